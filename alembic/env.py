@@ -17,7 +17,7 @@ if config.config_file_name is not None:
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.db.database import Base
-from app.models import ingredient, user  # Import all your models here
+from app.models import ingredient, user, recipe, job_run, user_recipe, saved_recipe, canonical_ingredient, recipe_ingredient  # Import all your models here
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,31 @@
+"""Add users.pantry_version and (user_id, id) index to ingredients
+
+Revision ID: 5d09e6b4f2c1
+Revises: e81b7c3d5a20
+Create Date: 2026-10-18 15:02:17.904216
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d09e6b4f2c1'
+down_revision: Union[str, None] = 'e81b7c3d5a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Use batch operations for SQLite compatibility
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('pantry_version', sa.Integer(), nullable=False, server_default='0'))
+    op.create_index('ix_ingredients_user_id_id', 'ingredients', ['user_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ingredients_user_id_id', table_name='ingredients')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('pantry_version')
@@ -0,0 +1,31 @@
+"""Add recipes.updated_at so recipe indexes can pick up edited recipes
+
+Revision ID: a3e7c5d81f96
+Revises: f4b9e1a73c26
+Create Date: 2026-10-19 10:12:08.530417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3e7c5d81f96'
+down_revision: Union[str, None] = 'f4b9e1a73c26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_recipes_updated_at'), ['updated_at'], unique=False)
+    op.execute("UPDATE recipes SET updated_at = COALESCE(fetched_at, CURRENT_TIMESTAMP)")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_recipes_updated_at'))
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,45 @@
+"""Add user_recipes table with a unique (user_id, recipe_id)
+
+Revision ID: a7d3e5f19c84
+Revises: 5d09e6b4f2c1
+Create Date: 2026-10-18 15:12:47.208391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3e5f19c84'
+down_revision: Union[str, None] = '5d09e6b4f2c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('user_recipes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(), nullable=True),
+    sa.Column('last_cooked', sa.DateTime(), nullable=True),
+    sa.Column('cook_count', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('is_favorite', sa.Boolean(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'recipe_id', name='uq_user_recipes_user_id_recipe_id')
+    )
+    op.create_index(op.f('ix_user_recipes_id'), 'user_recipes', ['id'], unique=False)
+    op.create_index(op.f('ix_user_recipes_recipe_id'), 'user_recipes', ['recipe_id'], unique=False)
+    op.create_index(op.f('ix_user_recipes_user_id'), 'user_recipes', ['user_id'], unique=False)
+    op.create_index(op.f('ix_user_recipes_title'), 'user_recipes', ['title'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_recipes_title'), table_name='user_recipes')
+    op.drop_index(op.f('ix_user_recipes_user_id'), table_name='user_recipes')
+    op.drop_index(op.f('ix_user_recipes_recipe_id'), table_name='user_recipes')
+    op.drop_index(op.f('ix_user_recipes_id'), table_name='user_recipes')
+    op.drop_table('user_recipes')
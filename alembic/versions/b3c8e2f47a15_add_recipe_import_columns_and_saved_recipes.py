@@ -0,0 +1,84 @@
+"""Add source URL, content hash and fetch validators to recipes; add saved_recipes
+
+Revision ID: b3c8e2f47a15
+Revises: a7d3e5f19c84
+Create Date: 2026-10-18 16:05:31.482907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3c8e2f47a15'
+down_revision: Union[str, None] = 'a7d3e5f19c84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+IMPORT_COLUMNS = (
+    ('servings', sa.Integer()),
+    ('ready_in_minutes', sa.Integer()),
+    ('source_url', sa.String()),
+    ('content_hash', sa.String(length=64)),
+    ('etag', sa.String()),
+    ('last_modified', sa.String()),
+    ('fetched_at', sa.DateTime()),
+)
+
+
+def upgrade() -> None:
+    # recipes used to be created by setup_db.py only, so it may not exist in a migrated database
+    if not sa.inspect(op.get_bind()).has_table('recipes'):
+        op.create_table('recipes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('instructions', sa.String(), nullable=True),
+        sa.Column('ingredients', sa.String(), nullable=True),
+        sa.Column('image_url', sa.String(), nullable=True),
+        *[sa.Column(name, type_, nullable=True) for name, type_ in IMPORT_COLUMNS],
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_recipes_id'), 'recipes', ['id'], unique=False)
+        op.create_index(op.f('ix_recipes_title'), 'recipes', ['title'], unique=False)
+    else:
+        # Use batch operations for SQLite compatibility
+        with op.batch_alter_table('recipes', schema=None) as batch_op:
+            for name, type_ in IMPORT_COLUMNS:
+                batch_op.add_column(sa.Column(name, type_, nullable=True))
+    op.create_index(op.f('ix_recipes_source_url'), 'recipes', ['source_url'], unique=True)
+    op.create_index(op.f('ix_recipes_content_hash'), 'recipes', ['content_hash'], unique=True)
+
+    op.create_table('saved_recipes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('saved_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'recipe_id', name='uq_saved_recipes_user_id_recipe_id')
+    )
+    op.create_index(op.f('ix_saved_recipes_id'), 'saved_recipes', ['id'], unique=False)
+    op.create_index(op.f('ix_saved_recipes_user_id'), 'saved_recipes', ['user_id'], unique=False)
+    op.create_index(op.f('ix_saved_recipes_recipe_id'), 'saved_recipes', ['recipe_id'], unique=False)
+    # Recipes added before imports were shared stay saved for the user who added them
+    op.execute(
+        "INSERT INTO saved_recipes (user_id, recipe_id) "
+        "SELECT user_id, id FROM recipes WHERE user_id IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_saved_recipes_recipe_id'), table_name='saved_recipes')
+    op.drop_index(op.f('ix_saved_recipes_user_id'), table_name='saved_recipes')
+    op.drop_index(op.f('ix_saved_recipes_id'), table_name='saved_recipes')
+    op.drop_table('saved_recipes')
+    op.drop_index(op.f('ix_recipes_content_hash'), table_name='recipes')
+    op.drop_index(op.f('ix_recipes_source_url'), table_name='recipes')
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        for name, _ in reversed(IMPORT_COLUMNS):
+            batch_op.drop_column(name)
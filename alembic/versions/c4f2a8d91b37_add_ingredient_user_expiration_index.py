@@ -0,0 +1,26 @@
+"""Add (user_id, expiration_date) index to ingredients
+
+Revision ID: c4f2a8d91b37
+Revises: 9131c7d17693
+Create Date: 2026-10-18 09:12:40.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f2a8d91b37'
+down_revision: Union[str, None] = '9131c7d17693'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_ingredients_user_id_expiration_date', 'ingredients', ['user_id', 'expiration_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ingredients_user_id_expiration_date', table_name='ingredients')
@@ -0,0 +1,243 @@
+"""Move recipe ingredients from a JSON string column into recipe_ingredients rows
+
+Revision ID: d6f3a9c2e184
+Revises: b3c8e2f47a15
+Create Date: 2026-10-18 17:21:09.613054
+
+"""
+import ast
+import itertools
+import json
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6f3a9c2e184'
+down_revision: Union[str, None] = 'b3c8e2f47a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+# Lines without an ingredient name (section headings) keep their place under this canonical row
+UNNAMED_INGREDIENT = ''
+
+# Frozen copy of app.services.ingredient_names.parse_ingredient_line as of this revision, so the
+# backfill does not change when the live parser does
+_NON_WORD = re.compile(r"[^a-z0-9.\s-]+")
+_WHITESPACE = re.compile(r"[\s_-]+")
+_NUMBER = re.compile(r"^\d+(\.\d+)?$")
+_FRACTION = re.compile(r"^(\d+)/(\d+)$")
+_RANGE = re.compile(r"^(\d+(?:\.\d+)?)\s*(?:-|–|to)\s*\d+(?:\.\d+)?")
+_GLUED = re.compile(r"(?<=\d)(?=[a-z½⅓⅔¼¾⅛])|(?<=[½⅓⅔¼¾⅛])(?=\S)")
+_PARENTHESES = re.compile(r"\([^)]*\)")
+_UNICODE_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75, "⅛": 0.125}
+_UNIT_SYNONYMS = {
+    "g": "g", "gr": "g", "gram": "g", "grams": "g",
+    "kg": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg", "kilogram": "kg", "kilograms": "kg",
+    "mg": "mg", "milligram": "mg", "milligrams": "mg",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "cup": "cup", "cups": "cup", "c": "cup",
+    "tbsp": "tbsp", "tbs": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "pinch": "pinch", "pinches": "pinch",
+    "piece": "piece", "pieces": "piece", "pc": "piece", "pcs": "piece",
+    "can": "can", "cans": "can",
+    "pack": "pack", "packs": "pack", "package": "pack", "packages": "pack",
+    "bunch": "bunch", "bunches": "bunch",
+    "clove": "clove", "cloves": "clove",
+}
+_ARTICLES = {"a", "an"}
+_IRREGULAR_PLURALS = {
+    "leaves": "leaf", "loaves": "loaf", "halves": "half", "knives": "knife", "potatoes": "potato",
+    "tomatoes": "tomato", "mangoes": "mango", "molasses": "molasses", "hummus": "hummus",
+    "couscous": "couscous", "asparagus": "asparagus", "swiss": "swiss", "peas": "pea",
+    "cheeses": "cheese", "olives": "olive",
+}
+
+
+def _singularize(word):
+    if word in _IRREGULAR_PLURALS:
+        return _IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _normalize_name(name):
+    name = _NON_WORD.sub(" ", (name or "").lower())
+    words = [word.strip(".") for word in _WHITESPACE.sub(" ", name).strip().split(" ")]
+    words = [word for word in words if word]
+    counted = article = False
+    while len(words) > 1 and (_NUMBER.match(words[0]) or words[0] in _ARTICLES or (counted and words[0] == "x")):
+        word = words.pop(0)
+        counted = counted or _NUMBER.match(word) is not None
+        article = not counted
+    if (counted or article) and len(words) > 1 and words[0] in _UNIT_SYNONYMS \
+            and (counted or (len(words) > 2 and words[1] == "of")):
+        words.pop(0)
+    if (counted or article) and len(words) > 1 and words[0] == "of":
+        words.pop(0)
+    if words:
+        words[-1] = _singularize(words[-1])
+    return " ".join(words)
+
+
+def _amount_of(word):
+    if _NUMBER.match(word):
+        return float(word)
+    if word in _UNICODE_FRACTIONS:
+        return _UNICODE_FRACTIONS[word]
+    fraction = _FRACTION.match(word)
+    if fraction and int(fraction.group(2)):
+        return int(fraction.group(1)) / int(fraction.group(2))
+    return None
+
+
+def parse_ingredient_line(line):
+    text = _PARENTHESES.sub(" ", (line or "").lower()).split(",")[0].strip()
+    if text.endswith(":"):
+        return None, None, UNNAMED_INGREDIENT
+    text = _GLUED.sub(" ", _RANGE.sub(r"\1", text))
+    words = text.split()
+    amount = None
+    while words and (value := _amount_of(words[0])) is not None:
+        amount = (amount or 0.0) + value
+        words.pop(0)
+    unit = None
+    if len(words) > 1 and words[0].rstrip(".") in _UNIT_SYNONYMS and (amount is not None or words[1] == "of"):
+        unit = _UNIT_SYNONYMS[words.pop(0).rstrip(".")]
+    elif amount is not None and len(words) > 2 and words[0] == "x" and _amount_of(words[1]) is not None:
+        words = words[2:]
+        if len(words) > 1 and words[0].rstrip(".") in _UNIT_SYNONYMS:
+            words.pop(0)
+    if (unit or amount is not None) and len(words) > 1 and words[0] == "of":
+        words.pop(0)
+    return amount, unit, _normalize_name(" ".join(words))
+
+recipes = sa.table('recipes', sa.column('id', sa.Integer()), sa.column('ingredients', sa.String()))
+canonical_ingredients = sa.table('canonical_ingredients', sa.column('id', sa.Integer()), sa.column('name', sa.String()))
+recipe_ingredients = sa.table(
+    'recipe_ingredients',
+    sa.column('recipe_id', sa.Integer()), sa.column('canonical_ingredient_id', sa.Integer()),
+    sa.column('position', sa.Integer()), sa.column('amount', sa.Float()), sa.column('unit', sa.String()),
+    sa.column('text', sa.String()),
+)
+
+
+def stored_lines(value):
+    # The column held a JSON list; older rows may contain a Python repr or a comma list
+    if not value:
+        return []
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        try:
+            parsed = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            parsed = value.split(",")
+    if isinstance(parsed, str):
+        parsed = [parsed]
+    return [str(item).strip() for item in parsed if str(item).strip()]
+
+
+def canonical_ids(bind, names, known):
+    new_names = sorted(set(names) - known.keys())
+    if new_names:
+        bind.execute(canonical_ingredients.insert(), [{'name': name} for name in new_names])
+        known.update(bind.execute(
+            sa.select(canonical_ingredients.c.name, canonical_ingredients.c.id)
+            .where(canonical_ingredients.c.name.in_(new_names))
+        ).all())
+    return known
+
+
+def upgrade() -> None:
+    op.create_table('canonical_ingredients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_canonical_ingredients_id'), 'canonical_ingredients', ['id'], unique=False)
+    op.create_index(op.f('ix_canonical_ingredients_name'), 'canonical_ingredients', ['name'], unique=True)
+    op.create_table('recipe_ingredients',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipe_id', sa.Integer(), nullable=False),
+    sa.Column('canonical_ingredient_id', sa.Integer(), nullable=False),
+    sa.Column('position', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=True),
+    sa.Column('unit', sa.String(), nullable=True),
+    sa.Column('text', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['canonical_ingredient_id'], ['canonical_ingredients.id'], ),
+    sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_recipe_ingredients_id'), 'recipe_ingredients', ['id'], unique=False)
+    op.create_index(op.f('ix_recipe_ingredients_recipe_id'), 'recipe_ingredients', ['recipe_id'], unique=False)
+    op.create_index('ix_recipe_ingredients_canonical_ingredient_id_recipe_id', 'recipe_ingredients',
+                    ['canonical_ingredient_id', 'recipe_id'], unique=False)
+
+    # Backfill in keyset batches so large catalogs never sit in memory at once
+    bind = op.get_bind()
+    known = {}
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(recipes.c.id, recipes.c.ingredients)
+            .where(recipes.c.id > last_id).order_by(recipes.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        parsed = [
+            (recipe_id, position, line, *parse_ingredient_line(line))
+            for recipe_id, value in rows
+            for position, line in enumerate(stored_lines(value))
+        ]
+        ids = canonical_ids(bind, [item[-1] for item in parsed], known)
+        if parsed:
+            bind.execute(recipe_ingredients.insert(), [
+                {'recipe_id': recipe_id, 'canonical_ingredient_id': ids[name], 'position': position,
+                 'amount': amount, 'unit': unit, 'text': line}
+                for recipe_id, position, line, amount, unit, name in parsed
+            ])
+
+    # Use batch operations for SQLite compatibility
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.drop_column('ingredients')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('recipes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ingredients', sa.String(), nullable=True))
+
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(recipe_ingredients.c.recipe_id, recipe_ingredients.c.text)
+        .order_by(recipe_ingredients.c.recipe_id, recipe_ingredients.c.position)
+    ).all()
+    for recipe_id, lines in itertools.groupby(rows, key=lambda row: row.recipe_id):
+        bind.execute(
+            recipes.update().where(recipes.c.id == recipe_id)
+            .values(ingredients=json.dumps([line.text for line in lines]))
+        )
+
+    op.drop_index('ix_recipe_ingredients_canonical_ingredient_id_recipe_id', table_name='recipe_ingredients')
+    op.drop_index(op.f('ix_recipe_ingredients_recipe_id'), table_name='recipe_ingredients')
+    op.drop_index(op.f('ix_recipe_ingredients_id'), table_name='recipe_ingredients')
+    op.drop_table('recipe_ingredients')
+    op.drop_index(op.f('ix_canonical_ingredients_name'), table_name='canonical_ingredients')
+    op.drop_index(op.f('ix_canonical_ingredients_id'), table_name='canonical_ingredients')
+    op.drop_table('canonical_ingredients')
@@ -0,0 +1,59 @@
+"""Add job_locks and job_runs tables
+
+Revision ID: e81b7c3d5a20
+Revises: c4f2a8d91b37
+Create Date: 2026-10-18 11:40:05.532719
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81b7c3d5a20'
+down_revision: Union[str, None] = 'c4f2a8d91b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('job_locks',
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('owner', sa.String(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('job_runs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_name', sa.String(), nullable=False),
+    sa.Column('batch_id', sa.String(), nullable=False),
+    sa.Column('trigger', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('shard', sa.Integer(), nullable=False),
+    sa.Column('shard_count', sa.Integer(), nullable=False),
+    sa.Column('owner', sa.String(), nullable=True),
+    sa.Column('queued_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('duration_s', sa.Float(), nullable=True),
+    sa.Column('rows_scanned', sa.Integer(), nullable=True),
+    sa.Column('users_notified', sa.Integer(), nullable=True),
+    sa.Column('notifications_sent', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_job_runs_id'), 'job_runs', ['id'], unique=False)
+    op.create_index(op.f('ix_job_runs_job_name'), 'job_runs', ['job_name'], unique=False)
+    op.create_index(op.f('ix_job_runs_batch_id'), 'job_runs', ['batch_id'], unique=False)
+    op.create_index(op.f('ix_job_runs_status'), 'job_runs', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_job_runs_status'), table_name='job_runs')
+    op.drop_index(op.f('ix_job_runs_batch_id'), table_name='job_runs')
+    op.drop_index(op.f('ix_job_runs_job_name'), table_name='job_runs')
+    op.drop_index(op.f('ix_job_runs_id'), table_name='job_runs')
+    op.drop_table('job_runs')
+    op.drop_table('job_locks')
@@ -0,0 +1,350 @@
+"""Merge canonical ingredients that the ingredient dictionary resolves to the same name
+
+Revision ID: f4b9e1a73c26
+Revises: d6f3a9c2e184
+Create Date: 2026-10-18 19:02:47.115830
+
+"""
+from collections import defaultdict
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4b9e1a73c26'
+down_revision: Union[str, None] = 'd6f3a9c2e184'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+canonical_ingredients = sa.table('canonical_ingredients', sa.column('id', sa.Integer()), sa.column('name', sa.String()))
+recipe_ingredients = sa.table(
+    'recipe_ingredients', sa.column('canonical_ingredient_id', sa.Integer()),
+)
+
+# Frozen copy of app.services.ingredient_dictionary as of this revision (DICTIONARY_VERSION 3), so
+# the merge does not change when the live dictionary does. Aliases are in its key form: every
+# word singular. Typo matching is left out: rows it would merge keep their own name.
+_CANONICAL_ALIASES = {
+    'tomato': ('roma tomato', 'plum tomato', 'vine tomato', 'beefsteak tomato', 'cherry tomato', 'grape tomato'),
+    'tomato paste': ('tomato puree', 'tomato concentrate'),
+    'tomato sauce': ('passata', 'marinara sauce'),
+    'canned tomato': ('chopped tomato', 'crushed tomato', 'diced tomato', 'tinned tomato'),
+    'onion': ('yellow onion', 'white onion', 'brown onion', 'sweet onion', 'spanish onion'),
+    'red onion': ('purple onion',),
+    'green onion': ('scallion', 'spring onion', 'salad onion'),
+    'shallot': ('eschalot',),
+    'garlic': ('garlic clove', 'garlic bulb'),
+    'garlic powder': ('granulated garlic',),
+    'onion powder': (),
+    'ginger': ('ginger root', 'fresh ginger', 'root ginger'),
+    'potato': ('russet potato', 'yukon gold potato', 'new potato', 'baby potato', 'white potato', 'red potato'),
+    'sweet potato': ('yam', 'kumara'),
+    'mashed potato': ('potato mash',),
+    'carrot': ('baby carrot',),
+    'celery': ('celery stalk', 'celery rib', 'celery stick'),
+    'bell pepper': ('capsicum', 'sweet pepper', 'red pepper', 'green pepper', 'yellow pepper', 'orange pepper'),
+    'chili pepper': ('chili', 'chilli', 'chile', 'hot pepper', 'red chili', 'green chili', 'bird eye chili'),
+    'jalapeno': ('jalape o', 'jalapeno pepper', 'jalape o pepper'),
+    'cucumber': ('english cucumber', 'persian cucumber'),
+    'zucchini': ('courgette',),
+    'eggplant': ('aubergine', 'brinjal'),
+    'broccoli': ('broccoli floret', 'calabrese'),
+    'cauliflower': ('cauliflower floret',),
+    'cabbage': ('green cabbage', 'white cabbage', 'head cabbage', 'savoy cabbage'),
+    'red cabbage': ('purple cabbage',),
+    'bok choy': ('pak choi', 'bok choi'),
+    'spinach': ('baby spinach', 'english spinach'),
+    'kale': ('curly kale', 'lacinato kale', 'cavolo nero', 'tuscan kale'),
+    'lettuce': ('romaine', 'romaine lettuce', 'iceberg lettuce', 'butter lettuce', 'cos lettuce', 'little gem'),
+    'arugula': ('rocket', 'roquette'),
+    'mushroom': ('button mushroom', 'white mushroom', 'cremini mushroom', 'chestnut mushroom', 'champignon',
+                 'baby bella'),
+    'portobello mushroom': ('portobello', 'portabella mushroom'),
+    'shiitake mushroom': ('shiitake',),
+    'porcini mushroom': ('porcini', 'cep', 'bolete'),
+    'maitake mushroom': ('maitake', 'hen of the wood'),
+    'corn': ('sweetcorn', 'sweet corn', 'corn kernel', 'maize', 'corn on the cob'),
+    'pea': ('green pea', 'garden pea', 'frozen pea', 'petit pois'),
+    'green bean': ('string bean', 'french bean', 'haricot vert', 'snap bean'),
+    'asparagus': ('asparagus spear',),
+    'artichoke': ('globe artichoke', 'artichoke heart'),
+    'cardoon': (),
+    'leek': (),
+    'fennel': ('fennel bulb', 'florence fennel'),
+    'beet': ('beetroot',),
+    'radish': (),
+    'turnip': (),
+    'parsnip': (),
+    'pumpkin': (),
+    'butternut squash': ('butternut',),
+    'acorn squash': (),
+    'spaghetti squash': (),
+    'avocado': (),
+    'brussels sprout': ('brussel sprout',),
+    'olive': ('black olive', 'green olive', 'kalamata olive'),
+    'apple': ('granny smith', 'granny smith apple', 'gala apple', 'fuji apple', 'honeycrisp apple',
+              'golden delicious', 'pink lady apple'),
+    'banana': (),
+    'orange': ('navel orange', 'blood orange', 'valencia orange'),
+    'lemon': (),
+    'lime': (),
+    'lemon juice': (),
+    'lime juice': (),
+    'strawberry': (),
+    'blueberry': (),
+    'raspberry': (),
+    'blackberry': (),
+    'cranberry': (),
+    'grape': ('red grape', 'green grape', 'seedless grape'),
+    'raisin': ('sultana',),
+    'pineapple': (),
+    'mango': (),
+    'peach': (),
+    'pear': (),
+    'plum': (),
+    'cherry': (),
+    'apricot': (),
+    'fig': (),
+    'date': ('medjool date',),
+    'pomegranate': (),
+    'kiwi': ('kiwifruit', 'kiwi fruit'),
+    'watermelon': (),
+    'melon': ('cantaloupe', 'honeydew'),
+    'coconut': (),
+    'jackfruit': (),
+    'custard apple': ('cherimoya',),
+    'basil': ('sweet basil', 'basil leaf', 'thai basil'),
+    'parsley': ('flat leaf parsley', 'italian parsley', 'curly parsley'),
+    'cilantro': ('coriander leaf', 'fresh coriander', 'chinese parsley'),
+    'coriander': ('ground coriander', 'coriander seed'),
+    'mint': ('mint leaf', 'spearmint', 'peppermint'),
+    'dill': (),
+    'rosemary': (),
+    'thyme': (),
+    'oregano': (),
+    'sage': (),
+    'chive': (),
+    'bay leaf': ('bay',),
+    'cumin': ('ground cumin', 'cumin seed'),
+    'paprika': ('smoked paprika', 'sweet paprika'),
+    'cinnamon': ('ground cinnamon', 'cinnamon stick'),
+    'nutmeg': (),
+    'turmeric': (),
+    'chili powder': (),
+    'cayenne pepper': ('cayenne',),
+    'red pepper flake': ('chili flake', 'crushed red pepper', 'red chili flake'),
+    'black pepper': ('pepper', 'ground black pepper', 'peppercorn', 'black peppercorn', 'ground pepper'),
+    'salt': ('sea salt', 'kosher salt', 'table salt', 'flaky salt'),
+    'vanilla': ('vanilla extract', 'vanilla essence', 'vanilla bean', 'vanilla pod'),
+    'curry powder': (),
+    'curry paste': ('red curry paste', 'green curry paste'),
+    'garam masala': (),
+    'egg': ('large egg', 'whole egg', 'free range egg', 'hen egg'),
+    'egg yolk': (),
+    'egg white': (),
+    'milk': ('whole milk', 'skim milk', 'skimmed milk', 'semi skimmed milk', 'cow milk'),
+    'butter': ('unsalted butter', 'salted butter'),
+    'cream': ('heavy cream', 'double cream', 'whipping cream', 'single cream', 'light cream', 'heavy whipping cream'),
+    'sour cream': (),
+    'yogurt': ('yoghurt', 'greek yogurt', 'plain yogurt', 'natural yogurt'),
+    'cheese': (),
+    'cheddar': ('cheddar cheese',),
+    'parmesan': ('parmesan cheese', 'parmigiano reggiano', 'parmigiano'),
+    'mozzarella': ('mozzarella cheese', 'buffalo mozzarella'),
+    'feta': ('feta cheese',),
+    'cream cheese': (),
+    'ricotta': ('ricotta cheese',),
+    'goat cheese': ('chevre',),
+    'ice cream': (),
+    'eggnog': (),
+    'chicken': ('chicken breast', 'chicken thigh', 'chicken leg', 'chicken drumstick', 'chicken wing',
+                'whole chicken', 'chicken fillet', 'chicken meat'),
+    'beef': ('beef steak', 'steak', 'stewing beef', 'beef chuck', 'sirloin'),
+    'ground beef': ('minced beef', 'beef mince', 'hamburger meat'),
+    'pork': ('pork chop', 'pork loin', 'pork shoulder', 'pork belly'),
+    'ground pork': ('minced pork', 'pork mince'),
+    'bacon': ('streaky bacon', 'bacon rasher', 'pancetta'),
+    'ham': (),
+    'sausage': (),
+    'hot dog': ('hotdog', 'frankfurter'),
+    'lamb': (),
+    'turkey': (),
+    'salmon': ('salmon fillet', 'coho', 'coho salmon'),
+    'tuna': ('canned tuna', 'tuna steak'),
+    'cod': (),
+    'anchovy': (),
+    'shrimp': ('prawn', 'king prawn', 'tiger prawn'),
+    'crab': ('crab meat', 'dungeness crab', 'king crab', 'rock crab'),
+    'lobster': ('spiny lobster', 'american lobster'),
+    'crayfish': ('crawfish',),
+    'flour': ('all purpose flour', 'plain flour', 'wheat flour', 'white flour'),
+    'bread flour': ('strong flour',),
+    'whole wheat flour': ('wholemeal flour',),
+    'self raising flour': ('self rising flour',),
+    'cornstarch': ('corn starch', 'cornflour'),
+    'sugar': ('white sugar', 'granulated sugar', 'caster sugar', 'castor sugar'),
+    'brown sugar': ('light brown sugar', 'dark brown sugar', 'muscovado'),
+    'powdered sugar': ('icing sugar', 'confectioner sugar'),
+    'honey': (),
+    'maple syrup': (),
+    'baking powder': (),
+    'baking soda': ('bicarbonate of soda', 'bicarb soda', 'sodium bicarbonate'),
+    'yeast': ('dry yeast', 'active dry yeast', 'instant yeast'),
+    'dough': ('pizza dough', 'bread dough'),
+    'chocolate': ('dark chocolate', 'milk chocolate', 'chocolate chip'),
+    'chocolate sauce': ('chocolate syrup',),
+    'cocoa powder': ('cocoa', 'unsweetened cocoa'),
+    'rice': ('white rice', 'long grain rice', 'basmati rice', 'jasmine rice'),
+    'brown rice': (),
+    'pasta': (),
+    'spaghetti': (),
+    'penne': (),
+    'macaroni': (),
+    'noodle': ('ramen noodle',),
+    'bread': ('white bread', 'sandwich bread', 'loaf'),
+    'baguette': ('french bread', 'french loaf'),
+    'bagel': (),
+    'pretzel': (),
+    'tortilla': ('flour tortilla', 'corn tortilla'),
+    'oat': ('rolled oat', 'oatmeal', 'porridge oat'),
+    'quinoa': (),
+    'couscous': (),
+    'lentil': ('red lentil', 'green lentil', 'brown lentil'),
+    'chickpea': ('garbanzo bean', 'garbanzo', 'chick pea'),
+    'black bean': (),
+    'kidney bean': ('red kidney bean',),
+    'tofu': (),
+    'almond': (),
+    'walnut': (),
+    'peanut': (),
+    'cashew': (),
+    'pine nut': (),
+    'sesame seed': (),
+    'olive oil': ('extra virgin olive oil', 'evoo'),
+    'vegetable oil': ('canola oil', 'rapeseed oil', 'sunflower oil', 'cooking oil'),
+    'sesame oil': (),
+    'coconut oil': (),
+    'vinegar': ('white vinegar', 'distilled vinegar'),
+    'balsamic vinegar': (),
+    'apple cider vinegar': ('cider vinegar',),
+    'soy sauce': ('soya sauce', 'shoyu', 'tamari', 'light soy sauce', 'dark soy sauce'),
+    'fish sauce': (),
+    'worcestershire sauce': (),
+    'mustard': ('dijon mustard', 'yellow mustard', 'wholegrain mustard'),
+    'ketchup': ('tomato ketchup',),
+    'mayonnaise': ('mayo',),
+    'peanut butter': (),
+    'jam': ('preserve',),
+    'caper': (),
+    'pickle': ('gherkin',),
+    'coconut milk': (),
+    'guacamole': (),
+    'hummus': (),
+    'chicken stock': ('chicken broth',),
+    'vegetable stock': ('vegetable broth',),
+    'beef stock': ('beef broth',),
+    'stock': ('broth', 'stock cube', 'bouillon'),
+    'water': (),
+    'red wine': (),
+    'white wine': (),
+    'beer': (),
+    'coffee': ('espresso', 'ground coffee', 'instant coffee'),
+    'tea': (),
+    'pizza': (),
+    'burrito': (),
+    'ice pop': ('ice lolly', 'popsicle'),
+}
+_ALIASES = {alias: canonical for canonical, aliases in _CANONICAL_ALIASES.items() for alias in (canonical, *aliases)}
+_DESCRIPTORS = {
+    'large', 'medium', 'small', 'big', 'extra', 'ripe', 'fresh', 'freshly', 'frozen', 'raw', 'whole',
+    'organic', 'boneless', 'skinless', 'lean', 'dried', 'canned', 'tinned', 'salted', 'unsalted',
+    'red', 'green', 'yellow',
+    'chopped', 'diced', 'sliced', 'minced', 'grated', 'shredded', 'crushed', 'ground', 'halved',
+    'quartered', 'peeled', 'seeded', 'cubed', 'trimmed', 'rinsed', 'drained', 'sifted', 'softened',
+    'melted', 'beaten', 'cooked', 'roasted', 'toasted', 'thinly', 'finely', 'roughly', 'coarsely',
+    'to', 'taste', 'optional', 'for', 'garnish', 'serving',
+}
+_IRREGULAR_PLURALS = {
+    'leaves': 'leaf', 'loaves': 'loaf', 'halves': 'half', 'knives': 'knife', 'potatoes': 'potato',
+    'tomatoes': 'tomato', 'mangoes': 'mango', 'molasses': 'molasses', 'hummus': 'hummus',
+    'couscous': 'couscous', 'asparagus': 'asparagus', 'swiss': 'swiss', 'peas': 'pea',
+    'cheeses': 'cheese', 'olives': 'olive',
+}
+
+
+def _singularize(word):
+    if word in _IRREGULAR_PLURALS:
+        return _IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word.endswith(('ss', 'us', 'is')):
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('ches', 'shes', 'xes', 'zes', 'sses')):
+        return word[:-2]
+    if word.endswith('s'):
+        return word[:-1]
+    return word
+
+
+def _is_descriptor(word):
+    return word in _DESCRIPTORS or any(char.isdigit() for char in word)
+
+
+def canonical_ingredient_name(name):
+    # Names are already in normalised form (d6f3a9c2e184): an exact alias, else the longest alias
+    # that only descriptors surround, taking the last ingredient of "salt and pepper"
+    words = [_singularize(word) for word in name.split()]
+    if not words:
+        return name
+    if ' '.join(words) in _ALIASES:
+        return _ALIASES[' '.join(words)]
+    for conjunction in ('and', 'or'):
+        if conjunction in words[:-1]:
+            words = words[len(words) - words[::-1].index(conjunction):]
+    best = None
+    for start in range(len(words)):
+        for end in range(len(words), start, -1):
+            canonical = _ALIASES.get(' '.join(words[start:end]))
+            if canonical is not None and all(map(_is_descriptor, words[end:])):
+                if best is None or end - start > best[0]:
+                    best = (end - start, canonical)
+                break
+        if not _is_descriptor(words[start]):
+            break
+    return best[1] if best else name
+
+
+def upgrade() -> None:
+    # "roma tomato", "tomatoes" and "tomato" become one row: recipes are repointed at the
+    # survivor (an existing row with the canonical name, else the lowest id, renamed)
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(canonical_ingredients.c.id, canonical_ingredients.c.name).order_by(canonical_ingredients.c.id)
+    ).all()
+    groups = defaultdict(list)
+    for row in rows:
+        groups[canonical_ingredient_name(row.name)].append(row)
+
+    for name, members in groups.items():
+        if len(members) == 1 and members[0].name == name:
+            continue
+        survivor = next((row for row in members if row.name == name), members[0])
+        merged = [row.id for row in members if row.id != survivor.id]
+        if merged:
+            bind.execute(
+                recipe_ingredients.update()
+                .where(recipe_ingredients.c.canonical_ingredient_id.in_(merged))
+                .values(canonical_ingredient_id=survivor.id)
+            )
+            bind.execute(canonical_ingredients.delete().where(canonical_ingredients.c.id.in_(merged)))
+        if survivor.name != name:
+            bind.execute(
+                canonical_ingredients.update().where(canonical_ingredients.c.id == survivor.id).values(name=name)
+            )
+
+
+def downgrade() -> None:
+    # Merges can't be split again; recipe_ingredients.text still holds each line as published
+    pass
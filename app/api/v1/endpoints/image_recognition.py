@@ -1,88 +1,141 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
 from google.cloud import vision
+import asyncio
 import os
-from core.config import settings
+from app.core.config import settings
 from typing import List
-import re
-from datetime import datetime, timedelta
+from app.core.uploads import read_upload
+from app.services.ingredient_dictionary import display_name, resolve_ingredient
+from app.services.label_text import scan_label_text
+from app.services.recognition_cache import create_recognition_cache
 
 router = APIRouter()
 
-client = vision.ImageAnnotatorClient()
+# Text and label detection go out together in a single annotate request per image
+VISION_FEATURES = [
+    vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION),
+    vision.Feature(type_=vision.Feature.Type.LABEL_DETECTION),
+]
 
-@router.post("/identify_ingredient")
-async def identify_ingredient(file: UploadFile = File(...)):
-    try:
-        content = await file.read()
-        image = vision.Image(content=content)
+_client = None
 
-        # Perform text detection
-        text_response = client.text_detection(image=image)
-        texts = text_response.text_annotations
+def get_vision_client():
+    # Created on first use; tests can swap it out through app.dependency_overrides
+    global _client
+    if _client is None:
+        _client = vision.ImageAnnotatorClient()
+    return _client
 
-        # Perform label detection
-        label_response = client.label_detection(image=image)
-        labels = label_response.label_annotations
+# Vision calls are billed per image, so retries and re-uploads are served from here
+vision_cache = create_recognition_cache("vision", settings.VISION_MODEL_VERSION)
 
-        # Extract information
-        ingredients = extract_ingredients(texts, labels)
+def annotate_images(client, contents: List[bytes], timeout: float):
+    requests = [
+        vision.AnnotateImageRequest(image=vision.Image(content=bytes(content)), features=VISION_FEATURES)
+        for content in contents
+    ]
+    response = client.batch_annotate_images(requests=requests, timeout=timeout)
+    return list(response.responses)
+
+async def annotate_images_async(client, contents: List[bytes]):
+    # Vision caps images per batch request, so larger uploads are split and the chunks sent concurrently
+    deadline = settings.VISION_DEADLINE_S
+    chunk_size = settings.VISION_MAX_IMAGES_PER_REQUEST
+    chunks = [contents[i:i + chunk_size] for i in range(0, len(contents), chunk_size)]
+    try:
+        chunk_responses = await asyncio.wait_for(
+            asyncio.gather(*[asyncio.to_thread(annotate_images, client, chunk, deadline) for chunk in chunks]),
+            timeout=deadline,
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Image recognition timed out")
+    return [response for responses in chunk_responses for response in responses]
+
+def build_recognition_result(response):
+    if response.error.message:
+        return {"message": response.error.message, "status": "error"}
+
+    # Extract information
+    ingredients = extract_ingredients(response.text_annotations, response.label_annotations)
+
+    if ingredients:
+        return {"ingredients": ingredients, "status": "pending_confirmation"}
+    return {"message": "No food ingredients detected in the image", "status": "no_ingredients"}
+
+def _lookup_cached(contents: List[bytes]):
+    return [vision_cache.lookup(content) for content in contents]
+
+def _store_cached(entries):
+    for key, result in entries:
+        vision_cache.set(key, result)
+
+async def recognize_images(client, contents: List[bytes]):
+    if not contents:
+        return []
+    # Hashing and the shared cache tier are blocking work, so they run off the event loop too
+    keys, results = map(list, zip(*await asyncio.to_thread(_lookup_cached, contents)))
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        responses = await annotate_images_async(client, [contents[i] for i in missing])
+        for i, response in zip(missing, responses):
+            results[i] = build_recognition_result(response)
+        await asyncio.to_thread(_store_cached, [(keys[i], results[i]) for i in missing if results[i]["status"] != "error"])
+    return results
 
-        if ingredients:
-            return {"ingredients": ingredients, "status": "pending_confirmation"}
-        else:
-            return {"message": "No food ingredients detected in the image", "status": "no_ingredients"}
+@router.post("/identify_ingredient")
+async def identify_ingredient(file: UploadFile = File(...), client=Depends(get_vision_client)):
+    try:
+        content = await read_upload(file)
+        result = (await recognize_images(client, [content]))[0]
+        if result["status"] == "error":
+            raise HTTPException(status_code=502, detail=result["message"])
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/identify_ingredients")
+async def identify_ingredients(files: List[UploadFile] = File(...), client=Depends(get_vision_client)):
+    try:
+        contents = [await read_upload(file) for file in files]
+        results = await recognize_images(client, contents)
+        return {"results": [{"filename": file.filename, **result} for file, result in zip(files, results)]}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 def extract_ingredients(texts, labels):
     ingredients = []
     text_content = texts[0].description if texts else ""
-
-    # Extract ingredients from labels
-    food_labels = [label.description for label in labels if label.score > 0.7 and is_food_related(label.description)]
-
-    for label in food_labels:
+    # One pass over the OCR text for every label; Vision reports the text's language as its locale
+    label_text = scan_label_text(text_content, texts[0].locale if texts else None)
+    expiration_date = label_text.expiration_date.isoformat() if label_text.expiration_date else ""
+    amounts = {}
+    for item in label_text.amounts:
+        amounts.setdefault(resolve_ingredient(item.name) if item.name else None, item.text)
+    # A package states one unnamed quantity ("NET WT 500 g"): it belongs to whatever is pictured
+    unnamed = amounts.get(None, "") if len(label_text.amounts) == 1 else ""
+
+    # Keep labels that name an ingredient, once each: "Tomato" and "Plum tomato" are one item,
+    # while generic ones ("Food", "Produce", "Tableware") name nothing
+    seen = set()
+    for label in labels:
+        canonical = resolve_ingredient(label.description) if label.score > 0.7 else None
+        if canonical is None or canonical in seen:
+            continue
+        seen.add(canonical)
         ingredient = {
-            "name": label,
-            "amount": extract_amount(text_content, label),
-            "expirationDate": extract_expiration_date(text_content)
+            "name": display_name(canonical),
+            "amount": amounts.get(canonical, unnamed),
+            "expirationDate": expiration_date
         }
         ingredients.append(ingredient)
 
     return ingredients
 
-def extract_amount(text, ingredient):
-    # Simple regex to find amount near the ingredient name
-    pattern = r'(\d+(\.\d+)?)\s*(g|kg|ml|l|oz|lb|cup|tbsp|tsp)\s*' + re.escape(ingredient)
-    match = re.search(pattern, text, re.IGNORECASE)
-    return match.group(0) if match else ""
-
-def extract_expiration_date(text):
-    # Simple regex to find dates in common formats
-    date_patterns = [
-        r'\d{1,2}/\d{1,2}/\d{2,4}',  # MM/DD/YYYY or DD/MM/YYYY
-        r'\d{1,2}-\d{1,2}-\d{2,4}',  # MM-DD-YYYY or DD-MM-YYYY
-        r'\d{4}-\d{2}-\d{2}',        # YYYY-MM-DD
-        r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}'  # Month DD, YYYY
-    ]
-
-    for pattern in date_patterns:
-        match = re.search(pattern, text)
-        if match:
-            try:
-                date = datetime.strptime(match.group(0), "%Y-%m-%d")
-                return date.strftime("%Y-%m-%d")
-            except ValueError:
-                pass  # If parsing fails, try the next pattern
-
-    return ""
-
-def is_food_related(label: str) -> bool:
-    # This is a simple check. You might want to use a more comprehensive list or API for better accuracy.
-    food_related_words = ['food', 'ingredient', 'fruit', 'vegetable', 'meat', 'dairy', 'grain', 'spice', 'herb']
-    return any(word in label.lower() for word in food_related_words)
-
 @router.post("/confirm_ingredients")
 async def confirm_ingredients(ingredients: List[dict]):
     # Here we would typically save the confirmed ingredients to the database
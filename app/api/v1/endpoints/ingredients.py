@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
-from db.database import get_db
-from models.ingredient import Ingredient
-from schemas.ingredient import IngredientCreate, IngredientUpdate, Ingredient as IngredientSchema
+from app.db.database import get_db
+from app.models.ingredient import Ingredient
+from app.schemas.ingredient import IngredientCreate, IngredientUpdate, Ingredient as IngredientSchema
+from app.services.ingredient_service import invalidate_pantry
 
 router = APIRouter()
 
@@ -14,12 +15,19 @@ def create_ingredient(ingredient: IngredientCreate, db: Session = Depends(get_db
     db.add(db_ingredient)
     db.commit()
     db.refresh(db_ingredient)
+    invalidate_pantry(db_ingredient.user_id)
     return db_ingredient
 
 @router.get("/", response_model=List[IngredientSchema])
-def read_ingredients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    ingredients = db.query(Ingredient).offset(skip).limit(limit).all()
-    return ingredients
+def read_ingredients(skip: int = 0, limit: int = 100, user_id: Optional[int] = None, after_id: Optional[int] = None,
+                     db: Session = Depends(get_db)):
+    query = db.query(Ingredient)
+    if user_id is not None:
+        query = query.filter(Ingredient.user_id == user_id)
+    if after_id is not None:
+        # Keyset paging: pass the last id of the previous page instead of a growing skip
+        return query.filter(Ingredient.id > after_id).order_by(Ingredient.id).limit(limit).all()
+    return query.order_by(Ingredient.id).offset(skip).limit(limit).all()
 
 @router.get("/{ingredient_id}", response_model=IngredientSchema)
 def read_ingredient(ingredient_id: int, db: Session = Depends(get_db)):
@@ -39,6 +47,7 @@ def update_ingredient(ingredient_id: int, ingredient: IngredientUpdate, db: Sess
     db.add(db_ingredient)
     db.commit()
     db.refresh(db_ingredient)
+    invalidate_pantry(db_ingredient.user_id)
     return db_ingredient
 
 @router.delete("/{ingredient_id}", response_model=IngredientSchema)
@@ -48,4 +57,5 @@ def delete_ingredient(ingredient_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Ingredient not found")
     db.delete(ingredient)
     db.commit()
+    invalidate_pantry(ingredient.user_id)
     return ingredient
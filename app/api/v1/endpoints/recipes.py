@@ -1,113 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
-import requests
-from datetime import datetime
+from typing import Dict, List
 
-from db.database import get_db
-from models.ingredient import Ingredient
-from models.user_recipe import UserRecipe
-from schemas.recipe import Recipe, RecipeSearch
-from schemas.user_recipe import UserRecipe as UserRecipeSchema
+from app.db.database import get_db, get_async_db, run_in_session
+from app.schemas.recipe import Recipe
+from app.schemas.user_recipe import UserRecipe as UserRecipeSchema
+from app.services import spoonacular_client
+from app.services.spoonacular_client import spoonacular, SpoonacularError
+from app.services.recipe_index import recipe_index
+from app.services.user_recipe_service import fetch_recipe_requirements, mark_recipe_cooked, set_favorite, unset_favorite
+from app.services.pantry_service import (
+    get_pantry_snapshot, get_pantry_snapshot_async, missing_ingredients, missing_ingredients_for_recipes
+)
 
 router = APIRouter()
 
-SPOONACULAR_API_KEY = "YOUR_SPOONACULAR_API_KEY"  # Replace with actual API key
-SPOONACULAR_BASE_URL = "https://api.spoonacular.com"
-
 @router.get("/search", response_model=List[Recipe])
-def search_recipes(query: str, db: Session = Depends(get_db)):
-    url = f"{SPOONACULAR_BASE_URL}/recipes/complexSearch"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY,
-        "query": query,
-        "number": 10,
-        "addRecipeInformation": True,
-    }
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch recipes")
-    return response.json()["results"]
+async def search_recipes(query: str, db: Session = Depends(get_db)):
+    try:
+        data = await spoonacular.aget(spoonacular_client.complex_search(query, number=10))
+    except SpoonacularError as e:
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch recipes")
+    return data["results"]
 
 @router.get("/by_ingredients", response_model=List[Recipe])
-def get_recipes_by_ingredients(db: Session = Depends(get_db)):
-    ingredients = db.query(Ingredient).all()
-    ingredient_names = [ingredient.name for ingredient in ingredients]
-
-    url = f"{SPOONACULAR_BASE_URL}/recipes/findByIngredients"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY,
-        "ingredients": ",".join(ingredient_names),
-        "number": 10,
-    }
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch recipes")
-    return response.json()
+def get_recipes_by_ingredients(user_id: int, db: Session = Depends(get_db)):
+    ingredient_names = sorted(get_pantry_snapshot(db, user_id).names)
+
+    # Prefer the local catalog; only spend Spoonacular quota when it has nothing to offer
+    suggestions = recipe_index.ensure_loaded(db).rank(ingredient_names, limit=10)
+    if suggestions:
+        return suggestions
+
+    try:
+        return spoonacular.get(spoonacular_client.find_by_ingredients(ingredient_names, number=10))
+    except SpoonacularError as e:
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch recipes")
 
 @router.get("/{recipe_id}/instructions", response_model=str)
-def get_recipe_instructions(recipe_id: int):
-    url = f"{SPOONACULAR_BASE_URL}/recipes/{recipe_id}/analyzedInstructions"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY,
-    }
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch recipe instructions")
-    instructions = response.json()
+async def get_recipe_instructions(recipe_id: int):
+    try:
+        instructions = await spoonacular.aget(spoonacular_client.analyzed_instructions(recipe_id))
+    except SpoonacularError as e:
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch recipe instructions")
     return "\n".join([step["step"] for step in instructions[0]["steps"]])
 
-@router.get("/{recipe_id}/missing_ingredients", response_model=List[str])
-def get_missing_ingredients(recipe_id: int, db: Session = Depends(get_db)):
-    url = f"{SPOONACULAR_BASE_URL}/recipes/{recipe_id}/ingredientWidget.json"
-    params = {
-        "apiKey": SPOONACULAR_API_KEY,
-    }
-    response = requests.get(url, params=params)
-    if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to fetch recipe ingredients")
-
-    recipe_ingredients = response.json()["ingredients"]
-    recipe_ingredient_names = [ingredient["name"] for ingredient in recipe_ingredients]
+@router.get("/missing_ingredients", response_model=Dict[int, List[str]])
+async def get_missing_ingredients_bulk(user_id: int, recipe_ids: List[int] = Query(...),
+                                       db: AsyncSession = Depends(get_async_db)):
+    recipe_ingredients = {}
+    remote_ids = []
+    index = await run_in_session(recipe_index.ensure_loaded)
+    for recipe_id in dict.fromkeys(recipe_ids):
+        names = index.ingredients_of(recipe_id)
+        if names:
+            recipe_ingredients[recipe_id] = sorted(names)
+        else:
+            remote_ids.append(recipe_id)
 
-    available_ingredients = db.query(Ingredient).all()
-    available_ingredient_names = [ingredient.name for ingredient in available_ingredients]
+    # Recipes outside the local catalog are fetched concurrently (and cached) instead of one by one
+    responses = await asyncio.gather(
+        *(spoonacular.aget(spoonacular_client.ingredient_widget(recipe_id)) for recipe_id in remote_ids),
+        return_exceptions=True,
+    )
+    for recipe_id, response in zip(remote_ids, responses):
+        if isinstance(response, SpoonacularError):
+            raise HTTPException(status_code=response.status_code, detail="Failed to fetch recipe ingredients")
+        if isinstance(response, Exception):
+            raise response
+        recipe_ingredients[recipe_id] = [ingredient["name"] for ingredient in response["ingredients"]]
 
-    missing_ingredients = [ingredient for ingredient in recipe_ingredient_names if ingredient not in available_ingredient_names]
-    return missing_ingredients
+    return missing_ingredients_for_recipes(await get_pantry_snapshot_async(db, user_id), recipe_ingredients)
 
-@router.post("/{recipe_id}/mark_cooked", response_model=UserRecipeSchema)
-def mark_recipe_as_cooked(recipe_id: int, db: Session = Depends(get_db)):
-    user_recipe = db.query(UserRecipe).filter(UserRecipe.recipe_id == recipe_id).first()
-    if user_recipe:
-        user_recipe.cook_count += 1
-        user_recipe.last_cooked = datetime.utcnow()
-    else:
-        user_recipe = UserRecipe(recipe_id=recipe_id, cook_count=1, last_cooked=datetime.utcnow())
-    db.add(user_recipe)
-    db.commit()
-    db.refresh(user_recipe)
-    return user_recipe
+@router.get("/{recipe_id}/missing_ingredients", response_model=List[str])
+def get_missing_ingredients(recipe_id: int, user_id: int, db: Session = Depends(get_db)):
+    try:
+        recipe_ingredients = spoonacular.get(spoonacular_client.ingredient_widget(recipe_id))["ingredients"]
+    except SpoonacularError as e:
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch recipe ingredients")
+
+    recipe_ingredient_names = [ingredient["name"] for ingredient in recipe_ingredients]
+    # Compared on normalised names against a cached set, so "Tomatoes" matches a pantry "tomato"
+    return missing_ingredients(get_pantry_snapshot(db, user_id), recipe_ingredient_names)
+
+@router.post("/{recipe_id}/mark_cooked")
+def mark_recipe_as_cooked(recipe_id: int, user_id: int, db: Session = Depends(get_db)):
+    try:
+        requirements = fetch_recipe_requirements(recipe_id)
+    except SpoonacularError as e:
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch recipe ingredients")
+    # cook_count is incremented by an upsert and the pantry deducted in the same transaction
+    return mark_recipe_cooked(db, user_id, recipe_id, requirements)
 
 @router.post("/{recipe_id}/favorite", response_model=UserRecipeSchema)
-def save_favorite_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    user_recipe = db.query(UserRecipe).filter(UserRecipe.recipe_id == recipe_id).first()
-    if user_recipe:
-        user_recipe.is_favorite = True
-    else:
-        user_recipe = UserRecipe(recipe_id=recipe_id, is_favorite=True)
-    db.add(user_recipe)
-    db.commit()
-    db.refresh(user_recipe)
-    return user_recipe
+def save_favorite_recipe(recipe_id: int, user_id: int, db: Session = Depends(get_db)):
+    return set_favorite(db, user_id, recipe_id)
 
 @router.delete("/{recipe_id}/favorite", response_model=UserRecipeSchema)
-def remove_favorite_recipe(recipe_id: int, db: Session = Depends(get_db)):
-    user_recipe = db.query(UserRecipe).filter(UserRecipe.recipe_id == recipe_id).first()
+def remove_favorite_recipe(recipe_id: int, user_id: int, db: Session = Depends(get_db)):
+    user_recipe = unset_favorite(db, user_id, recipe_id)
     if user_recipe:
-        user_recipe.is_favorite = False
-        db.add(user_recipe)
-        db.commit()
-        db.refresh(user_recipe)
         return user_recipe
     raise HTTPException(status_code=404, detail="Recipe not found in favorites")
@@ -1,27 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
-from datetime import datetime
 
-from db.database import get_db
-from models.user_recipe import UserRecipe
-from schemas.user_recipe import UserRecipeCreate, UserRecipeUpdate, UserRecipe as UserRecipeSchema
+from app.db.database import get_db
+from app.models.user_recipe import UserRecipe
+from app.schemas.user_recipe import UserRecipeCreate, UserRecipeUpdate, UserRecipe as UserRecipeSchema
+from app.services.spoonacular_client import SpoonacularError
+from app.services.user_recipe_service import fetch_recipe_requirements, mark_recipe_cooked, set_favorite
 
 router = APIRouter()
 
-@router.post("/cooked", response_model=UserRecipeSchema)
+@router.post("/cooked")
 def mark_recipe_as_cooked(recipe: UserRecipeCreate, db: Session = Depends(get_db)):
-    existing_recipe = db.query(UserRecipe).filter(UserRecipe.id == recipe.id).first()
-    if existing_recipe:
-        existing_recipe.cook_count += 1
-        existing_recipe.last_cooked = datetime.utcnow()
-        db.add(existing_recipe)
-    else:
-        new_recipe = UserRecipe(**recipe.dict(), last_cooked=datetime.utcnow(), cook_count=1)
-        db.add(new_recipe)
-    db.commit()
-    db.refresh(existing_recipe if existing_recipe else new_recipe)
-    return existing_recipe if existing_recipe else new_recipe
+    try:
+        requirements = fetch_recipe_requirements(recipe.recipe_id)
+    except SpoonacularError as e:
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch recipe ingredients")
+    return mark_recipe_cooked(db, recipe.user_id, recipe.recipe_id, requirements, recipe.title)
 
 @router.get("/cooked", response_model=List[UserRecipeSchema])
 def get_cooked_recipes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
@@ -30,11 +25,7 @@ def get_cooked_recipes(skip: int = 0, limit: int = 100, db: Session = Depends(ge
 
 @router.post("/favorite", response_model=UserRecipeSchema)
 def save_favorite_recipe(recipe: UserRecipeCreate, db: Session = Depends(get_db)):
-    db_recipe = UserRecipe(**recipe.dict(), is_favorite=True)
-    db.add(db_recipe)
-    db.commit()
-    db.refresh(db_recipe)
-    return db_recipe
+    return set_favorite(db, recipe.user_id, recipe.recipe_id, True, recipe.title)
 
 @router.get("/favorite", response_model=List[UserRecipeSchema])
 def get_favorite_recipes(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
@@ -0,0 +1,245 @@
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Thread-safe in-process LRU with an entry bound and optional per-entry TTL."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float | None = None):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteCacheBackend:
+    """Shared cache tier in a local SQLite file, usable by every gunicorn worker on the host.
+
+    Expired rows are dropped when read, and all of them at most every `purge_interval_s` on
+    write, so keys that are never read again don't pile up.
+    """
+
+    def __init__(self, path: str, purge_interval_s: float = 300.0):
+        self.path = path
+        self.purge_interval_s = purge_interval_s
+        self._local = threading.local()
+        self._next_purge = 0.0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_expires_at ON cache_entries (expires_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            self.delete(key)
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl: float | None = None):
+        now = time.time()
+        expires_at = now + ttl if ttl else None
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), expires_at),
+        )
+        if now >= self._next_purge:
+            self._next_purge = now + self.purge_interval_s
+            self.purge_expired()
+
+    def purge_expired(self):
+        return self._connection().execute(
+            "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+        ).rowcount
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str):
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._connection().execute("DELETE FROM cache_entries WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",))
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache_entries")
+
+
+class FileCacheBackend:
+    """Shared cache tier as one JSON file per key, for hosts where SQLite locking is unwanted."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        if entry["expires_at"] is not None and entry["expires_at"] <= time.time():
+            self.delete(key)
+            return None
+        return entry["value"]
+
+    def set(self, key, value, ttl: float | None = None):
+        entry = {"key": key, "value": value, "expires_at": time.time() + ttl if ttl else None}
+        # Write to a temp file and rename so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_prefix(self, prefix: str):
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    if json.load(f).get("key", "").startswith(prefix):
+                        os.remove(path)
+            except (OSError, ValueError):
+                pass
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self.directory, name))
+
+
+def create_cache_backend(kind: str, path: str):
+    if kind == "sqlite":
+        return SQLiteCacheBackend(path)
+    if kind == "file":
+        return FileCacheBackend(path)
+    if kind in ("", "none", None):
+        return None
+    raise ValueError(f"Unknown cache backend '{kind}'")
+
+
+class TieredCache:
+    """In-process LRU in front of an optional shared backend, with hit/miss counters per tier.
+
+    Values must be JSON-serialisable so they can live in the shared tier.
+    """
+
+    def __init__(self, maxsize: int = 1024, shared=None, ttl: float | None = None):
+        self.local = LRUCache(maxsize)
+        self.shared = shared
+        self.ttl = ttl
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.shared_errors = 0
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+        if self.shared is not None:
+            try:
+                value = self.shared.get(key)
+            except Exception:
+                # The shared tier is an optimisation; never fail a request because of it
+                self.shared_errors += 1
+                value = None
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(key, value, self.ttl)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key, value, ttl: float | None = None):
+        ttl = ttl if ttl is not None else self.ttl
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, value, ttl)
+            except Exception:
+                self.shared_errors += 1
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception:
+                self.shared_errors += 1
+
+    def stats(self):
+        hits = self.local_hits + self.shared_hits
+        lookups = hits + self.misses
+        return {
+            "local_size": len(self.local),
+            "local_maxsize": self.local.maxsize,
+            "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "shared_errors": self.shared_errors,
+        }
@@ -5,8 +5,137 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Food App"
     API_V1_STR: str = "/api/v1"
     SPOONACULAR_API_KEY: str = "YOUR_SPOONACULAR_API_KEY"  # Replace with actual API key
+    SPOONACULAR_BASE_URL: str = "https://api.spoonacular.com"
+    SPOONACULAR_TIMEOUT_S: float = 10.0
+    SPOONACULAR_MAX_RETRIES: int = 3
+    SPOONACULAR_BACKOFF_S: float = 0.5
+    # A Retry-After longer than this fails the call instead of holding the request open
+    SPOONACULAR_MAX_RETRY_AFTER_S: float = 10.0
+    SPOONACULAR_MAX_CONNECTIONS: int = 20
+    SPOONACULAR_CACHE_SIZE: int = 2048
+    SPOONACULAR_CACHE_BACKEND: str = "sqlite"
+    SPOONACULAR_CACHE_PATH: str = "./spoonacular_cache.sqlite3"
     GOOGLE_CLOUD_VISION_CREDENTIALS: str  # This will be set from an environment variable
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./food_app.db")
+    # Connection pool, per worker process: size + overflow should stay under the server's
+    # max_connections divided by the number of workers
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_S: float = 10.0
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT_MS: int = 15000
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+
+    # Batched image recognition
+    INFERENCE_MAX_BATCH_SIZE: int = 16
+    INFERENCE_MAX_WAIT_MS: float = 5.0
+    INFERENCE_THREADS: int = 1
+    # Inference backend: "keras" (full TensorFlow), "tflite" or "onnx". The latter two run models
+    # written to MODEL_DIR by export_models.py with INFERENCE_QUANTIZATION weights ("none", "int8",
+    # or "float16" for tflite) and never download anything; 0 threads leaves it to the runtime
+    INFERENCE_BACKEND: str = "keras"
+    INFERENCE_QUANTIZATION: str = "int8"
+    INFERENCE_INTRA_OP_THREADS: int = 0
+    INFERENCE_MEMORY_ARENA: bool = True
+    MODEL_DIR: str = "./models"
+    # Load models in the gunicorn master so workers share the weights copy-on-write
+    PRELOAD_MODELS: bool = False
+
+    # Image uploads: each file is capped at UPLOAD_MAX_BYTES, and a whole multipart request at
+    # UPLOAD_MAX_REQUEST_BYTES (enough for SCAN_MAX_IMAGES full-size photos) while it streams in
+    UPLOAD_MAX_BYTES: int = 16 * 1024 * 1024
+    UPLOAD_MAX_REQUEST_BYTES: int = 161 * 1024 * 1024
+
+    # Multi-image scans: photos are decoded to SCAN_WORK_SIZE on the longest side, split into
+    # at most SCAN_MAX_REGIONS crops each, and all crops classified in batches of SCAN_MAX_BATCH_SIZE
+    # at SCAN_CROP_SIZE (160 uses the reduced-resolution model, 224 shares the upload model).
+    # At most SCAN_MAX_CONCURRENT scans run at once; the rest wait their turn
+    SCAN_MAX_IMAGES: int = 10
+    SCAN_MAX_REGIONS: int = 8
+    SCAN_WORK_SIZE: int = 768
+    SCAN_MAX_BATCH_SIZE: int = 64
+    SCAN_CROP_SIZE: int = 160
+    SCAN_TOP_K: int = 5
+    SCAN_LABELS_PER_REGION: int = 3
+    SCAN_MIN_CONFIDENCE: float = 0.1
+    SCAN_THREADS: int = 4
+    SCAN_MAX_CONCURRENT: int = 1
+
+    # Recognition result cache ("sqlite", "file" or "none" for the shared tier)
+    RECOGNITION_CACHE_SIZE: int = 1024
+    RECOGNITION_CACHE_BACKEND: str = "sqlite"
+    RECOGNITION_CACHE_PATH: str = "./recognition_cache.sqlite3"
+    RECOGNITION_CACHE_TTL_S: int = 7 * 24 * 3600
+    RECOGNITION_CACHE_PERCEPTUAL: bool = False
+    # Bump these whenever the model or Vision feature set changes to invalidate cached results
+    RECOGNITION_MODEL_VERSION: str = "mobilenet_v2-imagenet-1"
+    VISION_MODEL_VERSION: str = "vision-text-labels-2"
+    # Reads ambiguous numeric dates on labels ("05/06/2025") in this locale's order when
+    # requests don't say otherwise
+    LABEL_TEXT_LOCALE: str = "en_US"
+
+    # Recipe link imports: pages are fetched concurrently through one pooled client, at most
+    # RECIPE_FETCH_PER_HOST at a time per site; private and loopback addresses are refused unless allowed
+    RECIPE_FETCH_TIMEOUT_S: float = 10.0
+    RECIPE_FETCH_MAX_CONNECTIONS: int = 20
+    RECIPE_FETCH_PER_HOST: int = 2
+    RECIPE_FETCH_MAX_BYTES: int = 5 * 1024 * 1024
+    RECIPE_FETCH_USER_AGENT: str = "VegetabRecipeImporter/1.0"
+    RECIPE_FETCH_ALLOW_PRIVATE: bool = False
+    RECIPE_IMPORT_MAX_URLS: int = 20
+
+    # Local recipe catalog index, snapshotted on shutdown and reloaded on startup
+    RECIPE_INDEX_SNAPSHOT_PATH: str = "./recipe_index.json"
+    # How often a worker checks the recipes table for other workers' additions, edits and deletes
+    RECIPE_INDEX_REFRESH_INTERVAL_S: float = 5.0
+
+    # Suggestion ranking: pantry items expiring within the horizon get up to 1 + boost weight
+    RANKING_EXPIRY_HORIZON_DAYS: int = 7
+    RANKING_EXPIRY_BOOST: float = 2.0
+    RANKING_REBUILD_INTERVAL_S: float = 30.0
+
+    # Expiration notifications: items expiring within the notice window, streamed in batches
+    EXPIRATION_NOTICE_DAYS: int = 3
+    EXPIRATION_SCAN_BATCH_SIZE: int = 1000
+    # Digests suggest a recipe that uses the expiring items; users are ranked this many at a time
+    EXPIRATION_SUGGESTION_BATCH_SIZE: int = 500
+    # FCM delivery: messages per send_each call (FCM caps it at 500) and chunks in flight
+    FCM_BATCH_SIZE: int = 500
+    FCM_MAX_CONCURRENCY: int = 4
+    FCM_MAX_RETRIES: int = 3
+    FCM_BACKOFF_S: float = 0.5
+
+    # Job scheduler: every worker ticks, one elected leader enqueues scheduled runs,
+    # and any worker may claim a queued shard
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_TICK_S: float = 60.0
+    SCHEDULER_LEASE_S: float = 180.0
+    JOB_RUN_TIMEOUT_S: float = 3600.0
+    EXPIRATION_CHECK_INTERVAL_S: float = 24 * 3600
+    EXPIRATION_CHECK_SHARDS: int = 1
+    # Bearer token for POST /api/v1/trigger-expiration-check; the endpoint is disabled while empty
+    JOB_TRIGGER_TOKEN: str = ""
+
+    # Per-user pantry cache ("sqlite", "file" or "none" for the shared tier). Entries younger than
+    # FRESH_S are served as is, older ones up to STALE_S are served while being revalidated in
+    # the background; writes invalidate both tiers as they commit
+    PANTRY_CACHE_SIZE: int = 10000
+    PANTRY_CACHE_BACKEND: str = "sqlite"
+    PANTRY_CACHE_PATH: str = "./pantry_cache.sqlite3"
+    PANTRY_CACHE_FRESH_S: float = 2.0
+    PANTRY_CACHE_STALE_S: float = 60.0
+    PANTRY_CACHE_REFRESH_THREADS: int = 2
+    # Matching snapshots derived from cached pantries, keyed by pantry version
+    PANTRY_SNAPSHOT_CACHE_SIZE: int = 10000
+
+    # Google Cloud Vision
+    VISION_DEADLINE_S: float = 10.0
+    VISION_MAX_IMAGES_PER_REQUEST: int = 16
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
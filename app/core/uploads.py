@@ -0,0 +1,88 @@
+import asyncio
+import io
+import mmap
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+from app.core.config import settings
+from app.services.image_preprocessing import SNIFF_BYTES, sniff_image_type
+
+# Starlette keeps multipart file parts up to this size in memory before rolling them to disk
+SPOOL_MAX_BYTES = 1024 * 1024
+
+
+def upload_too_large(max_bytes: int):
+    return HTTPException(status_code=413, detail=f"Upload exceeds {max_bytes // (1024 * 1024)} MB")
+
+
+def _map_spool(spool) -> memoryview:
+    spool.flush()
+    return memoryview(mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+async def read_upload(file: UploadFile, max_bytes: int = None) -> memoryview:
+    """Returns an uploaded image as a zero-copy view, refusing oversized (413) and non-image (415) parts.
+
+    The multipart parser streams each part into a spooled temporary file that moves to disk past
+    SPOOL_MAX_BYTES. Larger parts are memory-mapped from there rather than read into the heap, so
+    the decoder reads the page cache directly; only small, still in-memory parts are copied.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    if file.size is not None and file.size > max_bytes:
+        raise upload_too_large(max_bytes)
+    await file.seek(0)
+    header = await file.read(SNIFF_BYTES)
+    if not header:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    if sniff_image_type(header) is None:
+        raise HTTPException(status_code=415, detail="Unsupported image type; upload a JPEG, PNG, WebP, GIF, BMP or TIFF")
+    await file.seek(0)
+    if file.size is not None and file.size > SPOOL_MAX_BYTES:
+        try:
+            return await asyncio.to_thread(_map_spool, file.file)
+        except (OSError, ValueError, io.UnsupportedOperation):
+            pass
+    contents = await file.read(max_bytes + 1)
+    if len(contents) > max_bytes:
+        raise upload_too_large(max_bytes)
+    return memoryview(contents)
+
+
+class UploadLimitMiddleware:
+    """Caps multipart request bodies while they stream in, before they are parsed and spooled.
+
+    A declared Content-Length over the limit is refused without reading the body; chunked
+    bodies are counted as they arrive and cut off with a 413 once they pass it.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = Headers(scope=scope)
+        if not headers.get("content-type", "").startswith("multipart/"):
+            return await self.app(scope, receive, send)
+
+        content_length = headers.get("content-length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            response = JSONResponse({"detail": upload_too_large(self.max_bytes).detail}, status_code=413)
+            return await response(scope, receive, send)
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes the response
+                    raise upload_too_large(self.max_bytes)
+            return message
+
+        await self.app(scope, receive_limited, send)
@@ -1,14 +1,162 @@
-from sqlalchemy import create_engine
+import asyncio
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from app.core.config import settings
 
-engine = create_engine(settings.DATABASE_URL)
-if settings.DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+# Upper bounds (seconds) for the checkout wait histogram
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.histogram = [0] * (len(WAIT_BUCKETS) + 1)
+        self._lock = threading.Lock()
+
+    def record(self, wait_s: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait_s += wait_s
+            self.max_wait_s = max(self.max_wait_s, wait_s)
+            bucket = next((i for i, bound in enumerate(WAIT_BUCKETS) if wait_s <= bound), len(WAIT_BUCKETS))
+            self.histogram[bucket] += 1
+
+    def stats(self):
+        with self._lock:
+            labels = [f"<={bound * 1000:g}ms" for bound in WAIT_BUCKETS] + [f">{WAIT_BUCKETS[-1] * 1000:g}ms"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": self.total_wait_s / self.checkouts * 1000 if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_s * 1000,
+                "wait_histogram": dict(zip(labels, self.histogram)),
+            }
+
+class MeteredPoolMixin:
+    """Records how long each checkout waited for a free connection."""
+
+    def __init__(self, *args, metrics: PoolMetrics = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = metrics or PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+class MeteredQueuePool(MeteredPoolMixin, QueuePool):
+    pass
+
+class MeteredAsyncQueuePool(MeteredPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # Per connection: WAL lets readers run alongside the single writer, NORMAL sync is safe under WAL,
+    # and mmap / a larger page cache keep hot pages out of read() calls
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.close()
+
+def _engine_options(url, pool_class):
+    backend = make_url(url).get_backend_name()
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE_S,
+    }
+    pool_options = {
+        "poolclass": pool_class,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_S,
+    }
+
+    if backend == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        database = make_url(url).database
+        if database and database != ":memory:":
+            options.update(pool_options)
+    else:
+        options.update(pool_options)
+        if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS:
+            # Sent as a startup parameter, so it applies to every statement on the connection
+            options["connect_args"] = {"options": f"-c statement_timeout={int(settings.DB_STATEMENT_TIMEOUT_MS)}"}
+    return backend, options
+
+def create_db_engine(url: str = None, **overrides):
+    url = url or settings.DATABASE_URL
+    backend, options = _engine_options(url, MeteredQueuePool)
+    options.update(overrides)
+    engine = create_engine(url, **options)
+    if backend == "sqlite":
+        event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+def async_database_url(url: str):
+    # Same database, async driver: aiosqlite locally, psycopg (v3) in production
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+psycopg")
+    return url
+
+def create_async_db_engine(url: str = None, **overrides):
+    url = async_database_url(url or settings.DATABASE_URL)
+    backend, options = _engine_options(url, MeteredAsyncQueuePool)
+    if backend == "sqlite":
+        # aiosqlite runs each connection on its own thread already
+        options.pop("connect_args", None)
+    options.update(overrides)
+    engine = create_async_engine(url, **options)
+    if backend == "sqlite":
+        event.listen(engine.sync_engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+def pool_stats(engine):
+    pool = engine.sync_engine.pool if hasattr(engine, "sync_engine") else engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+    if isinstance(pool, MeteredPoolMixin):
+        stats.update(pool.metrics.stats())
+    return stats
+
+engine = create_db_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine()
+
+# expire_on_commit=False: attributes can't be lazily reloaded outside an await, so keep them after commit
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -17,3 +165,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def run_in_session(fn, *args):
+    # For sync work with real CPU in it (index refreshes, bulk validation): AsyncSession.run_sync
+    # would run it on the event loop, so it gets a worker thread and its own session instead
+    def call():
+        with SessionLocal() as db:
+            return fn(db, *args)
+    return await asyncio.to_thread(call)
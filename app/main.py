@@ -1,16 +1,39 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File
+import secrets
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Query, Header, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from apscheduler.schedulers.background import BackgroundScheduler
-from app.db.database import get_db
-from app.services.notification_service import schedule_expiration_check, store_fcm_token, check_expiring_ingredients
+from app.db.database import get_db, get_async_db, run_in_session, engine, async_engine, pool_stats
+from app.models.user import User
+from app.services.notification_service import store_fcm_token
+from app.services.job_scheduler import job_scheduler, EXPIRATION_CHECK
 from app.services.recipe_service import process_recipe_link, search_recipes, get_recipe_details
-from app.services.ingredient_service import get_ingredients, add_ingredient, update_ingredient, delete_ingredient
+from app.services.recipe_ingestion import RecipeImportError, import_recipe_links, recipe_fetcher
+from app.services.recipe_catalog import recipes_containing, recipe_summary
+from app.services.ingredient_service import (
+    add_ingredient_async, update_ingredient_async, delete_ingredient_async,
+    parse_fields, decode_cursor, pantry_etag, MAX_PAGE_SIZE,
+    bulk_create_ingredients, bulk_update_ingredients, bulk_delete_ingredients, MAX_BULK_SIZE,
+    get_pantry, get_pantry_async, pantry_page, expiring_pantry_items, list_expiring_ingredients, pantry_cache_stats
+)
 from app.schemas.token import FCMToken
-from app.schemas.recipe import RecipeLink, Recipe
-from app.schemas.ingredient import IngredientCreate, Ingredient
-from app.services.image_recognition_service import identify_ingredient_from_image
-from app.services.recipe_suggestion_service import get_recipe_suggestions
+from app.schemas.job_run import JobRun
+from app.schemas.recipe import RecipeLink, RecipeLinks, Recipe
+from app.schemas.ingredient import IngredientCreate, IngredientBulkUpdate, Ingredient
+from app.services.image_recognition_service import recognize_ingredient_image, recognition_worker, recognition_cache
+from app.services.image_scan import scan_images_async
+from app.services.recipe_suggestion_service import get_recipe_suggestions_for_user_async
+from app.services.model_registry import registry
+from app.services.spoonacular_client import spoonacular, SpoonacularError
+from app.services.user_recipe_service import fetch_recipe_requirements, mark_recipe_cooked
+from app.services.recipe_index import recipe_index
+from app.services.recipe_ranking import ranking_engine
+from app.services.ingredient_dictionary import ingredient_dictionary
+from app.core.config import settings
+from app.core.uploads import UploadLimitMiddleware, read_upload
 
 app = FastAPI()
 
@@ -22,11 +45,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadLimitMiddleware, max_bytes=settings.UPLOAD_MAX_REQUEST_BYTES)
+
+@app.on_event("startup")
+async def start_scheduler():
+    # Every worker ticks; only the elected leader enqueues the daily check
+    if settings.SCHEDULER_ENABLED:
+        job_scheduler.start()
 
-# Set up the scheduler
-scheduler = BackgroundScheduler()
-scheduler.add_job(schedule_expiration_check, 'interval', hours=24, args=[next(get_db())])
-scheduler.start()
+@app.on_event("shutdown")
+async def shutdown_services():
+    job_scheduler.shutdown()
+    await async_engine.dispose()
+    await recognition_worker.shutdown()
+    await spoonacular.aclose()
+    spoonacular.close()
+    await recipe_fetcher.aclose()
+    if settings.RECIPE_INDEX_SNAPSHOT_PATH and len(recipe_index):
+        recipe_index.save_snapshot(settings.RECIPE_INDEX_SNAPSHOT_PATH)
 
 @app.get("/")
 async def root():
@@ -36,8 +72,24 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/api/v1/stats")
+async def get_stats():
+    return {
+        "inference": recognition_worker.stats(),
+        "models": registry.stats(),
+        "recognition_cache": recognition_cache.stats(),
+        "spoonacular": spoonacular.stats(),
+        "recipe_index": recipe_index.stats(),
+        "recipe_ranking": ranking_engine.stats(),
+        "ingredient_dictionary": ingredient_dictionary.stats(),
+        "pantry_cache": pantry_cache_stats(),
+        "scheduler": job_scheduler.stats(),
+        "db_pool": pool_stats(engine),
+        "async_db_pool": pool_stats(async_engine),
+    }
+
 @app.post("/store-fcm-token")
-async def store_token(token: FCMToken, db: Session = Depends(get_db)):
+def store_token(token: FCMToken, db: Session = Depends(get_db)):
     success = store_fcm_token(db, token.user_id, token.token)
     if success:
         return {"message": "FCM token stored successfully"}
@@ -45,83 +97,197 @@ async def store_token(token: FCMToken, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="User not found")
 
 @app.post("/process-recipe-link", response_model=Recipe)
-async def add_recipe_link(recipe_link: RecipeLink, db: Session = Depends(get_db)):
-    recipe = process_recipe_link(db, recipe_link.user_id, recipe_link.url)
-    if recipe:
-        return recipe
-    else:
-        raise HTTPException(status_code=400, detail="Failed to process recipe link")
+async def add_recipe_link(recipe_link: RecipeLink, db: AsyncSession = Depends(get_async_db)):
+    if await db.get(User, recipe_link.user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    try:
+        return await process_recipe_link(db, recipe_link.user_id, recipe_link.url)
+    except RecipeImportError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.post("/api/v1/recipes/import")
+async def import_recipes(recipe_links: RecipeLinks, db: AsyncSession = Depends(get_async_db)):
+    # Pages are fetched concurrently; each URL reports its own outcome
+    if len(recipe_links.urls) > settings.RECIPE_IMPORT_MAX_URLS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.RECIPE_IMPORT_MAX_URLS} URLs per import")
+    if await db.get(User, recipe_links.user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"results": await import_recipe_links(db, recipe_links.user_id, recipe_links.urls)}
+
+@app.get("/api/v1/recipes/containing")
+async def recipes_containing_endpoint(
+    ingredients: str,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    # ?ingredients=tomato,basil -> local recipes using both, paged by recipe id
+    names = [name for name in ingredients.split(",") if name.strip()]
+    recipes = await db.run_sync(recipes_containing, names, limit, after_id)
+    return {
+        "recipes": [recipe_summary(recipe) for recipe in recipes],
+        "next_after_id": recipes[-1].id if len(recipes) == limit else None,
+    }
+
+@app.get("/api/v1/ingredients")
+async def fetch_ingredients(
+    user_id: int,
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    fields: str | None = None,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        selected_fields = parse_fields(fields)
+        after_id = decode_cursor(cursor, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The cached pantry carries the version its rows were read at, so the ETag always describes them
+    pantry = await get_pantry_async(db, user_id)
+    if pantry is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    etag = pantry_etag(user_id, pantry.version, selected_fields, cursor, limit)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
 
-@app.get("/api/v1/ingredients", response_model=list[Ingredient])
-async def fetch_ingredients(db: Session = Depends(get_db)):
-    ingredients = get_ingredients(db)
-    return ingredients
+    items, next_cursor = pantry_page(pantry, selected_fields, after_id, limit)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return JSONResponse(jsonable_encoder(items), headers=headers)
 
 @app.post("/api/v1/ingredients", response_model=Ingredient)
-async def create_ingredient(ingredient: IngredientCreate, db: Session = Depends(get_db)):
-    return add_ingredient(db, ingredient)
+async def create_ingredient(ingredient: IngredientCreate, db: AsyncSession = Depends(get_async_db)):
+    return await add_ingredient_async(db, ingredient)
+
+def _check_bulk_size(items):
+    if len(items) > MAX_BULK_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_SIZE} items per request")
+
+@app.post("/api/v1/ingredients/bulk", response_model=List[Ingredient])
+@app.post("/api/v1/ingredients/confirm/bulk", response_model=List[Ingredient])
+async def bulk_create_ingredients_endpoint(ingredients: List[IngredientCreate]):
+    _check_bulk_size(ingredients)
+    created, errors = await run_in_session(bulk_create_ingredients, ingredients)
+    if errors:
+        raise HTTPException(status_code=422, detail={"errors": errors})
+    return created
+
+@app.patch("/api/v1/ingredients/bulk", response_model=List[Ingredient])
+async def bulk_update_ingredients_endpoint(updates: List[IngredientBulkUpdate]):
+    _check_bulk_size(updates)
+    updated, errors = await run_in_session(bulk_update_ingredients, updates)
+    if errors:
+        raise HTTPException(status_code=422, detail={"errors": errors})
+    return updated
+
+@app.post("/api/v1/ingredients/bulk-delete")
+async def bulk_delete_ingredients_endpoint(ingredient_ids: List[int]):
+    _check_bulk_size(ingredient_ids)
+    deleted, errors = await run_in_session(bulk_delete_ingredients, ingredient_ids)
+    if errors:
+        raise HTTPException(status_code=422, detail={"errors": errors})
+    return {"deleted": deleted}
 
 @app.put("/api/v1/ingredients/{ingredient_id}", response_model=Ingredient)
-async def update_ingredient_endpoint(ingredient_id: int, ingredient: IngredientCreate, db: Session = Depends(get_db)):
-    updated_ingredient = update_ingredient(db, ingredient_id, ingredient)
+async def update_ingredient_endpoint(ingredient_id: int, ingredient: IngredientCreate, db: AsyncSession = Depends(get_async_db)):
+    updated_ingredient = await update_ingredient_async(db, ingredient_id, ingredient)
     if updated_ingredient:
         return updated_ingredient
     raise HTTPException(status_code=404, detail="Ingredient not found")
 
 @app.delete("/api/v1/ingredients/{ingredient_id}")
-async def delete_ingredient_endpoint(ingredient_id: int, db: Session = Depends(get_db)):
-    success = delete_ingredient(db, ingredient_id)
+async def delete_ingredient_endpoint(ingredient_id: int, db: AsyncSession = Depends(get_async_db)):
+    success = await delete_ingredient_async(db, ingredient_id)
     if success:
         return {"message": "Ingredient deleted successfully"}
     raise HTTPException(status_code=404, detail="Ingredient not found")
 
 @app.post("/api/v1/ingredients/upload", response_model=dict)
-async def upload_ingredient_image(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_ingredient_image(file: UploadFile = File(...)):
     try:
-        contents = await file.read()
-        identified_ingredient = identify_ingredient_from_image(contents)
+        contents = await read_upload(file)
+        identified_ingredient = await recognize_ingredient_image(contents)
         return identified_ingredient
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/v1/ingredients/scan")
+async def scan_ingredient_images(files: List[UploadFile] = File(...), top_k: int = Query(settings.SCAN_TOP_K, ge=1, le=20)):
+    if len(files) > settings.SCAN_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.SCAN_MAX_IMAGES} images per scan")
+    contents = [await read_upload(file) for file in files]
+    # Every region of every photo goes through the model together, off the event loop
+    return await scan_images_async(contents, top_k)
+
 @app.post("/api/v1/ingredients/confirm", response_model=Ingredient)
-async def confirm_ingredient(ingredient: IngredientCreate, db: Session = Depends(get_db)):
-    return add_ingredient(db, ingredient)
+async def confirm_ingredient(ingredient: IngredientCreate, db: AsyncSession = Depends(get_async_db)):
+    return await add_ingredient_async(db, ingredient)
 
 @app.get("/api/v1/recipe-suggestions")
-async def get_recipe_suggestions_endpoint(db: Session = Depends(get_db)):
-    ingredients = get_ingredients(db)
-    suggestions = get_recipe_suggestions(ingredients)
-    return suggestions
+async def get_recipe_suggestions_endpoint(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    # Ranked against one user's pantry; there is no meaningful ranking across everyone's
+    return await get_recipe_suggestions_for_user_async(db, user_id)
+
+def require_job_token(authorization: str | None = Header(None)):
+    # Triggering a check sends pushes to every user, so it needs the operator's token
+    if not settings.JOB_TRIGGER_TOKEN:
+        raise HTTPException(status_code=403, detail="Manual job triggers are disabled")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not secrets.compare_digest(token.encode(), settings.JOB_TRIGGER_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid job token", headers={"WWW-Authenticate": "Bearer"})
 
-@app.post("/api/v1/trigger-expiration-check")
-async def trigger_expiration_check(db: Session = Depends(get_db)):
-    schedule_expiration_check(db)
-    return {"message": "Expiration check triggered successfully"}
+@app.post("/api/v1/trigger-expiration-check", status_code=202, dependencies=[Depends(require_job_token)])
+def trigger_expiration_check(db: Session = Depends(get_db)):
+    runs = job_scheduler.enqueue(db, EXPIRATION_CHECK)
+    return {"message": "Expiration check queued", "batch_id": runs[0].batch_id, "run_ids": [run.id for run in runs]}
+
+@app.get("/api/v1/job-runs", response_model=List[JobRun])
+def get_job_runs(limit: int = 20, db: Session = Depends(get_db)):
+    return job_scheduler.recent_runs(db, limit)
 
 @app.get("/api/v1/expiring-ingredients")
-async def get_expiring_ingredients(db: Session = Depends(get_db)):
-    expiring_ingredients = check_expiring_ingredients(db)
-    return {"expiring_ingredients": expiring_ingredients}
+def get_expiring_ingredients(
+    user_id: int | None = None,
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    if user_id is not None:
+        # One user's list comes from the pantry cache
+        pantry = get_pantry(db, user_id)
+        if pantry is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        expiring = expiring_pantry_items(pantry, settings.EXPIRATION_NOTICE_DAYS)
+        return {"expiring_ingredients": jsonable_encoder(expiring)}
+    # Read-only: notifications are only sent by the scheduled job or a triggered run
+    expiring = list_expiring_ingredients(db, settings.EXPIRATION_NOTICE_DAYS, limit=limit)
+    return {"expiring_ingredients": jsonable_encoder(expiring)}
 
 @app.get("/api/v1/search_recipes")
-async def search_recipes_endpoint(query: str, ingredients: str, db: Session = Depends(get_db)):
+def search_recipes_endpoint(query: str, ingredients: str, db: Session = Depends(get_db)):
     ingredient_list = ingredients.split(',')
     recipes = search_recipes(db, query, ingredient_list)
     return {"recipes": recipes}
 
 @app.get("/api/v1/recipe/{recipe_id}")
-async def get_recipe_details_endpoint(recipe_id: int, db: Session = Depends(get_db)):
+def get_recipe_details_endpoint(recipe_id: int, db: Session = Depends(get_db)):
     recipe = get_recipe_details(recipe_id)
     if recipe:
         return recipe
     raise HTTPException(status_code=404, detail="Recipe not found")
 
 @app.post("/api/v1/mark_cooked/{recipe_id}")
-async def mark_recipe_cooked(recipe_id: int, db: Session = Depends(get_db)):
-    # Implement logic to mark recipe as cooked
-    # For now, we'll just return a success message
-    return {"message": f"Recipe {recipe_id} marked as cooked"}
+def mark_recipe_cooked_endpoint(recipe_id: int, user_id: int, db: Session = Depends(get_db)):
+    try:
+        requirements = fetch_recipe_requirements(recipe_id)
+    except SpoonacularError as e:
+        raise HTTPException(status_code=e.status_code, detail="Failed to fetch recipe ingredients")
+    # Bumps cook_count and deducts the recipe's ingredients from the pantry in one transaction
+    return mark_recipe_cooked(db, user_id, recipe_id, requirements)
 
 @app.post("/api/v1/save_favorite/{recipe_id}")
 async def save_recipe_favorite(recipe_id: int, db: Session = Depends(get_db)):
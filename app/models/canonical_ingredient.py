@@ -0,0 +1,9 @@
+from sqlalchemy import Column, Integer, String
+from app.db.database import Base
+
+class CanonicalIngredient(Base):
+    __tablename__ = "canonical_ingredients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # normalize_ingredient_name form: "cherry tomato", "olive oil"
+    name = Column(String, unique=True, index=True, nullable=False)
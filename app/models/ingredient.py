@@ -1,9 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
 class Ingredient(Base):
     __tablename__ = "ingredients"
+    __table_args__ = (
+        # Serves the per-user expiration scan and per-user pantry lookups
+        Index("ix_ingredients_user_id_expiration_date", "user_id", "expiration_date"),
+        # Keyset pagination of a user's pantry
+        Index("ix_ingredients_user_id_id", "user_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text
+from app.db.database import Base
+
+class JobLock(Base):
+    __tablename__ = "job_locks"
+
+    # One row per lock name; whoever holds an unexpired lease is the leader
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class JobRun(Base):
+    __tablename__ = "job_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, nullable=False, index=True)
+    # Runs enqueued together (all shards of one check) share a batch id
+    batch_id = Column(String, nullable=False, index=True)
+    trigger = Column(String, nullable=False)  # "schedule" or "manual"
+    status = Column(String, nullable=False, index=True, default="queued")  # queued, running, succeeded, failed
+    shard = Column(Integer, nullable=False, default=0)
+    shard_count = Column(Integer, nullable=False, default=1)
+    owner = Column(String, nullable=True)
+    queued_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    duration_s = Column(Float, nullable=True)
+    rows_scanned = Column(Integer, nullable=True)
+    users_notified = Column(Integer, nullable=True)
+    notifications_sent = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
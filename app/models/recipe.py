@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from app.db.database import Base
 
@@ -9,7 +11,23 @@ class Recipe(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     title = Column(String, index=True)
     instructions = Column(String)
-    ingredients = Column(String)  # Changed from ARRAY(String) to String
     image_url = Column(String)
+    servings = Column(Integer)
+    ready_in_minutes = Column(Integer)
+    # Imported recipes: stored once per canonical page and once per content, whoever imports them;
+    # user_id is the first importer, saved_recipes links every user who imported it
+    source_url = Column(String, unique=True, index=True)
+    content_hash = Column(String(64), unique=True, index=True)
+    # Validators from the last fetch, sent back as If-None-Match / If-Modified-Since
+    etag = Column(String)
+    last_modified = Column(String)
+    fetched_at = Column(DateTime)
+    # Moves on every change to the row, so other workers' recipe indexes can pick up edits
+    updated_at = Column(DateTime, index=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     user = relationship("User", back_populates="recipes")
+    # In published order; load with selectinload when listing recipes
+    ingredients = relationship(
+        "RecipeIngredient", back_populates="recipe", order_by="RecipeIngredient.position",
+        cascade="all, delete-orphan",
+    )
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from app.db.database import Base
+
+class RecipeIngredient(Base):
+    __tablename__ = "recipe_ingredients"
+    __table_args__ = (
+        # "Recipes containing X": seek to X and read recipe ids in order from the index alone
+        Index("ix_recipe_ingredients_canonical_ingredient_id_recipe_id", "canonical_ingredient_id", "recipe_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), index=True, nullable=False)
+    canonical_ingredient_id = Column(Integer, ForeignKey("canonical_ingredients.id"), nullable=False)
+    position = Column(Integer, nullable=False)
+    amount = Column(Float)
+    unit = Column(String)
+    text = Column(String, nullable=False)  # the line as published, e.g. "2 cloves garlic, minced"
+
+    recipe = relationship("Recipe", back_populates="ingredients")
+    canonical_ingredient = relationship("CanonicalIngredient")
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, UniqueConstraint, func
+from app.db.database import Base
+
+class SavedRecipe(Base):
+    __tablename__ = "saved_recipes"
+    __table_args__ = (
+        UniqueConstraint("user_id", "recipe_id", name="uq_saved_recipes_user_id_recipe_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    recipe_id = Column(Integer, ForeignKey("recipes.id"), index=True, nullable=False)
+    saved_at = Column(DateTime, nullable=False, server_default=func.now())
@@ -10,6 +10,8 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
     fcm_token = Column(String)
+    # Bumped whenever any of the user's ingredients change; drives pantry ETags
+    pantry_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     recipes = relationship("Recipe", back_populates="user")
     ingredients = relationship("Ingredient", back_populates="user")
@@ -1,17 +1,17 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
-from sqlalchemy.ext.declarative import declarative_base
-
-Base = declarative_base()
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, UniqueConstraint
+from app.db.database import Base
 
 class UserRecipe(Base):
     __tablename__ = "user_recipes"
+    __table_args__ = (
+        # One row per user and recipe, so cooking and favouriting can upsert it
+        UniqueConstraint("user_id", "recipe_id", name="uq_user_recipes_user_id_recipe_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    recipe_id = Column(Integer, index=True)
-    user_id = Column(Integer, index=True)
+    recipe_id = Column(Integer, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
     title = Column(String, index=True)
     last_cooked = Column(DateTime, nullable=True)
-    cook_count = Column(Integer, default=0)
-    is_favorite = Column(Boolean, default=False)
-
-    # Add any additional fields as needed
+    cook_count = Column(Integer, nullable=False, default=0, server_default="0")
+    is_favorite = Column(Boolean, nullable=False, default=False, server_default="0")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Query
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.models.ingredient import Ingredient
@@ -6,56 +6,77 @@ from app.schemas.ingredient import IngredientCreate, IngredientResponse
 from typing import List, Optional
 import cv2
 import numpy as np
-from PIL import Image
-import io
-import tensorflow as tf
 from datetime import datetime, timedelta
-import requests
+from app.services.image_recognition_service import recognize_ingredient_image
+from app.services.image_scan import scan_images_async
+from app.core.config import settings
+from app.core.uploads import read_upload
+from app.services import spoonacular_client
+from app.services.spoonacular_client import spoonacular, SpoonacularError
+from app.services.recipe_index import recipe_index
+from app.services.recipe_ingestion import RecipeImportError, preview_recipe_link
+from app.services.pantry_service import get_pantry_snapshot
+from app.services.ingredient_service import (
+    consume_ingredient, expiring_pantry_items, get_pantry, invalidate_pantry, pantry_page
+)
+from app.services import user_recipe_service
+from app.services.user_recipe_service import fetch_recipe_requirements
 
 router = APIRouter()
 
-# Load a pre-trained model for image classification
-model = tf.keras.applications.MobileNetV2(weights='imagenet')
-
 @router.post("/ingredients/", response_model=IngredientResponse)
 def create_ingredient(ingredient: IngredientCreate, db: Session = Depends(get_db)):
     db_ingredient = Ingredient(**ingredient.dict())
     db.add(db_ingredient)
     db.commit()
     db.refresh(db_ingredient)
+    invalidate_pantry(db_ingredient.user_id)
     return db_ingredient
 
 @router.get("/ingredients/", response_model=List[IngredientResponse])
-def read_ingredients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    ingredients = db.query(Ingredient).offset(skip).limit(limit).all()
-    return ingredients
+def read_ingredients(skip: int = 0, limit: int = 100, user_id: Optional[int] = None, after_id: Optional[int] = None,
+                     db: Session = Depends(get_db)):
+    if user_id is not None and not skip:
+        # One user's pantry is served from the pantry cache, in the same keyset pages
+        pantry = get_pantry(db, user_id)
+        return pantry_page(pantry, after_id=after_id, limit=limit)[0] if pantry else []
+    query = db.query(Ingredient)
+    if user_id is not None:
+        query = query.filter(Ingredient.user_id == user_id)
+    if after_id is not None:
+        # Keyset paging: pass the last id of the previous page instead of a growing skip
+        return query.filter(Ingredient.id > after_id).order_by(Ingredient.id).limit(limit).all()
+    return query.order_by(Ingredient.id).offset(skip).limit(limit).all()
 
 @router.post("/ingredients/recognize/")
 async def recognize_ingredient(file: UploadFile = File(...)):
-    contents = await file.read()
-    image = Image.open(io.BytesIO(contents))
-    image = image.resize((224, 224))  # Resize image to match model input size
-    image_array = tf.keras.preprocessing.image.img_to_array(image)
-    image_array = tf.expand_dims(image_array, 0)  # Create batch axis
-    image_array = tf.keras.applications.mobilenet_v2.preprocess_input(image_array)
-
-    predictions = model.predict(image_array)
-    decoded_predictions = tf.keras.applications.mobilenet_v2.decode_predictions(predictions, top=1)[0]
+    contents = await read_upload(file)
+    # Shares the lazily loaded model and batching worker with /api/v1/ingredients/upload
+    result = await recognize_ingredient_image(contents)
 
-    recognized_ingredient = decoded_predictions[0][1]  # Get the class name
-    confidence = float(decoded_predictions[0][2])  # Get the confidence score
+    return {"recognized_ingredient": result["name"], "confidence": result["confidence"]}
 
-    return {"recognized_ingredient": recognized_ingredient, "confidence": confidence}
+@router.post("/ingredients/scan/")
+async def scan_ingredients(files: List[UploadFile] = File(...), top_k: int = 5):
+    if len(files) > settings.SCAN_MAX_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.SCAN_MAX_IMAGES} images per scan")
+    contents = [await read_upload(file) for file in files]
+    return await scan_images_async(contents, top_k)
 
 @router.put("/ingredients/{ingredient_id}", response_model=IngredientResponse)
 def update_ingredient(ingredient_id: int, ingredient: IngredientCreate, db: Session = Depends(get_db)):
     db_ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
     if db_ingredient is None:
         raise HTTPException(status_code=404, detail="Ingredient not found")
+    previous_user_id = db_ingredient.user_id
     for key, value in ingredient.dict().items():
+        if key == "user_id" and value is None:
+            continue
         setattr(db_ingredient, key, value)
     db.commit()
     db.refresh(db_ingredient)
+    invalidate_pantry(previous_user_id)
+    invalidate_pantry(db_ingredient.user_id)
     return db_ingredient
 
 @router.delete("/ingredients/{ingredient_id}", response_model=IngredientResponse)
@@ -65,10 +86,14 @@ def delete_ingredient(ingredient_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Ingredient not found")
     db.delete(db_ingredient)
     db.commit()
+    invalidate_pantry(db_ingredient.user_id)
     return db_ingredient
 
 @router.get("/ingredients/expiring/", response_model=List[IngredientResponse])
-def get_expiring_ingredients(days: int = 3, db: Session = Depends(get_db)):
+def get_expiring_ingredients(days: int = 3, user_id: Optional[int] = None, db: Session = Depends(get_db)):
+    if user_id is not None:
+        pantry = get_pantry(db, user_id)
+        return expiring_pantry_items(pantry, days) if pantry else []
     expiration_date = datetime.now() + timedelta(days=days)
     expiring_ingredients = db.query(Ingredient).filter(Ingredient.expiration_date <= expiration_date).all()
     return expiring_ingredients
@@ -81,53 +106,44 @@ def confirm_ingredient(ingredient_id: int, confirmed_name: str, db: Session = De
     db_ingredient.name = confirmed_name
     db.commit()
     db.refresh(db_ingredient)
+    invalidate_pantry(db_ingredient.user_id)
     return db_ingredient
 
 @router.post("/ingredients/use/")
-def use_ingredient(ingredient_id: int, amount_used: float, db: Session = Depends(get_db)):
-    db_ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
-    if db_ingredient is None:
+def use_ingredient(ingredient_id: int, amount_used: float = Query(..., gt=0), db: Session = Depends(get_db)):
+    result = consume_ingredient(db, ingredient_id, amount_used)
+    if result is None:
         raise HTTPException(status_code=404, detail="Ingredient not found")
-    db_ingredient.amount -= amount_used
-    if db_ingredient.amount <= 0:
-        db.delete(db_ingredient)
-    db.commit()
-    return {"message": "Ingredient updated or removed"}
+    return {"message": "Ingredient removed" if result["removed"] else "Ingredient updated", **result}
 
 @router.get("/recipes/suggestions/")
-def get_recipe_suggestions(db: Session = Depends(get_db)):
-    ingredients = db.query(Ingredient).all()
-    ingredient_names = [ingredient.name for ingredient in ingredients]
-
-    api_key = "YOUR_SPOONACULAR_API_KEY"  # Replace with actual API key
-    base_url = "https://api.spoonacular.com/recipes/findByIngredients"
-    params = {
-        "ingredients": ",".join(ingredient_names),
-        "number": 5,
-        "apiKey": api_key
-    }
-
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
+def get_recipe_suggestions(user_id: int, db: Session = Depends(get_db)):
+    ingredient_names = sorted(get_pantry_snapshot(db, user_id).names)
+
+    # Prefer the local catalog; only spend Spoonacular quota when it has nothing to offer
+    suggestions = recipe_index.ensure_loaded(db).rank(ingredient_names, limit=5)
+    if suggestions:
+        return suggestions
+
+    try:
+        return spoonacular.get(spoonacular_client.find_by_ingredients(ingredient_names, number=5))
+    except SpoonacularError:
         raise HTTPException(status_code=500, detail="Failed to fetch recipe suggestions")
 
 @router.get("/recipes/{recipe_id}")
-def get_recipe_details(recipe_id: int):
-    api_key = "YOUR_SPOONACULAR_API_KEY"  # Replace with actual API key
-    base_url = f"https://api.spoonacular.com/recipes/{recipe_id}/information"
-    params = {"apiKey": api_key}
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
+async def get_recipe_details(recipe_id: int):
+    try:
+        return await spoonacular.aget(spoonacular_client.recipe_information(recipe_id))
+    except SpoonacularError:
         raise HTTPException(status_code=500, detail="Failed to fetch recipe details")
 
 @router.post("/recipes/mark-cooked/{recipe_id}")
-def mark_recipe_cooked(recipe_id: int, db: Session = Depends(get_db)):
-    # TODO: Implement logic to mark recipe as cooked and update ingredient quantities
-    return {"message": f"Recipe {recipe_id} marked as cooked"}
+def mark_recipe_cooked(recipe_id: int, user_id: int, db: Session = Depends(get_db)):
+    try:
+        requirements = fetch_recipe_requirements(recipe_id)
+    except SpoonacularError:
+        raise HTTPException(status_code=500, detail="Failed to fetch recipe ingredients")
+    return user_recipe_service.mark_recipe_cooked(db, user_id, recipe_id, requirements)
 
 @router.post("/recipes/favorite/{recipe_id}")
 def favorite_recipe(recipe_id: int, db: Session = Depends(get_db)):
@@ -135,14 +151,16 @@ def favorite_recipe(recipe_id: int, db: Session = Depends(get_db)):
     return {"message": f"Recipe {recipe_id} saved as favorite"}
 
 @router.post("/recipes/parse-url")
-def parse_recipe_url(url: str):
-    api_key = "YOUR_SPOONACULAR_API_KEY"  # Replace with actual API key
-    base_url = "https://api.spoonacular.com/recipes/extract"
-    params = {"apiKey": api_key, "url": url}
-    response = requests.get(base_url, params=params)
-    if response.status_code == 200:
-        return response.json()
-    else:
+async def parse_recipe_url(url: str):
+    # The page's own schema.org markup first; Spoonacular's extractor only for pages without it
+    try:
+        return await preview_recipe_link(url)
+    except RecipeImportError as e:
+        if e.status_code != 422:
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+    try:
+        return await spoonacular.aget(spoonacular_client.extract_recipe(url))
+    except SpoonacularError:
         raise HTTPException(status_code=500, detail="Failed to parse recipe URL")
 
 def send_push_notification(user_id: int, message: str):
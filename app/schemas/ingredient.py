@@ -6,6 +6,7 @@ class IngredientBase(BaseModel):
     amount: float
     unit: str | None = None
     expiration_date: date | None = None
+    user_id: int | None = None
 
 class IngredientCreate(IngredientBase):
     pass
@@ -19,3 +20,11 @@ class Ingredient(IngredientBase):
 
     class Config:
         from_attributes = True
+
+class IngredientBulkUpdate(BaseModel):
+    id: int
+    name: str | None = None
+    amount: float | None = None
+    unit: str | None = None
+    expiration_date: date | None = None
+    user_id: int | None = None
@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+class JobRun(BaseModel):
+    id: int
+    job_name: str
+    batch_id: str
+    trigger: str
+    status: str
+    shard: int
+    shard_count: int
+    owner: Optional[str] = None
+    queued_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_s: Optional[float] = None
+    rows_scanned: Optional[int] = None
+    users_notified: Optional[int] = None
+    notifications_sent: Optional[int] = None
+    error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
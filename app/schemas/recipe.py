@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, field_validator
 from typing import List, Optional
 
 class RecipeBase(BaseModel):
@@ -9,6 +9,14 @@ class RecipeBase(BaseModel):
     instructions: str
     ingredients: List[str]
 
+    @field_validator("ingredients", mode="before")
+    @classmethod
+    def ingredient_lines(cls, value):
+        # ORM recipes hold RecipeIngredient rows; the API shows each line as published
+        if isinstance(value, (list, tuple)):
+            return [getattr(item, "text", item) for item in value]
+        return value
+
 class RecipeCreate(RecipeBase):
     pass
 
@@ -25,3 +33,7 @@ class RecipeSearch(BaseModel):
 class RecipeLink(BaseModel):
     user_id: int
     url: str
+
+class RecipeLinks(BaseModel):
+    user_id: int
+    urls: List[str]
@@ -17,9 +17,10 @@ class UserRecipeUpdate(BaseModel):
 
 class UserRecipe(UserRecipeBase):
     id: int
+    title: Optional[str] = None
     last_cooked: Optional[datetime]
     cook_count: int
     is_favorite: bool
 
     class Config:
-        orm_mode = True
+        from_attributes = True
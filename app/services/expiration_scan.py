@@ -0,0 +1,100 @@
+from datetime import date, datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.ingredient import Ingredient
+from app.models.user import User
+from app.services.push_delivery import PushDelivery, PushMessage, chunked
+from app.services.recipe_suggestion_service import get_recipe_suggestions_for_users
+
+def expiring_ingredients_query(cutoff: date, batch_size: int, shard: Optional[Tuple[int, int]] = None):
+    # Filtered in SQL and ordered to match the (user_id, expiration_date) index, so rows for one
+    # user arrive together and are streamed in batches instead of loading the whole table
+    query = (
+        select(Ingredient.user_id, User.fcm_token, Ingredient.name, Ingredient.expiration_date)
+        .join(User, User.id == Ingredient.user_id)
+        .where(Ingredient.expiration_date <= cutoff, User.fcm_token.is_not(None))
+        .order_by(Ingredient.user_id, Ingredient.expiration_date)
+        .execution_options(yield_per=batch_size, stream_results=True)
+    )
+    if shard is not None:
+        # shard = (index, count): each process of a split run only sees its slice of the users
+        index, count = shard
+        query = query.where(Ingredient.user_id % count == index)
+    return query
+
+def iter_expiring_by_user(db: Session, cutoff: date, batch_size: int = None, shard: Optional[Tuple[int, int]] = None):
+    # Yields (user_id, fcm_token, [(name, expiration_date), ...]); only one user's rows are held at a time
+    rows = db.execute(expiring_ingredients_query(cutoff, batch_size or settings.EXPIRATION_SCAN_BATCH_SIZE, shard))
+    for (user_id, fcm_token), group in groupby(rows, key=itemgetter(0, 1)):
+        yield user_id, fcm_token, [(name, expiration_date) for _, _, name, expiration_date in group]
+
+def expiry_phrase(days_until_expiration: int, plural: bool = False):
+    if days_until_expiration < 0:
+        return "have expired" if plural else "has expired"
+    if days_until_expiration == 0:
+        return "expire today" if plural else "expires today"
+    if days_until_expiration == 1:
+        return "expire tomorrow" if plural else "expires tomorrow"
+    return f"will expire in {days_until_expiration} days"
+
+def digest_text(names, days_until_expiration: int):
+    # "milk expires tomorrow", "milk and eggs expire soon", "milk, eggs and 3 more expire soon"
+    if len(names) == 1:
+        return f"{names[0]} {expiry_phrase(days_until_expiration)}."
+    if len(names) <= 3:
+        listed = f"{', '.join(names[:-1])} and {names[-1]}"
+    else:
+        listed = f"{', '.join(names[:2])} and {len(names) - 2} more"
+    return f"{listed} expire soon."
+
+def build_expiration_digest(fcm_token: str, items, today: date, recipe: dict = None) -> PushMessage:
+    # items arrive ordered by expiration date, so the most urgent names are listed first
+    names = list(dict.fromkeys(name for name, _ in items))
+    soonest = (items[0][1] - today).days
+    title = "Ingredient Expiring Soon" if len(names) == 1 else f"{len(names)} Ingredients Expiring Soon"
+    body = digest_text(names, soonest)
+    data = {"type": "expiration_digest", "count": str(len(names)), "soonest_days": str(soonest)}
+    if recipe is not None:
+        # The best local recipe for the pantry, weighted towards what is about to expire
+        body = f"{body} Try {recipe['title']}." if recipe["title"] else body
+        data["recipe_id"] = str(recipe["id"])
+    return PushMessage(fcm_token, title, body, data)
+
+def prune_fcm_tokens(db: Session, tokens, batch_size: int = 500):
+    # Tokens FCM reported as unregistered or invalid will never work again
+    tokens = list(set(tokens))
+    for start in range(0, len(tokens), batch_size):
+        db.execute(update(User).where(User.fcm_token.in_(tokens[start:start + batch_size])).values(fcm_token=None))
+    if tokens:
+        db.commit()
+    return len(tokens)
+
+def run_expiration_digest(db: Session, delivery: Optional[PushDelivery], today: date = None,
+                          shard: Optional[Tuple[int, int]] = None):
+    # One digest per user rather than one push per ingredient; without a delivery the digests are only logged
+    today = today or datetime.now().date()
+    cutoff = today + timedelta(days=settings.EXPIRATION_NOTICE_DAYS)
+    counts = {"users": 0, "ingredients": 0}
+
+    def digests():
+        # Users are ranked a batch at a time, with one pantry query and one matrix per batch
+        users = iter_expiring_by_user(db, cutoff, shard=shard)
+        for batch in chunked(users, settings.EXPIRATION_SUGGESTION_BATCH_SIZE):
+            suggestions = get_recipe_suggestions_for_users(db, [user_id for user_id, _, _ in batch], 1, today)
+            for (_, fcm_token, items), recipes in zip(batch, suggestions):
+                counts["users"] += 1
+                counts["ingredients"] += len(items)
+                yield build_expiration_digest(fcm_token, items, today, recipes[0] if recipes else None)
+
+    if delivery is None:
+        for message in digests():
+            print(f"Notification would be sent: {message.body}")
+        return counts
+
+    report = delivery.deliver(digests())
+    counts["pruned_tokens"] = prune_fcm_tokens(db, report.invalid_tokens)
+    return {**counts, **report.as_dict()}
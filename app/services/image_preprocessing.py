@@ -0,0 +1,133 @@
+import io
+import threading
+
+import numpy as np
+from PIL import Image, ImageOps
+
+INPUT_SIZE = (224, 224)
+
+_local = threading.local()
+
+# Leading bytes of the formats the decoder is built with; anything else is refused before decoding
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+SNIFF_BYTES = 16
+
+
+def sniff_image_type(header):
+    header = bytes(header[:SNIFF_BYTES])
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, media_type in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return media_type
+    return None
+
+
+class BufferReader(io.RawIOBase):
+    """Read-only file over a bytes-like object; unlike BytesIO it never copies a memoryview."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer).cast("B")
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, out):
+        chunk = self._view[self._position:self._position + len(out)]
+        out[:len(chunk)] = chunk
+        self._position += len(chunk)
+        return len(chunk)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = (0, self._position, len(self._view))[whence]
+        self._position = max(0, base + offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+def open_image(source):
+    if isinstance(source, Image.Image):
+        return source
+    if isinstance(source, bytes):
+        # BytesIO shares an immutable bytes object instead of copying it
+        source = io.BytesIO(source)
+    elif isinstance(source, (bytearray, memoryview)):
+        source = BufferReader(source)
+    return Image.open(source)
+
+
+def decode_rgb(source, draft_size):
+    image = open_image(source)
+
+    # Let libjpeg decode at 1/2, 1/4 or 1/8 scale instead of the full 12MP;
+    # draft() never goes below the requested size, so quality is unaffected
+    if image.format == "JPEG":
+        image.draft("RGB", draft_size)
+
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info):
+        # Flatten transparent images onto white rather than letting alpha turn them black
+        image = image.convert("RGBA")
+        background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+        image = Image.alpha_composite(background, image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def load_image(source, size=INPUT_SIZE):
+    image = decode_rgb(source, size)
+    if image.size != size:
+        image = image.resize(size, Image.Resampling.BILINEAR)
+    return image
+
+
+def load_image_fit(source, max_side):
+    # Keeps the aspect ratio, for work that needs the photo's real geometry (region proposals).
+    # The draft size follows the aspect ratio too, or a 4:3 photo would decode at twice the scale.
+    image = open_image(source)
+    scale = max_side / max(image.size)
+    image = decode_rgb(image, (round(image.width * scale), round(image.height * scale)))
+    image.thumbnail((max_side, max_side), Image.Resampling.BILINEAR)
+    return image
+
+
+def scale_into(pixels, out):
+    # Writes the MobileNetV2-scaled pixels ([-1, 1]) of a uint8 array straight into `out`
+    np.multiply(pixels, 1 / 127.5, out=out, casting="unsafe")
+    out -= 1.0
+    return out
+
+
+def preprocess_into(source, out):
+    # `out` is a (224, 224, 3) float32 view, typically a slot of a batch buffer
+    return scale_into(np.asarray(load_image(source, (out.shape[1], out.shape[0]))), out)
+
+
+def preprocess_image(source):
+    out = np.empty((INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+    return preprocess_into(source, out)
+
+
+def batch_buffer(batch_size):
+    # One reusable buffer per inference thread; grows to the largest batch seen
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None or buffer.shape[0] < batch_size:
+        buffer = np.empty((batch_size, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.float32)
+        _local.buffer = buffer
+    return buffer
@@ -1,32 +1,84 @@
-import tensorflow as tf
+import asyncio
 import numpy as np
-from PIL import Image
-import io
+from app.core.config import settings
+from app.services.image_preprocessing import batch_buffer, preprocess_into
+from app.services.ingredient_dictionary import DICTIONARY_VERSION, display_name, imagenet_ingredient
+from app.services.inference_backends import decode_predictions, model_version
+from app.services.inference_worker import InferenceWorker
+from app.services.model_registry import registry, MOBILENET_V2
+from app.services.recognition_cache import create_recognition_cache
 
-# Load a pre-trained MobileNetV2 model
-model = tf.keras.applications.MobileNetV2(weights='imagenet')
+recognition_cache = create_recognition_cache(
+    MOBILENET_V2, f"{model_version()}+dict{DICTIONARY_VERSION}", perceptual=settings.RECOGNITION_CACHE_PERCEPTUAL
+)
 
-def identify_ingredient_from_image(image_data):
-    # Convert the image data to a PIL Image
-    image = Image.open(io.BytesIO(image_data))
-
-    # Preprocess the image
-    image = image.resize((224, 224))
-    image_array = tf.keras.preprocessing.image.img_to_array(image)
-    image_array = tf.keras.applications.mobilenet_v2.preprocess_input(image_array)
-    image_array = np.expand_dims(image_array, axis=0)
+FOOD_SEARCH_TOP = 5
 
-    # Make a prediction
-    predictions = model.predict(image_array)
-    decoded_predictions = tf.keras.applications.mobilenet_v2.decode_predictions(predictions, top=1)[0]
+def decode_prediction(prediction):
+    decoded_predictions = decode_predictions(prediction[np.newaxis], top=FOOD_SEARCH_TOP)[0]
 
-    # Return the top prediction
-    _, ingredient_name, confidence = decoded_predictions[0]
+    # The most likely food class among the top few ("bowl" or "refrigerator" often outrank the
+    # food in a photo); the top class as-is if none of them is food
+    for _, label, confidence in decoded_predictions:
+        ingredient = imagenet_ingredient(label)
+        if ingredient is not None:
+            name = display_name(ingredient)
+            break
+    else:
+        _, label, confidence = decoded_predictions[0]
+        name = label.replace('_', ' ').title()
 
     return {
-        "name": ingredient_name.replace('_', ' ').title(),
+        "name": name,
         "confidence": float(confidence),
         "amount": 1,
         "unit": "piece",
         "expiration_date": None
     }
+
+def identify_ingredients_batch(images):
+    # Preprocess each image separately so one corrupt upload only fails its own request
+    results = [None] * len(images)
+    buffer = batch_buffer(len(images))
+    indices = []
+    for i, image_data in enumerate(images):
+        try:
+            preprocess_into(image_data, buffer[len(indices)])
+            indices.append(i)
+        except Exception as e:
+            results[i] = e
+
+    if indices:
+        model = registry.get(MOBILENET_V2)
+        predictions = model.predict_on_batch(buffer[:len(indices)])
+        for i, prediction in zip(indices, np.asarray(predictions)):
+            results[i] = decode_prediction(prediction)
+
+    return results
+
+def identify_ingredient_from_image(image_data):
+    key, cached = recognition_cache.lookup(image_data)
+    if cached is not None:
+        return cached
+    result = identify_ingredients_batch([image_data])[0]
+    if isinstance(result, Exception):
+        raise result
+    recognition_cache.set(key, result)
+    return result
+
+recognition_worker = InferenceWorker(
+    identify_ingredients_batch,
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS,
+    num_threads=settings.INFERENCE_THREADS,
+)
+
+async def recognize_ingredient_image(image_data):
+    # Batched, off-event-loop variant of identify_ingredient_from_image for async handlers.
+    # Hashing and the shared cache tier touch disk, so they run in a thread too.
+    key, cached = await asyncio.to_thread(recognition_cache.lookup, image_data)
+    if cached is not None:
+        return cached
+    result = await recognition_worker.submit(image_data)
+    await asyncio.to_thread(recognition_cache.set, key, result)
+    return result
@@ -0,0 +1,151 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.image_preprocessing import load_image_fit, scale_into
+from app.services.inference_backends import decode_predictions
+from app.services.ingredient_dictionary import display_name, imagenet_ingredient
+from app.services.model_registry import registry, MOBILENET_V2, MOBILENET_V2_160
+
+# Decoding and region proposals release the GIL (libjpeg, OpenCV), so images are prepared in parallel
+_prepare_pool = ThreadPoolExecutor(max_workers=max(1, settings.SCAN_THREADS), thread_name_prefix="scan")
+
+SCAN_MODELS = {160: MOBILENET_V2_160, 224: MOBILENET_V2}
+CROP_SIZE = (settings.SCAN_CROP_SIZE, settings.SCAN_CROP_SIZE)
+
+# (loop, semaphore): bound lazily to the running loop, like InferenceWorker's slots
+_scan_slots = None
+
+
+class Region(NamedTuple):
+    # Box as fractions of the photo's width and height, independent of the decode size
+    image: int
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+class PreparedScan(NamedTuple):
+    batch: np.ndarray
+    regions: List[Region]
+    errors: List[dict]
+
+
+def propose_regions(pixels: np.ndarray, max_regions: int, min_area: float = 0.02, max_area: float = 0.9):
+    # Edge map -> dilated blobs -> bounding boxes, one per item on the shelf. When nothing stands
+    # out (a close-up of a single item) the full frame is classified instead.
+    height, width = pixels.shape[:2]
+    gray = cv2.GaussianBlur(cv2.cvtColor(pixels, cv2.COLOR_RGB2GRAY), (5, 5), 0)
+    edges = cv2.Canny(gray, 50, 150)
+    edges = cv2.dilate(edges, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9)), iterations=2)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes, scores = [], []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        area = w * h / (width * height)
+        if min_area <= area <= max_area:
+            # A little context around the item helps the classifier
+            pad_x, pad_y = w // 10, h // 10
+            x0, y0 = max(0, x - pad_x), max(0, y - pad_y)
+            boxes.append([x0, y0, min(width, x + w + pad_x) - x0, min(height, y + h + pad_y) - y0])
+            scores.append(area)
+
+    if not boxes:
+        return [(0, 0, width, height)]
+    # Largest blobs first; drop boxes mostly covering one already kept
+    keep = cv2.dnn.NMSBoxes(boxes, scores, score_threshold=0.0, nms_threshold=0.5)
+    return [tuple(boxes[i]) for i in np.asarray(keep).reshape(-1)[:max_regions]]
+
+
+def _prepare_image(index: int, image_data, max_regions: int):
+    pixels = np.asarray(load_image_fit(image_data, settings.SCAN_WORK_SIZE))
+    height, width = pixels.shape[:2]
+    crops = []
+    for x, y, w, h in propose_regions(pixels, max_regions):
+        crop = cv2.resize(pixels[y:y + h, x:x + w], CROP_SIZE, interpolation=cv2.INTER_AREA)
+        region = Region(index, round(x / width, 4), round(y / height, 4), round(w / width, 4), round(h / height, 4))
+        crops.append((region, crop))
+    return crops
+
+
+def prepare_scan(images, max_regions: int = None) -> PreparedScan:
+    max_regions = max_regions or settings.SCAN_MAX_REGIONS
+    futures = [_prepare_pool.submit(_prepare_image, i, image_data, max_regions) for i, image_data in enumerate(images)]
+    crops, errors = [], []
+    for i, future in enumerate(futures):
+        try:
+            crops.extend(future.result())
+        except Exception as e:
+            # One unreadable photo doesn't fail the others
+            errors.append({"image": i, "detail": str(e)})
+
+    batch = np.empty((len(crops), CROP_SIZE[1], CROP_SIZE[0], 3), dtype=np.float32)
+    for slot, (_, crop) in zip(batch, crops):
+        scale_into(crop, slot)
+    return PreparedScan(batch, [region for region, _ in crops], errors)
+
+
+def predict_regions(batch: np.ndarray):
+    # Crops from every photo share the forward passes instead of one model call per upload
+    model = registry.get(SCAN_MODELS[settings.SCAN_CROP_SIZE])
+    predictions = [
+        np.asarray(model.predict_on_batch(batch[start:start + settings.SCAN_MAX_BATCH_SIZE]))
+        for start in range(0, len(batch), settings.SCAN_MAX_BATCH_SIZE)
+    ]
+    return np.concatenate(predictions) if predictions else np.empty((0, 1000), dtype=np.float32)
+
+
+def decode_labels(predictions: np.ndarray, labels_per_region: int):
+    return decode_predictions(predictions, top=labels_per_region)
+
+
+def merge_candidates(regions: List[Region], labels, top_k: int, min_confidence: float):
+    # The same item shows up in the full frame and its own crop, and across photos: keep one
+    # candidate per canonical ingredient with its best confidence and where it was seen best.
+    # Classes that aren't food (bowls, shelves, the fridge) are dropped.
+    candidates = {}
+    for region, region_labels in zip(regions, labels):
+        for _, label, confidence in region_labels:
+            confidence = float(confidence)
+            key = imagenet_ingredient(label)
+            if confidence < min_confidence or key is None:
+                continue
+            name = display_name(key)
+            candidate = candidates.get(key)
+            if candidate is None:
+                candidates[key] = candidate = {"name": name, "confidence": confidence, "regions": 0,
+                                               "image": region.image, "box": list(region[1:])}
+            elif confidence > candidate["confidence"]:
+                candidate.update(name=name, confidence=confidence, image=region.image, box=list(region[1:]))
+            candidate["regions"] += 1
+    ranked = sorted(candidates.values(), key=lambda candidate: candidate["confidence"], reverse=True)
+    return ranked[:top_k]
+
+
+def scan_images(images, top_k: int = None, max_regions: int = None):
+    prepared = prepare_scan(images, max_regions)
+    labels = decode_labels(predict_regions(prepared.batch), settings.SCAN_LABELS_PER_REGION)
+    candidates = merge_candidates(prepared.regions, labels, top_k or settings.SCAN_TOP_K, settings.SCAN_MIN_CONFIDENCE)
+    return {
+        "candidates": candidates,
+        "images": len(images),
+        "regions": len(prepared.regions),
+        "errors": prepared.errors,
+    }
+
+
+async def scan_images_async(images, top_k: int = None):
+    # Keras models aren't safe to call from several threads at once, and a scan is already a full
+    # batch: extra scans wait on the event loop instead of each taking a thread and the model
+    global _scan_slots
+    loop = asyncio.get_running_loop()
+    if _scan_slots is None or _scan_slots[0] is not loop:
+        _scan_slots = (loop, asyncio.Semaphore(max(1, settings.SCAN_MAX_CONCURRENT)))
+    async with _scan_slots[1]:
+        return await asyncio.to_thread(scan_images, images, top_k)
@@ -0,0 +1,184 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from app.core.config import settings
+
+BACKENDS = ("keras", "tflite", "onnx")
+QUANTIZATIONS = {"keras": ("none",), "tflite": ("none", "float16", "int8"), "onnx": ("none", "int8")}
+LABELS_FILE = "imagenet_class_index.json"
+
+
+def model_path(model_dir: str, size: int, backend: str, quantization: str = "none"):
+    # Layout written by export_models.py, e.g. models/mobilenet_v2_160.int8.onnx
+    if backend == "keras":
+        return os.path.join(model_dir, f"mobilenet_v2_{size}.weights.h5")
+    extension = "tflite" if backend == "tflite" else "onnx"
+    return os.path.join(model_dir, f"mobilenet_v2_{size}.{quantization}.{extension}")
+
+
+class KerasBackend:
+    """MobileNetV2 on the full TensorFlow runtime; exported weights are used when present."""
+
+    name = "keras"
+
+    def __init__(self, size: int, weights_path: str = None, num_threads: int = 0):
+        # TensorFlow is only imported here so app startup never pays for it
+        import tensorflow as tf
+        if num_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(num_threads)
+        if weights_path and os.path.exists(weights_path):
+            self.model = tf.keras.applications.MobileNetV2(input_shape=(size, size, 3), weights=None)
+            self.model.load_weights(weights_path)
+        else:
+            self.model = tf.keras.applications.MobileNetV2(input_shape=(size, size, 3), weights='imagenet')
+
+    def predict_on_batch(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+def _tflite_interpreter():
+    # Prefer the standalone runtimes so CPU-only deployments can drop TensorFlow entirely
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter
+
+
+class TFLiteBackend:
+    """TFLite interpreter over an exported float, float16 or int8 model."""
+
+    name = "tflite"
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        Interpreter = _tflite_interpreter()
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads or None)
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = None
+        # One interpreter owns its tensors: calls from the worker and scan threads take turns
+        self._lock = threading.Lock()
+
+    def _resize(self, batch_size):
+        shape = list(self.input["shape"])
+        shape[0] = batch_size
+        self.interpreter.resize_tensor_input(self.input["index"], shape)
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.batch_size = batch_size
+
+    def predict_on_batch(self, batch):
+        with self._lock:
+            if len(batch) != self.batch_size:
+                self._resize(len(batch))
+            scale, zero_point = self.input["quantization"]
+            if scale:
+                # Integer-only input: quantize the [-1, 1] floats the preprocessing produces
+                batch = np.clip(np.round(batch / scale + zero_point), *_dtype_range(self.input["dtype"]))
+            self.interpreter.set_tensor(self.input["index"], batch.astype(self.input["dtype"], copy=False))
+            self.interpreter.invoke()
+            predictions = self.interpreter.get_tensor(self.output["index"])
+            scale, zero_point = self.output["quantization"]
+            if scale:
+                predictions = (predictions.astype(np.float32) - zero_point) * scale
+            return predictions.astype(np.float32, copy=True)
+
+
+def _dtype_range(dtype):
+    info = np.iinfo(dtype)
+    return info.min, info.max
+
+
+class OnnxBackend:
+    """ONNX Runtime session over an exported float or int8 (QDQ) model."""
+
+    name = "onnx"
+
+    def __init__(self, model_path: str, num_threads: int = 0, memory_arena: bool = True):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        # The arena keeps the largest batch's activations around: faster, but a few hundred MB
+        options.enable_cpu_mem_arena = memory_arena
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def predict_on_batch(self, batch):
+        # InferenceSession.run is thread-safe, no lock needed
+        return self.session.run(None, {self.input_name: np.ascontiguousarray(batch, dtype=np.float32)})[0]
+
+
+def create_backend(backend: str, size: int, quantization: str = "none", num_threads: int = 0, model_dir: str = None):
+    model_dir = model_dir or settings.MODEL_DIR
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if quantization not in QUANTIZATIONS[backend]:
+        raise ValueError(f"The {backend} backend supports {', '.join(QUANTIZATIONS[backend])} weights, "
+                         f"not '{quantization}'")
+    path = model_path(model_dir, size, backend, quantization)
+    if backend == "keras":
+        return KerasBackend(size, path, num_threads)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run export_models.py --backend {backend} "
+                                f"--quantization {quantization} first")
+    if backend == "tflite":
+        return TFLiteBackend(path, num_threads)
+    return OnnxBackend(path, num_threads, settings.INFERENCE_MEMORY_ARENA)
+
+
+def load_mobilenet_v2(size: int):
+    quantization = "none" if settings.INFERENCE_BACKEND == "keras" else settings.INFERENCE_QUANTIZATION
+    return create_backend(settings.INFERENCE_BACKEND, size, quantization, settings.INFERENCE_INTRA_OP_THREADS)
+
+
+def model_version():
+    # Quantized models can rank classes differently, so each backend gets its own cached results
+    if settings.INFERENCE_BACKEND == "keras":
+        return settings.RECOGNITION_MODEL_VERSION
+    return f"{settings.RECOGNITION_MODEL_VERSION}-{settings.INFERENCE_BACKEND}-{settings.INFERENCE_QUANTIZATION}"
+
+
+_labels = None
+_labels_lock = threading.Lock()
+
+
+def imagenet_labels():
+    global _labels
+    if _labels is None:
+        with _labels_lock:
+            if _labels is None:
+                path = os.path.join(settings.MODEL_DIR, LABELS_FILE)
+                if not os.path.exists(path):
+                    # Not exported yet: fall back to Keras' copy (downloaded on first use)
+                    import tensorflow as tf
+                    path = tf.keras.utils.get_file(
+                        LABELS_FILE,
+                        "https://storage.googleapis.com/download.tensorflow.org/data/imagenet_class_index.json",
+                        cache_subdir="models",
+                    )
+                with open(path) as f:
+                    index = json.load(f)
+                _labels = [tuple(index[str(i)]) for i in range(len(index))]
+    return _labels
+
+
+def decode_predictions(predictions: np.ndarray, top: int = 5):
+    # Same (wnid, label, score) tuples as keras' decode_predictions, without TensorFlow
+    labels = imagenet_labels()
+    if not len(predictions):
+        return []
+    top_indices = np.argsort(-predictions, axis=1)[:, :top]
+    return [
+        [(*labels[i], row[i]) for i in indices]
+        for row, indices in zip(predictions, top_indices)
+    ]
@@ -0,0 +1,138 @@
+import asyncio
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceWorker:
+    """Collects concurrent requests into micro-batches and runs them off the event loop.
+
+    `batch_fn` receives a list of items and must return a list of the same length,
+    where each entry is either the result for that item or an Exception instance.
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int = 16, max_wait_ms: float = 5.0, num_threads: int = 1):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.num_threads = max(1, num_threads)
+
+        self._pending = deque()
+        self._item_added = None
+        self._slots = None
+        self._task = None
+        self._executor = None
+        # Strong references to running batches; the loop itself only keeps weak ones
+        self._dispatches = set()
+
+        self._batches_run = 0
+        self._items_processed = 0
+        self._in_flight = 0
+        self._batch_sizes = Counter()
+        self._total_queue_wait = 0.0
+        self._total_batch_time = 0.0
+
+    def start(self):
+        # Lazily bound to the running loop so the worker can be created at import time
+        if self._task is None or self._task.done():
+            self._item_added = asyncio.Event()
+            self._slots = asyncio.Semaphore(self.num_threads)
+            self._executor = self._executor or ThreadPoolExecutor(
+                max_workers=self.num_threads, thread_name_prefix="inference"
+            )
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("Inference worker shut down"))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def submit(self, item):
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        self._item_added.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Only collect the next batch once a pool thread is free to run it,
+            # so requests arriving meanwhile accumulate into a larger batch.
+            await self._slots.acquire()
+            try:
+                while not self._pending:
+                    self._item_added.clear()
+                    await self._item_added.wait()
+
+                deadline = loop.time() + self.max_wait
+                while len(self._pending) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    self._item_added.clear()
+                    try:
+                        await asyncio.wait_for(self._item_added.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+
+                batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch_size))]
+            except BaseException:
+                self._slots.release()
+                raise
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self._in_flight += len(batch)
+        try:
+            results = await loop.run_in_executor(self._executor, self.batch_fn, [item for item, _, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            self._in_flight -= len(batch)
+            self._slots.release()
+
+        finished = time.perf_counter()
+        self._batches_run += 1
+        self._items_processed += len(batch)
+        self._batch_sizes[len(batch)] += 1
+        self._total_batch_time += finished - started
+        for (_, future, enqueued_at), result in zip(batch, results):
+            self._total_queue_wait += started - enqueued_at
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self):
+        batches = self._batches_run
+        items = self._items_processed
+        return {
+            "queue_depth": len(self._pending),
+            "in_flight": self._in_flight,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "batches_run": batches,
+            "items_processed": items,
+            "avg_batch_size": items / batches if batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "avg_queue_wait_ms": self._total_queue_wait / items * 1000 if items else 0.0,
+            "avg_batch_latency_ms": self._total_batch_time / batches * 1000 if batches else 0.0,
+        }
@@ -0,0 +1,511 @@
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain
+from typing import Optional
+
+from app.services.ingredient_names import normalize_ingredient_name, singularize
+
+# Bump whenever an edit below changes what a name resolves to: persisted indexes and cached
+# recognition results keyed by it are rebuilt rather than mixing old and new names. Rows already
+# in canonical_ingredients are not re-merged by a bump; an edit that should merge stored names
+# needs its own migration, with its own frozen copy of the aliases (see f4b9e1a73c26).
+DICTIONARY_VERSION = 3
+
+# canonical name -> synonyms, aliases and common varieties that cook the same.
+# Canonical names are in normalize_ingredient_name form; plurals of everything are matched
+# through singularize, so only irregular spellings need listing.
+CANONICAL_INGREDIENTS = {
+    # Vegetables
+    "tomato": ("roma tomato", "plum tomato", "vine tomato", "beefsteak tomato", "cherry tomato", "grape tomato"),
+    "tomato paste": ("tomato puree", "tomato concentrate"),
+    "tomato sauce": ("passata", "marinara sauce"),
+    "canned tomato": ("chopped tomato", "crushed tomato", "diced tomato", "tinned tomato"),
+    "onion": ("yellow onion", "white onion", "brown onion", "sweet onion", "spanish onion"),
+    "red onion": ("purple onion",),
+    "green onion": ("scallion", "spring onion", "salad onion"),
+    "shallot": ("eschalot",),
+    "garlic": ("garlic clove", "garlic bulb"),
+    "garlic powder": ("granulated garlic",),
+    "onion powder": (),
+    "ginger": ("ginger root", "fresh ginger", "root ginger"),
+    "potato": ("russet potato", "yukon gold potato", "new potato", "baby potato", "white potato", "red potato"),
+    "sweet potato": ("yam", "kumara"),
+    "mashed potato": ("potato mash",),
+    "carrot": ("baby carrot",),
+    "celery": ("celery stalk", "celery rib", "celery stick"),
+    "bell pepper": ("capsicum", "sweet pepper", "red pepper", "green pepper", "yellow pepper", "orange pepper"),
+    "chili pepper": ("chili", "chilli", "chile", "hot pepper", "red chili", "green chili", "bird eye chili"),
+    "jalapeno": ("jalapeño", "jalapeno pepper", "jalapeño pepper"),
+    "cucumber": ("english cucumber", "persian cucumber"),
+    "zucchini": ("courgette",),
+    "eggplant": ("aubergine", "brinjal"),
+    "broccoli": ("broccoli floret", "calabrese"),
+    "cauliflower": ("cauliflower floret",),
+    "cabbage": ("green cabbage", "white cabbage", "head cabbage", "savoy cabbage"),
+    "red cabbage": ("purple cabbage",),
+    "bok choy": ("pak choi", "bok choi"),
+    "spinach": ("baby spinach", "english spinach"),
+    "kale": ("curly kale", "lacinato kale", "cavolo nero", "tuscan kale"),
+    "lettuce": ("romaine", "romaine lettuce", "iceberg lettuce", "butter lettuce", "cos lettuce", "little gem"),
+    "arugula": ("rocket", "roquette"),
+    "mushroom": ("button mushroom", "white mushroom", "cremini mushroom", "chestnut mushroom", "champignon",
+                 "baby bella"),
+    "portobello mushroom": ("portobello", "portabella mushroom"),
+    "shiitake mushroom": ("shiitake",),
+    "porcini mushroom": ("porcini", "cep", "bolete"),
+    "maitake mushroom": ("maitake", "hen of the woods"),
+    "corn": ("sweetcorn", "sweet corn", "corn kernel", "maize", "corn on the cob"),
+    "pea": ("green pea", "garden pea", "frozen pea", "petit pois"),
+    "green bean": ("string bean", "french bean", "haricot vert", "snap bean"),
+    "asparagus": ("asparagus spear",),
+    "artichoke": ("globe artichoke", "artichoke heart"),
+    "cardoon": (),
+    "leek": (),
+    "fennel": ("fennel bulb", "florence fennel"),
+    "beet": ("beetroot",),
+    "radish": (),
+    "turnip": (),
+    "parsnip": (),
+    "pumpkin": (),
+    "butternut squash": ("butternut",),
+    "acorn squash": (),
+    "spaghetti squash": (),
+    "avocado": (),
+    "brussels sprout": ("brussel sprout",),
+    "olive": ("black olive", "green olive", "kalamata olive"),
+    # Fruit
+    "apple": ("granny smith", "granny smith apple", "gala apple", "fuji apple", "honeycrisp apple",
+              "golden delicious", "pink lady apple"),
+    "banana": (),
+    "orange": ("navel orange", "blood orange", "valencia orange"),
+    "lemon": (),
+    "lime": (),
+    "lemon juice": (),
+    "lime juice": (),
+    "strawberry": (),
+    "blueberry": (),
+    "raspberry": (),
+    "blackberry": (),
+    "cranberry": (),
+    "grape": ("red grape", "green grape", "seedless grape"),
+    "raisin": ("sultana",),
+    "pineapple": (),
+    "mango": (),
+    "peach": (),
+    "pear": (),
+    "plum": (),
+    "cherry": (),
+    "apricot": (),
+    "fig": (),
+    "date": ("medjool date",),
+    "pomegranate": (),
+    "kiwi": ("kiwifruit", "kiwi fruit"),
+    "watermelon": (),
+    "melon": ("cantaloupe", "honeydew"),
+    "coconut": (),
+    "jackfruit": (),
+    "custard apple": ("cherimoya",),
+    # Herbs and spices
+    "basil": ("sweet basil", "basil leaf", "thai basil"),
+    "parsley": ("flat leaf parsley", "italian parsley", "curly parsley"),
+    "cilantro": ("coriander leaf", "fresh coriander", "chinese parsley"),
+    "coriander": ("ground coriander", "coriander seed"),
+    "mint": ("mint leaf", "spearmint", "peppermint"),
+    "dill": (),
+    "rosemary": (),
+    "thyme": (),
+    "oregano": (),
+    "sage": (),
+    "chive": (),
+    "bay leaf": ("bay",),
+    "cumin": ("ground cumin", "cumin seed"),
+    "paprika": ("smoked paprika", "sweet paprika"),
+    "cinnamon": ("ground cinnamon", "cinnamon stick"),
+    "nutmeg": (),
+    "turmeric": (),
+    "chili powder": (),
+    "cayenne pepper": ("cayenne",),
+    "red pepper flake": ("chili flake", "crushed red pepper", "red chili flake"),
+    "black pepper": ("pepper", "ground black pepper", "peppercorn", "black peppercorn", "ground pepper"),
+    "salt": ("sea salt", "kosher salt", "table salt", "flaky salt"),
+    "vanilla": ("vanilla extract", "vanilla essence", "vanilla bean", "vanilla pod"),
+    "curry powder": (),
+    "curry paste": ("red curry paste", "green curry paste"),
+    "garam masala": (),
+    # Dairy and eggs
+    "egg": ("large egg", "whole egg", "free range egg", "hen egg"),
+    "egg yolk": (),
+    "egg white": (),
+    "milk": ("whole milk", "skim milk", "skimmed milk", "semi skimmed milk", "cow milk"),
+    "butter": ("unsalted butter", "salted butter"),
+    "cream": ("heavy cream", "double cream", "whipping cream", "single cream", "light cream",
+              "heavy whipping cream"),
+    "sour cream": (),
+    "yogurt": ("yoghurt", "greek yogurt", "plain yogurt", "natural yogurt"),
+    "cheese": (),
+    "cheddar": ("cheddar cheese",),
+    "parmesan": ("parmesan cheese", "parmigiano reggiano", "parmigiano"),
+    "mozzarella": ("mozzarella cheese", "buffalo mozzarella"),
+    "feta": ("feta cheese",),
+    "cream cheese": (),
+    "ricotta": ("ricotta cheese",),
+    "goat cheese": ("chevre",),
+    "ice cream": (),
+    "eggnog": (),
+    # Meat and seafood
+    "chicken": ("chicken breast", "chicken thigh", "chicken leg", "chicken drumstick", "chicken wing",
+                "whole chicken", "chicken fillet", "chicken meat"),
+    "beef": ("beef steak", "steak", "stewing beef", "beef chuck", "sirloin"),
+    "ground beef": ("minced beef", "beef mince", "hamburger meat"),
+    "pork": ("pork chop", "pork loin", "pork shoulder", "pork belly"),
+    "ground pork": ("minced pork", "pork mince"),
+    "bacon": ("streaky bacon", "bacon rasher", "pancetta"),
+    "ham": (),
+    "sausage": (),
+    "hot dog": ("hotdog", "frankfurter"),
+    "lamb": (),
+    "turkey": (),
+    "salmon": ("salmon fillet", "coho", "coho salmon"),
+    "tuna": ("canned tuna", "tuna steak"),
+    "cod": (),
+    "anchovy": (),
+    "shrimp": ("prawn", "king prawn", "tiger prawn"),
+    "crab": ("crab meat", "dungeness crab", "king crab", "rock crab"),
+    "lobster": ("spiny lobster", "american lobster"),
+    "crayfish": ("crawfish",),
+    # Baking and grains
+    "flour": ("all purpose flour", "plain flour", "wheat flour", "white flour"),
+    "bread flour": ("strong flour",),
+    "whole wheat flour": ("wholemeal flour",),
+    "self raising flour": ("self rising flour",),
+    "cornstarch": ("corn starch", "cornflour"),
+    "sugar": ("white sugar", "granulated sugar", "caster sugar", "castor sugar"),
+    "brown sugar": ("light brown sugar", "dark brown sugar", "muscovado"),
+    "powdered sugar": ("icing sugar", "confectioners sugar"),
+    "honey": (),
+    "maple syrup": (),
+    "baking powder": (),
+    "baking soda": ("bicarbonate of soda", "bicarb soda", "sodium bicarbonate"),
+    "yeast": ("dry yeast", "active dry yeast", "instant yeast"),
+    "dough": ("pizza dough", "bread dough"),
+    "chocolate": ("dark chocolate", "milk chocolate", "chocolate chip"),
+    "chocolate sauce": ("chocolate syrup",),
+    "cocoa powder": ("cocoa", "unsweetened cocoa"),
+    "rice": ("white rice", "long grain rice", "basmati rice", "jasmine rice"),
+    "brown rice": (),
+    "pasta": (),
+    "spaghetti": (),
+    "penne": (),
+    "macaroni": (),
+    "noodle": ("ramen noodle",),
+    "bread": ("white bread", "sandwich bread", "loaf"),
+    "baguette": ("french bread", "french loaf"),
+    "bagel": (),
+    "pretzel": (),
+    "tortilla": ("flour tortilla", "corn tortilla"),
+    "oat": ("rolled oat", "oatmeal", "porridge oat"),
+    "quinoa": (),
+    "couscous": (),
+    "lentil": ("red lentil", "green lentil", "brown lentil"),
+    "chickpea": ("garbanzo bean", "garbanzo", "chick pea"),
+    "black bean": (),
+    "kidney bean": ("red kidney bean",),
+    "tofu": (),
+    "almond": (),
+    "walnut": (),
+    "peanut": (),
+    "cashew": (),
+    "pine nut": (),
+    "sesame seed": (),
+    # Oils, sauces and condiments
+    "olive oil": ("extra virgin olive oil", "evoo"),
+    "vegetable oil": ("canola oil", "rapeseed oil", "sunflower oil", "cooking oil"),
+    "sesame oil": (),
+    "coconut oil": (),
+    "vinegar": ("white vinegar", "distilled vinegar"),
+    "balsamic vinegar": (),
+    "apple cider vinegar": ("cider vinegar",),
+    "soy sauce": ("soya sauce", "shoyu", "tamari", "light soy sauce", "dark soy sauce"),
+    "fish sauce": (),
+    "worcestershire sauce": (),
+    "mustard": ("dijon mustard", "yellow mustard", "wholegrain mustard"),
+    "ketchup": ("tomato ketchup",),
+    "mayonnaise": ("mayo",),
+    "peanut butter": (),
+    "jam": ("preserve",),
+    "caper": (),
+    "pickle": ("gherkin",),
+    "coconut milk": (),
+    "guacamole": (),
+    "hummus": (),
+    "chicken stock": ("chicken broth",),
+    "vegetable stock": ("vegetable broth",),
+    "beef stock": ("beef broth",),
+    "stock": ("broth", "stock cube", "bouillon"),
+    # Drinks and prepared foods
+    "water": (),
+    "red wine": (),
+    "white wine": (),
+    "beer": (),
+    "coffee": ("espresso", "ground coffee", "instant coffee"),
+    "tea": (),
+    "pizza": (),
+    "burrito": (),
+    "ice pop": ("ice lolly", "popsicle"),
+}
+
+# ImageNet classes MobileNetV2 can return that are food you'd keep or cook with, by their keras
+# label. Everything else (dishes, containers, kitchenware, live animals) is not an ingredient.
+IMAGENET_FOODS = {
+    "Granny_Smith": "apple",
+    "strawberry": "strawberry",
+    "orange": "orange",
+    "lemon": "lemon",
+    "fig": "fig",
+    "pineapple": "pineapple",
+    "banana": "banana",
+    "jackfruit": "jackfruit",
+    "custard_apple": "custard apple",
+    "pomegranate": "pomegranate",
+    "head_cabbage": "cabbage",
+    "broccoli": "broccoli",
+    "cauliflower": "cauliflower",
+    "zucchini": "zucchini",
+    "spaghetti_squash": "spaghetti squash",
+    "acorn_squash": "acorn squash",
+    "butternut_squash": "butternut squash",
+    "cucumber": "cucumber",
+    "artichoke": "artichoke",
+    "bell_pepper": "bell pepper",
+    "cardoon": "cardoon",
+    "mushroom": "mushroom",
+    "agaric": "mushroom",
+    "bolete": "porcini mushroom",
+    "hen-of-the-woods": "maitake mushroom",
+    "corn": "corn",
+    "ear": "corn",
+    "French_loaf": "baguette",
+    "bagel": "bagel",
+    "pretzel": "pretzel",
+    "dough": "dough",
+    "pizza": "pizza",
+    "burrito": "burrito",
+    "hotdog": "hot dog",
+    "guacamole": "guacamole",
+    "mashed_potato": "mashed potato",
+    "ice_cream": "ice cream",
+    "ice_lolly": "ice pop",
+    "chocolate_sauce": "chocolate sauce",
+    "red_wine": "red wine",
+    "espresso": "coffee",
+    "eggnog": "eggnog",
+    "Dungeness_crab": "crab",
+    "rock_crab": "crab",
+    "king_crab": "crab",
+    "American_lobster": "lobster",
+    "spiny_lobster": "lobster",
+    "crayfish": "crayfish",
+    "coho": "salmon",
+}
+
+_END = object()
+FUZZY_CANDIDATES = 8
+MIN_FUZZY_LENGTH = 5
+
+# Words that say how an ingredient is bought, cut or served without changing what it is. Only
+# these may surround a known name: "chopped fresh parsley" is parsley, but "peanut oil" is not
+# peanut and "carrot cake" is not carrot.
+DESCRIPTORS = frozenset({
+    "large", "medium", "small", "big", "extra", "ripe", "fresh", "freshly", "frozen", "raw", "whole",
+    "organic", "boneless", "skinless", "lean", "dried", "canned", "tinned", "salted", "unsalted",
+    "red", "green", "yellow",
+    "chopped", "diced", "sliced", "minced", "grated", "shredded", "crushed", "ground", "halved",
+    "quartered", "peeled", "seeded", "cubed", "trimmed", "rinsed", "drained", "sifted", "softened",
+    "melted", "beaten", "cooked", "roasted", "toasted", "thinly", "finely", "roughly", "coarsely",
+    "to", "taste", "optional", "for", "garnish", "serving",
+})
+CONJUNCTIONS = ("and", "or")
+
+
+def _key(text: str) -> str:
+    # normalize_ingredient_name only singularizes the head word; keys singularize every word
+    # so "tomatoes paste" and "cherry tomatoes halved" line up with the aliases
+    return " ".join(singularize(word) for word in normalize_ingredient_name(text).split())
+
+
+def _is_descriptor(word: str) -> bool:
+    # "400g" and the like are left over from quantities the parser didn't take apart
+    return word in DESCRIPTORS or any(char.isdigit() for char in word)
+
+
+def _trigrams(text: str):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    # Levenshtein distance counting a swap of neighbours ("parsely") as one edit. Only cells
+    # within `limit` of the diagonal can stay in range, and anything over it is reported as
+    # limit + 1 without finishing the table.
+    out = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return out
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        char_a = a[i - 1]
+        current = [out] * (len(b) + 1)
+        current[0] = i
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            char_b = b[j - 1]
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before[j - 2] + 1)
+            current[j] = distance
+        if min(current) > limit:
+            return out
+        before, previous = previous, current
+    return min(previous[-1], out)
+
+
+def display_name(canonical: str) -> str:
+    return canonical.title()
+
+
+class IngredientDictionary:
+    """Resolves free-text ingredient names to canonical ones.
+
+    Cheapest first: an exact alias lookup; then the longest alias phrase in the text that only
+    descriptors surround, via a word trie ("2 large ripe roma tomatoes" -> "tomato", "garlic
+    cloves, minced" -> "garlic"), so a known word inside an unknown compound ("peanut oil",
+    "corned beef") doesn't resolve; then, for typos, a character-trigram index whose best few
+    candidates are checked by edit distance. Of "salt and pepper", the last ingredient is taken.
+    Results are memoized, so repeat lookups cost a dict hit.
+    """
+
+    def __init__(self, entries: dict, imagenet: dict, cache_size: int = 65536):
+        self._aliases = {}
+        self._trie = {}
+        # length -> trigram -> alias keys: a typo search only walks keys of about its own length
+        self._trigrams = defaultdict(lambda: defaultdict(list))
+        for canonical, aliases in entries.items():
+            if normalize_ingredient_name(canonical) != canonical:
+                raise ValueError(f"Canonical ingredient {canonical!r} is not in normalised form")
+            for alias in (canonical, *aliases):
+                key = _key(alias)
+                if self._aliases.setdefault(key, canonical) != canonical:
+                    raise ValueError(f"{alias!r} is an alias of both {self._aliases[key]!r} and {canonical!r}")
+                node = self._trie
+                for word in key.split():
+                    node = node.setdefault(word, {})
+                node[_END] = canonical
+        for key in self._aliases:
+            for gram in _trigrams(key):
+                self._trigrams[len(key)][gram].append(key)
+
+        unknown = set(imagenet.values()) - set(entries)
+        if unknown:
+            raise ValueError(f"ImageNet classes map to unknown ingredients: {sorted(unknown)}")
+        self._imagenet = dict(imagenet)
+        self.names = frozenset(entries)
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _resolve(self, text: str) -> Optional[str]:
+        key = _key(text or "")
+        if not key:
+            return None
+        canonical = self._aliases.get(key)
+        if canonical is not None:
+            return canonical
+        words = key.split()
+        for conjunction in CONJUNCTIONS:
+            if conjunction in words[:-1]:
+                words = words[len(words) - words[::-1].index(conjunction):]
+        canonical = self._longest_phrase(words)
+        if canonical is not None:
+            return canonical
+        # Typos: the whole text first, then without its descriptors
+        start, end = 0, len(words)
+        while start < end and _is_descriptor(words[start]):
+            start += 1
+        while end > start and _is_descriptor(words[end - 1]):
+            end -= 1
+        for candidate in dict.fromkeys((key, " ".join(words[start:end]))):
+            if len(candidate) >= MIN_FUZZY_LENGTH:
+                match = self._closest_alias(candidate)
+                if match is not None:
+                    return self._aliases[match]
+        return None
+
+    def _longest_phrase(self, words):
+        # A phrase counts only when nothing but descriptors comes before and after it
+        trailing = len(words)
+        while trailing and _is_descriptor(words[trailing - 1]):
+            trailing -= 1
+        best, best_length = None, 0
+        for start in range(len(words)):
+            node = self._trie
+            for end in range(start, len(words)):
+                node = node.get(words[end])
+                if node is None:
+                    break
+                canonical = node.get(_END)
+                if canonical is not None and end + 1 >= trailing and end - start + 1 > best_length:
+                    best, best_length = canonical, end - start + 1
+            if not _is_descriptor(words[start]):
+                break
+        return best
+
+    def _closest_alias(self, text: str):
+        limit = 1 if len(text) <= 7 else 2
+        grams = _trigrams(text)
+        indexes = [self._trigrams[length] for length in range(len(text) - limit, len(text) + limit + 1)
+                   if length in self._trigrams]
+        shared = Counter(chain.from_iterable(index.get(gram, ()) for index in indexes for gram in grams))
+        # One edit changes at most four trigrams, so anything sharing fewer can't be in range
+        required = len(grams) - 4 * limit
+        best, best_distance = None, limit + 1
+        for key, count in shared.most_common(FUZZY_CANDIDATES):
+            if count < required:
+                break
+            if abs(len(key) - len(text)) >= best_distance:
+                continue
+            distance = _edit_distance(text, key, limit)
+            if distance < best_distance:
+                best, best_distance = key, distance
+        return best
+
+    def canonical_name(self, text: str) -> str:
+        # Known ingredients by their canonical name, anything else by its normalised spelling
+        return self.resolve(text) or normalize_ingredient_name(text)
+
+    def imagenet_ingredient(self, label: str) -> Optional[str]:
+        return self._imagenet.get(label)
+
+    def stats(self):
+        info = self.resolve.cache_info()
+        return {
+            "ingredients": len(self.names),
+            "aliases": len(self._aliases),
+            "imagenet_classes": len(self._imagenet),
+            "cache_hits": info.hits,
+            "cache_misses": info.misses,
+            "cache_size": info.currsize,
+        }
+
+
+ingredient_dictionary = IngredientDictionary(CANONICAL_INGREDIENTS, IMAGENET_FOODS)
+
+
+def resolve_ingredient(text: str) -> Optional[str]:
+    return ingredient_dictionary.resolve(text)
+
+
+def canonical_ingredient_name(text: str) -> str:
+    return ingredient_dictionary.canonical_name(text)
+
+
+def imagenet_ingredient(label: str) -> Optional[str]:
+    return ingredient_dictionary.imagenet_ingredient(label)
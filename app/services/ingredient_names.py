@@ -0,0 +1,155 @@
+import re
+from functools import lru_cache
+
+_NON_WORD = re.compile(r"[^a-z0-9.\s-]+")
+_WHITESPACE = re.compile(r"[\s_-]+")
+_NUMBER = re.compile(r"^\d+(\.\d+)?$")
+_FRACTION = re.compile(r"^(\d+)/(\d+)$")
+_RANGE = re.compile(r"^(\d+(?:\.\d+)?)\s*(?:-|–|to)\s*\d+(?:\.\d+)?")
+_GLUED = re.compile(r"(?<=\d)(?=[a-z½⅓⅔¼¾⅛])|(?<=[½⅓⅔¼¾⅛])(?=\S)")
+_PARENTHESES = re.compile(r"\([^)]*\)")
+_UNICODE_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75, "⅛": 0.125}
+
+UNIT_SYNONYMS = {
+    "g": "g", "gr": "g", "gram": "g", "grams": "g",
+    "kg": "kg", "kgs": "kg", "kilo": "kg", "kilos": "kg", "kilogram": "kg", "kilograms": "kg",
+    "mg": "mg", "milligram": "mg", "milligrams": "mg",
+    "ml": "ml", "milliliter": "ml", "milliliters": "ml", "millilitre": "ml", "millilitres": "ml",
+    "l": "l", "liter": "l", "liters": "l", "litre": "l", "litres": "l",
+    "oz": "oz", "ounce": "oz", "ounces": "oz",
+    "lb": "lb", "lbs": "lb", "pound": "lb", "pounds": "lb",
+    "cup": "cup", "cups": "cup", "c": "cup",
+    "tbsp": "tbsp", "tbs": "tbsp", "tablespoon": "tbsp", "tablespoons": "tbsp",
+    "tsp": "tsp", "teaspoon": "tsp", "teaspoons": "tsp",
+    "pinch": "pinch", "pinches": "pinch",
+    "piece": "piece", "pieces": "piece", "pc": "piece", "pcs": "piece",
+    "can": "can", "cans": "can",
+    "pack": "pack", "packs": "pack", "package": "pack", "packages": "pack",
+    "bunch": "bunch", "bunches": "bunch",
+    "clove": "clove", "cloves": "clove",
+}
+
+# Counts that may start a free-text name ("a pinch of salt"); a unit word after them is dropped
+# too, but a unit word on its own is part of the name ("pound cake", "can opener")
+_ARTICLES = {"a", "an"}
+
+# Plurals that simple suffix stripping would get wrong
+_IRREGULAR_PLURALS = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "potatoes": "potato",
+    "tomatoes": "tomato",
+    "mangoes": "mango",
+    "molasses": "molasses",
+    "hummus": "hummus",
+    "couscous": "couscous",
+    "asparagus": "asparagus",
+    "swiss": "swiss",
+    "peas": "pea",
+    "cheeses": "cheese",
+    "olives": "olive",
+}
+
+
+def singularize(word: str) -> str:
+    if word in _IRREGULAR_PLURALS:
+        return _IRREGULAR_PLURALS[word]
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes", "zes", "sses")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def normalize_unit(unit: str | None) -> str | None:
+    if not unit:
+        return None
+    unit = unit.strip().lower().rstrip(".")
+    return UNIT_SYNONYMS.get(unit, unit)
+
+
+# Units convertible within a dimension, as (base unit, factor to the base unit)
+_UNIT_SCALES = {
+    "mg": ("g", 0.001), "g": ("g", 1.0), "kg": ("g", 1000.0),
+    "ml": ("ml", 1.0), "l": ("ml", 1000.0),
+    "oz": ("g", 28.3495), "lb": ("g", 453.592),
+    "tsp": ("ml", 4.92892), "tbsp": ("ml", 14.7868), "cup": ("ml", 236.588),
+}
+
+
+def convert_amount(amount: float, from_unit: str | None, to_unit: str | None) -> float | None:
+    # None when the units can't be compared (e.g. grams against pieces); no unit counts as pieces
+    from_unit = normalize_unit(from_unit) or "piece"
+    to_unit = normalize_unit(to_unit) or "piece"
+    if from_unit == to_unit:
+        return amount
+    source, target = _UNIT_SCALES.get(from_unit), _UNIT_SCALES.get(to_unit)
+    if source is None or target is None or source[0] != target[0]:
+        return None
+    return amount * source[1] / target[1]
+
+
+@lru_cache(maxsize=65536)
+def normalize_ingredient_name(name: str) -> str:
+    # "Cherry_Tomatoes " -> "cherry tomato", "2 Cups of Flour" -> "flour"
+    name = _NON_WORD.sub(" ", (name or "").lower())
+    words = [word.strip(".") for word in _WHITESPACE.sub(" ", name).strip().split(" ")]
+    words = [word for word in words if word]
+    counted = article = False
+    while len(words) > 1 and (_NUMBER.match(words[0]) or words[0] in _ARTICLES or (counted and words[0] == "x")):
+        word = words.pop(0)
+        counted = counted or _NUMBER.match(word) is not None
+        article = not counted
+    # "2 cups flour", "a cup of flour"; after an article only with "of", so "a pound cake" stays a cake
+    if (counted or article) and len(words) > 1 and words[0] in UNIT_SYNONYMS \
+            and (counted or (len(words) > 2 and words[1] == "of")):
+        words.pop(0)
+    if (counted or article) and len(words) > 1 and words[0] == "of":
+        words.pop(0)
+    if words:
+        words[-1] = singularize(words[-1])
+    return " ".join(words)
+
+
+def _amount_of(word: str) -> float | None:
+    if _NUMBER.match(word):
+        return float(word)
+    if word in _UNICODE_FRACTIONS:
+        return _UNICODE_FRACTIONS[word]
+    fraction = _FRACTION.match(word)
+    if fraction and int(fraction.group(2)):
+        return int(fraction.group(1)) / int(fraction.group(2))
+    return None
+
+
+def parse_ingredient_line(line: str) -> tuple[float | None, str | None, str]:
+    # "1 1/2 cups flour, sifted" -> (1.5, "cup", "flour"); "2-3 tomatoes (ripe)" -> (2.0, None, "tomato")
+    text = _PARENTHESES.sub(" ", (line or "").lower()).split(",")[0].strip()
+    if text.endswith(":"):
+        # A section heading such as "For the sauce:"
+        return None, None, ""
+    text = _GLUED.sub(" ", _RANGE.sub(r"\1", text))
+    words = text.split()
+    amount = None
+    while words and (value := _amount_of(words[0])) is not None:
+        amount = (amount or 0.0) + value
+        words.pop(0)
+    unit = None
+    # A unit word is a unit after an amount or before "of" ("pinch of salt"), otherwise it starts
+    # the name ("pound cake")
+    if len(words) > 1 and words[0].rstrip(".") in UNIT_SYNONYMS and (amount is not None or words[1] == "of"):
+        unit = normalize_unit(words.pop(0))
+    elif amount is not None and len(words) > 2 and words[0] == "x" and _amount_of(words[1]) is not None:
+        # "2 x 400 g tomatoes": two packs; the pack size is not part of the name
+        words = words[2:]
+        if len(words) > 1 and words[0].rstrip(".") in UNIT_SYNONYMS:
+            words.pop(0)
+    if (unit or amount is not None) and len(words) > 1 and words[0] == "of":
+        words.pop(0)
+    return amount, unit, normalize_ingredient_name(" ".join(words))
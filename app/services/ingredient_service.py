@@ -1,6 +1,329 @@
+import asyncio
+import base64
+import bisect
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import List, NamedTuple, Optional
+from sqlalchemy import delete, event, func, insert, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.core.cache import LRUCache, create_cache_backend
+from app.core.config import settings
 from app.models.ingredient import Ingredient
-from app.schemas.ingredient import IngredientCreate
+from app.models.user import User
+from app.schemas.ingredient import IngredientCreate, IngredientBulkUpdate
+
+INGREDIENT_FIELDS = ("id", "name", "amount", "unit", "expiration_date", "user_id")
+MAX_PAGE_SIZE = 500
+MAX_BULK_SIZE = 1000
+
+# Pantry versions: every write to a user's ingredients moves users.pantry_version in the same
+# transaction, so a version read alongside the rows identifies exactly that state of the pantry
+
+def _changed_pantry_owners(session: Session):
+    user_ids = set()
+    for obj in session.new:
+        if isinstance(obj, Ingredient):
+            user_ids.add(obj.user_id)
+    for obj in session.deleted:
+        if isinstance(obj, Ingredient):
+            user_ids.add(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, Ingredient) and session.is_modified(obj, include_collections=False):
+            history = inspect(obj).attrs.user_id.history
+            user_ids.update(history.deleted or ())
+            user_ids.add(obj.user_id)
+    user_ids.discard(None)
+    return user_ids
+
+def bump_pantry_versions(db: Session, user_ids):
+    # Statement-level writes (bulk updates, atomic decrements) bypass the flush hook and call this directly
+    user_ids = sorted(set(user_ids) - {None})
+    if user_ids:
+        db.execute(
+            update(User).where(User.id.in_(user_ids)).values(pantry_version=User.pantry_version + 1),
+            execution_options={"synchronize_session": False},
+        )
+
+@event.listens_for(Session, "before_flush")
+def _bump_versions_on_flush(session, flush_context, instances):
+    # Every ORM write to ingredients, from any route or job, moves the owner's pantry version
+    # in the same transaction, so an ETag can never outlive the data it describes
+    bump_pantry_versions(session, _changed_pantry_owners(session))
+
+def get_pantry_version(db: Session, user_id: int) -> Optional[int]:
+    return db.scalar(select(User.pantry_version).where(User.id == user_id))
+
+async def get_pantry_version_async(db: AsyncSession, user_id: int) -> Optional[int]:
+    return await db.scalar(select(User.pantry_version).where(User.id == user_id))
+
+# Pantry cache: each user's ingredient rows with the version they were read at
+
+class CachedPantry(NamedTuple):
+    user_id: int
+    version: int
+    # INGREDIENT_FIELDS dicts in id order
+    items: List[dict]
+    # When the read started; an entry never claims to be newer than its data
+    loaded_at: float
+
+    def ids(self):
+        return [item["id"] for item in self.items]
+
+def _encode_pantry(pantry: CachedPantry):
+    return {
+        "user_id": pantry.user_id,
+        "version": pantry.version,
+        "loaded_at": pantry.loaded_at,
+        "items": [{**item, "expiration_date": item["expiration_date"] and item["expiration_date"].isoformat()}
+                  for item in pantry.items],
+    }
+
+def _decode_pantry(value) -> CachedPantry:
+    return CachedPantry(
+        user_id=value["user_id"],
+        version=value["version"],
+        loaded_at=value["loaded_at"],
+        items=[{**item, "expiration_date": item["expiration_date"] and date.fromisoformat(item["expiration_date"])}
+               for item in value["items"]],
+    )
+
+class PantryCache:
+    """Per-user pantries in an in-process LRU, in front of an optional shared tier (SQLite or
+    files on the host) that lets workers reuse each other's reads.
+
+    Writes invalidate write-through: every write path drops the user's entry from both tiers
+    once its transaction commits, and a read that started before the invalidation is not
+    stored. An entry younger than `fresh_s` is served as is. Up to `stale_s` it is still served
+    while one background refresh per user revalidates it (stale-while-revalidate); that costs a
+    single version lookup when nothing changed. Older entries are reloaded before answering.
+    Writes made by another worker, or outside the write paths, therefore show within about
+    `fresh_s`.
+    """
+
+    def __init__(self, maxsize: int = 10000, shared=None, fresh_s: float = 2.0, stale_s: float = 60.0):
+        self.local = LRUCache(maxsize)
+        self.shared = shared
+        self.fresh_s = fresh_s
+        self.stale_s = stale_s
+        self._invalidated = LRUCache(maxsize)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.revalidations = 0
+        self.revalidated_unchanged = 0
+        self.invalidations = 0
+        self.shared_errors = 0
+        self.stale_age_total = 0.0
+        self.stale_age_max = 0.0
+
+    def _key(self, user_id: int):
+        return f"pantry:{user_id}"
+
+    def _shared_call(self, method, *args):
+        # The shared tier is an optimisation; never fail a request because of it
+        if self.shared is None:
+            return None
+        try:
+            return getattr(self.shared, method)(*args)
+        except Exception:
+            self.shared_errors += 1
+            return None
+
+    def lookup(self, user_id: int):
+        # -> (entry or None, whether it should be refreshed)
+        pantry = self.local.get(user_id)
+        if pantry is None:
+            value = self._shared_call("get", self._key(user_id))
+            if value is not None:
+                pantry = _decode_pantry(value)
+                self.shared_hits += 1
+                self.local.set(user_id, pantry, self.stale_s)
+        age = time.time() - pantry.loaded_at if pantry is not None else None
+        if age is None or age >= self.stale_s:
+            self.misses += 1
+            return None, True
+        if age < self.fresh_s:
+            self.hits += 1
+            return pantry, False
+        self.stale_hits += 1
+        self.stale_age_total += age
+        self.stale_age_max = max(self.stale_age_max, age)
+        return pantry, True
+
+    def store(self, pantry: CachedPantry):
+        if self._invalidated.get(pantry.user_id, 0.0) >= pantry.loaded_at:
+            # A write committed while this was being read
+            return
+        self.local.set(pantry.user_id, pantry, self.stale_s)
+        self._shared_call("set", self._key(pantry.user_id), _encode_pantry(pantry), self.stale_s)
+
+    def invalidate(self, user_id: int):
+        self.invalidations += 1
+        self._invalidated.set(user_id, time.time())
+        self.local.delete(user_id)
+        self._shared_call("delete", self._key(user_id))
+
+    def claim_refresh(self, user_id: int) -> bool:
+        with self._lock:
+            if user_id in self._refreshing:
+                return False
+            self._refreshing.add(user_id)
+            return True
+
+    def release_refresh(self, user_id: int):
+        with self._lock:
+            self._refreshing.discard(user_id)
+
+    def clear(self):
+        self.local.clear()
+        self._invalidated.clear()
+        if self.shared is not None:
+            self._shared_call("delete_prefix", "pantry:")
+
+    def stats(self):
+        hits = self.hits + self.stale_hits
+        lookups = hits + self.misses
+        return {
+            "local_size": len(self.local),
+            "local_maxsize": self.local.maxsize,
+            "shared_backend": type(self.shared).__name__ if self.shared is not None else None,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "loads": self.loads,
+            "revalidations": self.revalidations,
+            "revalidated_unchanged": self.revalidated_unchanged,
+            "invalidations": self.invalidations,
+            "stale_served_mean_age_s": self.stale_age_total / self.stale_hits if self.stale_hits else 0.0,
+            "stale_served_max_age_s": self.stale_age_max,
+            "refreshing": len(self._refreshing),
+            "shared_errors": self.shared_errors,
+        }
+
+pantry_cache = PantryCache(
+    maxsize=settings.PANTRY_CACHE_SIZE,
+    shared=create_cache_backend(settings.PANTRY_CACHE_BACKEND, settings.PANTRY_CACHE_PATH),
+    fresh_s=settings.PANTRY_CACHE_FRESH_S,
+    stale_s=settings.PANTRY_CACHE_STALE_S,
+)
+_refresh_pool = ThreadPoolExecutor(max_workers=settings.PANTRY_CACHE_REFRESH_THREADS, thread_name_prefix="pantry-refresh")
+_refresh_tasks = set()
+
+def invalidate_pantry(user_id: Optional[int]):
+    # Called by every write path that touches a user's ingredients, after its commit
+    if user_id is not None:
+        pantry_cache.invalidate(user_id)
+
+def pantry_cache_stats():
+    return pantry_cache.stats()
+
+def _pantry_rows_query(user_id: int):
+    return select(*_columns(INGREDIENT_FIELDS)).where(Ingredient.user_id == user_id).order_by(Ingredient.id)
+
+def _loaded_pantry(user_id: int, version: Optional[int], rows, cached: Optional[CachedPantry], started: float):
+    if version is None:
+        return None
+    if cached is not None and cached.version == version:
+        pantry_cache.revalidated_unchanged += 1
+        return cached._replace(loaded_at=started)
+    pantry_cache.loads += 1
+    return CachedPantry(user_id, version, [dict(zip(INGREDIENT_FIELDS, row)) for row in rows], started)
+
+def _load_pantry(db: Session, user_id: int, cached: Optional[CachedPantry] = None):
+    # The version is read before the rows, so rows newer than the version only cause a reload,
+    # never stale rows filed under a newer version. A revalidation whose version still matches
+    # skips the rows.
+    started = time.time()
+    version = get_pantry_version(db, user_id)
+    unchanged = cached is not None and cached.version == version
+    rows = db.execute(_pantry_rows_query(user_id)).all() if version is not None and not unchanged else []
+    pantry = _loaded_pantry(user_id, version, rows, cached, started)
+    if pantry is not None:
+        pantry_cache.store(pantry)
+    return pantry
+
+async def _load_pantry_async(db: AsyncSession, user_id: int, cached: Optional[CachedPantry] = None):
+    started = time.time()
+    version = await get_pantry_version_async(db, user_id)
+    unchanged = cached is not None and cached.version == version
+    rows = (await db.execute(_pantry_rows_query(user_id))).all() if version is not None and not unchanged else []
+    pantry = _loaded_pantry(user_id, version, rows, cached, started)
+    if pantry is not None:
+        pantry_cache.store(pantry)
+    return pantry
+
+def _revalidate(bind, user_id: int, cached: CachedPantry):
+    pantry_cache.revalidations += 1
+    try:
+        with Session(bind) as db:
+            _load_pantry(db, user_id, cached)
+    except Exception as e:
+        print(f"Pantry refresh for user {user_id} failed: {e}")
+    finally:
+        pantry_cache.release_refresh(user_id)
+
+async def _revalidate_async(bind, user_id: int, cached: CachedPantry):
+    pantry_cache.revalidations += 1
+    try:
+        async with AsyncSession(bind) as db:
+            await _load_pantry_async(db, user_id, cached)
+    except Exception as e:
+        print(f"Pantry refresh for user {user_id} failed: {e}")
+    finally:
+        pantry_cache.release_refresh(user_id)
+
+def get_pantry(db: Session, user_id: int) -> Optional[CachedPantry]:
+    """A user's ingredients and pantry version, from the pantry cache when it can; None for unknown users."""
+    cached, refresh = pantry_cache.lookup(user_id)
+    if cached is None:
+        return _load_pantry(db, user_id)
+    if refresh and pantry_cache.claim_refresh(user_id):
+        # Its own session: the request's may be closed before the refresh runs
+        _refresh_pool.submit(_revalidate, db.get_bind(), user_id, cached)
+    return cached
+
+async def get_pantry_async(db: AsyncSession, user_id: int) -> Optional[CachedPantry]:
+    cached, refresh = pantry_cache.lookup(user_id)
+    if cached is None:
+        return await _load_pantry_async(db, user_id)
+    if refresh and pantry_cache.claim_refresh(user_id):
+        task = asyncio.create_task(_revalidate_async(db.bind, user_id, cached))
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+    return cached
+
+def pantry_page(pantry: CachedPantry, fields=INGREDIENT_FIELDS, after_id: int | None = None, limit: int = 100):
+    # The same pages list_ingredients_page reads from the database, cut from the cached list
+    start = bisect.bisect_right(pantry.ids(), after_id) if after_id is not None else 0
+    rows = [tuple(item[field] for field in fields) for item in pantry.items[start:start + limit + 1]]
+    return _page_result(rows, pantry.user_id, fields, limit)
+
+def expiring_pantry_items(pantry: CachedPantry, days: int, today: date | None = None):
+    # Items expiring within `days`, soonest first (already expired ones included)
+    cutoff = (today or date.today()) + timedelta(days=days)
+    expiring = [item for item in pantry.items if item["expiration_date"] and item["expiration_date"] <= cutoff]
+    return sorted(expiring, key=lambda item: (item["expiration_date"], item["id"]))
+
+def list_expiring_ingredients(db: Session, days: int, today: date | None = None, limit: int = MAX_PAGE_SIZE):
+    # Every pantry's items expiring within `days`, soonest first; only reads, nothing is sent
+    cutoff = (today or date.today()) + timedelta(days=days)
+    rows = db.execute(
+        select(*(getattr(Ingredient, field) for field in INGREDIENT_FIELDS))
+        .where(Ingredient.expiration_date <= cutoff)
+        .order_by(Ingredient.expiration_date, Ingredient.id)
+        .limit(limit)
+    )
+    return [dict(row._mapping) for row in rows]
 
 def get_ingredients(db: Session):
     return db.query(Ingredient).all()
@@ -10,22 +333,251 @@ def add_ingredient(db: Session, ingredient: IngredientCreate):
     db.add(db_ingredient)
     db.commit()
     db.refresh(db_ingredient)
+    invalidate_pantry(db_ingredient.user_id)
     return db_ingredient
 
 def update_ingredient(db: Session, ingredient_id: int, ingredient: IngredientCreate):
     db_ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
     if db_ingredient:
-        for key, value in ingredient.dict().items():
+        previous_user_id = db_ingredient.user_id
+        data = ingredient.dict()
+        if data.get("user_id") is None:
+            # Owner is only changed when the client sends one explicitly
+            data.pop("user_id", None)
+        for key, value in data.items():
             setattr(db_ingredient, key, value)
         db.commit()
         db.refresh(db_ingredient)
+        invalidate_pantry(previous_user_id)
+        invalidate_pantry(db_ingredient.user_id)
         return db_ingredient
     return None
 
 def delete_ingredient(db: Session, ingredient_id: int):
     db_ingredient = db.query(Ingredient).filter(Ingredient.id == ingredient_id).first()
     if db_ingredient:
+        user_id = db_ingredient.user_id
         db.delete(db_ingredient)
         db.commit()
+        invalidate_pantry(user_id)
+        return True
+    return False
+
+# Bulk writes: the whole batch is validated first and then written in one transaction with a
+# handful of statements, so nothing is written if any item is rejected. Each returns
+# (items, errors): items as plain dicts read before the commit, errors as one
+# {"index", "id", "detail"} entry per rejected item.
+
+def _columns(fields):
+    return [getattr(Ingredient, field) for field in fields]
+
+def _bulk_error(index: int, detail: str, ingredient_id: int = None):
+    return {"index": index, "id": ingredient_id, "detail": detail}
+
+def _missing_users(db: Session, user_ids):
+    user_ids = set(user_ids) - {None}
+    if not user_ids:
+        return set()
+    return user_ids - set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+
+def _validate_values(index: int, data: dict, ingredient_id: int = None):
+    errors = []
+    if "name" in data and not (data["name"] or "").strip():
+        errors.append(_bulk_error(index, "name must not be empty", ingredient_id))
+    if data.get("amount") is not None and data["amount"] < 0:
+        errors.append(_bulk_error(index, "amount must not be negative", ingredient_id))
+    return errors
+
+def _commit_pantry_writes(db: Session, user_ids):
+    # Statement-level writes skip the before_flush hook, so bump versions before committing
+    bump_pantry_versions(db, user_ids)
+    db.commit()
+    for user_id in set(user_ids) - {None}:
+        invalidate_pantry(user_id)
+
+def bulk_create_ingredients(db: Session, ingredients: List[IngredientCreate]):
+    rows = [ingredient.dict() for ingredient in ingredients]
+    errors = []
+    for index, row in enumerate(rows):
+        errors.extend(_validate_values(index, row))
+    missing_users = _missing_users(db, (row["user_id"] for row in rows))
+    errors.extend(_bulk_error(index, f"User {row['user_id']} not found")
+                  for index, row in enumerate(rows) if row["user_id"] in missing_users)
+    if errors or not rows:
+        return [], sorted(errors, key=lambda error: error["index"])
+
+    # A Core insert on the table: one multi-row INSERT ... RETURNING per driver batch (the ORM bulk
+    # path starts a new statement whenever the set of NULL columns changes between rows). Ids are
+    # handed out in VALUES order on SQLite and Postgres alike, so sorting by id restores request
+    # order; sort_by_parameter_order would make SQLite fall back to one INSERT per row.
+    returned = db.execute(insert(Ingredient.__table__).returning(*_columns(INGREDIENT_FIELDS)), rows).all()
+    created = sorted((dict(zip(INGREDIENT_FIELDS, row)) for row in returned), key=lambda item: item["id"])
+    _commit_pantry_writes(db, [row["user_id"] for row in rows])
+    return created, []
+
+def bulk_update_ingredients(db: Session, updates: List[IngredientBulkUpdate]):
+    ids = [item.id for item in updates]
+    owners = dict(db.execute(select(Ingredient.id, Ingredient.user_id).where(Ingredient.id.in_(ids))).all())
+    rows = []
+    errors = []
+    seen = set()
+    for index, item in enumerate(updates):
+        data = item.dict(exclude_unset=True)
+        if item.id not in owners:
+            errors.append(_bulk_error(index, "Ingredient not found", item.id))
+        elif item.id in seen:
+            errors.append(_bulk_error(index, "Ingredient listed more than once", item.id))
+        elif len(data) == 1:
+            errors.append(_bulk_error(index, "No fields to update", item.id))
+        errors.extend(_validate_values(index, data, item.id))
+        seen.add(item.id)
+        if data.get("user_id") is None:
+            # As in update_ingredient, the owner only changes when one is sent explicitly
+            data.pop("user_id", None)
+        rows.append(data)
+    missing_users = _missing_users(db, (row.get("user_id") for row in rows))
+    errors.extend(_bulk_error(index, f"User {row['user_id']} not found", row["id"])
+                  for index, row in enumerate(rows) if row.get("user_id") in missing_users)
+    if errors or not rows:
+        return [], sorted(errors, key=lambda error: error["index"])
+
+    # Update by primary key: one executemany per run of rows updating the same columns,
+    # so rows are grouped by column set first
+    db.execute(update(Ingredient), sorted(rows, key=lambda row: sorted(row)))
+    updated = db.execute(select(*_columns(INGREDIENT_FIELDS)).where(Ingredient.id.in_(ids))).all()
+    _commit_pantry_writes(db, [*owners.values(), *(row.get("user_id") for row in rows)])
+    by_id = {row[0]: dict(zip(INGREDIENT_FIELDS, row)) for row in updated}
+    return [by_id[ingredient_id] for ingredient_id in ids], []
+
+def bulk_delete_ingredients(db: Session, ingredient_ids: List[int]):
+    owners = dict(db.execute(select(Ingredient.id, Ingredient.user_id).where(Ingredient.id.in_(ingredient_ids))).all())
+    errors = []
+    seen = set()
+    for index, ingredient_id in enumerate(ingredient_ids):
+        if ingredient_id not in owners:
+            errors.append(_bulk_error(index, "Ingredient not found", ingredient_id))
+        elif ingredient_id in seen:
+            errors.append(_bulk_error(index, "Ingredient listed more than once", ingredient_id))
+        seen.add(ingredient_id)
+    if errors or not ingredient_ids:
+        return [], errors
+
+    deleted = db.scalars(
+        delete(Ingredient).where(Ingredient.id.in_(ingredient_ids)).returning(Ingredient.id),
+        execution_options={"synchronize_session": False},
+    ).all()
+    _commit_pantry_writes(db, owners.values())
+    return deleted, []
+
+def consume_ingredient(db: Session, ingredient_id: int, amount_used: float):
+    # The subtraction happens inside one UPDATE ... RETURNING, so two concurrent uses both count
+    # instead of the later commit overwriting the earlier one
+    row = db.execute(
+        update(Ingredient)
+        .where(Ingredient.id == ingredient_id)
+        .values(amount=func.coalesce(Ingredient.amount, 0) - amount_used)
+        .returning(Ingredient.user_id, Ingredient.amount),
+        execution_options={"synchronize_session": False},
+    ).first()
+    if row is None:
+        return None
+    user_id, remaining = row
+    if remaining <= 0:
+        db.execute(delete(Ingredient).where(Ingredient.id == ingredient_id), execution_options={"synchronize_session": False})
+    _commit_pantry_writes(db, [user_id])
+    return {"id": ingredient_id, "remaining": max(remaining, 0.0), "removed": remaining <= 0}
+
+# Keyset pagination of one user's pantry on (user_id, id): each page is an index range scan
+# starting after the last id seen, so deep pages cost the same as the first one
+
+def parse_fields(fields: str | None):
+    if not fields:
+        return INGREDIENT_FIELDS
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in INGREDIENT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so clients can page and address items
+    return tuple(dict.fromkeys(["id", *requested]))
+
+def encode_cursor(user_id: int, last_id: int):
+    return base64.urlsafe_b64encode(f"{user_id}:{last_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str | None, user_id: int):
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        cursor_user_id, last_id = (int(part) for part in raw.split(":"))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if cursor_user_id != user_id:
+        raise ValueError("Cursor belongs to a different pantry")
+    return last_id
+
+def pantry_etag(user_id: int, version: int, fields, cursor: str | None, limit: int):
+    # Weak: the same pantry version and query always serialise to equivalent JSON
+    query = f"{','.join(fields)}|{cursor or ''}|{limit}"
+    return f'W/"p{user_id}-v{version}-{hashlib.sha1(query.encode()).hexdigest()[:12]}"'
+
+def _page_query(user_id: int, fields, after_id: int | None, limit: int):
+    query = select(*_columns(fields)).where(Ingredient.user_id == user_id)
+    if after_id is not None:
+        query = query.where(Ingredient.id > after_id)
+    # One extra row tells whether another page exists without a COUNT
+    return query.order_by(Ingredient.id).limit(limit + 1)
+
+def _page_result(rows, user_id: int, fields, limit: int):
+    items = [dict(zip(fields, row)) for row in rows[:limit]]
+    next_cursor = encode_cursor(user_id, items[-1]["id"]) if len(rows) > limit else None
+    return items, next_cursor
+
+def list_ingredients_page(db: Session, user_id: int, fields=INGREDIENT_FIELDS, after_id: int | None = None,
+                          limit: int = 100):
+    rows = db.execute(_page_query(user_id, fields, after_id, limit)).all()
+    return _page_result(rows, user_id, fields, limit)
+
+async def list_ingredients_page_async(db: AsyncSession, user_id: int, fields=INGREDIENT_FIELDS,
+                                      after_id: int | None = None, limit: int = 100):
+    rows = (await db.execute(_page_query(user_id, fields, after_id, limit))).all()
+    return _page_result(rows, user_id, fields, limit)
+
+# Async variants for routes running on the event loop with an AsyncSession
+
+async def get_ingredients_async(db: AsyncSession):
+    result = await db.execute(select(Ingredient))
+    return result.scalars().all()
+
+async def add_ingredient_async(db: AsyncSession, ingredient: IngredientCreate):
+    db_ingredient = Ingredient(**ingredient.dict())
+    db.add(db_ingredient)
+    await db.commit()
+    await db.refresh(db_ingredient)
+    invalidate_pantry(db_ingredient.user_id)
+    return db_ingredient
+
+async def update_ingredient_async(db: AsyncSession, ingredient_id: int, ingredient: IngredientCreate):
+    db_ingredient = await db.get(Ingredient, ingredient_id)
+    if db_ingredient:
+        previous_user_id = db_ingredient.user_id
+        data = ingredient.dict()
+        if data.get("user_id") is None:
+            data.pop("user_id", None)
+        for key, value in data.items():
+            setattr(db_ingredient, key, value)
+        await db.commit()
+        await db.refresh(db_ingredient)
+        invalidate_pantry(previous_user_id)
+        invalidate_pantry(db_ingredient.user_id)
+        return db_ingredient
+    return None
+
+async def delete_ingredient_async(db: AsyncSession, ingredient_id: int):
+    db_ingredient = await db.get(Ingredient, ingredient_id)
+    if db_ingredient:
+        user_id = db_ingredient.user_id
+        await db.delete(db_ingredient)
+        await db.commit()
+        invalidate_pantry(user_id)
         return True
     return False
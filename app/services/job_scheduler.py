@@ -0,0 +1,274 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.job_run import JobLock, JobRun
+from app.services.notification_service import expiration_check_job
+
+EXPIRATION_CHECK = "expiration_check"
+LEADER_LOCK = "scheduler-leader"
+TICK_JOB_ID = "scheduler-tick"
+
+
+def acquire_lock(db: Session, name: str, owner: str, ttl_s: float, now: datetime = None) -> bool:
+    # Take over the lock row if it is ours or its lease has lapsed; otherwise try to create it.
+    # Both statements are atomic, so two processes can never both come away holding the lease.
+    now = now or datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_s)
+    result = db.execute(
+        update(JobLock)
+        .where(JobLock.name == name, or_(JobLock.owner == owner, JobLock.expires_at < now))
+        .values(owner=owner, expires_at=expires_at)
+    )
+    if result.rowcount:
+        db.commit()
+        return True
+    try:
+        db.execute(insert(JobLock).values(name=name, owner=owner, expires_at=expires_at))
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
+
+def renew_lock(db: Session, name: str, owner: str, ttl_s: float, now: datetime = None) -> bool:
+    # Extends a lease this owner still holds; a lapsed one may already be someone else's
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(JobLock)
+        .where(JobLock.name == name, JobLock.owner == owner, JobLock.expires_at >= now)
+        .values(expires_at=now + timedelta(seconds=ttl_s))
+    )
+    db.commit()
+    return bool(result.rowcount)
+
+
+def release_lock(db: Session, name: str, owner: str):
+    db.execute(update(JobLock).where(JobLock.name == name, JobLock.owner == owner).values(expires_at=datetime.utcnow()))
+    db.commit()
+
+
+def enqueue_runs(db: Session, job_name: str, shard_count: int, trigger: str, now: datetime = None) -> List[JobRun]:
+    now = now or datetime.utcnow()
+    batch_id = uuid.uuid4().hex
+    runs = [
+        JobRun(job_name=job_name, batch_id=batch_id, trigger=trigger, status="queued",
+               shard=shard, shard_count=shard_count, queued_at=now)
+        for shard in range(shard_count)
+    ]
+    db.add_all(runs)
+    db.commit()
+    return runs
+
+
+def claim_run(db: Session, owner: str, now: datetime = None) -> Optional[JobRun]:
+    # The status check in the UPDATE makes the claim atomic; losing a race just moves on to the next run
+    now = now or datetime.utcnow()
+    candidates = db.scalars(select(JobRun.id).where(JobRun.status == "queued").order_by(JobRun.id).limit(5)).all()
+    for run_id in candidates:
+        result = db.execute(
+            update(JobRun)
+            .where(JobRun.id == run_id, JobRun.status == "queued")
+            .values(status="running", owner=owner, started_at=now)
+        )
+        db.commit()
+        if result.rowcount:
+            return db.get(JobRun, run_id)
+    return None
+
+
+def fail_stale_runs(db: Session, timeout_s: float, now: datetime = None):
+    # A run whose process died mid-way never finishes; mark it so it stops looking in progress
+    now = now or datetime.utcnow()
+    result = db.execute(
+        update(JobRun)
+        .where(JobRun.status == "running", JobRun.started_at < now - timedelta(seconds=timeout_s))
+        .values(status="failed", finished_at=now, error="timed out")
+    )
+    db.commit()
+    return result.rowcount
+
+
+def is_due(db: Session, job_name: str, interval_s: float, now: datetime = None) -> bool:
+    now = now or datetime.utcnow()
+    last_queued = db.scalar(
+        select(JobRun.queued_at)
+        .where(JobRun.job_name == job_name, JobRun.trigger == "schedule")
+        .order_by(JobRun.queued_at.desc())
+        .limit(1)
+    )
+    return last_queued is None or last_queued <= now - timedelta(seconds=interval_s)
+
+
+class JobScheduler:
+    """Runs periodic jobs once per cluster instead of once per gunicorn worker.
+
+    Every process ticks. The process holding the leader lease (a row in job_locks) enqueues
+    scheduled runs, split into shards, as rows in job_runs. Any process then claims queued runs
+    one at a time and executes each with its own fresh session, recording the outcome. While the
+    leader works through runs, a heartbeat thread keeps renewing its lease.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], jobs: Dict[str, Callable],
+                 tick_s: float = 60.0, lease_s: float = 180.0, run_timeout_s: float = 3600.0,
+                 schedules: Optional[Dict[str, tuple]] = None):
+        self.session_factory = session_factory
+        self.jobs = jobs
+        self.tick_s = tick_s
+        self.lease_s = lease_s
+        self.run_timeout_s = run_timeout_s
+        # job name -> (interval seconds, shard count)
+        self.schedules = schedules or {}
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self.runs_executed = 0
+        self.runs_failed = 0
+        self._scheduler = None
+
+    def start(self):
+        if self._scheduler is not None:
+            return
+        self._scheduler = BackgroundScheduler()
+        self._scheduler.add_job(
+            self.tick, "interval", seconds=self.tick_s, id=TICK_JOB_ID,
+            max_instances=1, coalesce=True, next_run_time=datetime.now(),
+        )
+        self._scheduler.start()
+
+    def shutdown(self):
+        if self._scheduler is None:
+            return
+        self._scheduler.shutdown(wait=False)
+        self._scheduler = None
+        if self.is_leader:
+            db = self.session_factory()
+            try:
+                release_lock(db, LEADER_LOCK, self.owner)
+            finally:
+                db.close()
+            self.is_leader = False
+
+    def poke(self):
+        # Run a tick now in the background instead of waiting for the next interval
+        if self._scheduler is not None:
+            self._scheduler.modify_job(TICK_JOB_ID, next_run_time=datetime.now())
+
+    def enqueue(self, db: Session, job_name: str, trigger: str = "manual", shard_count: int = None):
+        if job_name not in self.jobs:
+            raise ValueError(f"Unknown job '{job_name}'")
+        shard_count = shard_count or self.schedules.get(job_name, (None, 1))[1]
+        runs = enqueue_runs(db, job_name, shard_count, trigger)
+        self.poke()
+        return runs
+
+    def tick(self):
+        db = self.session_factory()
+        try:
+            self.is_leader = acquire_lock(db, LEADER_LOCK, self.owner, self.lease_s)
+            if self.is_leader:
+                fail_stale_runs(db, self.run_timeout_s)
+                for job_name, (interval_s, shard_count) in self.schedules.items():
+                    if is_due(db, job_name, interval_s):
+                        enqueue_runs(db, job_name, shard_count, "schedule")
+        except Exception as e:
+            db.rollback()
+            print(f"Scheduler tick failed: {str(e)}")
+        finally:
+            db.close()
+
+        # Work through the queue; runs enqueued meanwhile (e.g. by a poke) are picked up by this loop
+        stop = threading.Event()
+        heartbeat = None
+        if self.is_leader:
+            heartbeat = threading.Thread(target=self._heartbeat, args=(stop,), daemon=True)
+            heartbeat.start()
+        try:
+            while self.run_next():
+                pass
+        finally:
+            stop.set()
+            if heartbeat is not None:
+                heartbeat.join()
+
+    def _heartbeat(self, stop: threading.Event):
+        # A run can take far longer than the lease; without renewing it another process would take
+        # over as leader mid-run
+        while not stop.wait(self.lease_s / 3):
+            db = self.session_factory()
+            try:
+                self.is_leader = renew_lock(db, LEADER_LOCK, self.owner, self.lease_s)
+            except Exception as e:
+                db.rollback()
+                print(f"Scheduler lease renewal failed: {str(e)}")
+            finally:
+                db.close()
+            if not self.is_leader:
+                return
+
+    def run_next(self) -> bool:
+        db = self.session_factory()
+        try:
+            run = claim_run(db, self.owner)
+            if run is None:
+                return False
+            run_id, job_name, shard, shard_count = run.id, run.job_name, run.shard, run.shard_count
+        finally:
+            db.close()
+        self.execute(run_id, job_name, shard, shard_count)
+        return True
+
+    def execute(self, run_id: int, job_name: str, shard: int, shard_count: int):
+        # A fresh session per run: nothing is carried over from a previous run or a request
+        db = self.session_factory()
+        started = time.perf_counter()
+        values = {}
+        try:
+            result = self.jobs[job_name](db, (shard, shard_count) if shard_count > 1 else None)
+            values.update(result or {})
+            values["status"] = "succeeded"
+            self.runs_executed += 1
+        except Exception as e:
+            db.rollback()
+            print(f"Job {job_name} (run {run_id}, shard {shard}/{shard_count}) failed: {str(e)}")
+            values.update(status="failed", error=str(e))
+            self.runs_failed += 1
+        try:
+            values.update(finished_at=datetime.utcnow(), duration_s=time.perf_counter() - started)
+            db.execute(update(JobRun).where(JobRun.id == run_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def recent_runs(self, db: Session, limit: int = 20):
+        return db.scalars(select(JobRun).order_by(JobRun.id.desc()).limit(limit)).all()
+
+    def stats(self):
+        return {
+            "owner": self.owner,
+            "running": self._scheduler is not None,
+            "is_leader": self.is_leader,
+            "runs_executed": self.runs_executed,
+            "runs_failed": self.runs_failed,
+        }
+
+
+job_scheduler = JobScheduler(
+    SessionLocal,
+    {EXPIRATION_CHECK: expiration_check_job},
+    tick_s=settings.SCHEDULER_TICK_S,
+    lease_s=settings.SCHEDULER_LEASE_S,
+    run_timeout_s=settings.JOB_RUN_TIMEOUT_S,
+    schedules={EXPIRATION_CHECK: (settings.EXPIRATION_CHECK_INTERVAL_S, settings.EXPIRATION_CHECK_SHARDS)},
+)
@@ -0,0 +1,168 @@
+import calendar
+import re
+from datetime import date
+from typing import List, NamedTuple, Optional
+
+from app.core.config import settings
+from app.services.ingredient_names import normalize_unit
+
+# Countries that write numeric dates month first; everyone else day first, apart from the
+# languages below that put the year first ("24/05/12" in Japan is 12 May 2024)
+MONTH_FIRST_REGIONS = {"US", "PH", "FM", "MH", "PW"}
+YEAR_FIRST_LANGUAGES = {"zh", "ja", "ko", "hu", "lt", "mn"}
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_abbr) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_name) if name})
+MONTHS["sept"] = 9
+
+_UNITS = sorted((unit for unit in (
+    "g", "gr", "gram", "grams", "kg", "kgs", "kilo", "kilos", "mg", "ml", "cl", "dl", "l", "lt", "ltr",
+    "liter", "liters", "litre", "litres", "oz", "fl oz", "lb", "lbs", "pound", "pounds", "cup", "cups",
+    "tbsp", "tsp", "pc", "pcs", "piece", "pieces", "pack", "packs", "can", "cans", "bunch",
+)), key=len, reverse=True)
+_MONTH = "|".join(sorted(MONTHS, key=len, reverse=True))
+_EXPIRY_WORDS = (r"best\s+before(?:\s+end)?|best\s+by|use\s+by|use\s+before|sell\s+by|"
+                 r"exp(?:iry|iration|ires)?(?:\s+date)?|bbe?")
+_WORD = r"[^\W\d_][\w'&-]*"
+
+# One pattern for everything on a label, tried left to right in a single pass. Matches only
+# start at a word, and the first character picks the numeric or the worded alternatives, so most
+# positions are rejected after one test. Dates come before amounts so "12.05.2024" is never read
+# as a quantity, and keywords mark the next date as the expiry date.
+_LABEL_PATTERN = re.compile(rf"""
+  \b(?:
+    (?=[^\W\d_])(?:
+        (?P<expiry>(?:{_EXPIRY_WORDS})\b\.?)
+      | (?P<md_m>{_MONTH})\.?[ \t.-]*(?P<md_d>\d{{1,2}})(?:st|nd|rd|th)?,?[ \t]+(?P<md_y>\d{{4}})\b
+    )
+  | (?=\d)(?:
+        (?P<iso_y>\d{{4}})[-/.](?P<iso_m>\d{{1,2}})[-/.](?P<iso_d>\d{{1,2}})\b
+      | (?P<n1>\d{{1,2}})(?P<sep>[-/.])(?P<n2>\d{{1,2}})(?P=sep)(?P<n3>\d{{4}}|\d{{2}})\b
+      | (?P<dm_d>\d{{1,2}})(?:st|nd|rd|th)?[ \t.-]*(?P<dm_m>{_MONTH})\.?,?[ \t.-]*(?P<dm_y>\d{{4}}|\d{{2}})\b
+      | (?P<my_m>\d{{1,2}})[-/.](?P<my_y>\d{{4}})\b
+      | (?<![.,/])(?P<qty>\d{{1,3}}(?:,\d{{3}})+|\d+/\d+|\d+(?:[.,]\d+)?)[ \t]*
+        (?P<unit>{"|".join(_UNITS)})\b\.?
+        (?:[ \t]+(?:of[ \t]+)?(?P<name>(?!(?:{_EXPIRY_WORDS})\b){_WORD}(?:[ \t]+(?!(?:{_EXPIRY_WORDS})\b){_WORD}){{0,3}}))?
+    )
+  )
+""", re.IGNORECASE | re.VERBOSE)
+
+# Words around a quantity on packaging that don't name anything ("NET WT 500 g", "750 ml e")
+_LABEL_WORDS = {"net", "wt", "weight", "contents", "content", "qty", "quantity", "approx", "e"}
+_LEADING_WORDS = re.compile(rf"(?:{_WORD}[ \t]+){{0,3}}{_WORD}(?=[ \t]*$)")
+
+
+class LabelAmount(NamedTuple):
+    amount: float
+    unit: str
+    name: str
+    text: str
+
+
+class LabelText(NamedTuple):
+    amounts: List[LabelAmount]
+    dates: List[date]
+    expiration_date: Optional[date]
+
+
+def date_order(locale: str = None) -> str:
+    # "en_US" / "en-US" -> "mdy", "de_DE" / "de" -> "dmy", "ja" -> "ymd"; only bare "en", which is
+    # written both ways, falls back to the default locale
+    language, _, region = (locale or settings.LABEL_TEXT_LOCALE).replace("-", "_").partition("_")
+    if language.lower() in YEAR_FIRST_LANGUAGES:
+        return "ymd"
+    if not region:
+        if language.lower() == "en" and locale and locale != settings.LABEL_TEXT_LOCALE:
+            return date_order()
+        return "dmy"
+    return "mdy" if region.upper() in MONTH_FIRST_REGIONS else "dmy"
+
+
+def _year(value: str) -> int:
+    year = int(value)
+    return year + 2000 if year < 100 else year
+
+
+def _make_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _numeric_date(n1: str, n2: str, n3: str, order: str) -> Optional[date]:
+    # The locale's order first; if that is impossible ("25/12/2024" in the US) the other reading
+    a, b, c = int(n1), int(n2), n3
+    if order == "ymd" and len(c) == 2:
+        return _make_date(_year(n1), b, int(c)) or _make_date(_year(c), b, a)
+    if order == "mdy":
+        return _make_date(_year(c), a, b) or _make_date(_year(c), b, a)
+    return _make_date(_year(c), b, a) or _make_date(_year(c), a, b)
+
+
+def _quantity(value: str) -> float:
+    if "/" in value:
+        numerator, denominator = value.split("/")
+        return int(numerator) / int(denominator) if int(denominator) else 0.0
+    if re.fullmatch(r"\d{1,3}(?:,\d{3})+", value):
+        return float(value.replace(",", ""))
+    return float(value.replace(",", "."))
+
+
+def _name_words(text: Optional[str]) -> str:
+    return " ".join(word for word in (text or "").lower().split() if word.rstrip(".") not in _LABEL_WORDS)
+
+
+def scan_label_text(text: str, locale: str = None) -> LabelText:
+    """Amounts and dates in OCR text from a package, label or receipt, in one pass.
+
+    Amounts are "<quantity> <unit> <name>" ("500 g spaghetti"), or on receipts
+    "<name> <quantity> <unit>" ("TOMATOES 1.2 KG"). The expiration date is the first date after
+    an expiry keyword ("best before", "use by", "EXP"), otherwise the latest date on the label:
+    receipts also carry the purchase date, which comes before anything's expiry.
+    """
+    order = date_order(locale)
+    amounts, dates = [], []
+    expiration_date = None
+    expects_expiry = False
+    for match in _LABEL_PATTERN.finditer(text or ""):
+        groups = match.groupdict()
+        if groups["expiry"]:
+            expects_expiry = True
+            continue
+        if groups["qty"]:
+            name = _name_words(groups["name"])
+            if not name:
+                line_start = text.rfind("\n", 0, match.start()) + 1
+                before = _LEADING_WORDS.search(text, line_start, match.start())
+                name = _name_words(before and before.group(0))
+            amounts.append(LabelAmount(
+                amount=_quantity(groups["qty"]),
+                unit=normalize_unit(re.sub(r"\s+", " ", groups["unit"])),
+                name=name,
+                text=match.group(0)[:match.end("unit") - match.start()],
+            ))
+            continue
+
+        if groups["iso_y"]:
+            found = _make_date(int(groups["iso_y"]), int(groups["iso_m"]), int(groups["iso_d"]))
+        elif groups["n1"]:
+            found = _numeric_date(groups["n1"], groups["n2"], groups["n3"], order)
+        elif groups["dm_m"]:
+            found = _make_date(_year(groups["dm_y"]), MONTHS[groups["dm_m"].lower()], int(groups["dm_d"]))
+        elif groups["md_m"]:
+            found = _make_date(int(groups["md_y"]), MONTHS[groups["md_m"].lower()], int(groups["md_d"]))
+        else:
+            # "EXP 05/2025": good until the end of the month
+            year, month = int(groups["my_y"]), int(groups["my_m"])
+            found = _make_date(year, month, calendar.monthrange(year, month)[1]) if 1 <= month <= 12 else None
+        if found is None:
+            continue
+        dates.append(found)
+        if expects_expiry and expiration_date is None:
+            expiration_date = found
+        expects_expiry = False
+
+    if expiration_date is None and dates:
+        expiration_date = max(dates)
+    return LabelText(amounts=amounts, dates=dates, expiration_date=expiration_date)
@@ -0,0 +1,90 @@
+import os
+import resource
+import threading
+import time
+
+
+def current_rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is the peak (not current) RSS, reported in KB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ModelRegistry:
+    """Loads each registered model once, on first use, and shares it across the process.
+
+    Loading in the gunicorn master (see gunicorn.conf.py) lets forked workers share
+    the weights copy-on-write instead of each building their own copy.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._load_stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                model = self._models.get(name)
+                if model is None:
+                    model = self._load(name)
+        return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def preload(self, *names):
+        for name in names or list(self._loaders):
+            self.get(name)
+
+    def _load(self, name):
+        if name not in self._loaders:
+            raise KeyError(f"No model registered under '{name}'")
+        rss_before = current_rss_bytes()
+        started = time.perf_counter()
+        model = self._loaders[name]()
+        self._load_stats[name] = {
+            "load_time_s": time.perf_counter() - started,
+            "rss_delta_bytes": current_rss_bytes() - rss_before,
+            "loaded_at": time.time(),
+            "loaded_in_pid": os.getpid(),
+        }
+        self._models[name] = model
+        return model
+
+    def stats(self):
+        return {
+            "registered": sorted(self._loaders),
+            "loaded": dict(self._load_stats),
+            "pid": os.getpid(),
+            "rss_bytes": current_rss_bytes(),
+        }
+
+
+def _load_mobilenet_v2():
+    # The runtime (Keras, TFLite or ONNX Runtime) is only imported here so app startup never pays for it
+    from app.services.inference_backends import load_mobilenet_v2
+    return load_mobilenet_v2(224)
+
+
+def _load_mobilenet_v2_160():
+    # Reduced-resolution ImageNet weights for scan crops: about half the FLOPs of 224x224
+    from app.services.inference_backends import load_mobilenet_v2
+    return load_mobilenet_v2(160)
+
+
+MOBILENET_V2 = "mobilenet_v2"
+MOBILENET_V2_160 = "mobilenet_v2_160"
+
+registry = ModelRegistry()
+registry.register(MOBILENET_V2, _load_mobilenet_v2)
+registry.register(MOBILENET_V2_160, _load_mobilenet_v2_160)
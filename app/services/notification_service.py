@@ -1,10 +1,12 @@
-from datetime import datetime, timedelta
-from firebase_admin import messaging
+from datetime import date
+from typing import Optional, Tuple
 import firebase_admin
 from firebase_admin import credentials
 from sqlalchemy.orm import Session
-from app.models.ingredient import Ingredient
+from app.core.config import settings
 from app.models.user import User
+from app.services.expiration_scan import run_expiration_digest
+from app.services.push_delivery import FirebaseMessagingTransport, PushDelivery
 import os
 import json
 
@@ -22,44 +24,27 @@ if firebase_creds:
 else:
     print("Warning: Firebase credentials not found. Notifications will not work.")
 
-def check_expiring_ingredients(db: Session):
-    # Get all ingredients from the database
-    ingredients = db.query(Ingredient).all()
-
-    # Check each ingredient for expiration
-    for ingredient in ingredients:
-        if ingredient.expiration_date:
-            if isinstance(ingredient.expiration_date, str):
-                expiration_date = datetime.strptime(ingredient.expiration_date, "%Y-%m-%d").date()
-            else:
-                expiration_date = ingredient.expiration_date
-            days_until_expiration = (expiration_date - datetime.now().date()).days
-
-            if days_until_expiration <= 3:  # Notify if ingredient expires within 3 days
-                send_expiration_notification(db, ingredient, days_until_expiration)
-
-def send_expiration_notification(db: Session, ingredient: Ingredient, days_until_expiration: int):
-    if not firebase_initialized:
-        print(f"Notification would be sent: {ingredient.name} will expire in {days_until_expiration} days.")
-        return
-
-    # Get the user associated with this ingredient
-    user = db.query(User).filter(User.id == ingredient.user_id).first()
-
-    if user and user.fcm_token:
-        message = messaging.Message(
-            notification=messaging.Notification(
-                title='Ingredient Expiring Soon',
-                body=f'{ingredient.name} will expire in {days_until_expiration} days.'
-            ),
-            token=user.fcm_token,
-        )
-
-        try:
-            response = messaging.send(message)
-            print('Successfully sent message:', response)
-        except Exception as e:
-            print('Error sending message:', str(e))
+push_delivery = None
+if firebase_initialized:
+    push_delivery = PushDelivery(
+        FirebaseMessagingTransport(),
+        chunk_size=settings.FCM_BATCH_SIZE,
+        max_concurrency=settings.FCM_MAX_CONCURRENCY,
+        max_retries=settings.FCM_MAX_RETRIES,
+        backoff=settings.FCM_BACKOFF_S,
+    )
+
+def check_expiring_ingredients(db: Session, today: date = None, shard: Optional[Tuple[int, int]] = None):
+    return run_expiration_digest(db, push_delivery, today, shard)
+
+def expiration_check_job(db: Session, shard: Optional[Tuple[int, int]] = None):
+    # Entry point for the job scheduler; the returned counters are recorded on the job run
+    result = check_expiring_ingredients(db, shard=shard)
+    return {
+        "rows_scanned": result["ingredients"],
+        "users_notified": result["users"],
+        "notifications_sent": result.get("sent", 0),
+    }
 
 def store_fcm_token(db: Session, user_id: int, fcm_token: str):
     user = db.query(User).filter(User.id == user_id).first()
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.services.ingredient_dictionary import canonical_ingredient_name
+from app.services.ingredient_names import normalize_unit
+from app.services.ingredient_service import CachedPantry, get_pantry, get_pantry_async
+
+class PantrySnapshot(NamedTuple):
+    user_id: int
+    names: frozenset
+    # name -> earliest expiration date among that user's rows (None if none of them expire)
+    expirations: Dict[str, Optional[date]]
+    # name -> {canonical unit: total amount}
+    quantities: Dict[str, Dict[Optional[str], float]]
+
+# Derived from the cached pantry and keyed by its version, so it never needs invalidating:
+# a write moves the version and the next lookup misses
+_snapshots = LRUCache(maxsize=settings.PANTRY_SNAPSHOT_CACHE_SIZE)
+
+def build_pantry_snapshot(user_id: int, rows) -> PantrySnapshot:
+    expirations = {}
+    quantities = defaultdict(lambda: defaultdict(float))
+    for name, amount, unit, expiration_date in rows:
+        name = canonical_ingredient_name(name)
+        if not name:
+            continue
+        if name not in expirations or (expiration_date and (expirations[name] is None or expiration_date < expirations[name])):
+            expirations[name] = expiration_date
+        quantities[name][normalize_unit(unit)] += amount or 0.0
+    return PantrySnapshot(
+        user_id=user_id,
+        names=frozenset(expirations),
+        expirations=expirations,
+        quantities={name: dict(units) for name, units in quantities.items()},
+    )
+
+def pantry_snapshot(user_id: int, pantry: Optional[CachedPantry]) -> PantrySnapshot:
+    if pantry is None:
+        return build_pantry_snapshot(user_id, [])
+    key = (user_id, pantry.version)
+    snapshot = _snapshots.get(key)
+    if snapshot is None:
+        snapshot = build_pantry_snapshot(user_id, (
+            (item["name"], item["amount"], item["unit"], item["expiration_date"]) for item in pantry.items
+        ))
+        _snapshots.set(key, snapshot)
+    return snapshot
+
+def get_pantry_snapshot(db: Session, user_id: int) -> PantrySnapshot:
+    return pantry_snapshot(user_id, get_pantry(db, user_id))
+
+async def get_pantry_snapshot_async(db: AsyncSession, user_id: int) -> PantrySnapshot:
+    return pantry_snapshot(user_id, await get_pantry_async(db, user_id))
+
+def missing_ingredients(snapshot: PantrySnapshot, recipe_ingredients: Iterable[str]) -> List[str]:
+    # Keeps the recipe's own spelling and order, reporting each normalised ingredient once
+    missing = []
+    seen = set()
+    for ingredient in recipe_ingredients:
+        name = canonical_ingredient_name(ingredient)
+        if name and name not in snapshot.names and name not in seen:
+            seen.add(name)
+            missing.append(ingredient)
+    return missing
+
+def missing_ingredients_for_recipes(snapshot: PantrySnapshot, recipes: Dict[int, Iterable[str]]) -> Dict[int, List[str]]:
+    return {recipe_id: missing_ingredients(snapshot, names) for recipe_id, names in recipes.items()}
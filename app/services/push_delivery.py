@@ -0,0 +1,154 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# FCM's per-call limit for send_each
+MAX_BATCH_SIZE = 500
+
+# Only messaging.UnregisteredError and messaging.SenderIdMismatchError mean the token itself is
+# dead; INVALID_ARGUMENT or PERMISSION_DENIED can as well be a bad payload or bad credentials
+INVALID_TOKEN_ERRORS = {"UnregisteredError", "SenderIdMismatchError"}
+# Error codes as reported on firebase_admin exceptions (FirebaseError.code)
+INVALID_TOKEN_CODES = {"NOT_FOUND", "SENDER_ID_MISMATCH"}
+TRANSIENT_CODES = {"UNAVAILABLE", "INTERNAL", "RESOURCE_EXHAUSTED", "DEADLINE_EXCEEDED", "UNKNOWN"}
+
+
+class PushMessage(NamedTuple):
+    token: str
+    title: str
+    body: str
+    data: Optional[Dict[str, str]] = None
+
+
+class SendResult(NamedTuple):
+    success: bool
+    exception: Optional[Exception] = None
+
+
+def error_code(exception):
+    return getattr(exception, "code", None)
+
+
+def is_invalid_token(exception):
+    return type(exception).__name__ in INVALID_TOKEN_ERRORS or error_code(exception) in INVALID_TOKEN_CODES
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class FirebaseMessagingTransport:
+    """Sends PushMessages through firebase_admin.messaging, one send_each call per chunk."""
+
+    def __init__(self, app=None):
+        self.app = app
+
+    def send_each(self, messages: List[PushMessage]) -> List[SendResult]:
+        from firebase_admin import messaging
+
+        batch = messaging.send_each([
+            messaging.Message(
+                notification=messaging.Notification(title=message.title, body=message.body),
+                data=message.data,
+                token=message.token,
+            )
+            for message in messages
+        ], app=self.app)
+        return [SendResult(response.success, response.exception) for response in batch.responses]
+
+
+class DeliveryReport:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.send_calls = 0
+        self.invalid_tokens = []
+
+    def merge(self, other: "DeliveryReport"):
+        self.sent += other.sent
+        self.failed += other.failed
+        self.retried += other.retried
+        self.send_calls += other.send_calls
+        self.invalid_tokens.extend(other.invalid_tokens)
+
+    def as_dict(self):
+        return {
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "send_calls": self.send_calls,
+            "invalid_tokens": len(self.invalid_tokens),
+        }
+
+
+class PushDelivery:
+    """Delivers messages in send_each chunks with a bounded number of chunks in flight.
+
+    Messages are consumed lazily, so a streamed source never has more than
+    `max_concurrency` chunks in memory. Transient failures are retried with exponential
+    backoff; tokens FCM reports as unregistered or sent to the wrong sender are collected for
+    pruning.
+    """
+
+    def __init__(self, transport, chunk_size: int = MAX_BATCH_SIZE, max_concurrency: int = 4,
+                 max_retries: int = 3, backoff: float = 0.5):
+        self.transport = transport
+        self.chunk_size = min(chunk_size, MAX_BATCH_SIZE)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def _send_chunk(self, messages: List[PushMessage]):
+        report = DeliveryReport()
+        pending = messages
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                report.retried += len(pending)
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            report.send_calls += 1
+            try:
+                results = self.transport.send_each(pending)
+            except Exception as e:
+                # The whole call failed (network, auth, quota); retry it if that could pass
+                if error_code(e) in TRANSIENT_CODES and attempt < self.max_retries:
+                    continue
+                print(f"Error sending {len(pending)} notifications: {e}")
+                report.failed += len(pending)
+                return report
+
+            retry = []
+            for message, result in zip(pending, results):
+                if result.success:
+                    report.sent += 1
+                elif is_invalid_token(result.exception):
+                    report.failed += 1
+                    report.invalid_tokens.append(message.token)
+                elif error_code(result.exception) in TRANSIENT_CODES and attempt < self.max_retries:
+                    retry.append(message)
+                else:
+                    report.failed += 1
+            if not retry:
+                return report
+            pending = retry
+        return report
+
+    def deliver(self, messages: Iterable[PushMessage]) -> DeliveryReport:
+        report = DeliveryReport()
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            in_flight = set()
+            for chunk in chunked(messages, self.chunk_size):
+                if len(in_flight) >= self.max_concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        report.merge(future.result())
+                in_flight.add(pool.submit(self._send_chunk, chunk))
+            for future in in_flight:
+                report.merge(future.result())
+        return report
@@ -0,0 +1,126 @@
+from typing import Iterable, List
+
+from sqlalchemy import exists, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, selectinload
+
+from app.models.canonical_ingredient import CanonicalIngredient
+from app.models.recipe import Recipe
+from app.models.recipe_ingredient import RecipeIngredient
+from app.services.ingredient_dictionary import canonical_ingredient_name
+from app.services.ingredient_names import parse_ingredient_line
+
+# Posting lists are counted up to this many rows when picking which ingredient drives a search
+DRIVER_COUNT_CAP = 1000
+# Lines without an ingredient name (section headings like "For the sauce:") keep their place
+# under this canonical row; search and the recipe index skip it
+UNNAMED_INGREDIENT = ""
+
+
+def dialect_insert(db: Session):
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
+def canonical_ingredients(db: Session, names: Iterable[str]) -> dict:
+    # Get-or-create by name in two statements, safe against concurrent writers
+    names = sorted(set(names))
+    if not names:
+        return {}
+    db.execute(
+        dialect_insert(db)(CanonicalIngredient).values([{"name": name} for name in names])
+        .on_conflict_do_nothing(index_elements=[CanonicalIngredient.name])
+    )
+    return {
+        ingredient.name: ingredient
+        for ingredient in db.scalars(select(CanonicalIngredient).where(CanonicalIngredient.name.in_(names)))
+    }
+
+
+def ingredient_rows(db: Session, lines: List[str]) -> List[RecipeIngredient]:
+    # "2 cloves garlic, minced" -> amount 2, unit "clove", canonical "garlic", text kept as published;
+    # names are stored as the dictionary resolves them so "2 roma tomatoes" is found under "tomato"
+    parsed = [
+        (position, line, amount, unit, canonical_ingredient_name(name) if name else UNNAMED_INGREDIENT)
+        for position, line in enumerate(lines)
+        for amount, unit, name in [parse_ingredient_line(line)]
+    ]
+    canonical = canonical_ingredients(db, [name for *_, name in parsed])
+    return [
+        RecipeIngredient(position=position, text=line, amount=amount, unit=unit, canonical_ingredient=canonical[name])
+        for position, line, amount, unit, name in parsed
+    ]
+
+
+def recipe_summary(recipe: Recipe):
+    return {
+        "id": recipe.id,
+        "title": recipe.title,
+        "image": recipe.image_url,
+        "servings": recipe.servings,
+        "ready_in_minutes": recipe.ready_in_minutes,
+        "ingredients": [
+            {"text": item.text, "name": item.canonical_ingredient.name, "amount": item.amount, "unit": item.unit}
+            for item in recipe.ingredients
+        ],
+    }
+
+
+def load_recipes(db: Session, recipe_ids: List[int]) -> List[Recipe]:
+    # Two extra queries for any number of recipes (ingredients, then their canonical names), not one per recipe
+    if not recipe_ids:
+        return []
+    recipes = db.scalars(
+        select(Recipe).where(Recipe.id.in_(recipe_ids))
+        .options(selectinload(Recipe.ingredients).selectinload(RecipeIngredient.canonical_ingredient))
+    ).all()
+    order = {recipe_id: i for i, recipe_id in enumerate(recipe_ids)}
+    return sorted(recipes, key=lambda recipe: order[recipe.id])
+
+
+def _posting_counts(db: Session, ingredient_ids: List[int]) -> dict:
+    # One round trip; each count stops at DRIVER_COUNT_CAP index entries
+    postings = RecipeIngredient.__table__
+    counts = [
+        select(func.count()).select_from(
+            select(postings.c.recipe_id).where(postings.c.canonical_ingredient_id == ingredient_id)
+            .limit(DRIVER_COUNT_CAP).subquery()
+        ).scalar_subquery()
+        for ingredient_id in ingredient_ids
+    ]
+    return dict(zip(ingredient_ids, db.execute(select(*counts)).one()))
+
+
+def recipe_ids_containing(db: Session, names: Iterable[str], limit: int = 20, after_id: int = None) -> List[int]:
+    """Ids of recipes that use every one of `names`, in id order, `limit` at a time after `after_id`.
+
+    The rarest ingredient drives: its slice of the (canonical_ingredient_id, recipe_id) index is
+    walked in recipe order and each candidate is probed in the same index for the others, so the
+    cost follows the rarest ingredient and the page size, not the size of the catalog.
+    """
+    names = sorted({canonical_ingredient_name(name) for name in names} - {UNNAMED_INGREDIENT})
+    if not names:
+        return []
+    ingredient_ids = dict(db.execute(
+        select(CanonicalIngredient.name, CanonicalIngredient.id).where(CanonicalIngredient.name.in_(names))
+    ).all())
+    if len(ingredient_ids) < len(names):
+        # Nothing in the catalog uses one of them
+        return []
+
+    counts = _posting_counts(db, list(ingredient_ids.values())) if len(names) > 1 else {}
+    driver_id, *other_ids = sorted(ingredient_ids.values(), key=lambda ingredient_id: counts.get(ingredient_id, 0))
+    # Core aliases: this runs per request and ORM aliasing costs more than the query itself
+    driver = RecipeIngredient.__table__.alias("driver")
+    query = select(driver.c.recipe_id).distinct().where(driver.c.canonical_ingredient_id == driver_id)
+    for i, ingredient_id in enumerate(other_ids):
+        other = RecipeIngredient.__table__.alias(f"other_{i}")
+        query = query.where(
+            exists().where(other.c.canonical_ingredient_id == ingredient_id, other.c.recipe_id == driver.c.recipe_id)
+        )
+    if after_id is not None:
+        query = query.where(driver.c.recipe_id > after_id)
+    return list(db.scalars(query.order_by(driver.c.recipe_id).limit(limit)))
+
+
+def recipes_containing(db: Session, names: Iterable[str], limit: int = 20, after_id: int = None) -> List[Recipe]:
+    return load_recipes(db, recipe_ids_containing(db, names, limit, after_id))
@@ -0,0 +1,237 @@
+import itertools
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.canonical_ingredient import CanonicalIngredient
+from app.models.recipe import Recipe
+from app.models.recipe_ingredient import RecipeIngredient
+from app.services.ingredient_dictionary import DICTIONARY_VERSION, canonical_ingredient_name
+
+SNAPSHOT_VERSION = 3
+# updated_at is set when a row is written but becomes visible when its transaction commits, so
+# each refresh looks back this far to catch writes that committed after a later one was seen
+UPDATE_OVERLAP = timedelta(seconds=60)
+
+
+class RecipeIndex:
+    """Inverted index from normalised ingredient name to the recipes that use it."""
+
+    def __init__(self):
+        self._postings = defaultdict(set)
+        self._ingredients = {}
+        self._meta = {}
+        self._last_recipe_id = 0
+        # Latest recipes.updated_at the index has caught up with
+        self._synced_at = None
+        self._loaded = False
+        self._refreshed_at = None
+        # Bumped on every change so derived structures (e.g. the ranking matrix) know to rebuild
+        self.version = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._ingredients)
+
+    def add_recipe(self, recipe_id: int, ingredient_names, title=None, image=None):
+        names = frozenset(filter(None, (canonical_ingredient_name(name) for name in ingredient_names)))
+        with self._lock:
+            self._last_recipe_id = max(self._last_recipe_id, recipe_id)
+            if self._ingredients.get(recipe_id) == names and self._meta.get(recipe_id) == (title, image):
+                # Refreshes see recently updated recipes again; only real changes move the version
+                return
+            self._remove(recipe_id)
+            for name in names:
+                self._postings[name].add(recipe_id)
+            self._ingredients[recipe_id] = names
+            self._meta[recipe_id] = (title, image)
+            self.version += 1
+
+    def add_db_recipe(self, recipe: Recipe):
+        names = [item.canonical_ingredient.name for item in recipe.ingredients]
+        self.add_recipe(recipe.id, names, recipe.title, recipe.image_url)
+
+    def remove_recipe(self, recipe_id: int):
+        with self._lock:
+            self._remove(recipe_id)
+            self.version += 1
+
+    def _remove(self, recipe_id):
+        for name in self._ingredients.pop(recipe_id, ()):
+            postings = self._postings.get(name)
+            if postings is not None:
+                postings.discard(recipe_id)
+                if not postings:
+                    del self._postings[name]
+        self._meta.pop(recipe_id, None)
+
+    def ingredients_of(self, recipe_id: int):
+        return self._ingredients.get(recipe_id, frozenset())
+
+    def meta_of(self, recipe_id: int):
+        return self._meta.get(recipe_id, (None, None))
+
+    def export(self):
+        # Consistent copy of (recipe_id, ingredient names) pairs plus the version it reflects
+        with self._lock:
+            return self.version, list(self._ingredients.items())
+
+    def rank(self, pantry_names, limit: int = 10):
+        pantry = {canonical_ingredient_name(name) for name in pantry_names}
+        pantry.discard("")
+
+        with self._lock:
+            used = Counter()
+            for name in pantry:
+                postings = self._postings.get(name)
+                if postings:
+                    used.update(postings)
+            if not used:
+                return []
+
+            ingredients = self._ingredients
+            # Used counts are bounded by the pantry size, so a histogram of them gives the limit-th
+            # best count without sorting the whole catalog; only recipes at or above it are tie-broken
+            histogram = Counter(used.values())
+            cutoff, seen = 0, 0
+            for count in sorted(histogram, reverse=True):
+                cutoff, seen = count, seen + histogram[count]
+                if seen >= limit:
+                    break
+            candidates = [item for item in used.items() if item[1] >= cutoff]
+            # Most used ingredients first, then fewest missing, then oldest recipe for stable output
+            top = sorted(
+                candidates, key=lambda item: (-item[1], len(ingredients[item[0]]) - item[1], item[0])
+            )[:limit]
+            return [
+                {
+                    "id": recipe_id,
+                    "title": self._meta[recipe_id][0],
+                    "image": self._meta[recipe_id][1],
+                    "usedIngredientCount": used_count,
+                    "missedIngredientCount": len(ingredients[recipe_id]) - used_count,
+                    "usedIngredients": sorted(ingredients[recipe_id] & pantry),
+                    "missedIngredients": sorted(ingredients[recipe_id] - pantry),
+                }
+                for recipe_id, used_count in top
+            ]
+
+    def _recipe_rows(self, db: Session, condition, batch_size: int):
+        return (
+            db.query(Recipe.id, Recipe.title, Recipe.image_url, CanonicalIngredient.name)
+            .outerjoin(RecipeIngredient, RecipeIngredient.recipe_id == Recipe.id)
+            .outerjoin(CanonicalIngredient, CanonicalIngredient.id == RecipeIngredient.canonical_ingredient_id)
+            .filter(condition)
+            .order_by(Recipe.id)
+            .execution_options(yield_per=batch_size)
+        )
+
+    def _add_rows(self, rows):
+        added = 0
+        for (recipe_id, title, image_url), group in itertools.groupby(rows, key=lambda row: row[:3]):
+            self.add_recipe(recipe_id, [row[3] for row in group if row[3]], title, image_url)
+            added += 1
+        return added
+
+    def refresh(self, db: Session, batch_size: int = 1000):
+        """Picks up recipes other workers added, edited or deleted since the last refresh."""
+        synced_at = db.scalar(select(func.max(Recipe.updated_at)))
+        condition = Recipe.id > self._last_recipe_id
+        if self._synced_at is not None:
+            condition = or_(condition, Recipe.updated_at >= self._synced_at - UPDATE_OVERLAP)
+        changed = self._add_rows(self._recipe_rows(db, condition, batch_size))
+        if synced_at is not None:
+            self._synced_at = max(self._synced_at or synced_at, synced_at)
+
+        # Every stored recipe is indexed by now, so any difference in count means deletes (or a
+        # snapshot out of step with the table): reconcile the ids
+        if db.scalar(select(func.count(Recipe.id))) != len(self._ingredients):
+            ids = set(db.scalars(select(Recipe.id)))
+            with self._lock:
+                gone = set(self._ingredients) - ids
+                for recipe_id in gone:
+                    self.remove_recipe(recipe_id)
+            missing = ids - set(self._ingredients)
+            if missing:
+                self._add_rows(self._recipe_rows(db, Recipe.id.in_(missing), batch_size))
+            changed += len(gone) + len(missing)
+        return changed
+
+    def ensure_loaded(self, db: Session, max_age_s: float = None):
+        """Loads the index on first use, then refreshes it at most every `max_age_s`.
+
+        Writes in this process update the index directly; the refresh brings in other workers' writes.
+        """
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    snapshot_path = settings.RECIPE_INDEX_SNAPSHOT_PATH
+                    if snapshot_path and os.path.exists(snapshot_path):
+                        self.load_snapshot(snapshot_path)
+                    self._loaded = True
+        max_age_s = settings.RECIPE_INDEX_REFRESH_INTERVAL_S if max_age_s is None else max_age_s
+        now = time.monotonic()
+        if self._refreshed_at is None or now - self._refreshed_at >= max_age_s:
+            self._refreshed_at = now
+            self.refresh(db)
+        return self
+
+    def save_snapshot(self, path: str):
+        with self._lock:
+            data = {
+                "version": SNAPSHOT_VERSION,
+                "dictionary": DICTIONARY_VERSION,
+                "last_recipe_id": self._last_recipe_id,
+                "synced_at": self._synced_at.isoformat() if self._synced_at else None,
+                "recipes": [
+                    [recipe_id, sorted(names), *self._meta[recipe_id]]
+                    for recipe_id, names in self._ingredients.items()
+                ],
+            }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def load_snapshot(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        if data.get("version") != SNAPSHOT_VERSION or data.get("dictionary") != DICTIONARY_VERSION:
+            # Names were resolved by another dictionary; rebuild from the database instead
+            return False
+
+        postings = defaultdict(set)
+        ingredients = {}
+        meta = {}
+        for recipe_id, names, title, image in data["recipes"]:
+            names = frozenset(names)  # already canonical when the snapshot was written
+            for name in names:
+                postings[name].add(recipe_id)
+            ingredients[recipe_id] = names
+            meta[recipe_id] = (title, image)
+        with self._lock:
+            self._postings = postings
+            self._ingredients = ingredients
+            self._meta = meta
+            self._last_recipe_id = data["last_recipe_id"]
+            self._synced_at = datetime.fromisoformat(data["synced_at"]) if data["synced_at"] else None
+            self.version += 1
+        return True
+
+    def stats(self):
+        return {
+            "recipes": len(self._ingredients),
+            "ingredients": len(self._postings),
+            "last_recipe_id": self._last_recipe_id,
+            "synced_at": self._synced_at.isoformat() if self._synced_at else None,
+        }
+
+
+recipe_index = RecipeIndex()
@@ -0,0 +1,543 @@
+import asyncio
+import codecs
+import hashlib
+import html
+import ipaddress
+import json
+import re
+import socket
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+import httpx
+import orjson
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.database import run_in_session
+from app.models.recipe import Recipe
+from app.models.saved_recipe import SavedRecipe
+from app.services.recipe_catalog import dialect_insert, ingredient_rows
+from app.services.recipe_index import recipe_index
+
+# Query parameters that only say how the visitor got to the page
+TRACKING_PARAM = re.compile(r"^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|igshid|_ga|ref|ref_src)$")
+DEFAULT_PORTS = {"http": 80, "https": 443}
+DURATION = re.compile(r"^P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:[\d.]+S)?)?$", re.IGNORECASE)
+INTEGER = re.compile(r"\d+")
+TAG = re.compile(r"<[^>]+>")
+WHITESPACE = re.compile(r"\s+")
+
+
+class RecipeImportError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ParsedRecipe(NamedTuple):
+    title: str
+    ingredients: List[str]
+    instructions: str
+    image_url: Optional[str]
+    servings: Optional[int]
+    ready_in_minutes: Optional[int]
+
+    def content_hash(self):
+        # Same recipe text under another URL (mirrors, syndication) hashes the same
+        content = {
+            "title": _fold(self.title),
+            "ingredients": sorted(_fold(line) for line in self.ingredients),
+            "instructions": _fold(self.instructions),
+        }
+        return hashlib.sha256(orjson.dumps(content, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+class FetchedPage(NamedTuple):
+    canonical_url: str
+    recipe: Optional[ParsedRecipe]  # None when the server answered 304 Not Modified
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+def _fold(text):
+    return WHITESPACE.sub(" ", text or "").strip().lower()
+
+
+def canonicalize_url(url: str) -> str:
+    # One key per page: lower-case scheme and host, no default port, fragment, tracking
+    # parameters or trailing slash, query parameters sorted
+    try:
+        parts = urlsplit(url.strip())
+        port = parts.port
+    except ValueError:
+        raise RecipeImportError(400, f"Invalid URL: {url}")
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        raise RecipeImportError(400, f"Not an http(s) URL: {url}")
+    host = parts.hostname
+    netloc = f"[{host}]" if ":" in host else host
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/") or "/"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAM.match(key)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def check_public_host(host: str, port: int = None, getaddrinfo=socket.getaddrinfo) -> Optional[str]:
+    # Returns the address to connect to: every address the name resolves to must be public, or a
+    # name with one private record could still reach the internal network
+    if settings.RECIPE_FETCH_ALLOW_PRIVATE:
+        return None
+    host = host.strip("[]").lower()
+    if host == "localhost" or host.endswith(".localhost"):
+        raise RecipeImportError(400, f"Refusing to fetch from {host}")
+    try:
+        addresses = [ipaddress.ip_address(host)]
+    except ValueError:
+        try:
+            records = getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except (OSError, UnicodeError) as e:
+            raise RecipeImportError(502, f"Could not resolve {host}: {e}")
+        addresses = [ipaddress.ip_address(record[4][0].split("%")[0]) for record in records]
+    # An IPv4-mapped IPv6 address reaches the IPv4 host
+    addresses = [getattr(address, "ipv4_mapped", None) or address for address in addresses]
+    if not addresses or not all(address.is_global for address in addresses):
+        raise RecipeImportError(400, f"Refusing to fetch from {host}")
+    return str(addresses[0])
+
+
+class PublicHostTransport(httpx.AsyncBaseTransport):
+    """Connects only to vetted public addresses.
+
+    The host of every request, redirects included, is resolved and checked once here, and the
+    connection goes to that address; the name is kept in the Host header and for TLS (SNI and the
+    certificate check). A name can't pass the check and then re-resolve to a private address
+    when the connection is made (DNS rebinding).
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, getaddrinfo=socket.getaddrinfo):
+        self.transport = transport
+        self.getaddrinfo = getaddrinfo
+
+    async def handle_async_request(self, request):
+        host = request.url.host
+        port = request.url.port or DEFAULT_PORTS.get(request.url.scheme)
+        address = await asyncio.to_thread(check_public_host, host, port, self.getaddrinfo)
+        if address is not None and address != host:
+            # A copy, so redirects and response.url still see the name; the Host header was set
+            # from it when the request was built
+            extensions = request.extensions
+            if request.url.scheme == "https":
+                extensions = {**extensions, "sni_hostname": host}
+            request = httpx.Request(request.method, request.url.copy_with(host=address), headers=request.headers,
+                                    stream=request.stream, extensions=extensions)
+        return await self.transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+def _load_json(text):
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        pass
+    try:
+        # Hand-written JSON-LD often has raw newlines or tabs inside strings
+        return json.loads(text, strict=False)
+    except ValueError:
+        return None
+
+
+def _is_recipe(node):
+    types = node.get("@type")
+    return "Recipe" in types if isinstance(types, list) else types == "Recipe"
+
+
+def find_recipe_node(data):
+    # The Recipe may be the document itself, one of a list, in an @graph, or a page's mainEntity
+    pending = [data]
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, list):
+            pending.extend(node)
+        elif isinstance(node, dict):
+            if _is_recipe(node):
+                return node
+            for key in ("@graph", "mainEntity"):
+                if key in node:
+                    pending.append(node[key])
+    return None
+
+
+def _text(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("text") or value.get("name")
+    if value is None:
+        return None
+    return WHITESPACE.sub(" ", TAG.sub(" ", html.unescape(str(value)))).strip() or None
+
+
+def _steps(value):
+    # Plain text, a list of strings or HowToSteps, or HowToSections holding steps
+    if isinstance(value, list):
+        return [step for item in value for step in _steps(item)]
+    if isinstance(value, dict) and "itemListElement" in value:
+        return _steps(value["itemListElement"])
+    text = _text(value)
+    return [text] if text else []
+
+
+def _image(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get("url") or value.get("contentUrl")
+    return str(value) if value else None
+
+
+def _minutes(value):
+    match = DURATION.match(value.strip()) if isinstance(value, str) else None
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    return days * 1440 + hours * 60 + minutes
+
+
+def _servings(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return int(value)
+    match = INTEGER.search(str(value)) if value else None
+    return int(match.group()) if match else None
+
+
+def parse_recipe_node(node, base_url: str):
+    title = _text(node.get("name"))
+    lines = node.get("recipeIngredient") or node.get("ingredients") or []
+    ingredients = [line for line in map(_text, [lines] if isinstance(lines, str) else lines) if line]
+    if not title or not ingredients:
+        return None
+    image = _image(node.get("image"))
+    return ParsedRecipe(
+        title=title,
+        ingredients=ingredients,
+        instructions="\n".join(_steps(node.get("recipeInstructions"))),
+        image_url=urljoin(base_url, image) if image else None,
+        servings=_servings(node.get("recipeYield")),
+        ready_in_minutes=_minutes(node.get("totalTime")) or _minutes(node.get("cookTime")),
+    )
+
+
+class RecipePageParser(HTMLParser):
+    """Incremental page parser: keeps only JSON-LD blocks and the canonical link.
+
+    Fed chunk by chunk as the page downloads; `recipe` is set as soon as a usable schema.org
+    Recipe has been seen, so the caller can stop reading the rest of the page.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.canonical_url = None
+        self.recipe = None
+        self._script = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script":
+            attrs = dict(attrs)
+            if (attrs.get("type") or "").split(";")[0].strip().lower() == "application/ld+json":
+                self._script = []
+        elif tag == "link" and self.canonical_url is None:
+            attrs = dict(attrs)
+            if "canonical" in (attrs.get("rel") or "").lower().split() and attrs.get("href"):
+                self.canonical_url = urljoin(self.base_url, attrs["href"])
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script.append(data)
+
+    def handle_endtag(self, tag):
+        if tag != "script" or self._script is None:
+            return
+        text, self._script = "".join(self._script), None
+        if self.recipe is not None:
+            return
+        node = find_recipe_node(_load_json(text))
+        if node is not None:
+            self.recipe = parse_recipe_node(node, self.base_url)
+
+
+def parse_recipe_page(page: str, base_url: str):
+    parser = RecipePageParser(base_url)
+    parser.feed(page)
+    parser.close()
+    return parser.recipe
+
+
+class RecipeFetcher:
+    """Fetches recipe pages: pooled keep-alive connections, a concurrency cap per host so one
+    import can't hammer a site, conditional GETs for pages fetched before, and a size cap.
+    Connections only go to public addresses (see PublicHostTransport)."""
+
+    def __init__(self, timeout: float = 10.0, max_connections: int = 20, per_host: int = 2,
+                 max_bytes: int = 5 * 1024 * 1024, user_agent: str = "VegetabRecipeImporter/1.0", transport=None,
+                 getaddrinfo=socket.getaddrinfo):
+        self.timeout = timeout
+        self.per_host = per_host
+        self.max_bytes = max_bytes
+        self.user_agent = user_agent
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._transport = transport
+        self._getaddrinfo = getaddrinfo
+        self._client = None
+        self._host_limits = {}
+
+    @property
+    def client(self):
+        # httpx.AsyncClient is bound to the loop it is first used on; one per worker process is enough
+        if self._client is None:
+            # Every hop, redirects included, goes through the transport's address check
+            transport = PublicHostTransport(self._transport or httpx.AsyncHTTPTransport(limits=self.limits),
+                                            self._getaddrinfo)
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout, transport=transport, follow_redirects=True, max_redirects=5,
+                headers={"User-Agent": self.user_agent, "Accept": "text/html,application/xhtml+xml"},
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _host_limit(self, host):
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return limit
+
+    async def fetch(self, url: str, etag: str = None, last_modified: str = None) -> FetchedPage:
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        async with self._host_limit(urlsplit(url).netloc):
+            try:
+                async with self.client.stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304:
+                        return FetchedPage(url, None, etag, last_modified)
+                    if response.status_code != 200:
+                        raise RecipeImportError(502, f"{url} answered {response.status_code}")
+                    if "html" not in response.headers.get("content-type", "html"):
+                        raise RecipeImportError(422, f"{url} is not an HTML page")
+                    length = response.headers.get("content-length", "")
+                    if length.isdigit() and int(length) > self.max_bytes:
+                        raise RecipeImportError(413, f"{url} is larger than {self.max_bytes // (1024 * 1024)} MB")
+                    parser = await self._parse(response)
+                    final_url = str(response.url)
+                    validators = response.headers.get("etag"), response.headers.get("last-modified")
+            except httpx.HTTPError as e:
+                raise RecipeImportError(502, f"Fetching {url} failed: {e}")
+
+        if parser.recipe is None:
+            raise RecipeImportError(422, f"No schema.org Recipe found on {url}")
+        canonical_url = canonicalize_url(final_url)
+        if parser.canonical_url:
+            # Only trusted on the same host, or any page could claim another site's recipe
+            claimed = canonicalize_url(parser.canonical_url)
+            if urlsplit(claimed).netloc == urlsplit(canonical_url).netloc:
+                canonical_url = claimed
+        return FetchedPage(canonical_url, parser.recipe, *validators)
+
+    async def _parse(self, response):
+        parser = RecipePageParser(str(response.url))
+        try:
+            decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        except LookupError:
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        received = 0
+        async for chunk in response.aiter_bytes():
+            received += len(chunk)
+            if received > self.max_bytes:
+                raise RecipeImportError(413, f"{response.url} is larger than {self.max_bytes // (1024 * 1024)} MB")
+            parser.feed(decoder.decode(chunk))
+            if parser.recipe is not None:
+                # Everything needed is in hand; don't download the rest of the page
+                return parser
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        return parser
+
+
+def recipe_dict(recipe: Recipe):
+    return {
+        "id": recipe.id,
+        "user_id": recipe.user_id,
+        "title": recipe.title,
+        "image": recipe.image_url,
+        "servings": recipe.servings,
+        "ready_in_minutes": recipe.ready_in_minutes,
+        "instructions": recipe.instructions or "",
+        "ingredients": [item.text for item in recipe.ingredients],
+        "source_url": recipe.source_url,
+    }
+
+
+def _recipe_fields(parsed: ParsedRecipe):
+    return {
+        "title": parsed.title,
+        "instructions": parsed.instructions,
+        "image_url": parsed.image_url,
+        "servings": parsed.servings,
+        "ready_in_minutes": parsed.ready_in_minutes,
+    }
+
+
+def _store_recipe(db: Session, user_id: int, page: FetchedPage):
+    content_hash = page.recipe.content_hash()
+    matches = db.scalars(
+        select(Recipe).where(or_(Recipe.source_url == page.canonical_url, Recipe.content_hash == content_hash))
+    ).all()
+    by_url = next((recipe for recipe in matches if recipe.source_url == page.canonical_url), None)
+    by_hash = next((recipe for recipe in matches if recipe.content_hash == content_hash), None)
+
+    if by_url is not None:
+        recipe, status = by_url, "existing"
+        # The page changed since it was imported, unless the new text is already stored under another URL
+        if recipe.content_hash != content_hash and by_hash is None:
+            for key, value in _recipe_fields(page.recipe).items():
+                setattr(recipe, key, value)
+            recipe.ingredients = ingredient_rows(db, page.recipe.ingredients)
+            recipe.content_hash = content_hash
+            status = "updated"
+        recipe.etag, recipe.last_modified, recipe.fetched_at = page.etag, page.last_modified, datetime.utcnow()
+        return recipe, status
+    if by_hash is not None:
+        return by_hash, "existing"
+
+    # Two imports of the same page can race; the unique columns decide, the loser reads the winner's row
+    insert = dialect_insert(db)
+    recipe_id = db.execute(
+        insert(Recipe).values(
+            user_id=user_id, source_url=page.canonical_url, content_hash=content_hash,
+            etag=page.etag, last_modified=page.last_modified, fetched_at=datetime.utcnow(),
+            **_recipe_fields(page.recipe),
+        ).on_conflict_do_nothing().returning(Recipe.id)
+    ).scalar()
+    if recipe_id is None:
+        recipe = db.scalars(
+            select(Recipe).where(or_(Recipe.source_url == page.canonical_url, Recipe.content_hash == content_hash))
+        ).first()
+        return recipe, "existing"
+    recipe = db.get(Recipe, recipe_id)
+    recipe.ingredients = ingredient_rows(db, page.recipe.ingredients)
+    return recipe, "created"
+
+
+def store_imported_pages(db: Session, user_id: int, pages: dict, known: dict):
+    # pages: requested canonical URL -> FetchedPage or RecipeImportError; known: URL -> stored recipe id
+    stored = {}
+    changed = []
+    for url, page in pages.items():
+        if isinstance(page, RecipeImportError):
+            stored[url] = page
+            continue
+        if page.recipe is None:
+            recipe, status = db.get(Recipe, known[url]), "not_modified"
+            if recipe is None:
+                stored[url] = RecipeImportError(409, f"{url} was removed during the import; try again")
+                continue
+            recipe.fetched_at = datetime.utcnow()
+        else:
+            recipe, status = _store_recipe(db, user_id, page)
+            if status in ("created", "updated"):
+                changed.append(recipe)
+        db.execute(
+            dialect_insert(db)(SavedRecipe).values(user_id=user_id, recipe_id=recipe.id)
+            .on_conflict_do_nothing(index_elements=[SavedRecipe.user_id, SavedRecipe.recipe_id])
+        )
+        stored[url] = (status, recipe_dict(recipe))
+    db.commit()
+
+    # Keep the local "cook with what I have" index current without a rebuild
+    for recipe in changed:
+        recipe_index.add_db_recipe(recipe)
+    return stored
+
+
+async def import_recipe_links(db: AsyncSession, user_id: int, urls: List[str], fetcher: RecipeFetcher = None):
+    """Imports recipe pages for a user, fetching them concurrently.
+
+    Each URL reports its own outcome: created, updated (the page changed), existing (already
+    stored, from this URL or another with the same content), not_modified (304 on re-import), or
+    failed with a status code and detail.
+    """
+    fetcher = fetcher or recipe_fetcher
+    results = [None] * len(urls)
+    canonical = {}
+    for i, url in enumerate(urls):
+        try:
+            canonical[i] = canonicalize_url(url)
+        except RecipeImportError as e:
+            results[i] = {"url": url, "status": "failed", "status_code": e.status_code, "detail": e.detail}
+
+    # The same page submitted twice is fetched once; pages imported before are asked for changes only
+    unique_urls = list(dict.fromkeys(canonical.values()))
+    known = {}
+    if unique_urls:
+        rows = await db.execute(
+            select(Recipe.id, Recipe.source_url, Recipe.etag, Recipe.last_modified)
+            .where(Recipe.source_url.in_(unique_urls))
+        )
+        known = {row.source_url: row for row in rows}
+
+    async def fetch(url):
+        row = known.get(url)
+        try:
+            if row is None:
+                return await fetcher.fetch(url)
+            return await fetcher.fetch(url, row.etag, row.last_modified)
+        except RecipeImportError as e:
+            return e
+
+    pages = dict(zip(unique_urls, await asyncio.gather(*(fetch(url) for url in unique_urls))))
+    # Parsing and storing every page is real CPU: it runs on a worker thread, not the event loop
+    stored = await run_in_session(store_imported_pages, user_id, pages, {url: row.id for url, row in known.items()})
+
+    for i, url in canonical.items():
+        outcome = stored[url]
+        if isinstance(outcome, RecipeImportError):
+            results[i] = {"url": urls[i], "status": "failed", "status_code": outcome.status_code,
+                          "detail": outcome.detail}
+        else:
+            status, recipe = outcome
+            results[i] = {"url": urls[i], "status": status, "recipe": recipe}
+    return results
+
+
+async def preview_recipe_link(url: str, fetcher: RecipeFetcher = None):
+    # Fetch and parse without storing anything
+    page = await (fetcher or recipe_fetcher).fetch(canonicalize_url(url))
+    return {"source_url": page.canonical_url, **page.recipe._asdict()}
+
+
+recipe_fetcher = RecipeFetcher(
+    timeout=settings.RECIPE_FETCH_TIMEOUT_S,
+    max_connections=settings.RECIPE_FETCH_MAX_CONNECTIONS,
+    per_host=settings.RECIPE_FETCH_PER_HOST,
+    max_bytes=settings.RECIPE_FETCH_MAX_BYTES,
+    user_agent=settings.RECIPE_FETCH_USER_AGENT,
+)
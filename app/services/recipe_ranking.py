@@ -0,0 +1,179 @@
+import threading
+import time
+from datetime import date
+from typing import NamedTuple
+
+import numpy as np
+from scipy import sparse
+
+from app.core.config import settings
+from app.services.ingredient_dictionary import canonical_ingredient_name
+from app.services.recipe_index import RecipeIndex, recipe_index
+
+
+def expiry_weight(expiration_date, today: date, horizon_days: int, boost: float):
+    # 1.0 for anything in the pantry, rising linearly to 1 + boost for items expiring today
+    if expiration_date is None:
+        return 1.0
+    days_left = (expiration_date - today).days
+    if days_left < 0 or days_left >= horizon_days:
+        return 1.0
+    return 1.0 + boost * (horizon_days - days_left) / horizon_days
+
+
+def pantry_weights(ingredients, today: date | None = None):
+    today = today or date.today()
+    weights = {}
+    for ingredient in ingredients:
+        name = canonical_ingredient_name(ingredient.name)
+        if not name:
+            continue
+        weight = expiry_weight(
+            ingredient.expiration_date, today, settings.RANKING_EXPIRY_HORIZON_DAYS, settings.RANKING_EXPIRY_BOOST
+        )
+        weights[name] = max(weight, weights.get(name, 0.0))
+    return weights
+
+
+def snapshot_weights(snapshot, today: date | None = None):
+    # Same weighting as pantry_weights, from a PantrySnapshot's earliest expiration per name
+    today = today or date.today()
+    return {
+        name: expiry_weight(expiration_date, today, settings.RANKING_EXPIRY_HORIZON_DAYS, settings.RANKING_EXPIRY_BOOST)
+        for name, expiration_date in snapshot.expirations.items()
+    }
+
+
+class RankingMatrix(NamedTuple):
+    # Stored ingredient-major (ingredients x recipes) so a pantry only touches its own rows
+    by_ingredient: sparse.csr_matrix
+    recipe_ids: np.ndarray
+    sizes: np.ndarray
+    vocabulary: dict
+
+    def pantry_columns(self, weights: dict):
+        columns, values = [], []
+        for name, weight in weights.items():
+            column = self.vocabulary.get(name)
+            if column is not None:
+                columns.append(column)
+                values.append(weight)
+        return columns, values
+
+
+class RecipeRankingEngine:
+    """Scores recipes as a sparse recipe x ingredient matrix times a weighted pantry vector.
+
+    Only the pantry's rows of the (transposed) matrix are sliced out and multiplied, so the
+    cost scales with how many recipes use the pantry's ingredients rather than with the catalog.
+
+    The matrix is derived from a RecipeIndex and rebuilt when the index changes, at most
+    once per RANKING_REBUILD_INTERVAL_S so a burst of new recipes doesn't trigger a rebuild each.
+    """
+
+    def __init__(self, index: RecipeIndex, rebuild_interval: float = 0.0):
+        self.index = index
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._built_version = None
+        self._built_at = 0.0
+        # Swapped as a single object so concurrent readers never mix two builds
+        self._state = RankingMatrix(
+            sparse.csr_matrix((0, 0), dtype=np.float32), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32), {}
+        )
+
+    def _current(self):
+        if self._built_version == self.index.version:
+            return self._state
+        if self._built_version is not None and time.monotonic() - self._built_at < self.rebuild_interval:
+            return self._state
+        with self._lock:
+            if self._built_version == self.index.version:
+                return self._state
+            version, recipes = self.index.export()
+            vocabulary = {}
+            indptr = [0]
+            indices = []
+            for _, names in recipes:
+                for name in names:
+                    indices.append(vocabulary.setdefault(name, len(vocabulary)))
+                indptr.append(len(indices))
+            matrix = sparse.csr_matrix(
+                (np.ones(len(indices), dtype=np.float32), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+                shape=(len(recipes), len(vocabulary)),
+            )
+            self._state = RankingMatrix(
+                matrix.T.tocsr(),
+                np.fromiter((recipe_id for recipe_id, _ in recipes), dtype=np.int64, count=len(recipes)),
+                np.diff(matrix.indptr).astype(np.float32),
+                vocabulary,
+            )
+            self._built_version = version
+            self._built_at = time.monotonic()
+            return self._state
+
+    def _top_k(self, state, scores, used, limit):
+        # Pantry weights are >= 1, so a positive score means the recipe uses at least one item.
+        # Partitioning the dense scores finds the limit-th best without sorting the catalog;
+        # ties on score go to fewer missing ingredients, then to the oldest recipe.
+        cutoff = np.finfo(np.float32).tiny
+        if scores.size > limit:
+            cutoff = max(cutoff, np.partition(scores, scores.size - limit)[scores.size - limit])
+        candidates = np.flatnonzero(scores >= cutoff)
+        missed = state.sizes[candidates] - used[candidates]
+        order = np.lexsort((state.recipe_ids[candidates], missed, -scores[candidates]))[:limit]
+        return candidates[order]
+
+    def _format(self, state, rows, scores, used, pantry_names):
+        results = []
+        for row in rows:
+            recipe_id = int(state.recipe_ids[row])
+            names = self.index.ingredients_of(recipe_id)
+            title, image = self.index.meta_of(recipe_id)
+            results.append({
+                "id": recipe_id,
+                "title": title,
+                "image": image,
+                "score": round(float(scores[row]), 4),
+                "usedIngredientCount": int(used[row]),
+                "missedIngredientCount": int(state.sizes[row] - used[row]),
+                "usedIngredients": sorted(names & pantry_names),
+                "missedIngredients": sorted(names - pantry_names),
+            })
+        return results
+
+    def _rank(self, state, weights: dict, limit: int):
+        columns, values = state.pantry_columns(weights)
+        if not columns:
+            return []
+
+        pantry = np.ones((len(columns), 2), dtype=np.float32)
+        pantry[:, 0] = values
+        # One sparse product yields both the expiry-weighted score and the plain used count
+        product = state.by_ingredient[columns].T @ pantry
+        scores, used = np.ascontiguousarray(product[:, 0]), np.ascontiguousarray(product[:, 1])
+        rows = self._top_k(state, scores, used, limit)
+        return self._format(state, rows, scores, used, frozenset(weights))
+
+    def rank(self, weights: dict, limit: int = 10):
+        return self._rank(self._current(), weights, limit)
+
+    def rank_many(self, pantries, limit: int = 10):
+        # Batch scoring for jobs like the nightly push. Every user is scored against the same
+        # matrix snapshot; slicing each pantry's own rows beats one dense sparse x (users) product
+        # here because pantries are tiny next to the vocabulary, so that product is mostly zeros.
+        state = self._current()
+        return [self._rank(state, weights, limit) for weights in pantries]
+
+    def stats(self):
+        matrix = self._state.by_ingredient
+        return {
+            "recipes": matrix.shape[1],
+            "ingredients": matrix.shape[0],
+            "nonzeros": int(matrix.nnz),
+            "built_version": self._built_version,
+            "index_version": self.index.version,
+        }
+
+
+ranking_engine = RecipeRankingEngine(recipe_index, rebuild_interval=settings.RANKING_REBUILD_INTERVAL_S)
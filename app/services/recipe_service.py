@@ -1,23 +1,13 @@
-import requests
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.models.recipe import Recipe
+from app.services.recipe_ingestion import RecipeImportError, import_recipe_links
 
-def process_recipe_link(db: Session, user_id: int, url: str):
-    # Here you would typically use a service like recipe-scrapers or your own scraping logic
-    # For this example, we'll just create a dummy recipe
-    recipe = Recipe(
-        user_id=user_id,
-        title="Dummy Recipe from Link",
-        instructions="These are dummy instructions for the recipe from the link.",
-        ingredients=["Ingredient 1", "Ingredient 2", "Ingredient 3"],
-        image_url="https://example.com/dummy-recipe-image.jpg"
-    )
-
-    db.add(recipe)
-    db.commit()
-    db.refresh(recipe)
-
-    return recipe
+async def process_recipe_link(db: AsyncSession, user_id: int, url: str):
+    # Fetches the page and stores its schema.org Recipe, or links the copy someone already imported
+    result = (await import_recipe_links(db, user_id, [url]))[0]
+    if result["status"] == "failed":
+        raise RecipeImportError(result["status_code"], result["detail"])
+    return result["recipe"]
 
 def search_recipes(db: Session, query: str, ingredients: list):
     # Here you would typically use the Spoonacular API or another recipe API
@@ -1,30 +1,38 @@
-import random
+from collections import defaultdict
+from datetime import date
 from typing import List
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.db.database import run_in_session
 from app.models.ingredient import Ingredient
+from app.services.pantry_service import get_pantry_snapshot, get_pantry_snapshot_async
+from app.services.recipe_index import recipe_index
+from app.services.recipe_ranking import ranking_engine, pantry_weights, snapshot_weights
 
-def get_recipe_suggestions(ingredients: List[Ingredient], number: int = 5) -> List[dict]:
-    # Mock recipe suggestions
-    mock_recipes = [
-        {"id": 1, "title": "Pasta Primavera", "image": "https://example.com/pasta.jpg"},
-        {"id": 2, "title": "Chicken Stir Fry", "image": "https://example.com/stirfry.jpg"},
-        {"id": 3, "title": "Vegetable Soup", "image": "https://example.com/soup.jpg"},
-        {"id": 4, "title": "Grilled Salmon", "image": "https://example.com/salmon.jpg"},
-        {"id": 5, "title": "Caesar Salad", "image": "https://example.com/salad.jpg"},
-        {"id": 6, "title": "Beef Tacos", "image": "https://example.com/tacos.jpg"},
-        {"id": 7, "title": "Mushroom Risotto", "image": "https://example.com/risotto.jpg"},
-        {"id": 8, "title": "Vegetable Curry", "image": "https://example.com/curry.jpg"},
-    ]
+def get_recipe_suggestions(db: Session, ingredients: List[Ingredient], number: int = 5) -> List[dict]:
+    # Ranks the local recipe catalog by pantry overlap, favouring recipes that use up soon-to-expire items
+    recipe_index.ensure_loaded(db)
+    return ranking_engine.rank(pantry_weights(ingredients), limit=number)
 
-    # Randomly select 'number' of recipes
-    selected_recipes = random.sample(mock_recipes, min(number, len(mock_recipes)))
+def get_recipe_suggestions_for_user(db: Session, user_id: int, number: int = 5) -> List[dict]:
+    recipe_index.ensure_loaded(db)
+    return ranking_engine.rank(snapshot_weights(get_pantry_snapshot(db, user_id)), limit=number)
 
-    return [
-        {
-            "id": recipe["id"],
-            "title": recipe["title"],
-            "image": recipe["image"],
-            "usedIngredientCount": random.randint(1, len(ingredients)),
-            "missedIngredientCount": random.randint(0, 3)
-        }
-        for recipe in selected_recipes
-    ]
+async def get_recipe_suggestions_for_user_async(db: AsyncSession, user_id: int, number: int = 5) -> List[dict]:
+    snapshot = await get_pantry_snapshot_async(db, user_id)
+    await run_in_session(recipe_index.ensure_loaded)
+    return ranking_engine.rank(snapshot_weights(snapshot), limit=number)
+
+def get_recipe_suggestions_for_users(db: Session, user_ids: List[int], number: int = 5,
+                                     today: date = None) -> List[List[dict]]:
+    # Batch variant for jobs that score many users at once: one pantry query for the whole batch,
+    # and every user ranked against the same matrix
+    recipe_index.ensure_loaded(db)
+    pantries = defaultdict(list)
+    rows = db.execute(
+        select(Ingredient.user_id, Ingredient.name, Ingredient.expiration_date).where(Ingredient.user_id.in_(user_ids))
+    )
+    for row in rows:
+        pantries[row.user_id].append(row)
+    return ranking_engine.rank_many([pantry_weights(pantries[user_id], today) for user_id in user_ids], limit=number)
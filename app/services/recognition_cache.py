@@ -0,0 +1,115 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from app.core.cache import TieredCache, create_cache_backend
+from app.core.config import settings
+from app.services.image_preprocessing import open_image
+
+
+def image_digest(image_data):
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def perceptual_hash(image_data):
+    # 64-bit difference hash: robust to re-encoding and resizing, cheap to compare
+    image = open_image(image_data)
+    if image.format == "JPEG":
+        image.draft("L", (64, 64))
+    pixels = np.asarray(image.convert("L").resize((9, 8), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+class RecognitionCacheKey:
+    __slots__ = ("digest", "phash")
+
+    def __init__(self, digest, phash=None):
+        self.digest = digest
+        self.phash = phash
+
+
+class RecognitionCache:
+    """Recognition results keyed by image content and namespaced by model version.
+
+    Bumping `model_version` makes every older entry unreachable; they are left to expire, so
+    workers on the old and the new version can share the tier during a rolling deploy.
+    """
+
+    def __init__(self, namespace, model_version, cache: TieredCache, perceptual=False,
+                 max_distance=4, max_perceptual_entries=4096):
+        self.namespace = namespace
+        self.model_version = model_version
+        self.cache = cache
+        self.perceptual = perceptual
+        self.max_distance = max_distance
+        self.max_perceptual_entries = max_perceptual_entries
+        self.near_duplicate_hits = 0
+
+        self._phashes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry_key(self, digest):
+        return f"{self.namespace}:{self.model_version}:{digest}"
+
+    def key_for(self, image_data):
+        phash = None
+        if self.perceptual:
+            try:
+                phash = perceptual_hash(image_data)
+            except Exception:
+                phash = None
+        return RecognitionCacheKey(image_digest(image_data), phash)
+
+    def get(self, key: RecognitionCacheKey):
+        result = self.cache.get(self._entry_key(key.digest))
+        if result is not None or key.phash is None:
+            return result
+
+        with self._lock:
+            candidates = [
+                digest for phash, digest in self._phashes.items()
+                if (phash ^ key.phash).bit_count() <= self.max_distance
+            ]
+        for digest in candidates:
+            result = self.cache.local.get(self._entry_key(digest))
+            if result is not None:
+                self.near_duplicate_hits += 1
+                return result
+        return None
+
+    def lookup(self, image_data):
+        key = self.key_for(image_data)
+        return key, self.get(key)
+
+    def set(self, key: RecognitionCacheKey, result):
+        self.cache.set(self._entry_key(key.digest), result)
+        if key.phash is not None:
+            with self._lock:
+                self._phashes[key.phash] = key.digest
+                self._phashes.move_to_end(key.phash)
+                while len(self._phashes) > self.max_perceptual_entries:
+                    self._phashes.popitem(last=False)
+
+    def stats(self):
+        return {
+            "model_version": self.model_version,
+            "perceptual": self.perceptual,
+            "near_duplicate_hits": self.near_duplicate_hits,
+            **self.cache.stats(),
+        }
+
+
+_shared_backend = create_cache_backend(settings.RECOGNITION_CACHE_BACKEND, settings.RECOGNITION_CACHE_PATH)
+
+
+def create_recognition_cache(namespace, model_version, perceptual=False):
+    cache = TieredCache(
+        maxsize=settings.RECOGNITION_CACHE_SIZE,
+        shared=_shared_backend,
+        ttl=settings.RECOGNITION_CACHE_TTL_S,
+    )
+    return RecognitionCache(namespace, model_version, cache, perceptual=perceptual)
@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from typing import NamedTuple
+
+import httpx
+
+from app.core.cache import TieredCache, create_cache_backend
+from app.core.config import settings
+
+# Recipe details never change once published; search results drift slowly
+RECIPE_TTL_S = 7 * 24 * 3600
+SEARCH_TTL_S = 3600
+
+# Comma-separated parameters whose order and case don't change the result
+LIST_PARAMS = {"ingredients", "includeIngredients", "excludeIngredients", "intolerances"}
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class SpoonacularError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class SpoonacularRequest(NamedTuple):
+    endpoint: str
+    path: str
+    params: dict
+    ttl: float | None
+
+
+def complex_search(query: str, number: int = 10, add_recipe_information: bool = True):
+    params = {"query": query, "number": number, "addRecipeInformation": add_recipe_information}
+    return SpoonacularRequest("complexSearch", "/recipes/complexSearch", params, SEARCH_TTL_S)
+
+
+def find_by_ingredients(ingredients, number: int = 10):
+    params = {"ingredients": ",".join(ingredients), "number": number}
+    return SpoonacularRequest("findByIngredients", "/recipes/findByIngredients", params, SEARCH_TTL_S)
+
+
+def analyzed_instructions(recipe_id: int):
+    return SpoonacularRequest("analyzedInstructions", f"/recipes/{recipe_id}/analyzedInstructions", {}, RECIPE_TTL_S)
+
+
+def ingredient_widget(recipe_id: int):
+    return SpoonacularRequest("ingredientWidget", f"/recipes/{recipe_id}/ingredientWidget.json", {}, RECIPE_TTL_S)
+
+
+def recipe_information(recipe_id: int):
+    return SpoonacularRequest("information", f"/recipes/{recipe_id}/information", {}, RECIPE_TTL_S)
+
+
+def extract_recipe(url: str):
+    return SpoonacularRequest("extract", "/recipes/extract", {"url": url}, RECIPE_TTL_S)
+
+
+def normalize_params(params: dict):
+    normalized = []
+    for key, value in params.items():
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        value = str(value).strip()
+        if key in LIST_PARAMS:
+            value = ",".join(sorted({part.strip().lower() for part in value.split(",") if part.strip()}))
+        normalized.append((key, value))
+    return sorted(normalized)
+
+
+class SpoonacularClient:
+    """Shared Spoonacular client: pooled keep-alive connections, retries, TTL cache and quota tracking."""
+
+    def __init__(self, api_key: str, base_url: str, timeout: float = 10.0, max_retries: int = 3,
+                 backoff: float = 0.5, max_connections: int = 20, cache: TieredCache | None = None,
+                 transport=None, async_transport=None, max_retry_after: float = 10.0):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_retry_after = max_retry_after
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.cache = cache
+        self._transport = transport
+        self._async_transport = async_transport
+        self._client = None
+        self._async_client = None
+        self._lock = threading.Lock()
+        self._usage = defaultdict(lambda: {"requests": 0, "cache_hits": 0, "retries": 0, "errors": 0, "points": 0.0})
+        self._quota = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(
+                        base_url=self.base_url, timeout=self.timeout, limits=self.limits, transport=self._transport
+                    )
+        return self._client
+
+    @property
+    def async_client(self):
+        # httpx.AsyncClient is bound to the loop it is first used on; one per worker process is enough
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self.limits, transport=self._async_transport
+            )
+        return self._async_client
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def _cache_key(self, request: SpoonacularRequest):
+        query = "&".join(f"{key}={value}" for key, value in normalize_params(request.params))
+        return f"spoonacular:{request.path}?{query}"
+
+    def _cached(self, request: SpoonacularRequest, use_cache: bool):
+        if not use_cache or self.cache is None or not request.ttl:
+            return None, None
+        key = self._cache_key(request)
+        value = self.cache.get(key)
+        if value is not None:
+            self._record(request.endpoint, cache_hits=1)
+        return key, value
+
+    def _params(self, request: SpoonacularRequest):
+        return dict(normalize_params(request.params), apiKey=self.api_key)
+
+    def _record(self, endpoint, response=None, **counts):
+        with self._lock:
+            usage = self._usage[endpoint]
+            for name, value in counts.items():
+                usage[name] += value
+            if response is not None:
+                # Spoonacular reports the points each call cost and the running daily total
+                try:
+                    usage["points"] += float(response.headers.get("X-API-Quota-Request", 0))
+                    if "X-API-Quota-Used" in response.headers:
+                        self._quota["used"] = float(response.headers["X-API-Quota-Used"])
+                    if "X-API-Quota-Left" in response.headers:
+                        self._quota["left"] = float(response.headers["X-API-Quota-Left"])
+                except ValueError:
+                    pass
+
+    def _retry_delay(self, request, attempt, response=None):
+        delay = self.backoff * (2 ** attempt)
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                delay = float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+            # Waiting out a long quota reset would hold the request open for minutes
+            if delay > self.max_retry_after:
+                self._record(request.endpoint, errors=1)
+                raise SpoonacularError(
+                    response.status_code, f"Spoonacular {request.endpoint} rate limited; retry after {delay:.0f} s"
+                )
+        return delay
+
+    def _result(self, request, response, key):
+        if response.status_code != 200:
+            self._record(request.endpoint, errors=1)
+            raise SpoonacularError(response.status_code, f"Spoonacular {request.endpoint} failed")
+        try:
+            data = response.json()
+        except ValueError:
+            self._record(request.endpoint, errors=1)
+            raise SpoonacularError(502, f"Spoonacular {request.endpoint} returned an invalid response")
+        if key is not None:
+            self.cache.set(key, data, request.ttl)
+        return data
+
+    def get(self, request: SpoonacularRequest, use_cache: bool = True):
+        key, cached = self._cached(request, use_cache)
+        if cached is not None:
+            return cached
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = self.client.get(request.path, params=self._params(request))
+            except httpx.TransportError as e:
+                if last_attempt:
+                    self._record(request.endpoint, errors=1)
+                    raise SpoonacularError(503, f"Spoonacular {request.endpoint} unreachable: {e}")
+                self._record(request.endpoint, retries=1)
+                time.sleep(self._retry_delay(request, attempt))
+                continue
+            self._record(request.endpoint, response, requests=1)
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                self._record(request.endpoint, retries=1)
+                time.sleep(self._retry_delay(request, attempt, response))
+                continue
+            return self._result(request, response, key)
+
+    async def aget(self, request: SpoonacularRequest, use_cache: bool = True):
+        key, cached = self._cached(request, use_cache)
+        if cached is not None:
+            return cached
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.async_client.get(request.path, params=self._params(request))
+            except httpx.TransportError as e:
+                if last_attempt:
+                    self._record(request.endpoint, errors=1)
+                    raise SpoonacularError(503, f"Spoonacular {request.endpoint} unreachable: {e}")
+                self._record(request.endpoint, retries=1)
+                await asyncio.sleep(self._retry_delay(request, attempt))
+                continue
+            self._record(request.endpoint, response, requests=1)
+            if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                self._record(request.endpoint, retries=1)
+                await asyncio.sleep(self._retry_delay(request, attempt, response))
+                continue
+            return self._result(request, response, key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "endpoints": {endpoint: dict(usage) for endpoint, usage in self._usage.items()},
+                "quota": dict(self._quota),
+                "cache": self.cache.stats() if self.cache is not None else None,
+            }
+
+
+spoonacular = SpoonacularClient(
+    api_key=settings.SPOONACULAR_API_KEY,
+    base_url=settings.SPOONACULAR_BASE_URL,
+    timeout=settings.SPOONACULAR_TIMEOUT_S,
+    max_retries=settings.SPOONACULAR_MAX_RETRIES,
+    backoff=settings.SPOONACULAR_BACKOFF_S,
+    max_connections=settings.SPOONACULAR_MAX_CONNECTIONS,
+    max_retry_after=settings.SPOONACULAR_MAX_RETRY_AFTER_S,
+    cache=TieredCache(
+        maxsize=settings.SPOONACULAR_CACHE_SIZE,
+        shared=create_cache_backend(settings.SPOONACULAR_CACHE_BACKEND, settings.SPOONACULAR_CACHE_PATH),
+    ),
+)
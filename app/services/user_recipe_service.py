@@ -0,0 +1,149 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models.ingredient import Ingredient
+from app.models.user_recipe import UserRecipe
+from app.services import spoonacular_client
+from app.services.spoonacular_client import spoonacular
+from app.services.ingredient_dictionary import canonical_ingredient_name
+from app.services.ingredient_names import convert_amount
+from app.services.ingredient_service import bump_pantry_versions, invalidate_pantry
+
+# Remaining amounts below this count as used up (float residue from unit conversions)
+EMPTY_AMOUNT = 1e-9
+
+class RecipeRequirement(NamedTuple):
+    name: str
+    amount: Optional[float] = None
+    unit: Optional[str] = None
+
+def requirements_from_widget(widget) -> List[RecipeRequirement]:
+    requirements = []
+    for ingredient in widget.get("ingredients", []):
+        metric = (ingredient.get("amount") or {}).get("metric") or {}
+        requirements.append(RecipeRequirement(ingredient["name"], metric.get("value"), metric.get("unit")))
+    return requirements
+
+def fetch_recipe_requirements(recipe_id: int) -> List[RecipeRequirement]:
+    # Raises SpoonacularError; the widget response is cached by the client
+    return requirements_from_widget(spoonacular.get(spoonacular_client.ingredient_widget(recipe_id)))
+
+def _upsert_user_recipe(db: Session, values: dict, on_conflict) -> UserRecipe:
+    # INSERT ... ON CONFLICT (user_id, recipe_id) DO UPDATE: one statement whether or not the
+    # row exists yet, with counters computed from the stored row rather than a value read earlier
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = insert(UserRecipe).values(**values)
+    statement = statement.on_conflict_do_update(
+        index_elements=[UserRecipe.user_id, UserRecipe.recipe_id],
+        set_=on_conflict(statement.excluded),
+    )
+    return db.scalars(statement.returning(UserRecipe), execution_options={"populate_existing": True}).one()
+
+def record_cooked(db: Session, user_id: int, recipe_id: int, title: str = None, now: datetime = None) -> UserRecipe:
+    now = now or datetime.utcnow()
+    return _upsert_user_recipe(
+        db,
+        dict(user_id=user_id, recipe_id=recipe_id, title=title, cook_count=1, last_cooked=now, is_favorite=False),
+        lambda excluded: {
+            "cook_count": UserRecipe.cook_count + 1,
+            "last_cooked": excluded.last_cooked,
+            "title": func.coalesce(excluded.title, UserRecipe.title),
+        },
+    )
+
+def set_favorite(db: Session, user_id: int, recipe_id: int, is_favorite: bool = True, title: str = None) -> UserRecipe:
+    user_recipe = _upsert_user_recipe(
+        db,
+        dict(user_id=user_id, recipe_id=recipe_id, title=title, cook_count=0, is_favorite=is_favorite),
+        lambda excluded: {
+            "is_favorite": excluded.is_favorite,
+            "title": func.coalesce(excluded.title, UserRecipe.title),
+        },
+    )
+    db.commit()
+    return user_recipe
+
+def unset_favorite(db: Session, user_id: int, recipe_id: int) -> Optional[UserRecipe]:
+    user_recipe = db.scalars(
+        update(UserRecipe)
+        .where(UserRecipe.user_id == user_id, UserRecipe.recipe_id == recipe_id)
+        .values(is_favorite=False)
+        .returning(UserRecipe),
+        execution_options={"populate_existing": True, "synchronize_session": False},
+    ).first()
+    db.commit()
+    return user_recipe
+
+def plan_deductions(pantry_rows, requirements: List[RecipeRequirement]):
+    # pantry_rows are (id, name, amount, unit), soonest-expiring first; each requirement is taken
+    # from matching rows in that order, converting units where they share a dimension
+    rows_by_name = defaultdict(list)
+    for row in pantry_rows:
+        rows_by_name[canonical_ingredient_name(row.name)].append(row)
+
+    deductions: Dict[int, float] = {}
+    skipped = []
+    for requirement in requirements:
+        rows = rows_by_name.get(canonical_ingredient_name(requirement.name))
+        if not rows or not requirement.amount:
+            skipped.append(requirement.name)
+            continue
+        needed = requirement.amount
+        for row in rows:
+            available = (row.amount or 0) - deductions.get(row.id, 0)
+            needed_here = convert_amount(needed, requirement.unit, row.unit)
+            if available <= EMPTY_AMOUNT or needed_here is None:
+                continue
+            used = min(available, needed_here)
+            deductions[row.id] = deductions.get(row.id, 0) + used
+            needed -= convert_amount(used, row.unit, requirement.unit)
+            if needed <= EMPTY_AMOUNT:
+                break
+        if needed == requirement.amount:
+            skipped.append(requirement.name)
+    return deductions, skipped
+
+def mark_recipe_cooked(db: Session, user_id: int, recipe_id: int, requirements: List[RecipeRequirement],
+                       title: str = None):
+    # The upsert runs first, so on SQLite the write lock is already held while the pantry is read,
+    # and on Postgres the pantry rows are read FOR UPDATE: nothing can change between planning
+    # the deductions and applying them, and everything commits together
+    user_recipe = record_cooked(db, user_id, recipe_id, title)
+    result = {"recipe_id": recipe_id, "cook_count": user_recipe.cook_count, "last_cooked": user_recipe.last_cooked}
+
+    pantry_rows = db.execute(
+        select(Ingredient.id, Ingredient.name, Ingredient.amount, Ingredient.unit)
+        .where(Ingredient.user_id == user_id)
+        .order_by(Ingredient.expiration_date.is_(None), Ingredient.expiration_date, Ingredient.id)
+        .with_for_update()
+    ).all()
+    deductions, skipped = plan_deductions(pantry_rows, requirements)
+
+    removed = []
+    if deductions:
+        table = Ingredient.__table__
+        # One executemany for every row touched, then one DELETE for whatever ran out
+        db.execute(
+            update(table).where(table.c.id == bindparam("b_id")).values(amount=table.c.amount - bindparam("b_used")),
+            [{"b_id": ingredient_id, "b_used": used} for ingredient_id, used in deductions.items()],
+        )
+        removed = db.scalars(
+            delete(table).where(table.c.id.in_(list(deductions)), table.c.amount <= EMPTY_AMOUNT).returning(table.c.id)
+        ).all()
+        bump_pantry_versions(db, [user_id])
+    db.commit()
+    if deductions:
+        invalidate_pantry(user_id)
+
+    names = {row.id: row.name for row in pantry_rows}
+    result.update(
+        deducted=[{"ingredient_id": ingredient_id, "name": names[ingredient_id], "amount": used}
+                  for ingredient_id, used in deductions.items()],
+        removed=removed,
+        skipped=skipped,
+    )
+    return result
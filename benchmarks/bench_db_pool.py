@@ -0,0 +1,112 @@
+"""Load test: concurrent request-shaped DB work against the old and the tuned engine setup.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_db_pool --threads 32 --seconds 10
+
+Each simulated request opens a session, reads one user's pantry and, for a share of
+requests, updates an ingredient and commits, like the ingredient routes do. The old setup is
+SQLAlchemy's defaults (5 + 10 pooled connections, rollback journal, no pragmas); the tuned one
+is app.db.database.create_db_engine. Both use the metered pool so checkout waits are comparable.
+"""
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import MeteredQueuePool, create_db_engine, pool_stats
+from app.models.ingredient import Ingredient
+from benchmarks.bench_expiration_scan import generate_database
+
+
+def percentile(timings, fraction):
+    return sorted(timings)[min(len(timings) - 1, int(len(timings) * fraction))] if timings else 0.0
+
+
+def run_load(engine, num_users, num_ingredients, threads, seconds, write_fraction, think_ms, gap_ms):
+    Session = sessionmaker(bind=engine, autoflush=False)
+    timings, errors = [], {"locked": 0, "pool_timeout": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        local_timings = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            db = Session()
+            try:
+                db.execute(select(Ingredient.name, Ingredient.amount).where(Ingredient.user_id == rng.randint(1, num_users))).all()
+                # Simulated handler work while the connection is still checked out
+                time.sleep(think_ms / 1000)
+                if rng.random() < write_fraction:
+                    db.execute(
+                        update(Ingredient).where(Ingredient.id == rng.randint(1, num_ingredients)).values(amount=rng.random())
+                    )
+                    db.commit()
+                local_timings.append(time.perf_counter() - started)
+            except PoolTimeoutError:
+                with lock:
+                    errors["pool_timeout"] += 1
+            except OperationalError:
+                db.rollback()
+                with lock:
+                    errors["locked"] += 1
+            finally:
+                db.close()
+            # Gap between one client's requests; without it a thread that just released a connection
+            # grabs it straight back and the threads queued in the pool starve
+            time.sleep(gap_ms / 1000)
+        with lock:
+            timings.extend(local_timings)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return timings, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--ingredients", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--write-fraction", type=float, default=0.2)
+    parser.add_argument("--think-ms", type=float, default=2.0)
+    parser.add_argument("--gap-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("default", "tuned"):
+            path = os.path.join(directory, f"{name}.sqlite3")
+            generate_database(path, args.users, args.ingredients)
+            url = f"sqlite:///{path}"
+            if name == "default":
+                engine = create_engine(url, connect_args={"check_same_thread": False}, poolclass=MeteredQueuePool,
+                                       pool_size=5, max_overflow=10, pool_timeout=30)
+            else:
+                engine = create_db_engine(url)
+
+            timings, errors = run_load(engine, args.users, args.ingredients, args.threads, args.seconds,
+                                       args.write_fraction, args.think_ms, args.gap_ms)
+            stats = pool_stats(engine)
+            print(
+                f"{name:>8}: {len(timings) / args.seconds:7.0f} req/s, "
+                f"p50 {percentile(timings, 0.5) * 1000:7.2f} ms, p99 {percentile(timings, 0.99) * 1000:7.2f} ms, "
+                f"errors {errors}, pool wait avg {stats['avg_wait_ms']:.2f} ms / max {stats['max_wait_ms']:.1f} ms"
+            )
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Expiration-check scan time and peak memory on a generated SQLite database.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_expiration_scan --ingredients 1000000
+
+Compares the old full-table load plus one user query per expiring item against the
+streamed, index-backed per-user scan. Each mode runs in a fresh subprocess so its
+peak RSS is not polluted by the other.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+from app.db.database import Base
+from app.models.ingredient import Ingredient
+from app.models.recipe import Recipe  # noqa: F401 - registers the mapper User relates to
+from app.models import canonical_ingredient, recipe_ingredient  # noqa: F401 - and those Recipe relates to
+from app.models.user import User
+from app.services.expiration_scan import expiring_ingredients_query, iter_expiring_by_user
+from app.services.model_registry import current_rss_bytes
+from benchmarks.bench_image_preprocessing import peak_rss_bytes
+
+TODAY = date(2026, 1, 1)
+NOTICE_DAYS = 3
+
+
+def generate_database(path, num_users, num_ingredients, seed=0, batch_size=50_000):
+    rng = random.Random(seed)
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # Most users have registered a device; a few never opened the app on one
+        conn.execute(insert(User), [
+            {"id": user_id, "username": f"user{user_id}", "email": f"user{user_id}@example.com",
+             "fcm_token": f"token-{user_id}" if rng.random() < 0.9 else None}
+            for user_id in range(1, num_users + 1)
+        ])
+        for start in range(0, num_ingredients, batch_size):
+            conn.execute(insert(Ingredient), [
+                {"name": f"ingredient {rng.randrange(2000)}", "amount": 1.0, "unit": "piece",
+                 "expiration_date": TODAY + timedelta(days=rng.randint(-5, 60)) if rng.random() < 0.9 else None,
+                 "user_id": rng.randint(1, num_users)}
+                for _ in range(start, min(start + batch_size, num_ingredients))
+            ])
+    engine.dispose()
+
+
+def legacy_scan(db):
+    # What check_expiring_ingredients did before: load every row, filter in Python, query each owner
+    notified = 0
+    for ingredient in db.query(Ingredient).all():
+        if ingredient.expiration_date and (ingredient.expiration_date - TODAY).days <= NOTICE_DAYS:
+            user = db.query(User).filter(User.id == ingredient.user_id).first()
+            if user and user.fcm_token:
+                notified += 1
+    return notified
+
+
+def streaming_scan(db, batch_size):
+    notified = 0
+    for _, _, items in iter_expiring_by_user(db, TODAY + timedelta(days=NOTICE_DAYS), batch_size):
+        notified += len(items)
+    return notified
+
+
+def run_mode(mode, path, batch_size):
+    engine = create_engine(f"sqlite:///{path}")
+    baseline_rss = current_rss_bytes()
+    with Session(engine) as db:
+        started = time.perf_counter()
+        notified = legacy_scan(db) if mode == "legacy" else streaming_scan(db, batch_size)
+        elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "notified": notified,
+        "seconds": elapsed,
+        "peak_rss_over_baseline_mb": (peak_rss_bytes() - baseline_rss) / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["legacy", "streaming"])
+    parser.add_argument("--database")
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--ingredients", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.database, args.batch_size)))
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite3")
+        started = time.perf_counter()
+        generate_database(path, args.users, args.ingredients)
+        print(f"generated {args.ingredients} ingredients for {args.users} users in {time.perf_counter() - started:.1f} s")
+
+        engine = create_engine(f"sqlite:///{path}")
+        with engine.connect() as conn:
+            query = expiring_ingredients_query(TODAY + timedelta(days=NOTICE_DAYS), args.batch_size)
+            compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+            for row in conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")):
+                print(f"  plan: {row[-1]}")
+        engine.dispose()
+
+        modes = ["streaming"] if args.skip_legacy else ["legacy", "streaming"]
+        for mode in modes:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_expiration_scan", "--mode", mode, "--database", path,
+                 "--batch-size", str(args.batch_size)],
+                check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output)
+            print(
+                f"{result['mode']:>9}: {result['seconds']:7.2f} s, {result['notified']} notifications, "
+                f"peak RSS +{result['peak_rss_over_baseline_mb']:6.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
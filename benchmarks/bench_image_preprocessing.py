@@ -0,0 +1,115 @@
+"""Decode + preprocess latency and peak memory for 12MP phone photos.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_image_preprocessing
+
+Each mode runs in a fresh subprocess so its peak RSS is not polluted by the other.
+"""
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from app.services.image_preprocessing import batch_buffer, preprocess_into
+from app.services.model_registry import current_rss_bytes
+
+
+def make_photo(width=4032, height=3024):
+    # Smooth gradients plus noise compress roughly like a real photo
+    y, x = np.mgrid[0:height, 0:width]
+    rng = np.random.default_rng(0)
+    pixels = np.stack([x * 255 // width, y * 255 // height, (x + y) * 255 // (width + height)], axis=-1)
+    pixels = (pixels + rng.integers(0, 24, pixels.shape)).clip(0, 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def naive_preprocess(data):
+    # What the recognition paths did before: full-size decode, resize, then scale
+    image = Image.open(io.BytesIO(data))
+    image = image.resize((224, 224))
+    image_array = np.asarray(image, dtype=np.float32)
+    return np.expand_dims(image_array / 127.5 - 1.0, axis=0)
+
+
+def peak_rss_bytes():
+    # VmHWM is reset on exec, unlike ru_maxrss which a child inherits from its parent
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run_mode(mode, photo_path, iterations, batch_size):
+    with open(photo_path, "rb") as f:
+        data = f.read()
+    baseline_rss = current_rss_bytes()
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        if mode == "naive":
+            np.concatenate([naive_preprocess(data) for _ in range(batch_size)])
+        else:
+            buffer = batch_buffer(batch_size)
+            for i in range(batch_size):
+                preprocess_into(data, buffer[i])
+        timings.append((time.perf_counter() - started) / batch_size)
+
+    timings.sort()
+    peak_rss = peak_rss_bytes()
+    return {
+        "mode": mode,
+        "jpeg_bytes": len(data),
+        "per_image_p50_ms": timings[len(timings) // 2] * 1000,
+        "per_image_p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000,
+        "peak_rss_over_baseline_mb": (peak_rss - baseline_rss) / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["naive", "pipeline"])
+    parser.add_argument("--photo")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.photo, args.iterations, args.batch_size)))
+        return
+
+    # Generating the photo is memory hungry, so do it once here rather than in the measured processes
+    photo = tempfile.NamedTemporaryFile(suffix=".jpg")
+    photo.write(make_photo())
+    photo.flush()
+
+    for mode in ("naive", "pipeline"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_image_preprocessing", "--mode", mode, "--photo", photo.name,
+             "--iterations", str(args.iterations), "--batch-size", str(args.batch_size)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output)
+        print(
+            f"{result['mode']:>9}: p50 {result['per_image_p50_ms']:7.2f} ms/image, "
+            f"p95 {result['per_image_p95_ms']:7.2f} ms/image, "
+            f"peak RSS +{result['peak_rss_over_baseline_mb']:6.1f} MB "
+            f"({result['jpeg_bytes'] / 2**20:.1f} MB JPEG)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Multi-image scan vs single uploads, CPU only.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_image_scan --images 10
+    python -m benchmarks.bench_image_scan --random-weights   # offline: same network, no weight download
+
+Synthetic 12MP "fridge shelf" photos with several items each are timed through:
+
+    single     what /ingredients/upload does per photo: preprocess, one forward pass of 1
+    unbatched  the scan's regions, but one forward pass per crop
+    scan       image_scan: parallel decode + region proposals, all crops in shared forward passes
+               at SCAN_CROP_SIZE
+
+Label decoding is left out of every mode; it is a table lookup and needs the ImageNet class
+index download.
+"""
+import os
+
+# Must be set before TensorFlow is imported anywhere
+os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import argparse
+import io
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from app.core.config import settings
+from app.services.image_preprocessing import batch_buffer, preprocess_into
+from app.services.image_scan import SCAN_MODELS, prepare_scan, predict_regions
+from app.services.model_registry import registry, MOBILENET_V2, MOBILENET_V2_160
+
+
+def make_shelf_photo(seed, width=4032, height=3024, items=6):
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    pixels = np.stack([x * 80 // width + 150, y * 60 // height + 160, np.full_like(x, 190)], axis=-1)
+    pixels = (pixels + rng.integers(0, 12, pixels.shape)).clip(0, 255).astype(np.uint8)
+    for _ in range(items):
+        color = tuple(int(c) for c in rng.integers(0, 200, 3))
+        center = (int(rng.integers(400, width - 400)), int(rng.integers(400, height - 400)))
+        axes = (int(rng.integers(150, 450)), int(rng.integers(150, 450)))
+        if rng.random() < 0.5:
+            cv2.ellipse(pixels, center, axes, 0, 0, 360, color, -1)
+        else:
+            cv2.rectangle(pixels, (center[0] - axes[0], center[1] - axes[1]),
+                          (center[0] + axes[0], center[1] + axes[1]), color, -1)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def best_of(repeats, fn):
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--random-weights", action="store_true",
+                        help="build MobileNetV2 without downloading ImageNet weights; same compute cost")
+    args = parser.parse_args()
+
+    if args.random_weights:
+        import tensorflow as tf
+        registry.register(MOBILENET_V2, lambda: tf.keras.applications.MobileNetV2(weights=None))
+        registry.register(MOBILENET_V2_160,
+                          lambda: tf.keras.applications.MobileNetV2(input_shape=(160, 160, 3), weights=None))
+    model = registry.get(MOBILENET_V2)
+    scan_model = registry.get(SCAN_MODELS[settings.SCAN_CROP_SIZE])
+
+    photos = [make_shelf_photo(seed) for seed in range(args.images)]
+
+    def single(photo):
+        buffer = batch_buffer(1)
+        preprocess_into(photo, buffer[0])
+        model.predict_on_batch(buffer[:1])
+
+    prepared = prepare_scan(photos)
+    predict_regions(prepared.batch)  # warm up both batch shapes
+    single(photos[0])
+
+    single_s = best_of(args.repeats, lambda: single(photos[0]))
+    singles_s = best_of(args.repeats, lambda: [single(photo) for photo in photos])
+    prepare_s = best_of(args.repeats, lambda: prepare_scan(photos))
+    forward_s = best_of(args.repeats, lambda: predict_regions(prepared.batch))
+    unbatched_s = best_of(args.repeats, lambda: [scan_model.predict_on_batch(prepared.batch[i:i + 1])
+                                                 for i in range(len(prepared.batch))])
+    scan_s = best_of(args.repeats, lambda: predict_regions(prepare_scan(photos).batch))
+
+    regions = len(prepared.regions)
+    print(f"    single: {single_s * 1000:7.1f} ms per upload, {args.images} uploads {singles_s * 1000:7.1f} ms "
+          f"(top-1 of the whole frame only)")
+    print(f" unbatched: {args.images} photos, {regions} regions, {unbatched_s * 1000 + prepare_s * 1000:7.1f} ms "
+          f"({unbatched_s / regions * 1000:5.1f} ms per crop forward pass)")
+    print(f"      scan: {args.images} photos, {regions} regions, {scan_s * 1000:7.1f} ms "
+          f"(prepare {prepare_s * 1000:6.1f} ms, forward {forward_s * 1000:6.1f} ms), "
+          f"= {scan_s / single_s:4.1f} single uploads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""Inference backends compared: accuracy parity with Keras, latency and memory, CPU only.
+
+Export the models first, then run from the repository root:
+
+    python export_models.py
+    python -m benchmarks.bench_inference_backends --threads 1
+    python -m benchmarks.bench_inference_backends --images-dir photos/ --min-top1 0.95
+
+    python export_models.py --random-weights --model-dir /tmp/models      # offline
+    python -m benchmarks.bench_inference_backends --model-dir /tmp/models
+
+Parity: a fixed image set (--images-dir, or deterministic synthetic photos) goes through every
+backend, and each is compared with the float Keras model: top-1 agreement, mean top-5 overlap and
+the largest probability difference. Exits non-zero when a backend's top-1 agreement is under
+--min-top1. Untrained (--random-weights) models have near-uniform outputs, so their top-1
+agreement says little; use the exported ImageNet weights and real photos for the gate.
+
+Latency and memory: each backend runs in a fresh process, so import time and resident memory
+are its own: runtime import, model load, RSS growth over a bare interpreter, and latency per
+image at batch 1 and at INFERENCE_MAX_BATCH_SIZE.
+"""
+import os
+
+# Must be set before TensorFlow is imported anywhere
+os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import argparse
+import glob
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.image_preprocessing import preprocess_into
+from app.services.inference_backends import _tflite_interpreter, create_backend
+from app.services.model_registry import current_rss_bytes
+
+CONFIGS = ("keras:none", "tflite:none", "tflite:float16", "tflite:int8", "onnx:none", "onnx:int8")
+
+
+def image_set(directory, count):
+    if directory:
+        paths = sorted(glob.glob(os.path.join(directory, "*")))
+        return [open(path, "rb").read() for path in paths[:count]]
+    from benchmarks.bench_image_scan import make_shelf_photo
+    return [make_shelf_photo(seed, width=1600, height=1200, items=2) for seed in range(count)]
+
+
+def preprocess(images, size):
+    batch = np.empty((len(images), size, size, 3), dtype=np.float32)
+    for image, slot in zip(images, batch):
+        preprocess_into(image, slot)
+    return batch
+
+
+def predict(backend, batch, batch_size):
+    return np.concatenate([backend.predict_on_batch(batch[start:start + batch_size])
+                           for start in range(0, len(batch), batch_size)])
+
+
+def parity(args, batch):
+    reference = predict(create_backend("keras", args.size, model_dir=args.model_dir), batch, args.batch_size)
+    reference_top5 = np.argsort(-reference, axis=1)[:, :5]
+    failed = []
+    print(f"parity on {len(batch)} images against keras:none")
+    for config in args.configs:
+        backend, quantization = config.split(":")
+        if config == "keras:none":
+            continue
+        try:
+            model = create_backend(backend, args.size, quantization, args.threads, args.model_dir)
+        except (FileNotFoundError, ImportError) as e:
+            print(f"  {config:>15}: skipped ({e})")
+            continue
+        predictions = predict(model, batch, args.batch_size)
+        top5 = np.argsort(-predictions, axis=1)[:, :5]
+        top1 = np.mean(top5[:, 0] == reference_top5[:, 0])
+        overlap = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(top5, reference_top5)])
+        print(f"  {config:>15}: top-1 agreement {top1:6.1%}, top-5 overlap {overlap:6.1%}, "
+              f"max |p - p_keras| {np.abs(predictions - reference).max():.5f}")
+        if top1 < args.min_top1:
+            failed.append(config)
+    return failed
+
+
+def child(args):
+    # One backend in a bare process: what a worker running only this backend would pay
+    backend, quantization = args.child.split(":")
+    rss_before = current_rss_bytes()
+    started = time.perf_counter()
+    if backend == "onnx":
+        import onnxruntime  # noqa: F401
+    elif backend == "tflite":
+        _tflite_interpreter()
+    else:
+        import tensorflow  # noqa: F401
+    imported = time.perf_counter()
+    model = create_backend(backend, args.size, quantization, args.threads, args.model_dir)
+    loaded = time.perf_counter()
+    rss_loaded = current_rss_bytes()
+
+    rng = np.random.default_rng(0)
+    batch = rng.uniform(-1, 1, (settings.INFERENCE_MAX_BATCH_SIZE, args.size, args.size, 3)).astype(np.float32)
+    timings = {}
+    for batch_size in (1, len(batch)):
+        model.predict_on_batch(batch[:batch_size])  # warm up this shape
+        runs = []
+        for _ in range(args.repeats):
+            run_started = time.perf_counter()
+            model.predict_on_batch(batch[:batch_size])
+            runs.append(time.perf_counter() - run_started)
+        timings[batch_size] = float(np.median(runs)) / batch_size
+    print(json.dumps({
+        "import_s": imported - started,
+        "load_s": loaded - imported,
+        "rss_loaded_mb": (rss_loaded - rss_before) / 1e6,
+        "rss_mb": (current_rss_bytes() - rss_before) / 1e6,
+        "batch1_ms": timings[1] * 1000,
+        "batched_ms": timings[len(batch)] * 1000,
+    }))
+
+
+def latency(args):
+    print(f"latency and memory, {args.size}x{args.size}, {args.threads or 'default'} intra-op threads, "
+          f"batch 1 and {settings.INFERENCE_MAX_BATCH_SIZE}")
+    for config in args.configs:
+        command = [sys.executable, "-m", "benchmarks.bench_inference_backends", "--child", config,
+                   "--size", str(args.size), "--threads", str(args.threads), "--repeats", str(args.repeats),
+                   "--model-dir", args.model_dir]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode:
+            print(f"  {config:>15}: failed: {result.stderr.strip().splitlines()[-1]}")
+            continue
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        print(f"  {config:>15}: import {stats['import_s']:5.2f} s, load {stats['load_s']:5.2f} s, "
+              f"RSS +{stats['rss_loaded_mb']:6.1f} MB loaded / +{stats['rss_mb']:6.1f} MB after runs, "
+              f"{stats['batch1_ms']:6.1f} ms/image at batch 1, {stats['batched_ms']:6.1f} ms/image batched")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-dir", default=settings.MODEL_DIR)
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), help="backend:quantization pairs")
+    parser.add_argument("--size", type=int, default=224)
+    parser.add_argument("--threads", type=int, default=settings.INFERENCE_INTRA_OP_THREADS)
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--images-dir", help="fixed photo set for the parity check")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--min-top1", type=float, default=0.0, help="fail when top-1 agreement is lower")
+    parser.add_argument("--skip-parity", action="store_true")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+    failed = []
+    if not args.skip_parity:
+        failed = parity(args, preprocess(image_set(args.images_dir, args.images), args.size))
+    latency(args)
+    if failed:
+        print(f"top-1 agreement under {args.min_top1:.0%}: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
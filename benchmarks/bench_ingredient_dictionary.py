@@ -0,0 +1,163 @@
+"""Resolving free-text ingredient names with the ingredient dictionary.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_ingredient_dictionary
+
+Checks that recipe lines, pantry entries, Vision labels and ImageNet classes resolve to the
+expected canonical ingredient (or to none), then times resolution per name:
+
+    linear scan   every alias tested as a substring of the text, longest wins (the obvious way)
+    cold          dictionary lookup with an empty memo: exact / trie / trigram paths
+    memoized      the same names again, served from the memo
+
+and compares the dictionary with the substring check it replaces for Vision labels.
+"""
+import argparse
+import time
+
+from app.services.ingredient_dictionary import (
+    CANONICAL_INGREDIENTS, IngredientDictionary, IMAGENET_FOODS, _key, ingredient_dictionary,
+)
+
+CASES = [
+    # Recipe lines and pantry entries
+    ("2 large ripe Roma tomatoes", "tomato"),
+    ("Tomatoes", "tomato"),
+    ("tomatoe", "tomato"),
+    ("Cherry_Tomatoes", "tomato"),
+    ("1 can (400g) chopped tomatoes", "canned tomato"),
+    ("2 tbsp tomato paste", "tomato paste"),
+    ("3 tbsp extra virgin olive oil", "olive oil"),
+    ("2 cups all-purpose flour, sifted", "flour"),
+    ("1 cup icing sugar", "powdered sugar"),
+    ("garlic cloves, minced", "garlic"),
+    ("1 tsp garlic powder", "garlic powder"),
+    ("scallions, thinly sliced", "green onion"),
+    ("Aubergine", "eggplant"),
+    ("courgettes", "zucchini"),
+    ("brocoli florets", "broccoli"),
+    ("1 red bell pepper, diced", "bell pepper"),
+    ("1/2 tsp red pepper flakes", "red pepper flake"),
+    ("salt and pepper to taste", "black pepper"),
+    ("500 ml chicken broth", "chicken stock"),
+    ("1 can coconut milk", "coconut milk"),
+    ("garbanzo beans, drained", "chickpea"),
+    ("fresh coriander", "cilantro"),
+    ("ground coriander", "coriander"),
+    ("3 eggs", "egg"),
+    ("2 egg yolks", "egg yolk"),
+    ("grated parmigiano reggiano", "parmesan"),
+    ("jalapeño", "jalapeno"),
+    ("parsely", "parsley"),
+    ("unicorn dust", None),
+    # Vision labels
+    ("Food", None),
+    ("Produce", None),
+    ("Natural foods", None),
+    ("Vegetable", None),
+    ("Leaf vegetable", None),
+    ("Staple food", None),
+    ("Tableware", None),
+    ("Recipe", None),
+    ("Plum tomato", "tomato"),
+    ("Bell pepper", "bell pepper"),
+    ("Granny Smith", "apple"),
+    ("Spring onion", "green onion"),
+    ("Chicken meat", "chicken"),
+]
+
+IMAGENET_CASES = [
+    ("Granny_Smith", "apple"),
+    ("hen-of-the-woods", "maitake mushroom"),
+    ("French_loaf", "baguette"),
+    ("king_crab", "crab"),
+    ("teapot", None),
+    ("refrigerator", None),
+    ("mixing_bowl", None),
+    ("gyromitra", None),
+    ("carbonara", None),
+]
+
+OLD_FOOD_WORDS = ['food', 'ingredient', 'fruit', 'vegetable', 'meat', 'dairy', 'grain', 'spice', 'herb']
+
+
+def is_food_related(label):
+    # The check the dictionary replaced
+    return any(word in label.lower() for word in OLD_FOOD_WORDS)
+
+
+def linear_scan(aliases, text):
+    key = f" {_key(text)} "
+    best = None
+    for alias, canonical in aliases:
+        if f" {alias} " in key and (best is None or len(alias) > len(best[0])):
+            best = (alias, canonical)
+    return best and best[1]
+
+
+def per_name_us(work, names, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for name in names:
+            work(name)
+    return (time.perf_counter() - started) / (repeat * len(names)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    ok = True
+    for text, expected in CASES:
+        got = ingredient_dictionary.resolve(text)
+        if got != expected:
+            ok = False
+            print(f"MISMATCH {text!r}: expected {expected!r}, got {got!r}")
+    for label, expected in IMAGENET_CASES:
+        got = ingredient_dictionary.imagenet_ingredient(label)
+        if got != expected:
+            ok = False
+            print(f"MISMATCH ImageNet {label!r}: expected {expected!r}, got {got!r}")
+    print(f"accuracy: {len(CASES) + len(IMAGENET_CASES)} cases {'OK' if ok else 'FAILED'}")
+
+    vision = [(text, expected) for text, expected in CASES[CASES.index(("Food", None)):]]
+    old_right = sum(is_food_related(text) == (expected is not None) for text, expected in vision)
+    new_right = sum((ingredient_dictionary.resolve(text) is not None) == (expected is not None) for text, expected in vision)
+    print(f"Vision labels kept correctly: substring check {old_right}/{len(vision)}, dictionary {new_right}/{len(vision)}")
+
+    started = time.perf_counter()
+    dictionary = IngredientDictionary(CANONICAL_INGREDIENTS, IMAGENET_FOODS)
+    build_ms = (time.perf_counter() - started) * 1000
+    stats = dictionary.stats()
+    print(f"built {stats['ingredients']} ingredients, {stats['aliases']} aliases in {build_ms:.1f} ms")
+
+    names = [text for text, _ in CASES]
+    aliases = [(key, canonical) for key, canonical in dictionary._aliases.items()]
+    scan_us = per_name_us(lambda name: linear_scan(aliases, name), names, max(1, args.repeat // 20))
+
+    def cold(name):
+        dictionary.resolve.cache_clear()
+        dictionary.resolve(name)
+    cold_us = per_name_us(cold, names, args.repeat)
+    dictionary.resolve.cache_clear()
+    for name in names:
+        dictionary.resolve(name)
+    memo_us = per_name_us(dictionary.resolve, names, args.repeat * 10)
+    print(f"per name: linear scan {scan_us:8.2f} us | cold {cold_us:6.2f} us | memoized {memo_us:5.3f} us")
+
+    for label, texts in (
+        ("exact", ["Tomatoes", "Aubergine", "scallions"]),
+        ("trie", ["2 large ripe Roma tomatoes", "3 tbsp extra virgin olive oil", "salt and pepper to taste"]),
+        ("fuzzy", ["tomatoe", "brocoli florets", "parsely"]),
+        ("no match", ["unicorn dust", "Natural foods", "Tableware"]),
+    ):
+        print(f"{label:>10} cold: {per_name_us(cold, texts, args.repeat):6.2f} us")
+
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
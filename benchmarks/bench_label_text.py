@@ -0,0 +1,169 @@
+"""Amount and expiry-date extraction from OCR text: per-label regexes vs one combined pass.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_label_text --documents 5000
+
+A corpus of synthetic receipts and package labels is generated: 3-15 item lines with
+quantities in mixed unit spellings and dates in ISO, US, European, month-name and month/year
+forms, some after "BEST BEFORE" / "USE BY" / "EXP" keywords. Each document's expected amounts and
+expiration date are known.
+
+    per label   the old extraction: a regex compiled per label for its amount, then four date
+                patterns tried one after another, parsed with "%Y-%m-%d" only
+    one pass    scan_label_text: a single precompiled pattern, one scan per document
+
+Both extract amounts for every item name the labels would report, and the expiry date.
+"""
+import argparse
+import random
+import re
+import time
+from datetime import date, datetime, timedelta
+
+from app.services.label_text import scan_label_text
+
+ITEMS = ["tomatoes", "milk", "cheddar", "spaghetti", "olive oil", "flour", "sugar", "butter", "rice",
+         "chicken breast", "greek yogurt", "basil", "carrots", "onions", "apples"]
+UNITS = ["g", "G", "kg", "KG", "ml", "L", "l", "oz", "lb", "lbs", "grams", "cups", "pcs"]
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+EXPIRY_WORDS = ["BEST BEFORE", "Use by:", "EXP", "Best by", "BB"]
+
+
+def format_date(day: date, style: str) -> str:
+    if style == "iso":
+        return day.isoformat()
+    if style == "us":
+        return day.strftime("%m/%d/%Y")
+    if style == "eu":
+        return day.strftime("%d.%m.%Y")
+    if style == "eu_short":
+        return day.strftime("%d/%m/%y")
+    if style == "month_name":
+        return f"{MONTH_NAMES[day.month - 1]} {day.day}, {day.year}"
+    return f"{day.day} {MONTH_NAMES[day.month - 1].upper()} {day.year}"
+
+
+def make_document(rng: random.Random):
+    # -> (text, locale, [(item, "qty unit")], expiration date)
+    locale = rng.choice(["en_US", "en_GB", "de_DE"])
+    date_styles = ["iso", "month_name", "day_month"] + (["us"] if locale == "en_US" else ["eu", "eu_short"])
+    purchased = date(2025, 1, 1) + timedelta(days=rng.randrange(300))
+    expires = purchased + timedelta(days=rng.randrange(2, 200))
+    lines = [rng.choice(["FRESHMART", "Corner Grocer", "BIO MARKT"]),
+             f"{format_date(purchased, rng.choice(date_styles))} {rng.randrange(24):02d}:{rng.randrange(60):02d}"]
+    amounts = []
+    for item in rng.sample(ITEMS, rng.randrange(3, min(15, len(ITEMS)) + 1)):
+        quantity = rng.choice([str(rng.randrange(1, 1000)), f"{rng.randrange(1, 5)}.{rng.randrange(10)}"])
+        unit = rng.choice(UNITS)
+        price = f"{rng.randrange(1, 20)}.{rng.randrange(100):02d}"
+        if rng.random() < 0.5:
+            lines.append(f"{item.upper()} {quantity} {unit} {price}")
+        else:
+            lines.append(f"{quantity}{rng.choice(['', ' '])}{unit} {item} {price}")
+        amounts.append((item, f"{quantity} {unit}".lower().replace(" ", "")))
+    lines.append(f"{rng.choice(EXPIRY_WORDS)} {format_date(expires, rng.choice(date_styles))}")
+    lines.append(f"TOTAL {rng.randrange(5, 200)}.{rng.randrange(100):02d}")
+    return "\n".join(lines), locale, amounts, expires
+
+
+def old_extract_amount(text, ingredient):
+    pattern = r'(\d+(\.\d+)?)\s*(g|kg|ml|l|oz|lb|cup|tbsp|tsp)\s*' + re.escape(ingredient)
+    match = re.search(pattern, text, re.IGNORECASE)
+    return match.group(0) if match else ""
+
+
+def old_extract_expiration_date(text):
+    date_patterns = [
+        r'\d{1,2}/\d{1,2}/\d{2,4}',
+        r'\d{1,2}-\d{1,2}-\d{2,4}',
+        r'\d{4}-\d{2}-\d{2}',
+        r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}'
+    ]
+    for pattern in date_patterns:
+        match = re.search(pattern, text)
+        if match:
+            try:
+                return datetime.strptime(match.group(0), "%Y-%m-%d").strftime("%Y-%m-%d")
+            except ValueError:
+                pass
+    return ""
+
+
+def old_extract(document):
+    text, _, amounts, _ = document
+    found = {item: old_extract_amount(text, item) for item, _ in amounts}
+    return found, old_extract_expiration_date(text)
+
+
+def new_extract(document):
+    text, locale, amounts, _ = document
+    scanned = scan_label_text(text, locale)
+    by_name = {}
+    for item in scanned.amounts:
+        by_name.setdefault(item.name, item.text)
+    found = {item: by_name.get(item, "") for item, _ in amounts}
+    return found, scanned.expiration_date.isoformat() if scanned.expiration_date else ""
+
+
+def score(extract, corpus):
+    amounts_right = amounts_total = dates_right = 0
+    for document in corpus:
+        found, expires = extract(document)
+        for item, expected in document[2]:
+            amounts_total += 1
+            # The old extraction returned the name with the quantity ("500 g tomatoes")
+            amounts_right += found[item].lower().replace(" ", "").startswith(expected)
+        dates_right += expires == document[3].isoformat()
+    return amounts_right / amounts_total, dates_right / len(corpus)
+
+
+def throughput(extract, corpus, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for document in corpus:
+            extract(document)
+    return len(corpus) * repeat / (time.perf_counter() - started)
+
+
+def check(label, ok):
+    print(f"{'ok' if ok else 'FAIL':>6}  {label}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    corpus = [make_document(rng) for _ in range(args.documents)]
+    characters = sum(len(document[0]) for document in corpus)
+    print(f"{len(corpus)} documents, {characters / len(corpus):.0f} characters each on average\n")
+
+    ok = True
+    ok &= check("US order by locale", scan_label_text("exp 05/06/2025", "en_US").expiration_date == date(2025, 5, 6))
+    ok &= check("day first elsewhere", scan_label_text("exp 05/06/2025", "de_DE").expiration_date == date(2025, 6, 5))
+    ok &= check("impossible month swaps", scan_label_text("25/12/2024", "en_US").dates == [date(2024, 12, 25)])
+    ok &= check("month/year is month end", scan_label_text("EXP 02/2028").expiration_date == date(2028, 2, 29))
+    ok &= check("keyword beats later date", scan_label_text(
+        "USE BY 2025-03-01\nprinted 2025-04-01").expiration_date == date(2025, 3, 1))
+    ok &= check("receipt amounts", [(item.amount, item.unit, item.name) for item in scan_label_text(
+        "TOMATOES 1.2 KG 3.49\n500g spaghetti 1.10").amounts] == [(1.2, "kg", "tomatoes"), (500.0, "g", "spaghetti")])
+
+    rows = []
+    for label, extract in (("per label", old_extract), ("one pass", new_extract)):
+        amounts, dates = score(extract, corpus)
+        rate = throughput(extract, corpus, args.repeat)
+        rows.append(rate)
+        print(f"{label:>10}: {rate:8.0f} docs/s | amounts found {amounts:6.1%} | expiry dates {dates:6.1%}")
+    print(f"\none pass is {rows[1] / rows[0]:.1f}x the per-label throughput")
+    ok &= check("one pass: thousands of documents per second", rows[1] >= 1000)
+    ok &= check("one pass finds every expiry date", score(new_extract, corpus)[1] == 1.0)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""Per-user pantry cache: correctness after writes, stale-while-revalidate, and read cost.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_pantry_cache --users 2000 --ingredients 80000 --requests 20000
+
+Checks, on a generated SQLite database:
+
+    write-through   after each write path (add, update, owner change, delete, use, confirm,
+                    bulk create / update / delete, mark cooked) the next read equals the table
+    stale           a change made behind the cache's back is served stale once, then refreshed
+                    in the background; a refresh that finds the same version skips the rows
+    shared tier     a second worker's cache reuses the first one's read through the SQLite tier
+
+Then times pantry reads (a miss reads the version and the rows, a hit reads nothing) and
+runs a mixed workload: users picked from a Zipf distribution, a share of requests writing,
+every read compared with the table. Reports the hit ratio and how stale served entries were.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ["PANTRY_CACHE_PATH"] = os.path.join(_tmp.name, "pantry_cache.sqlite3")
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import SQLiteCacheBackend
+from app.db.database import create_async_db_engine, create_db_engine
+from app.models.ingredient import Ingredient
+from app.models.user import User
+from app.schemas.ingredient import IngredientBulkUpdate, IngredientCreate
+from app.services import ingredient_service
+from app.services.ingredient_service import (
+    INGREDIENT_FIELDS, PantryCache, _load_pantry, add_ingredient, add_ingredient_async, bulk_create_ingredients,
+    bulk_delete_ingredients, bulk_update_ingredients, consume_ingredient, delete_ingredient, get_pantry,
+    get_pantry_async, update_ingredient,
+)
+from app.services.user_recipe_service import RecipeRequirement, mark_recipe_cooked
+from benchmarks.bench_expiration_scan import TODAY, generate_database
+
+
+def table_rows(db, user_id):
+    rows = db.execute(
+        select(*(getattr(Ingredient, field) for field in INGREDIENT_FIELDS))
+        .where(Ingredient.user_id == user_id).order_by(Ingredient.id)
+    ).all()
+    return [dict(zip(INGREDIENT_FIELDS, row)) for row in rows]
+
+
+def use_cache(**options):
+    cache = PantryCache(**options)
+    ingredient_service.pantry_cache = cache
+    return cache
+
+
+def wait_for_refreshes(cache, timeout_s=5.0):
+    deadline = time.time() + timeout_s
+    while cache.stats()["refreshing"] and time.time() < deadline:
+        time.sleep(0.001)
+
+
+def check(label, ok):
+    print(f"{'ok' if ok else 'FAIL':>6}  {label}")
+    return ok
+
+
+def check_write_paths(engine, async_engine, user_id, other_user_id):
+    use_cache(shared=SQLiteCacheBackend(os.environ["PANTRY_CACHE_PATH"]))
+    ok = True
+    with Session(engine) as db:
+        def fresh(label):
+            get_pantry(db, user_id)
+            get_pantry(db, other_user_id)
+            db.expire_all()
+            return check(label, get_pantry(db, user_id).items == table_rows(db, user_id)
+                         and get_pantry(db, other_user_id).items == table_rows(db, other_user_id))
+
+        ok &= fresh("first read")
+        created = add_ingredient(db, IngredientCreate(name="flour", amount=500, unit="g", user_id=user_id))
+        ok &= fresh("add")
+        update_ingredient(db, created.id, IngredientCreate(name="bread flour", amount=450, unit="g", user_id=None))
+        ok &= fresh("update")
+        update_ingredient(db, created.id, IngredientCreate(name="bread flour", amount=450, unit="g",
+                                                           user_id=other_user_id))
+        ok &= fresh("update moving the item to another user")
+        delete_ingredient(db, created.id)
+        ok &= fresh("delete")
+        item_id = get_pantry(db, user_id).items[0]["id"]
+        consume_ingredient(db, item_id, 0.25)
+        ok &= fresh("use")
+        items, _ = bulk_create_ingredients(db, [
+            IngredientCreate(name=f"item {i}", amount=2, unit="piece", user_id=user_id) for i in range(5)
+        ])
+        ok &= fresh("bulk create")
+        bulk_update_ingredients(db, [IngredientBulkUpdate(id=items[0]["id"], amount=1),
+                                     IngredientBulkUpdate(id=items[1]["id"], user_id=other_user_id)])
+        ok &= fresh("bulk update")
+        bulk_delete_ingredients(db, [items[2]["id"], items[3]["id"]])
+        ok &= fresh("bulk delete")
+        mark_recipe_cooked(db, user_id, 1, [RecipeRequirement("item 4", 1, "piece")])
+        ok &= fresh("mark cooked")
+
+    async def confirm():
+        async with AsyncSession(async_engine) as db:
+            await get_pantry_async(db, user_id)
+            await add_ingredient_async(db, IngredientCreate(name="basil", amount=1, unit="bunch", user_id=user_id))
+            return (await get_pantry_async(db, user_id)).items
+    confirmed = asyncio.run(confirm())
+    with Session(engine) as db:
+        ok &= check("confirm (async)", confirmed == table_rows(db, user_id))
+    return ok
+
+
+def check_stale_while_revalidate(engine, user_id):
+    cache = use_cache(fresh_s=0.05, stale_s=60.0)
+    ok = True
+    with Session(engine) as db:
+        before = get_pantry(db, user_id)
+        # Written behind the cache's back, as another worker or a migration would
+        db.execute(update(Ingredient).where(Ingredient.id == before.items[0]["id"]).values(amount=12345.0))
+        db.execute(update(User).where(User.id == user_id).values(pantry_version=User.pantry_version + 1))
+        db.commit()
+        ok &= check("fresh entry served as is", get_pantry(db, user_id) is before)
+        time.sleep(0.06)
+        served = get_pantry(db, user_id)
+        ok &= check("stale entry served once", served.items == before.items)
+        wait_for_refreshes(cache)
+        refreshed = get_pantry(db, user_id)
+        ok &= check("then refreshed in the background", refreshed.items == table_rows(db, user_id)
+                    and refreshed.version == before.version + 1)
+        time.sleep(0.06)
+        get_pantry(db, user_id)
+        wait_for_refreshes(cache)
+        stats = cache.stats()
+        ok &= check("unchanged version skips the rows", stats["revalidated_unchanged"] == 1 and stats["loads"] == 2)
+        add_ingredient(db, IngredientCreate(name="salt", amount=1, unit="kg", user_id=user_id))
+        ok &= check("read after write is current", get_pantry(db, user_id).items == table_rows(db, user_id))
+    return ok
+
+
+def check_shared_tier(engine, user_id):
+    path = os.path.join(_tmp.name, "shared.sqlite3")
+    first = PantryCache(shared=SQLiteCacheBackend(path))
+    second = PantryCache(shared=SQLiteCacheBackend(path))
+    ok = True
+    with Session(engine) as db:
+        ingredient_service.pantry_cache = first
+        get_pantry(db, user_id)
+        ingredient_service.pantry_cache = second
+        pantry = get_pantry(db, user_id)
+        ok &= check("second worker hits the shared tier", second.stats()["shared_hits"] == 1
+                    and second.stats()["loads"] == 0 and pantry.items == table_rows(db, user_id))
+        ingredient_service.pantry_cache = first
+        add_ingredient(db, IngredientCreate(name="pepper", amount=1, unit="jar", user_id=user_id))
+        ok &= check("a write removes the shared entry", second.shared.get(f"pantry:{user_id}") is None)
+    return ok
+
+
+def read_rate(engine, user_ids, cached):
+    cache = use_cache()
+    with Session(engine) as db:
+        started = time.perf_counter()
+        for user_id in user_ids:
+            if cached:
+                get_pantry(db, user_id)
+            else:
+                _load_pantry(db, user_id)
+            db.rollback()
+        elapsed = time.perf_counter() - started
+    return len(user_ids) / elapsed, cache.stats()
+
+
+def mixed_workload(engine, num_users, num_requests, write_share, zipf_s, fresh_s, seed):
+    rng = random.Random(seed)
+    weights = [1 / rank ** zipf_s for rank in range(1, num_users + 1)]
+    ranked = list(range(1, num_users + 1))
+    rng.shuffle(ranked)
+    picks = rng.choices(ranked, weights, k=num_requests)
+    cache = use_cache(fresh_s=fresh_s, stale_s=60.0)
+    wrong = 0
+    with Session(engine) as db:
+        started = time.perf_counter()
+        for user_id in picks:
+            if rng.random() < write_share:
+                pantry = get_pantry(db, user_id)
+                if pantry.items and rng.random() < 0.5:
+                    consume_ingredient(db, rng.choice(pantry.items)["id"], 0.1)
+                else:
+                    add_ingredient(db, IngredientCreate(name="item", amount=1, unit="piece", user_id=user_id))
+                continue
+            pantry = get_pantry(db, user_id)
+            db.rollback()
+            # Every write here goes through a write path, so nothing served may differ from the table
+            wrong += pantry.items != table_rows(db, user_id)
+            db.rollback()
+        elapsed = time.perf_counter() - started
+    wait_for_refreshes(cache)
+    return num_requests / elapsed, wrong, cache.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--ingredients", type=int, default=80000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--write-share", type=float, default=0.05)
+    parser.add_argument("--zipf", type=float, default=1.1)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    path = os.path.join(_tmp.name, "pantry.db")
+    generate_database(path, args.users, args.ingredients, seed=args.seed)
+    url = f"sqlite:///{path}"
+    engine = create_db_engine(url)
+    async_engine = create_async_db_engine(url)
+    print(f"{args.users} users, {args.ingredients / args.users:.0f} ingredients each on average (today {TODAY})\n")
+
+    ok = check_write_paths(engine, async_engine, 1, 2)
+    ok &= check_stale_while_revalidate(engine, 3)
+    ok &= check_shared_tier(engine, 4)
+    asyncio.run(async_engine.dispose())
+
+    rng = random.Random(args.seed)
+    user_ids = [rng.randint(1, args.users) for _ in range(min(args.requests, 5000))]
+    uncached, _ = read_rate(engine, user_ids, cached=False)
+    use_cache()
+    cached, stats = read_rate(engine, user_ids * 4, cached=True)
+    print(f"\nreads: uncached {uncached:8.0f}/s | cached {cached:8.0f}/s ({cached / uncached:.0f}x), "
+          f"hit ratio {stats['hit_ratio']:.1%}")
+
+    for fresh_s in (2.0, 0.005):
+        rate, wrong, stats = mixed_workload(engine, args.users, args.requests, args.write_share, args.zipf,
+                                            fresh_s, args.seed)
+        print(f"mixed, fresh {fresh_s:g} s: {rate:7.0f} req/s | hit ratio {stats['hit_ratio']:6.1%} "
+              f"(stale {stats['stale_hits']}) | revalidations {stats['revalidations']} "
+              f"({stats['revalidated_unchanged']} unchanged) | stale served mean "
+              f"{stats['stale_served_mean_age_s'] * 1000:.1f} ms, max {stats['stale_served_max_age_s'] * 1000:.1f} ms "
+              f"| wrong reads {wrong}")
+        ok &= check(f"fresh {fresh_s:g} s: no read differs from the table", wrong == 0)
+    ok &= check("cached reads are faster", cached > uncached * 2)
+    engine.dispose()
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
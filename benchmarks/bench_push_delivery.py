@@ -0,0 +1,84 @@
+"""Expiration notification delivery through a fake FCM transport with simulated round-trip latency.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_push_delivery --ingredients 50000 --latency-ms 20
+
+Compares one messaging.send per expiring ingredient against per-user digests sent with
+send_each in chunks, counting transport calls, retries and pruned tokens.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.services.expiration_scan import iter_expiring_by_user, run_expiration_digest
+from app.services.push_delivery import PushDelivery, PushMessage
+from benchmarks.bench_expiration_scan import NOTICE_DAYS, TODAY, generate_database
+from tests.fakes import FakeMessagingTransport
+
+
+def legacy_delivery(db, transport):
+    # What the job did before: one synchronous send per expiring ingredient
+    for _, fcm_token, items in iter_expiring_by_user(db, TODAY + timedelta(days=NOTICE_DAYS)):
+        for name, expiration_date in items:
+            message = PushMessage(fcm_token, "Ingredient Expiring Soon",
+                                  f"{name} will expire in {(expiration_date - TODAY).days} days.")
+            transport.send(message)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=5_000)
+    parser.add_argument("--ingredients", type=int, default=50_000)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--invalid-fraction", type=float, default=0.02)
+    parser.add_argument("--transient-fraction", type=float, default=0.01)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite3")
+        generate_database(path, args.users, args.ingredients)
+        engine = create_engine(f"sqlite:///{path}")
+
+        rng = random.Random(2)
+        tokens = [f"token-{user_id}" for user_id in range(1, args.users + 1)]
+        invalid = set(rng.sample(tokens, int(len(tokens) * args.invalid_fraction)))
+        transient = {token: 1 for token in rng.sample(tokens, int(len(tokens) * args.transient_fraction))}
+
+        transport = FakeMessagingTransport(latency_s=args.latency_ms / 1000)
+        with Session(engine) as db:
+            started = time.perf_counter()
+            legacy_delivery(db, transport)
+            elapsed = time.perf_counter() - started
+        print(
+            f"   legacy: {len(transport.delivered)} pushes, {transport.send_calls} send calls, "
+            f"{elapsed:7.2f} s, {len(transport.delivered) / elapsed:8.0f} pushes/s"
+        )
+
+        transport = FakeMessagingTransport(latency_s=args.latency_ms / 1000, invalid_tokens=invalid,
+                                           transient_failures=transient)
+        delivery = PushDelivery(transport, max_concurrency=args.concurrency, backoff=args.latency_ms / 1000)
+        with Session(engine) as db:
+            started = time.perf_counter()
+            result = run_expiration_digest(db, delivery, today=TODAY)
+            elapsed = time.perf_counter() - started
+            remaining = db.scalar(select(func.count()).select_from(User).where(User.fcm_token.in_(invalid)))
+        print(
+            f"   digest: {result['sent']} pushes covering {result['ingredients']} ingredients, "
+            f"{transport.send_calls} send calls, {result['retried']} retried, "
+            f"{result['pruned_tokens']} tokens pruned ({remaining} invalid left), "
+            f"{elapsed:7.2f} s, {result['users'] / elapsed:8.0f} users/s"
+        )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
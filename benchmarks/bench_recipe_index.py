@@ -0,0 +1,71 @@
+"""Build, query and snapshot timings for the local recipe index on a synthetic catalog.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_recipe_index --recipes 100000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from app.services.recipe_index import RecipeIndex
+
+
+def synthetic_catalog(num_recipes, vocabulary_size, seed=0):
+    rng = random.Random(seed)
+    vocabulary = [f"ingredient {i}" for i in range(vocabulary_size)]
+    # Zipf-like popularity: a few staples (salt, oil, onion...) appear in most recipes
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+    for recipe_id in range(1, num_recipes + 1):
+        names = set(rng.choices(vocabulary, weights=weights, k=rng.randint(6, 16)))
+        yield recipe_id, sorted(names)
+
+
+def percentile(timings, fraction):
+    return sorted(timings)[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--vocabulary", type=int, default=2_000)
+    parser.add_argument("--pantry-size", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    catalog = list(synthetic_catalog(args.recipes, args.vocabulary))
+    index = RecipeIndex()
+    started = time.perf_counter()
+    for recipe_id, names in catalog:
+        index.add_recipe(recipe_id, names, f"Recipe {recipe_id}")
+    print(f"build: {args.recipes} recipes in {time.perf_counter() - started:.2f} s")
+
+    rng = random.Random(1)
+    vocabulary = [f"ingredient {i}" for i in range(args.vocabulary)]
+    timings = []
+    for _ in range(args.queries):
+        # Pantries mix staples with a long tail of less common items
+        pantry = rng.sample(vocabulary[:50], args.pantry_size // 2) + rng.sample(vocabulary, args.pantry_size // 2)
+        started = time.perf_counter()
+        index.rank(pantry, limit=10)
+        timings.append(time.perf_counter() - started)
+    print(
+        f"rank: pantry of {args.pantry_size}, p50 {percentile(timings, 0.5) * 1000:.2f} ms, "
+        f"p99 {percentile(timings, 0.99) * 1000:.2f} ms"
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recipe_index.json")
+        started = time.perf_counter()
+        index.save_snapshot(path)
+        saved = time.perf_counter() - started
+        started = time.perf_counter()
+        RecipeIndex().load_snapshot(path)
+        loaded = time.perf_counter() - started
+        print(f"snapshot: save {saved:.2f} s, load {loaded:.2f} s, {os.path.getsize(path) / 2**20:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
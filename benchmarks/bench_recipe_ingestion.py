@@ -0,0 +1,181 @@
+"""Recipe link import against a local fixture site: one page at a time vs one concurrent batch.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_recipe_ingestion --latency-ms 50 --pages 16
+
+A threaded HTTP server plays two recipe sites (127.0.0.1 and localhost on the same port), each
+answer delayed by --latency-ms. --pages fresh recipes, split across the two hosts, are imported
+one request per URL and then as one batch; the batch must import every page without any site
+seeing more than RECIPE_FETCH_PER_HOST requests at once, or the script exits non-zero.
+
+Deduplication, conditional re-imports, per-page failures and the address checks are covered by
+tests/test_recipe_ingestion.py.
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.db import database
+from app.db.database import Base, create_async_db_engine, create_db_engine
+from app.models import ingredient, job_run, user_recipe  # noqa: F401  (registers the related tables)
+from app.models.canonical_ingredient import CanonicalIngredient
+from app.models.recipe import Recipe
+from app.models.recipe_ingredient import RecipeIngredient
+from app.models.saved_recipe import SavedRecipe
+from app.models.user import User
+from app.services.recipe_ingestion import RecipeFetcher, import_recipe_links
+
+MAX_BYTES = 256 * 1024
+
+
+def recipe_page(node, canonical=None, filler=0):
+    head = f'<link rel="canonical" href="{canonical}">' if canonical else ""
+    return (
+        f"<!doctype html><html><head><title>x</title>{head}"
+        f'<script type="application/ld+json">{json.dumps(node)}</script></head>'
+        f"<body><p>{'Lorem ipsum dolor sit amet. ' * filler}</p></body></html>"
+    ).encode()
+
+
+def numbered(i):
+    return {"@context": "https://schema.org", "@type": "Recipe", "name": f"Fixture Salad {i}",
+            "recipeIngredient": [f"{i} tomatoes", "1 cucumber", f"{i + 1} tbsp olive oil"],
+            "recipeInstructions": [f"Chop everything for salad {i}.", "Dress and serve."]}
+
+
+class FixtureSite:
+    def __init__(self, latency_s):
+        self.latency_s = latency_s
+        self.pages = {}
+        self.lock = threading.Lock()
+        self.in_flight = Counter()
+        self.max_in_flight = Counter()
+        self.statuses = Counter()
+        self.requests = 0
+
+    def publish(self, path, body, version="v1"):
+        self.pages[path] = (body, f'"{version}"', "Sat, 17 Oct 2026 10:00:00 GMT")
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                host = self.headers.get("Host", "").split(":")[0]
+                with site.lock:
+                    site.requests += 1
+                    site.in_flight[host] += 1
+                    site.max_in_flight[host] = max(site.max_in_flight[host], site.in_flight[host])
+                try:
+                    time.sleep(site.latency_s)
+                    self.respond()
+                finally:
+                    with site.lock:
+                        site.in_flight[host] -= 1
+
+            def respond(self):
+                page = site.pages.get(self.path.split("?")[0])
+                if page is None:
+                    return self.send(404, b"not found")
+                body, etag, last_modified = page
+                if self.headers.get("If-None-Match") == etag:
+                    return self.send(304, b"", etag=etag, last_modified=last_modified)
+                self.send(200, body, etag=etag, last_modified=last_modified)
+
+            def send(self, status, body, etag=None, last_modified=None):
+                site.statuses[status] += 1
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                if etag:
+                    self.send_header("ETag", etag)
+                    self.send_header("Last-Modified", last_modified)
+                if status != 304:
+                    self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+
+        return Handler
+
+
+async def run(args):
+    site = FixtureSite(args.latency_ms / 1000)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), site.handler())
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    a, b = f"http://127.0.0.1:{port}", f"http://localhost:{port}"
+
+    for i in range(args.pages * 2):
+        site.publish(f"/salads/{i}", recipe_page(numbered(i + 1)))
+
+    path = os.path.join(tempfile.mkdtemp(), "ingestion.db")
+    url = f"sqlite:///{path}"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Recipe.__table__, SavedRecipe.__table__, CanonicalIngredient.__table__,
+        RecipeIngredient.__table__,
+    ])
+    with engine.begin() as connection:
+        user_a = connection.execute(insert(User).values(email="a@example.com").returning(User.id)).scalar_one()
+    # Imported pages are stored through the worker-thread session
+    database.SessionLocal = sessionmaker(engine)
+    async_engine = create_async_db_engine(url)
+    Session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    fetcher = RecipeFetcher(per_host=settings.RECIPE_FETCH_PER_HOST, max_bytes=MAX_BYTES)
+
+    async def import_links(user_id, urls):
+        async with Session() as db:
+            return await import_recipe_links(db, user_id, urls, fetcher=fetcher)
+
+    urls = [f"{(a, b)[i % 2]}/salads/{i}" for i in range(args.pages)]
+    started = time.perf_counter()
+    for page_url in urls:
+        await import_links(user_a, [page_url])
+    sequential = time.perf_counter() - started
+    urls = [f"{(a, b)[i % 2]}/salads/{i}" for i in range(args.pages, args.pages * 2)]
+    started = time.perf_counter()
+    batch = await import_links(user_a, urls)
+    concurrent = time.perf_counter() - started
+    ok = all(r["status"] == "created" for r in batch) \
+        and max(site.max_in_flight.values()) <= settings.RECIPE_FETCH_PER_HOST
+    print(f"{args.pages} pages at {args.latency_ms:.0f} ms latency: one per request {sequential * 1000:7.1f} ms, "
+          f"one batch {concurrent * 1000:7.1f} ms ({sequential / concurrent:.1f}x), "
+          f"at most {dict(site.max_in_flight)} requests per host at once")
+
+    await fetcher.aclose()
+    await async_engine.dispose()
+    server.shutdown()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--pages", type=int, default=16)
+    args = parser.parse_args()
+    # The fixture site lives on loopback, which real imports refuse
+    settings.RECIPE_FETCH_ALLOW_PRIVATE = True
+    if not asyncio.run(run(args)):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
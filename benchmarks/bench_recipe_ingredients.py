@@ -0,0 +1,177 @@
+""""Recipes containing X and Y" on growing catalogs: JSON column scan vs the recipe_ingredients index.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_recipe_ingredients --sizes 10000 100000 1000000
+
+Each catalog is generated into a temporary SQLite file: recipes with 6-12 ingredients drawn from a
+Zipf-distributed vocabulary, so "salt" and "onion" are everywhere and "saffron" is rare. The same
+ingredients are also written the old way, as a JSON list in a string column.
+
+    json scan   ingredients LIKE '%"x"%' AND ingredients LIKE '%"y"%' (what the old column allowed)
+    indexed     recipe_ids_containing: rarest ingredient drives, the others are index probes
+
+Both return the first page of 20 recipe ids, then every match, and must agree. Loading 100
+recipes with their ingredients is then timed with lazy loading (queries per recipe and per
+ingredient) and with load_recipes (selectinload), counting the statements each issues.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import Column, Integer, String, event, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.db.database import Base, create_db_engine
+from app.models.canonical_ingredient import CanonicalIngredient
+from app.models.recipe import Recipe
+from app.models.recipe_ingredient import RecipeIngredient
+from app.models.user import User
+from app.models import ingredient  # noqa: F401  (registers the tables User refers to)
+from app.services.recipe_catalog import load_recipes, recipe_ids_containing
+
+COMMON = ["salt", "onion", "garlic", "olive oil", "black pepper", "butter", "egg", "tomato", "sugar", "flour"]
+VOCABULARY_SIZE = 2000
+PAGE = 20
+QUERIES = [
+    ("common + common", ["salt", "onion"]),
+    ("common + mid", ["garlic", "basil"]),
+    ("common + rare", ["salt", "saffron"]),
+    ("three", ["tomato", "basil", "olive oil"]),
+]
+
+
+class LegacyRecipe(Base):
+    # The old shape: ingredient names JSON-encoded in one string column
+    __tablename__ = "bench_legacy_recipes"
+
+    id = Column(Integer, primary_key=True)
+    ingredients = Column(String)
+
+
+def vocabulary():
+    names = COMMON + [f"ingredient {i}" for i in range(len(COMMON), VOCABULARY_SIZE)]
+    names[60], names[1200] = "basil", "saffron"
+    return names
+
+
+def generate(engine, size, seed=7):
+    rng = np.random.default_rng(seed)
+    names = vocabulary()
+    weights = 1 / np.arange(1, len(names) + 1)
+    weights /= weights.sum()
+    with engine.begin() as connection:
+        connection.execute(insert(CanonicalIngredient), [{"id": i + 1, "name": name} for i, name in enumerate(names)])
+        for start in range(0, size, 10000):
+            count = min(10000, size - start)
+            recipes, legacy, rows = [], [], []
+            for recipe_id in range(start + 1, start + count + 1):
+                picks = list(dict.fromkeys(rng.choice(len(names), size=rng.integers(6, 13), p=weights)))
+                recipes.append({"id": recipe_id, "title": f"Recipe {recipe_id}"})
+                legacy.append({"id": recipe_id, "ingredients": json.dumps([names[i] for i in picks])})
+                rows.extend(
+                    {"recipe_id": recipe_id, "canonical_ingredient_id": int(i) + 1, "position": position,
+                     "text": names[i]}
+                    for position, i in enumerate(picks)
+                )
+            connection.execute(insert(Recipe), recipes)
+            connection.execute(insert(LegacyRecipe), legacy)
+            connection.execute(insert(RecipeIngredient), rows)
+        connection.execute(text("ANALYZE"))
+
+
+def legacy_ids(db, names, limit):
+    query = select(LegacyRecipe.id)
+    for name in names:
+        query = query.where(LegacyRecipe.ingredients.like(f'%{json.dumps(name)}%'))
+    return list(db.scalars(query.order_by(LegacyRecipe.id).limit(limit)))
+
+
+def timed(work, repeat):
+    result = work()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        work()
+    return result, (time.perf_counter() - started) / repeat * 1000
+
+
+def count_statements(engine):
+    counts = {"statements": 0}
+
+    def on_execute(*args):
+        counts["statements"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    return counts
+
+
+def run(size, repeat):
+    path = os.path.join(tempfile.mkdtemp(), "catalog.db")
+    engine = create_db_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[
+        User.__table__, Recipe.__table__, CanonicalIngredient.__table__, RecipeIngredient.__table__,
+        LegacyRecipe.__table__,
+    ])
+    started = time.perf_counter()
+    generate(engine, size)
+    with Session(engine) as db:
+        postings = db.scalar(select(text("count(*)")).select_from(RecipeIngredient))
+    print(f"\n{size:,} recipes, {postings:,} recipe_ingredients rows (generated in {time.perf_counter() - started:.1f} s)")
+
+    ok = True
+    with Session(engine) as db:
+        for label, names in QUERIES:
+            line = f"{label:>16} {'+'.join(names):<26}"
+            for limit in (PAGE, size):
+                legacy, legacy_ms = timed(lambda: legacy_ids(db, names, limit), max(1, repeat // 10))
+                indexed, indexed_ms = timed(lambda: recipe_ids_containing(db, names, limit), repeat)
+                ok &= legacy == indexed
+                line += (f" | {'first page' if limit == PAGE else f'all {len(indexed):>6,}'}: json scan {legacy_ms:7.2f} ms,"
+                         f" indexed {indexed_ms:6.2f} ms{'' if legacy == indexed else ' RESULTS DIFFER'}")
+            print(line)
+        plan = db.execute(text("EXPLAIN QUERY PLAN " + str(
+            select(RecipeIngredient.recipe_id).where(RecipeIngredient.canonical_ingredient_id == 1)
+            .order_by(RecipeIngredient.recipe_id).compile(compile_kwargs={"literal_binds": True})
+        ))).all()
+        print(f"{'plan':>16} {plan[0][-1]}")
+
+    ids = list(range(1, min(size, 100) + 1))
+    counts = count_statements(engine)
+
+    def names_of(recipes):
+        return [[item.canonical_ingredient.name for item in recipe.ingredients] for recipe in recipes]
+
+    for label, load in (
+        ("lazy", lambda db: names_of(db.scalars(select(Recipe).where(Recipe.id.in_(ids))))),
+        ("selectinload", lambda db: names_of(load_recipes(db, ids))),
+    ):
+        def work():
+            with Session(engine) as db:
+                load(db)
+        work()
+        counts["statements"] = 0
+        work()
+        statements = counts["statements"]
+        _, elapsed_ms = timed(work, 10)
+        print(f"{label:>16} {len(ids)} recipes with ingredients: {elapsed_ms:7.2f} ms, {statements} statements")
+    engine.dispose()
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    ok = True
+    for size in args.sizes:
+        ok &= run(size, args.repeat)
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
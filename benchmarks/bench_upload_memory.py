@@ -0,0 +1,168 @@
+"""Server memory while many large photos are uploaded at once: whole-body reads vs spooled uploads.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_upload_memory --uploads 32
+
+Each mode runs a uvicorn server in its own process with one endpoint doing what
+/api/v1/ingredients/upload does short of the model: take the upload, then preprocess it off the
+event loop.
+
+    legacy     await file.read() into bytes, no size cap or type check
+    streaming  UploadLimitMiddleware + read_upload: the spooled part is memory-mapped into the decoder
+
+A sampler thread in the server records peak resident memory, both anonymous (heap) and in total
+(which includes mapped page cache), while the client sends every upload concurrently. The
+streaming server is then sent an oversized upload, a non-image and an over-limit Content-Length,
+and must answer 413, 415 and 413.
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+
+import httpx
+
+from benchmarks.bench_image_preprocessing import make_photo
+
+PORT = 8765
+
+
+def memory_kb():
+    values = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon"):
+                values[key] = int(value.split()[0])
+    return values["VmRSS"], values["RssAnon"]
+
+
+def build_app(mode):
+    from fastapi import FastAPI, File, UploadFile
+    from app.core.config import settings
+    from app.core.uploads import UploadLimitMiddleware, read_upload
+    from app.services.image_preprocessing import preprocess_image
+
+    app = FastAPI()
+    if mode == "streaming":
+        app.add_middleware(UploadLimitMiddleware, max_bytes=settings.UPLOAD_MAX_REQUEST_BYTES)
+    peaks = {"rss": 0, "anon": 0}
+
+    def sample():
+        while True:
+            rss, anon = memory_kb()
+            peaks["rss"] = max(peaks["rss"], rss)
+            peaks["anon"] = max(peaks["anon"], anon)
+            time.sleep(0.002)
+
+    threading.Thread(target=sample, daemon=True).start()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        contents = await file.read() if mode == "legacy" else await read_upload(file)
+        pixels = await asyncio.to_thread(preprocess_image, contents)
+        return {"mean": float(pixels.mean())}
+
+    @app.post("/stats/reset")
+    async def reset():
+        rss, anon = memory_kb()
+        peaks.update(rss=rss, anon=anon)
+        return {"rss": rss, "anon": anon}
+
+    @app.get("/stats")
+    async def stats():
+        rss, anon = memory_kb()
+        return {"rss": rss, "anon": anon, "peak_rss": peaks["rss"], "peak_anon": peaks["anon"]}
+
+    return app
+
+
+async def wait_until_up(client):
+    for _ in range(200):
+        try:
+            await client.get("/stats")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def measure(mode, photo, uploads):
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_upload_memory", "--serve", mode])
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=120) as client:
+            await wait_until_up(client)
+            await client.post("/upload", files={"file": ("warmup.jpg", photo, "image/jpeg")})
+            baseline = (await client.post("/stats/reset")).json()
+
+            started = time.perf_counter()
+            responses = await asyncio.gather(*(
+                client.post("/upload", files={"file": (f"photo{i}.jpg", photo, "image/jpeg")}) for i in range(uploads)
+            ))
+            elapsed = time.perf_counter() - started
+            stats = (await client.get("/stats")).json()
+            failed = sum(response.status_code != 200 for response in responses)
+            rss_mb = (stats["peak_rss"] - baseline["rss"]) / 1024
+            anon_mb = (stats["peak_anon"] - baseline["anon"]) / 1024
+            print(f"{mode:>10}: {uploads} x {len(photo) / 2**20:.1f} MB in {elapsed:5.2f} s, {failed} failed, "
+                  f"peak RSS +{rss_mb:6.1f} MB (+{rss_mb / uploads:5.2f} MB/upload), "
+                  f"heap +{anon_mb:6.1f} MB (+{anon_mb / uploads:5.2f} MB/upload)")
+            if mode == "streaming":
+                return await check_limits(client)
+            return True
+    finally:
+        server.terminate()
+        server.wait()
+
+
+async def check_limits(client):
+    from app.core.config import settings
+    oversized = b"\xff\xd8\xff" + bytes(settings.UPLOAD_MAX_BYTES)
+    checks = {
+        "oversized file": ((await client.post("/upload", files={"file": ("big.jpg", oversized, "image/jpeg")}))
+                           .status_code, 413),
+        "not an image": ((await client.post("/upload", files={"file": ("doc.pdf", b"%PDF-1.4 " * 100, "image/jpeg")}))
+                         .status_code, 415),
+    }
+    # A declared length over the request cap is refused before any of the body is sent
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    writer.write(f"POST /upload HTTP/1.1\r\nHost: bench\r\nContent-Type: multipart/form-data; boundary=x\r\n"
+                 f"Content-Length: {settings.UPLOAD_MAX_REQUEST_BYTES + 1}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    writer.close()
+    checks["declared too long"] = (status, 413)
+    refused_ms = (time.perf_counter() - started) * 1000
+    ok = True
+    for name, (status, expected) in checks.items():
+        ok &= status == expected
+        print(f"{name:>20}: {status} (expected {expected})")
+    print(f"{'':>20}  declared-length refusal took {refused_ms:.1f} ms")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uploads", type=int, default=32)
+    parser.add_argument("--serve", choices=["legacy", "streaming"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        import uvicorn
+        uvicorn.run(build_app(args.serve), host="127.0.0.1", port=PORT, log_level="warning")
+        return
+
+    photo = make_photo()
+    ok = True
+    for mode in ("legacy", "streaming"):
+        ok &= asyncio.run(measure(mode, photo, args.uploads))
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
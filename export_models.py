@@ -0,0 +1,159 @@
+"""Export MobileNetV2 for the inference backends, so the API never downloads weights at runtime.
+
+    python export_models.py                                   # every backend and quantization, 224 and 160
+    python export_models.py --backend onnx --quantization int8 --calibration-dir photos/
+    python export_models.py --random-weights                  # offline: same network, untrained weights
+
+Writes to MODEL_DIR (see app/core/config.py):
+
+    mobilenet_v2_{size}.weights.h5          Keras weights, loaded by the keras backend instead of 'imagenet'
+    mobilenet_v2_{size}.{none,float16,int8}.tflite
+    mobilenet_v2_{size}.{none,int8}.onnx
+    imagenet_class_index.json               labels, so decoding needs neither TensorFlow nor a download
+
+int8 models are calibrated on --calibration-dir (real pantry photos give the best ranges); without
+one, synthetic images are used.
+"""
+import os
+
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import argparse
+import glob
+import json
+import shutil
+import tempfile
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.image_preprocessing import preprocess_into
+from app.services.inference_backends import BACKENDS, LABELS_FILE, QUANTIZATIONS, model_path
+
+
+def calibration_batch(size, directory, count):
+    batch = np.empty((count, size, size, 3), dtype=np.float32)
+    paths = sorted(glob.glob(os.path.join(directory, "*"))) if directory else []
+    if directory and not paths:
+        raise SystemExit(f"no images in {directory}")
+    if paths:
+        for i in range(count):
+            preprocess_into(paths[i % len(paths)], batch[i])
+        return batch
+    print("  no --calibration-dir: calibrating int8 on synthetic images")
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size] / size
+    for slot in batch:
+        base = rng.uniform(-1, 1, 3) * 0.5
+        slot[:] = base + np.stack([x, y, x * y], axis=-1) * rng.uniform(-0.5, 0.5, 3)
+        for _ in range(3):
+            cx, cy, r = rng.uniform(0.2, 0.8), rng.uniform(0.2, 0.8), rng.uniform(0.1, 0.3)
+            slot[(x - cx) ** 2 + (y - cy) ** 2 < r * r] = rng.uniform(-1, 1, 3)
+        slot += rng.normal(0, 0.03, slot.shape)
+    return np.clip(batch, -1, 1)
+
+
+def export_tflite(model, path, quantization, calibration):
+    import tensorflow as tf
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        # Integer weights and activations; input and output stay float so callers don't change
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: ([sample[np.newaxis]] for sample in calibration)
+    with open(path, "wb") as f:
+        f.write(converter.convert())
+
+
+def export_onnx(model, path, quantization, calibration, size):
+    import tensorflow as tf
+    import tf2onnx
+    signature = (tf.TensorSpec((None, size, size, 3), tf.float32, name="input"),)
+    if quantization == "none":
+        tf2onnx.convert.from_keras(model, input_signature=signature, opset=13, output_path=path)
+        return
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class Calibration(CalibrationDataReader):
+        def __init__(self):
+            self.samples = iter([{"input": sample[np.newaxis]} for sample in calibration])
+
+        def get_next(self):
+            return next(self.samples, None)
+
+    with tempfile.TemporaryDirectory() as directory:
+        float_path = os.path.join(directory, "float.onnx")
+        prepared_path = os.path.join(directory, "prepared.onnx")
+        tf2onnx.convert.from_keras(model, input_signature=signature, opset=13, output_path=float_path)
+        quant_pre_process(float_path, prepared_path)
+        # QDQ with per-channel int8 weights is what the ORT CPU kernels fuse best for convnets
+        quantize_static(prepared_path, path, Calibration(),
+                        quant_format=QuantFormat.QDQ, per_channel=True,
+                        activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+
+def export_labels(model_dir, random_weights):
+    path = os.path.join(model_dir, LABELS_FILE)
+    if random_weights:
+        # Untrained weights have no meaningful classes; placeholders keep decoding working offline
+        index = {str(i): [f"n{i:08d}", f"class_{i}"] for i in range(1000)}
+        with open(path, "w") as f:
+            json.dump(index, f)
+        return
+    import tensorflow as tf
+    source = tf.keras.utils.get_file(
+        LABELS_FILE,
+        "https://storage.googleapis.com/download.tensorflow.org/data/imagenet_class_index.json",
+        cache_subdir="models",
+    )
+    shutil.copyfile(source, path)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", choices=BACKENDS, action="append", help="default: all")
+    parser.add_argument("--quantization", choices=("none", "float16", "int8"), action="append",
+                        help="default: everything the backend supports")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[224, 160])
+    parser.add_argument("--model-dir", default=settings.MODEL_DIR)
+    parser.add_argument("--calibration-dir", help="photos used to calibrate int8 activation ranges")
+    parser.add_argument("--calibration-images", type=int, default=100)
+    parser.add_argument("--random-weights", action="store_true",
+                        help="untrained MobileNetV2 (nothing is downloaded); for benchmarks and CI only")
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    os.makedirs(args.model_dir, exist_ok=True)
+    for size in args.sizes:
+        if args.random_weights:
+            tf.keras.utils.set_random_seed(size)
+        model = tf.keras.applications.MobileNetV2(input_shape=(size, size, 3),
+                                                  weights=None if args.random_weights else 'imagenet')
+        model.save_weights(model_path(args.model_dir, size, "keras"))
+        calibration = None
+        for backend in args.backend or BACKENDS:
+            if backend == "keras":
+                continue
+            for quantization in args.quantization or QUANTIZATIONS[backend]:
+                if quantization not in QUANTIZATIONS[backend]:
+                    continue
+                if quantization == "int8" and calibration is None:
+                    calibration = calibration_batch(size, args.calibration_dir, args.calibration_images)
+                path = model_path(args.model_dir, size, backend, quantization)
+                if backend == "tflite":
+                    export_tflite(model, path, quantization, calibration)
+                else:
+                    export_onnx(model, path, quantization, calibration, size)
+                print(f"  {path}: {os.path.getsize(path) / 1e6:.1f} MB")
+        print(f"  {model_path(args.model_dir, size, 'keras')}")
+    export_labels(args.model_dir, args.random_weights)
+    print(f"exported to {args.model_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+
+def on_starting(server):
+    from app.core.config import settings
+
+    if settings.PRELOAD_MODELS:
+        from app.services.model_registry import registry
+
+        registry.preload()
+        server.log.info("Preloaded models: %s", registry.stats()["loaded"])
+        # Keep the preloaded objects out of the collector so forked workers
+        # don't touch (and copy) their pages during GC passes
+        gc.freeze()
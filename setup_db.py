@@ -2,6 +2,11 @@ from app.db.database import Base, engine
 from app.models.ingredient import Ingredient
 from app.models.recipe import Recipe
 from app.models.user import User
+from app.models.job_run import JobLock, JobRun
+from app.models.user_recipe import UserRecipe
+from app.models.saved_recipe import SavedRecipe
+from app.models.canonical_ingredient import CanonicalIngredient
+from app.models.recipe_ingredient import RecipeIngredient
 
 def setup_database():
     print("Creating database tables...")
@@ -0,0 +1,44 @@
+import io
+import os
+import tempfile
+
+# Settings are read at import time: keep every cache and database of the test run in a scratch
+# directory, and leave the scheduler off
+_scratch = tempfile.mkdtemp(prefix="vegetab-tests-")
+os.environ.setdefault("GOOGLE_CLOUD_VISION_CREDENTIALS", "test")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_scratch, 'app.db')}")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+os.environ.setdefault("RECOGNITION_CACHE_BACKEND", "none")
+os.environ.setdefault("SPOONACULAR_CACHE_BACKEND", "none")
+os.environ.setdefault("PANTRY_CACHE_BACKEND", "none")
+os.environ.setdefault("RECIPE_INDEX_SNAPSHOT_PATH", "")
+os.environ.setdefault("CUDA_VISIBLE_DEVICES", "-1")
+os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+import pytest
+from PIL import Image
+
+
+def make_image(color=(200, 40, 40), size=(64, 64), format="PNG") -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # A fresh SQLite database with every table, per test
+    from app.db.database import Base, create_db_engine
+    from app.models import canonical_ingredient, ingredient, job_run, recipe, recipe_ingredient, saved_recipe, user, user_recipe  # noqa: F401
+
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def messaging_transport():
+    from tests.fakes import FakeMessagingTransport
+
+    return FakeMessagingTransport()
@@ -0,0 +1,58 @@
+import threading
+import time
+from typing import List
+
+from app.services.push_delivery import PushMessage, SendResult
+
+
+class FakeSendError(Exception):
+    def __init__(self, code: str):
+        super().__init__(code)
+        self.code = code
+
+
+class FakeMessagingTransport:
+    """In-memory stand-in for FCM that counts calls and can simulate latency and failures.
+
+    Tokens in `invalid_tokens` always fail as unregistered; `rejected_tokens` maps a token to the
+    error code it always fails with; `transient_failures` maps a token to how many times it should
+    fail with UNAVAILABLE before succeeding.
+    """
+
+    def __init__(self, latency_s: float = 0.0, invalid_tokens=(), rejected_tokens=None,
+                 transient_failures=None, fail_calls: int = 0):
+        self.latency_s = latency_s
+        self.invalid_tokens = set(invalid_tokens)
+        self.rejected_tokens = dict(rejected_tokens or {})
+        self.transient_failures = dict(transient_failures or {})
+        self.fail_calls = fail_calls
+        self.send_calls = 0
+        self.batch_sizes = []
+        self.delivered = []
+        self._lock = threading.Lock()
+
+    def send(self, message: PushMessage) -> SendResult:
+        return self.send_each([message])[0]
+
+    def send_each(self, messages: List[PushMessage]) -> List[SendResult]:
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        with self._lock:
+            self.send_calls += 1
+            self.batch_sizes.append(len(messages))
+            if self.fail_calls > 0:
+                self.fail_calls -= 1
+                raise FakeSendError("UNAVAILABLE")
+            results = []
+            for message in messages:
+                if message.token in self.invalid_tokens:
+                    results.append(SendResult(False, FakeSendError("NOT_FOUND")))
+                elif message.token in self.rejected_tokens:
+                    results.append(SendResult(False, FakeSendError(self.rejected_tokens[message.token])))
+                elif self.transient_failures.get(message.token, 0) > 0:
+                    self.transient_failures[message.token] -= 1
+                    results.append(SendResult(False, FakeSendError("UNAVAILABLE")))
+                else:
+                    self.delivered.append(message)
+                    results.append(SendResult(True))
+            return results
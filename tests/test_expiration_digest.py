@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models.canonical_ingredient import CanonicalIngredient
+from app.models.ingredient import Ingredient
+from app.models.recipe import Recipe
+from app.models.recipe_ingredient import RecipeIngredient
+from app.models.user import User
+from app.services import recipe_suggestion_service
+from app.services.expiration_scan import run_expiration_digest
+from app.services.push_delivery import PushDelivery, SendResult
+from app.services.recipe_index import RecipeIndex
+from app.services.recipe_ranking import RecipeRankingEngine
+
+TODAY = date(2026, 1, 1)
+
+
+class CollectingTransport:
+    def __init__(self):
+        self.messages = []
+
+    def send_each(self, messages):
+        self.messages.extend(messages)
+        return [SendResult(True) for _ in messages]
+
+
+@pytest.fixture
+def ranking(monkeypatch):
+    # The job ranks against the process-wide index; give each test its own
+    index = RecipeIndex()
+    monkeypatch.setattr(recipe_suggestion_service, "recipe_index", index)
+    monkeypatch.setattr(recipe_suggestion_service, "ranking_engine", RecipeRankingEngine(index))
+    return index
+
+
+def add_recipe(db, title, names):
+    db.add(Recipe(title=title, ingredients=[
+        RecipeIngredient(canonical_ingredient=db.query(CanonicalIngredient).filter_by(name=name).first()
+                         or CanonicalIngredient(name=name), position=i, text=name)
+        for i, name in enumerate(names)
+    ]))
+    db.flush()
+
+
+def test_digests_suggest_a_recipe_for_the_expiring_items(engine, ranking, monkeypatch):
+    with Session(engine) as db:
+        add_recipe(db, "Spinach omelette", ["spinach", "egg"])
+        add_recipe(db, "Rice pudding", ["rice", "milk"])
+        for user_id, items in ((1, [("spinach", 1), ("egg", 30), ("rice", 40)]),
+                               (2, [("milk", 0), ("rice", 50), ("egg", 50)]),
+                               (3, [("kale", 2)])):
+            db.add(User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com",
+                        fcm_token=f"token-{user_id}"))
+            db.add_all(Ingredient(name=name, amount=1, unit="piece", user_id=user_id,
+                                  expiration_date=TODAY + timedelta(days=days)) for name, days in items)
+        db.commit()
+
+        monkeypatch.setattr("app.core.config.settings.EXPIRATION_SUGGESTION_BATCH_SIZE", 2)
+        pantry_queries = []
+        on_execute = lambda conn, cursor, statement, *args: pantry_queries.append(statement) \
+            if "ingredients.user_id IN" in statement else None
+        event.listen(engine, "before_cursor_execute", on_execute)
+        try:
+            transport = CollectingTransport()
+            result = run_expiration_digest(db, PushDelivery(transport), today=TODAY)
+        finally:
+            event.remove(engine, "before_cursor_execute", on_execute)
+
+    messages = {message.token: message for message in transport.messages}
+    assert result["users"] == 3 and result["sent"] == 3
+    assert messages["token-1"].body == "spinach expires tomorrow. Try Spinach omelette."
+    assert messages["token-2"].body == "milk expires today. Try Rice pudding."
+    assert "recipe_id" not in messages["token-3"].data
+    # Three users in batches of two: two pantry queries, not one per user
+    assert len(pantry_queries) == 2
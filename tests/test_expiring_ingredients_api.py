@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db.database import get_db
+from app.main import app
+from app.models.ingredient import Ingredient
+from app.models.user import User
+from app.services import job_scheduler as job_scheduler_module, notification_service
+
+
+@pytest.fixture
+def client(engine, monkeypatch):
+    def send(*args, **kwargs):
+        raise AssertionError("a read must not send notifications")
+    monkeypatch.setattr(notification_service, "run_expiration_digest", send)
+    monkeypatch.setattr(job_scheduler_module.job_scheduler, "session_factory", sessionmaker(engine))
+
+    def get_test_db():
+        with Session(engine) as db:
+            yield db
+    app.dependency_overrides[get_db] = get_test_db
+    with Session(engine) as db:
+        db.add(User(id=1, username="cook", email="cook@example.com", fcm_token="token-1"))
+        db.add_all([
+            Ingredient(name="milk", amount=1, unit="l", user_id=1, expiration_date=date.today() + timedelta(days=1)),
+            Ingredient(name="rice", amount=1, unit="kg", user_id=1, expiration_date=date.today() + timedelta(days=300)),
+        ])
+        db.commit()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_listing_expiring_ingredients_is_read_only(client):
+    response = client.get("/api/v1/expiring-ingredients")
+
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()["expiring_ingredients"]] == ["milk"]
+
+
+def test_triggering_a_check_needs_the_job_token(client, monkeypatch):
+    assert client.post("/api/v1/trigger-expiration-check").status_code == 403
+
+    monkeypatch.setattr("app.core.config.settings.JOB_TRIGGER_TOKEN", "s3cret")
+    assert client.post("/api/v1/trigger-expiration-check").status_code == 401
+    assert client.post("/api/v1/trigger-expiration-check", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.post("/api/v1/trigger-expiration-check", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 202
+    assert len(response.json()["run_ids"]) == 1
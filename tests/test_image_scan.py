@@ -0,0 +1,33 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from app.core.config import settings
+from app.services import image_scan
+
+
+@pytest.mark.parametrize("limit", [1, 2])
+def test_concurrent_scans_are_capped(limit, monkeypatch):
+    monkeypatch.setattr(settings, "SCAN_MAX_CONCURRENT", limit)
+    monkeypatch.setattr(image_scan, "_scan_slots", None)
+    lock, active, peak = threading.Lock(), [0], [0]
+
+    def scan_images(images, top_k):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return {"images": len(images)}
+    monkeypatch.setattr(image_scan, "scan_images", scan_images)
+
+    async def main():
+        return await asyncio.gather(*(image_scan.scan_images_async([b"photo"], 5) for _ in range(6)))
+
+    assert asyncio.run(main()) == [{"images": 1}] * 6
+    assert peak[0] == limit
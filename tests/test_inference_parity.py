@@ -0,0 +1,63 @@
+"""Exported backends must classify a fixed image set like the float Keras model.
+
+Needs the models written by export_models.py in MODEL_DIR (or PARITY_MODEL_DIR) and skips
+without them. PARITY_IMAGES_DIR points at a folder of photos; without it a deterministic
+synthetic set is used. Same check as benchmarks/bench_inference_backends.py --min-top1.
+"""
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("tensorflow")
+
+from app.core.config import settings
+from app.services.inference_backends import create_backend, model_path
+from benchmarks.bench_inference_backends import image_set, predict, preprocess
+
+SIZE = 224
+IMAGES = 16
+BATCH_SIZE = 8
+# Minimum top-1 agreement with keras:none; quantized weights may flip a few close calls
+MIN_TOP1 = {
+    "tflite:none": 0.99,
+    "onnx:none": 0.99,
+    "tflite:float16": 0.95,
+    "tflite:int8": 0.85,
+    "onnx:int8": 0.85,
+}
+MODEL_DIR = os.environ.get("PARITY_MODEL_DIR") or settings.MODEL_DIR
+
+
+@pytest.fixture(scope="module")
+def batch():
+    images = image_set(os.environ.get("PARITY_IMAGES_DIR"), IMAGES)
+    if not images:
+        pytest.skip("no images in PARITY_IMAGES_DIR")
+    return preprocess(images, SIZE)
+
+
+@pytest.fixture(scope="module")
+def reference(batch):
+    if not os.path.exists(model_path(MODEL_DIR, SIZE, "keras")):
+        pytest.skip(f"no exported Keras weights in {MODEL_DIR}; run export_models.py")
+    predictions = predict(create_backend("keras", SIZE, model_dir=MODEL_DIR), batch, BATCH_SIZE)
+    # Untrained (--random-weights) exports are near-uniform, and their top-1 means nothing
+    if predictions.max() < 0.05:
+        pytest.skip("the exported Keras weights are untrained")
+    return predictions
+
+
+@pytest.mark.parametrize("config", sorted(MIN_TOP1))
+def test_backend_agrees_with_keras(config, batch, reference):
+    backend, quantization = config.split(":")
+    if not os.path.exists(model_path(MODEL_DIR, SIZE, backend, quantization)):
+        pytest.skip(f"{config} was not exported to {MODEL_DIR}")
+    try:
+        model = create_backend(backend, SIZE, quantization, model_dir=MODEL_DIR)
+    except ImportError as e:
+        pytest.skip(f"{backend} runtime not installed ({e})")
+
+    predictions = predict(model, batch, BATCH_SIZE)
+    top1 = np.mean(predictions.argmax(axis=1) == reference.argmax(axis=1))
+    assert top1 >= MIN_TOP1[config], f"{config}: top-1 agreement {top1:.1%}"
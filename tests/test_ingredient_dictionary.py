@@ -0,0 +1,24 @@
+import pytest
+
+from app.services.ingredient_dictionary import resolve_ingredient
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 large ripe tomatoes", "tomato"),
+    ("cherry tomatoes", "tomato"),
+    ("chopped fresh parsley", "parsley"),
+    ("frozen peas", "pea"),
+    ("boneless skinless chicken breasts", "chicken"),
+    ("garlic cloves, minced", "garlic"),
+    ("salt and pepper to taste", "black pepper"),
+    ("extra virgin olive oil", "olive oil"),
+    ("cherry tomatos", "tomato"),
+    ("chopped parsely", "parsley"),
+])
+def test_descriptors_around_a_known_name_resolve(text, expected):
+    assert resolve_ingredient(text) == expected
+
+
+@pytest.mark.parametrize("text", ["peanut oil", "carrot cake", "corned beef", "chocolate milk", "egg noodles"])
+def test_unknown_compounds_do_not_resolve_to_a_word_inside_them(text):
+    assert resolve_ingredient(text) is None
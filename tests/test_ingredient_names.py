@@ -0,0 +1,38 @@
+import pytest
+
+from app.services.ingredient_names import normalize_ingredient_name, parse_ingredient_line
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2 Cups of Flour", "flour"),
+    ("Cherry_Tomatoes ", "cherry tomato"),
+    ("3 eggs", "egg"),
+    ("2 x 400 g tomatoes", "tomato"),
+    ("a pinch of salt", "salt"),
+    ("an onion", "onion"),
+    # Unit words are only quantities after a count
+    ("pound cake", "pound cake"),
+    ("a pound cake", "pound cake"),
+    ("a pound of butter", "butter"),
+    ("can opener", "can opener"),
+    ("c", "c"),
+])
+def test_normalize_ingredient_name(text, expected):
+    assert normalize_ingredient_name(text) == expected
+
+
+@pytest.mark.parametrize("line, expected", [
+    ("1 1/2 cups flour, sifted", (1.5, "cup", "flour")),
+    ("2-3 tomatoes (ripe)", (2.0, None, "tomato")),
+    ("1 pound cake", (1.0, "lb", "cake")),
+    ("1 pound cake, sliced", (1.0, "lb", "cake")),
+    ("2 cups of flour", (2.0, "cup", "flour")),
+    ("Pinch of salt", (None, "pinch", "salt")),
+    ("2 x 400 g tomatoes", (2.0, None, "tomato")),
+    # Without an amount a unit word is part of the name
+    ("pound cake", (None, None, "pound cake")),
+    ("can opener", (None, None, "can opener")),
+    ("For the sauce:", (None, None, "")),
+])
+def test_parse_ingredient_line(line, expected):
+    assert parse_ingredient_line(line) == expected
@@ -0,0 +1,38 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.v1.endpoints import ingredients
+from app.db.database import get_db
+from app.models.user import User
+
+
+@pytest.fixture
+def http(engine, monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(ingredients, "invalidate_pantry", invalidated.append)
+    with Session(engine) as db:
+        db.add(User(id=1, username="cook", email="cook@example.com"))
+        db.commit()
+
+    def get_test_db():
+        with Session(engine) as db:
+            yield db
+    app = FastAPI()
+    app.include_router(ingredients.router, prefix="/ingredients")
+    app.dependency_overrides[get_db] = get_test_db
+    with TestClient(app) as http:
+        http.invalidated = invalidated
+        yield http
+
+
+def test_every_write_invalidates_the_owners_pantry(http):
+    created = http.post("/ingredients/", json={"name": "rice", "amount": 1, "unit": "kg", "user_id": 1})
+    assert created.status_code == 200
+    ingredient_id = created.json()["id"]
+
+    assert http.put(f"/ingredients/{ingredient_id}", json={"amount": 2}).json()["amount"] == 2
+    assert http.delete(f"/ingredients/{ingredient_id}").status_code == 200
+    assert http.get("/ingredients/", params={"user_id": 1}).json() == []
+    assert http.invalidated == [1, 1, 1]
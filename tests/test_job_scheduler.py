@@ -0,0 +1,38 @@
+import time
+from datetime import datetime
+
+from sqlalchemy.orm import sessionmaker
+
+from app.services.job_scheduler import LEADER_LOCK, JobScheduler, acquire_lock, enqueue_runs
+
+
+def test_leader_keeps_its_lease_while_a_job_runs(engine):
+    session_factory = sessionmaker(engine)
+    lease_s = 0.3
+    contested = []
+
+    def slow_job(db, shard):
+        # Well past the lease: without a heartbeat another process would take over meanwhile
+        for _ in range(4):
+            time.sleep(lease_s / 2)
+            with session_factory() as other:
+                contested.append(acquire_lock(other, LEADER_LOCK, "other-process", lease_s))
+
+    scheduler = JobScheduler(session_factory, {"slow": slow_job}, lease_s=lease_s)
+    with session_factory() as db:
+        enqueue_runs(db, "slow", 1, "manual")
+    scheduler.tick()
+
+    assert scheduler.runs_executed == 1
+    assert contested == [False] * 4
+    assert scheduler.is_leader
+
+
+def test_lapsed_lease_is_taken_over(engine):
+    session_factory = sessionmaker(engine)
+    scheduler = JobScheduler(session_factory, {}, lease_s=0.05)
+    scheduler.tick()
+    time.sleep(0.1)
+
+    with session_factory() as db:
+        assert acquire_lock(db, LEADER_LOCK, "other-process", 60, now=datetime.utcnow())
@@ -0,0 +1,27 @@
+from datetime import date
+
+import pytest
+
+from app.core.config import settings
+from app.services.label_text import date_order, scan_label_text
+
+
+@pytest.mark.parametrize("locale, expected", [
+    ("en_US", "mdy"), ("en-GB", "dmy"), ("de_DE", "dmy"), ("ja", "ymd"),
+    ("de", "dmy"), ("fr", "dmy"), ("es", "dmy"), ("en", "mdy"), (None, "mdy"),
+])
+def test_date_order(locale, expected, monkeypatch):
+    monkeypatch.setattr(settings, "LABEL_TEXT_LOCALE", "en_US")
+    assert date_order(locale) == expected
+
+
+def test_bare_english_follows_the_default_locale(monkeypatch):
+    monkeypatch.setattr(settings, "LABEL_TEXT_LOCALE", "en_GB")
+    assert date_order("en") == "dmy"
+    monkeypatch.setattr(settings, "LABEL_TEXT_LOCALE", "en")
+    assert date_order("en") == date_order() == "dmy"
+
+
+def test_german_label_is_read_day_first(monkeypatch):
+    monkeypatch.setattr(settings, "LABEL_TEXT_LOCALE", "en_US")
+    assert scan_label_text("MHD 05/06/2025", "de").dates == [date(2025, 6, 5)]
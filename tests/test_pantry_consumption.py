@@ -0,0 +1,97 @@
+"""Concurrent ingredient uses and "mark cooked" calls must not lose updates.
+
+Runs against a temporary SQLite file, or against STRESS_DATABASE_URL (e.g. a scratch Postgres
+database) when that is set.
+"""
+import os
+import threading
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, create_db_engine
+from app.models.ingredient import Ingredient
+from app.models.user import User
+from app.models.user_recipe import UserRecipe
+from app.services.ingredient_service import consume_ingredient
+from app.services.user_recipe_service import RecipeRequirement, mark_recipe_cooked
+
+THREADS = 8
+ITERATIONS = 25
+RECIPE_ID = 715538
+FLOUR_PER_RECIPE = 10.0
+START_AMOUNT = THREADS * ITERATIONS * 2
+
+
+@pytest.fixture
+def Session(engine):
+    url = os.environ.get("STRESS_DATABASE_URL")
+    if url:
+        engine = create_db_engine(url, pool_size=THREADS, max_overflow=0)
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    if url:
+        engine.dispose()
+
+
+@pytest.fixture
+def pantry(Session):
+    with Session() as db:
+        user_id = db.execute(insert(User).values(email="stress@example.com").returning(User.id)).scalar_one()
+        egg_id = db.execute(
+            insert(Ingredient).values(name="egg", amount=START_AMOUNT, user_id=user_id).returning(Ingredient.id)
+        ).scalar_one()
+        flour_id = db.execute(
+            insert(Ingredient).values(name="flour", amount=START_AMOUNT * FLOUR_PER_RECIPE, unit="g", user_id=user_id)
+            .returning(Ingredient.id)
+        ).scalar_one()
+        db.commit()
+    return user_id, egg_id, flour_id
+
+
+def hammer(Session, operation):
+    # Returns how many calls went through; a call SQLite gave up on fails as a whole
+    succeeded = []
+
+    def worker():
+        for _ in range(ITERATIONS):
+            with Session() as db:
+                try:
+                    operation(db)
+                    succeeded.append(1)
+                except OperationalError:
+                    db.rollback()
+
+    workers = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return len(succeeded)
+
+
+def test_concurrent_uses_all_count(Session, pantry):
+    _, egg_id, _ = pantry
+    succeeded = hammer(Session, lambda db: consume_ingredient(db, egg_id, 1))
+
+    with Session() as db:
+        stored = db.scalar(select(Ingredient.amount).where(Ingredient.id == egg_id))
+    assert succeeded > 0
+    assert stored == START_AMOUNT - succeeded
+
+
+def test_concurrent_mark_cooked_deducts_and_counts_every_call(Session, pantry):
+    user_id, _, flour_id = pantry
+    requirements = [RecipeRequirement("Flour", FLOUR_PER_RECIPE, "g")]
+    succeeded = hammer(Session, lambda db: mark_recipe_cooked(db, user_id, RECIPE_ID, requirements))
+
+    with Session() as db:
+        flour = db.scalar(select(Ingredient.amount).where(Ingredient.id == flour_id))
+        cook_count = db.scalar(select(UserRecipe.cook_count).where(UserRecipe.user_id == user_id,
+                                                                   UserRecipe.recipe_id == RECIPE_ID))
+    assert succeeded > 0
+    assert cook_count == succeeded
+    assert flour == (START_AMOUNT - succeeded) * FLOUR_PER_RECIPE
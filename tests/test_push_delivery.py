@@ -0,0 +1,55 @@
+import pytest
+
+from app.services.push_delivery import PushDelivery, PushMessage, is_invalid_token
+
+
+def messages(count):
+    return [PushMessage(f"token-{i}", "Ingredient Expiring Soon", f"item {i}") for i in range(count)]
+
+
+def test_messages_go_out_in_send_each_chunks(messaging_transport):
+    report = PushDelivery(messaging_transport, chunk_size=4).deliver(messages(10))
+
+    assert sorted(messaging_transport.batch_sizes) == [2, 4, 4]
+    assert report.send_calls == 3 and report.sent == 10
+    assert len(messaging_transport.delivered) == 10
+
+
+def test_transient_failures_are_retried(messaging_transport):
+    messaging_transport.transient_failures = {"token-1": 2}
+    messaging_transport.fail_calls = 1
+    report = PushDelivery(messaging_transport, chunk_size=10, max_retries=3, backoff=0).deliver(messages(3))
+
+    # The failed call, the call with token-1 failing, then token-1 alone twice
+    assert messaging_transport.batch_sizes == [3, 3, 1, 1]
+    assert report.sent == 3 and report.failed == 0 and report.retried == 5
+
+
+def test_retries_give_up_after_max_retries(messaging_transport):
+    messaging_transport.transient_failures = {"token-0": 10}
+    report = PushDelivery(messaging_transport, max_retries=2, backoff=0).deliver(messages(1))
+
+    assert messaging_transport.send_calls == 3
+    assert report.failed == 1 and report.invalid_tokens == []
+
+
+def test_only_dead_tokens_are_pruned(messaging_transport):
+    messaging_transport.invalid_tokens = {"token-0"}
+    messaging_transport.rejected_tokens = {"token-1": "SENDER_ID_MISMATCH", "token-2": "INVALID_ARGUMENT",
+                                           "token-3": "PERMISSION_DENIED"}
+    report = PushDelivery(messaging_transport, backoff=0).deliver(messages(5))
+
+    assert sorted(report.invalid_tokens) == ["token-0", "token-1"]
+    assert report.sent == 1 and report.failed == 4
+    # Permanent errors are not retried
+    assert messaging_transport.send_calls == 1
+
+
+def test_firebase_token_errors_are_pruned():
+    messaging = pytest.importorskip("firebase_admin.messaging")
+    from firebase_admin import exceptions
+
+    assert is_invalid_token(messaging.UnregisteredError("gone"))
+    assert is_invalid_token(messaging.SenderIdMismatchError("other project"))
+    assert not is_invalid_token(exceptions.InvalidArgumentError("bad payload"))
+    assert not is_invalid_token(exceptions.PermissionDeniedError("bad credentials"))
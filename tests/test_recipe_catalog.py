@@ -0,0 +1,37 @@
+from sqlalchemy.orm import Session
+
+from app.models.recipe import Recipe
+from app.services.recipe_catalog import UNNAMED_INGREDIENT, ingredient_rows, recipe_ids_containing, recipes_containing
+from app.services.recipe_index import RecipeIndex
+
+
+def test_lines_without_a_name_keep_their_place(engine):
+    with Session(engine) as db:
+        recipe = Recipe(title="Pasta", ingredients=ingredient_rows(db, ["For the sauce:", "400 g tomatoes", "Salt:"]))
+        db.add(recipe)
+        db.commit()
+
+        assert [(item.position, item.text, item.canonical_ingredient.name) for item in recipe.ingredients] == [
+            (0, "For the sauce:", UNNAMED_INGREDIENT), (1, "400 g tomatoes", "tomato"), (2, "Salt:", UNNAMED_INGREDIENT),
+        ]
+        # Both headings share the one fallback row, which search and the index skip
+        assert recipe.ingredients[0].canonical_ingredient_id == recipe.ingredients[2].canonical_ingredient_id
+        assert recipe_ids_containing(db, ["tomato"]) == [recipe.id]
+        assert recipe_ids_containing(db, [""]) == []
+        index = RecipeIndex()
+        index.add_db_recipe(recipe)
+        assert index.ingredients_of(recipe.id) == {"tomato"}
+
+
+def test_alias_lines_are_found_under_their_canonical_name(engine):
+    with Session(engine) as db:
+        recipe = Recipe(title="Ratatouille", ingredients=ingredient_rows(
+            db, ["2 roma tomatoes", "1 aubergine", "3 scallions, sliced", "2 tbsp peanut oil"]))
+        db.add(recipe)
+        db.commit()
+
+        assert [item.canonical_ingredient.name for item in recipe.ingredients] == [
+            "tomato", "eggplant", "green onion", "peanut oil",
+        ]
+        assert [found.id for found in recipes_containing(db, ["tomato"])] == [recipe.id]
+        assert recipe_ids_containing(db, ["Aubergine", "spring onions"]) == [recipe.id]
@@ -0,0 +1,81 @@
+from sqlalchemy import delete, update
+from sqlalchemy.orm import Session
+
+from app.models.canonical_ingredient import CanonicalIngredient
+from app.models.recipe import Recipe
+from app.models.recipe_ingredient import RecipeIngredient
+from app.services.recipe_index import RecipeIndex
+
+
+def add_recipe(db, title, names):
+    # What another worker's import leaves in the tables
+    recipe = Recipe(title=title)
+    recipe.ingredients = [
+        RecipeIngredient(canonical_ingredient=db.query(CanonicalIngredient).filter_by(name=name).first()
+                         or CanonicalIngredient(name=name), position=i, text=name)
+        for i, name in enumerate(names)
+    ]
+    db.add(recipe)
+    db.commit()
+    return recipe
+
+
+def test_refresh_sees_other_workers_additions_edits_and_deletes(engine):
+    index = RecipeIndex()
+    with Session(engine) as db:
+        soup = add_recipe(db, "Soup", ["tomato", "onion"])
+        salad = add_recipe(db, "Salad", ["lettuce"])
+        index.refresh(db)
+        assert index.ingredients_of(soup.id) == {"tomato", "onion"}
+
+        stew = add_recipe(db, "Stew", ["beef", "carrot"])
+        # Edited in place, as a re-import of a changed page does
+        soup.ingredients = [RecipeIngredient(canonical_ingredient=CanonicalIngredient(name="leek"), position=0, text="leek")]
+        soup.title = "Leek soup"
+        db.commit()
+        db.execute(delete(RecipeIngredient).where(RecipeIngredient.recipe_id == salad.id))
+        db.execute(delete(Recipe).where(Recipe.id == salad.id))
+        db.commit()
+
+        version = index.version
+        index.refresh(db)
+        assert index.ingredients_of(stew.id) == {"beef", "carrot"}
+        assert index.ingredients_of(soup.id) == {"leek"}
+        assert index.meta_of(soup.id)[0] == "Leek soup"
+        assert index.ingredients_of(salad.id) == frozenset()
+        assert [item["id"] for item in index.rank(["lettuce"])] == []
+        assert index.version > version
+
+        # Recently updated recipes are read again, but unchanged ones don't move the version
+        version = index.version
+        index.refresh(db)
+        assert index.version == version
+
+
+def test_ensure_loaded_refreshes_at_most_every_interval(engine):
+    index = RecipeIndex()
+    with Session(engine) as db:
+        add_recipe(db, "Soup", ["tomato"])
+        index.ensure_loaded(db, max_age_s=3600)
+        pasta = add_recipe(db, "Pasta", ["spaghetti"])
+        index.ensure_loaded(db, max_age_s=3600)
+        assert index.ingredients_of(pasta.id) == frozenset()
+
+        index.ensure_loaded(db, max_age_s=0)
+        index.ensure_loaded(db, max_age_s=0)
+        assert index.ingredients_of(pasta.id) == {"spaghetti"}
+
+
+def test_snapshot_keeps_the_update_watermark(engine, tmp_path):
+    index = RecipeIndex()
+    with Session(engine) as db:
+        recipe = add_recipe(db, "Soup", ["tomato"])
+        index.refresh(db)
+        index.save_snapshot(tmp_path / "index.json")
+
+        db.execute(update(Recipe).where(Recipe.id == recipe.id).values(title="Tomato soup"))
+        db.commit()
+        restored = RecipeIndex()
+        assert restored.load_snapshot(tmp_path / "index.json")
+        restored.refresh(db)
+        assert restored.meta_of(recipe.id)[0] == "Tomato soup"
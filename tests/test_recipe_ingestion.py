@@ -0,0 +1,205 @@
+import asyncio
+import json
+import socket
+from collections import Counter
+
+import httpx
+import pytest
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.db import database
+from app.db.database import create_async_db_engine
+from app.models.recipe import Recipe
+from app.models.saved_recipe import SavedRecipe
+from app.models.user import User
+from app.services import recipe_ingestion
+from app.services.recipe_index import RecipeIndex
+from app.services.recipe_ingestion import RecipeFetcher, RecipeImportError, import_recipe_links
+
+MAX_BYTES = 64 * 1024
+# What the fake resolver answers; the site itself is addressed by name through the Host header
+DNS = {
+    "kitchen.example": ["93.184.216.34"],
+    "mirror.example": ["93.184.216.35"],
+    "intranet.example": ["10.0.0.7"],
+    "rebind.example": ["93.184.216.36", "127.0.0.1"],
+}
+
+
+def fake_getaddrinfo(host, port, type=0):
+    if host not in DNS:
+        raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+    return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port)) for address in DNS[host]]
+
+
+def recipe_page(name, ingredients, steps="Cook it.", canonical=None, filler=0):
+    node = {"@context": "https://schema.org", "@type": "Recipe", "name": name,
+            "recipeIngredient": ingredients, "recipeInstructions": steps}
+    head = f'<link rel="canonical" href="{canonical}">' if canonical else ""
+    return (f'<html><head>{head}<script type="application/ld+json">{json.dumps(node)}</script></head>'
+            f"<body>{'Lorem ipsum dolor sit amet. ' * filler}</body></html>").encode()
+
+
+class FixtureSite:
+    """MockTransport handler playing recipe sites, with ETags, 304s and per-host concurrency counts."""
+
+    def __init__(self):
+        self.pages = {}
+        self.redirects = {}
+        self.requests = []
+        self.in_flight = Counter()
+        self.max_in_flight = Counter()
+
+    def publish(self, host, path, body, version="v1"):
+        self.pages[host, path] = (body, f'"{version}"')
+
+    async def __call__(self, request):
+        host = request.headers["host"]
+        self.requests.append(request)
+        self.in_flight[host] += 1
+        self.max_in_flight[host] = max(self.max_in_flight[host], self.in_flight[host])
+        try:
+            await asyncio.sleep(0.01)
+            if request.url.path in self.redirects:
+                return httpx.Response(302, headers={"Location": self.redirects[request.url.path]})
+            page = self.pages.get((host, request.url.path))
+            if page is None:
+                return httpx.Response(404, text="not found")
+            body, etag = page
+            if request.headers.get("if-none-match") == etag:
+                return httpx.Response(304, headers={"ETag": etag})
+            return httpx.Response(200, content=body, headers={"Content-Type": "text/html; charset=utf-8", "ETag": etag})
+        finally:
+            self.in_flight[host] -= 1
+
+
+@pytest.fixture
+def site():
+    site = FixtureSite()
+    site.publish("kitchen.example", "/recipes/pasta", recipe_page("Tomato Pasta", ["200 g spaghetti", "400 g tomatoes"]))
+    site.publish("kitchen.example", "/recipes/soup", recipe_page("Lentil Soup", ["1 onion", "250 g red lentils"]))
+    site.publish("mirror.example", "/tomato-pasta", recipe_page("Tomato Pasta", ["200 g spaghetti", "400 g tomatoes"]))
+    site.publish("kitchen.example", "/amp/curry", recipe_page("Chickpea Curry", ["1 can chickpeas"],
+                                                              canonical="https://kitchen.example/recipes/curry/"))
+    site.publish("kitchen.example", "/recipes/curry", recipe_page("Chickpea Curry", ["1 can chickpeas"]))
+    site.publish("kitchen.example", "/about", b"<html><body>No recipes here</body></html>")
+    site.publish("kitchen.example", "/recipes/huge", recipe_page("Huge", ["1 egg"], filler=MAX_BYTES // 20))
+    site.redirects["/go/intranet"] = "https://intranet.example/recipe"
+    for i in range(8):
+        site.publish("kitchen.example", f"/salads/{i}", recipe_page(f"Salad {i}", [f"{i} tomatoes", "1 cucumber"]))
+    return site
+
+
+@pytest.fixture
+def importer(engine, site, monkeypatch):
+    monkeypatch.setattr(recipe_ingestion, "recipe_index", RecipeIndex())
+    # Pages are stored through the worker-thread session, so point it at the test database too
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(engine))
+    with engine.begin() as connection:
+        users = [connection.execute(insert(User).values(email=f"{name}@example.com").returning(User.id)).scalar_one()
+                 for name in ("a", "b")]
+
+    def run(user, urls, fetcher=None):
+        async def main():
+            async_engine = create_async_db_engine(str(engine.url))
+            fetcher_ = fetcher or RecipeFetcher(per_host=2, max_bytes=MAX_BYTES, transport=httpx.MockTransport(site),
+                                                getaddrinfo=fake_getaddrinfo)
+            try:
+                async with async_sessionmaker(async_engine, expire_on_commit=False)() as db:
+                    results = await import_recipe_links(db, users[user], urls, fetcher=fetcher_)
+            finally:
+                await fetcher_.aclose()
+                await async_engine.dispose()
+            return {result["url"]: result for result in results}
+        return asyncio.run(main())
+
+    run.users = users
+    return run
+
+
+def test_pages_and_recipes_are_stored_once(importer, engine):
+    pasta = "https://kitchen.example/recipes/pasta"
+    first = importer(0, [pasta, "HTTPS://Kitchen.example/recipes/pasta/?utm_source=mail#top",
+                         "https://mirror.example/tomato-pasta", "https://kitchen.example/amp/curry"])
+    pasta_id = first[pasta]["recipe"]["id"]
+
+    assert first[pasta]["status"] == "created"
+    assert first["HTTPS://Kitchen.example/recipes/pasta/?utm_source=mail#top"]["recipe"]["id"] == pasta_id
+    assert first["https://mirror.example/tomato-pasta"]["status"] == "existing"
+    assert first["https://mirror.example/tomato-pasta"]["recipe"]["id"] == pasta_id
+    assert first["https://kitchen.example/amp/curry"]["recipe"]["source_url"] == "https://kitchen.example/recipes/curry"
+
+    second = importer(1, [pasta, "https://kitchen.example/recipes/curry"])
+    assert second[pasta]["recipe"]["id"] == pasta_id
+    assert second["https://kitchen.example/recipes/curry"]["recipe"]["id"] == \
+        first["https://kitchen.example/amp/curry"]["recipe"]["id"]
+    with engine.connect() as connection:
+        assert connection.scalar(select(func.count()).select_from(Recipe)) == 2
+        links = dict(connection.execute(select(SavedRecipe.user_id, func.count()).group_by(SavedRecipe.user_id)).all())
+    assert links == {importer.users[0]: 2, importer.users[1]: 2}
+
+
+def test_reimports_are_conditional(importer, site):
+    soup = "https://kitchen.example/recipes/soup"
+    created = importer(0, [soup])[soup]["recipe"]
+
+    assert importer(0, [soup])[soup]["status"] == "not_modified"
+    assert site.requests[-1].headers["if-none-match"] == '"v1"'
+
+    site.publish("kitchen.example", "/recipes/soup",
+                 recipe_page("Lentil Soup", ["1 onion", "250 g red lentils"], steps="Blend half."), version="v2")
+    updated = importer(0, [soup])[soup]
+    assert updated["status"] == "updated"
+    assert updated["recipe"]["id"] == created["id"]
+    assert updated["recipe"]["instructions"] == "Blend half."
+
+
+def test_no_host_sees_more_than_per_host_requests(importer, site):
+    results = importer(0, [f"https://kitchen.example/salads/{i}" for i in range(8)])
+
+    assert all(result["status"] == "created" for result in results.values())
+    assert site.max_in_flight["kitchen.example"] == 2
+
+
+def test_bad_pages_fail_on_their_own(importer):
+    urls = ["https://kitchen.example/about", "https://kitchen.example/recipes/huge",
+            "https://kitchen.example/recipes/gone", "ftp://kitchen.example/recipe", "https://kitchen.example/recipes/pasta"]
+    results = importer(0, urls)
+
+    assert [results[url].get("status_code") for url in urls] == [422, 413, 502, 400, None]
+    assert results["https://kitchen.example/recipes/pasta"]["status"] == "created"
+
+
+@pytest.mark.parametrize("url", [
+    "https://intranet.example/recipe",
+    "https://rebind.example/recipe",
+    "http://127.0.0.1:8000/recipe",
+    "http://[::ffff:10.0.0.1]/recipe",
+    "http://localhost/recipe",
+    "https://kitchen.example/go/intranet",
+])
+def test_private_addresses_are_refused(importer, site, url):
+    results = importer(0, [url])
+
+    assert results[url]["status_code"] == 400
+    assert not any(request.headers["host"] != "kitchen.example" for request in site.requests)
+
+
+def test_connections_go_to_the_vetted_address(importer, site):
+    importer(0, ["https://kitchen.example/recipes/pasta"])
+
+    request = site.requests[-1]
+    # The request the transport saw went to the address checked, still naming the site
+    assert request.url.host == "93.184.216.34"
+    assert request.headers["host"] == "kitchen.example"
+    assert request.extensions["sni_hostname"] == "kitchen.example"
+
+
+def test_unresolvable_host_fails():
+    fetcher = RecipeFetcher(transport=httpx.MockTransport(lambda request: httpx.Response(200)),
+                            getaddrinfo=fake_getaddrinfo)
+    with pytest.raises(RecipeImportError) as error:
+        asyncio.run(fetcher.fetch("https://nowhere.example/recipe"))
+    assert error.value.status_code == 502
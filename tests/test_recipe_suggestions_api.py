@@ -0,0 +1,18 @@
+from fastapi.testclient import TestClient
+
+from app import main
+
+
+def test_suggestions_need_a_user(monkeypatch):
+    calls = []
+
+    async def suggestions_for_user(db, user_id):
+        calls.append(user_id)
+        return [{"id": 1, "title": "Soup"}]
+    monkeypatch.setattr(main, "get_recipe_suggestions_for_user_async", suggestions_for_user)
+    http = TestClient(main.app)
+
+    assert http.get("/api/v1/recipe-suggestions").status_code == 422
+    response = http.get("/api/v1/recipe-suggestions", params={"user_id": 3})
+    assert response.status_code == 200 and response.json() == [{"id": 1, "title": "Soup"}]
+    assert calls == [3]
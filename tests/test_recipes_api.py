@@ -0,0 +1,88 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.api.v1.endpoints import recipes
+from app.db.database import get_db
+from app.models.ingredient import Ingredient
+from app.models.user import User
+from app.services import user_recipe_service
+from app.services.spoonacular_client import SpoonacularClient
+
+WIDGET = {"ingredients": [
+    {"name": "Tomatoes", "amount": {"metric": {"value": 200, "unit": "g"}}},
+    {"name": "basil", "amount": {"metric": {"value": 5, "unit": "g"}}},
+]}
+INSTRUCTIONS = [{"steps": [{"step": "Chop the tomatoes."}, {"step": "Add the basil."}]}]
+
+
+def spoonacular_site(request):
+    if request.url.path == "/recipes/7/ingredientWidget.json":
+        return httpx.Response(200, json=WIDGET)
+    if request.url.path == "/recipes/7/analyzedInstructions":
+        return httpx.Response(200, json=INSTRUCTIONS)
+    return httpx.Response(404, json={"message": "not found"})
+
+
+@pytest.fixture
+def http(engine, monkeypatch):
+    transport = httpx.MockTransport(spoonacular_site)
+    client = SpoonacularClient("key", "https://spoonacular.test", backoff=0.01, max_retries=0,
+                               transport=transport, async_transport=transport)
+    monkeypatch.setattr(recipes, "spoonacular", client)
+    monkeypatch.setattr(user_recipe_service, "spoonacular", client)
+    with Session(engine) as db:
+        db.add(User(id=1, username="cook", email="cook@example.com"))
+        db.add(Ingredient(name="tomato", amount=500, unit="g", user_id=1))
+        db.commit()
+
+    def get_test_db():
+        with Session(engine) as db:
+            yield db
+    app = FastAPI()
+    app.include_router(recipes.router, prefix="/recipes")
+    app.dependency_overrides[get_db] = get_test_db
+    with TestClient(app) as http:
+        yield http
+
+
+def test_missing_ingredients_compare_normalised_names(http):
+    response = http.get("/recipes/7/missing_ingredients", params={"user_id": 1})
+
+    assert response.status_code == 200
+    assert response.json() == ["basil"]
+
+
+def test_instructions_are_joined_steps(http):
+    response = http.get("/recipes/7/instructions")
+
+    assert response.status_code == 200
+    assert response.json() == "Chop the tomatoes.\nAdd the basil."
+
+
+def test_spoonacular_errors_keep_their_status(http):
+    response = http.get("/recipes/8/missing_ingredients", params={"user_id": 1})
+
+    assert response.status_code == 404
+
+
+def test_mark_cooked_counts_and_deducts_the_pantry(http, engine):
+    first = http.post("/recipes/7/mark_cooked", params={"user_id": 1})
+    second = http.post("/recipes/7/mark_cooked", params={"user_id": 1})
+
+    assert first.status_code == second.status_code == 200
+    assert [first.json()["cook_count"], second.json()["cook_count"]] == [1, 2]
+    assert second.json()["skipped"] == ["basil"]
+    with Session(engine) as db:
+        assert db.query(Ingredient).filter_by(user_id=1).one().amount == 100
+
+
+def test_favorite_can_be_set_and_removed(http):
+    saved = http.post("/recipes/7/favorite", params={"user_id": 1})
+    assert saved.status_code == 200 and saved.json()["is_favorite"] is True
+
+    removed = http.delete("/recipes/7/favorite", params={"user_id": 1})
+    assert removed.status_code == 200 and removed.json()["is_favorite"] is False
+    assert http.delete("/recipes/8/favorite", params={"user_id": 1}).status_code == 404
@@ -0,0 +1,55 @@
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.db import database
+from app.db.database import run_in_session
+from app.main import app
+from app.models.ingredient import Ingredient
+from app.models.user import User
+
+
+def test_sync_work_runs_off_the_event_loop(engine, monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(engine))
+
+    def slow_refresh(db, delay):
+        time.sleep(delay)
+        return isinstance(db, Session)
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        ticker = asyncio.create_task(tick())
+        result = await run_in_session(slow_refresh, 0.3)
+        ticker.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(main())
+    assert result is True
+    # The loop kept serving other tasks while the refresh ran
+    assert ticks >= 10
+
+
+def test_bulk_create_writes_through_its_own_session(engine, monkeypatch):
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(engine))
+    with Session(engine) as db:
+        db.add(User(id=1, username="cook", email="cook@example.com"))
+        db.commit()
+
+    response = TestClient(app).post("/api/v1/ingredients/bulk", json=[
+        {"name": "rice", "amount": 1, "unit": "kg", "user_id": 1},
+        {"name": "milk", "amount": 1, "unit": "l", "user_id": 1},
+    ])
+
+    assert response.status_code == 200
+    assert [item["name"] for item in response.json()] == ["rice", "milk"]
+    with Session(engine) as db:
+        assert sorted(db.scalars(select(Ingredient.name))) == ["milk", "rice"]
@@ -0,0 +1,45 @@
+import time
+
+import httpx
+import pytest
+
+from app.services.spoonacular_client import SpoonacularClient, SpoonacularError, recipe_information
+
+
+def make_client(handler, **options):
+    return SpoonacularClient("key", "https://spoonacular.test", backoff=0.01,
+                             transport=httpx.MockTransport(handler), **options)
+
+
+def test_short_retry_after_is_waited_out():
+    responses = [httpx.Response(429, headers={"Retry-After": "0.05"}), httpx.Response(200, json={"id": 1})]
+    client = make_client(lambda request: responses.pop(0))
+
+    started = time.perf_counter()
+    assert client.get(recipe_information(1)) == {"id": 1}
+    assert time.perf_counter() - started >= 0.05
+
+
+def test_long_retry_after_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(429, headers={"Retry-After": "3600"})
+    client = make_client(handler, max_retry_after=5)
+
+    started = time.perf_counter()
+    with pytest.raises(SpoonacularError) as error:
+        client.get(recipe_information(1))
+    assert error.value.status_code == 429
+    assert len(calls) == 1
+    assert time.perf_counter() - started < 1
+
+
+def test_non_json_body_is_a_spoonacular_error():
+    client = make_client(lambda request: httpx.Response(200, text="<html>maintenance</html>"))
+
+    with pytest.raises(SpoonacularError) as error:
+        client.get(recipe_information(1))
+    assert error.value.status_code == 502
+    assert client.stats()["endpoints"]["information"]["errors"] == 1
@@ -0,0 +1,108 @@
+import hashlib
+import os
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.uploads import UploadLimitMiddleware, read_upload
+from tests.conftest import make_image
+
+MB = 1024 * 1024
+REQUEST_LIMIT = 4 * MB
+FILE_LIMIT = 2 * MB
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_bytes=REQUEST_LIMIT)
+    app.state.calls = 0
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        app.state.calls += 1
+        return {"size": len(await read_upload(file, FILE_LIMIT))}
+
+    with TestClient(app) as http:
+        yield http
+
+
+def multipart(content, boundary="test-boundary"):
+    head = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"photo.png\"\r\n"
+            f"Content-Type: image/png\r\n\r\n").encode()
+    return head + content + f"\r\n--{boundary}--\r\n".encode(), f"multipart/form-data; boundary={boundary}"
+
+
+def test_image_within_limits_is_accepted(client):
+    image = make_image()
+    response = client.post("/upload", files={"file": ("photo.png", image, "image/png")})
+
+    assert response.status_code == 200
+    assert response.json() == {"size": len(image)}
+
+
+def test_declared_content_length_over_the_limit_is_refused_early(client):
+    body, content_type = multipart(PNG_HEADER + bytes(REQUEST_LIMIT))
+    response = client.post("/upload", content=body, headers={"Content-Type": content_type})
+
+    assert response.status_code == 413
+    assert client.app.state.calls == 0
+
+
+def test_chunked_body_is_cut_off_at_the_limit(client):
+    body, content_type = multipart(PNG_HEADER + bytes(2 * REQUEST_LIMIT))
+
+    def chunks():
+        # No Content-Length: the body arrives with Transfer-Encoding: chunked
+        for start in range(0, len(body), 256 * 1024):
+            yield body[start:start + 256 * 1024]
+
+    response = client.post("/upload", content=chunks(), headers={"Content-Type": content_type})
+
+    assert response.status_code == 413
+    assert client.app.state.calls == 0
+
+
+def test_file_over_the_per_file_limit_is_refused(client):
+    response = client.post("/upload", files={"file": ("photo.png", PNG_HEADER + bytes(FILE_LIMIT), "image/png")})
+
+    assert response.status_code == 413
+
+
+def test_non_image_is_refused_by_sniffing_not_by_content_type(client):
+    response = client.post("/upload", files={"file": ("photo.png", b"%PDF-1.7 not a photo", "image/png")})
+
+    assert response.status_code == 415
+
+
+def anon_memory_kb():
+    with open("/proc/self/status") as f:
+        return next((int(line.split()[1]) for line in f if line.startswith("RssAnon")), None)
+
+
+def test_large_upload_is_not_copied_onto_the_heap():
+    if not os.path.exists("/proc/self/status") or anon_memory_kb() is None:
+        pytest.skip("needs /proc/self/status")
+    # The test client holds its own copies of the body, so memory is measured around the server's
+    # read: the spooled part is memory-mapped, and reading it all adds next to no anonymous memory
+    size = 64 * MB
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, max_bytes=2 * size)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        before = anon_memory_kb()
+        contents = await read_upload(file, 2 * size)
+        digest = hashlib.sha256(contents).hexdigest()
+        return {"size": len(contents), "sha256": digest, "anon_kb": anon_memory_kb() - before}
+
+    content = PNG_HEADER + bytes(size)
+    body, content_type = multipart(content)
+    with TestClient(app) as http:
+        response = http.post("/upload", content=body, headers={"Content-Type": content_type})
+
+    assert response.status_code == 200
+    assert response.json()["sha256"] == hashlib.sha256(content).hexdigest()
+    assert response.json()["anon_kb"] * 1024 < size / 8
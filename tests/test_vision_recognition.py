@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+vision = pytest.importorskip("google.cloud.vision")
+
+from app.api.v1.endpoints import image_recognition
+from app.core.config import settings
+from app.services.recognition_cache import create_recognition_cache
+from tests.conftest import make_image
+
+
+class StubVisionClient:
+    """Stands in for ImageAnnotatorClient: counts annotate calls and can be slow or fail."""
+
+    def __init__(self, latency_s=0.0, error=None):
+        self.latency_s = latency_s
+        self.error = error
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def batch_annotate_images(self, requests, timeout=None):
+        with self._lock:
+            self.calls.append(requests)
+        time.sleep(self.latency_s)
+        return vision.BatchAnnotateImagesResponse(responses=[self._response() for _ in requests])
+
+    def _response(self):
+        if self.error:
+            return vision.AnnotateImageResponse(error={"message": self.error})
+        return vision.AnnotateImageResponse(
+            text_annotations=[vision.EntityAnnotation(description="500 g tomatoes\nBEST BEFORE 2025-03-01", locale="en")],
+            label_annotations=[
+                vision.EntityAnnotation(description="Food", score=0.95),
+                vision.EntityAnnotation(description="Plum tomato", score=0.9),
+            ],
+        )
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(image_recognition, "vision_cache", create_recognition_cache("vision", "test"))
+    client = StubVisionClient()
+    app = FastAPI()
+    app.include_router(image_recognition.router)
+    app.dependency_overrides[image_recognition.get_vision_client] = lambda: client
+    with TestClient(app) as http:
+        client.http = http
+        yield client
+
+
+def upload(http, images):
+    files = [("files", (f"photo{i}.png", image, "image/png")) for i, image in enumerate(images)]
+    return http.post("/identify_ingredients", files=files)
+
+
+def test_one_request_with_both_features_per_image(stub):
+    response = stub.http.post("/identify_ingredient", files={"file": ("photo.png", make_image(), "image/png")})
+
+    assert response.status_code == 200
+    assert response.json()["ingredients"] == [{"name": "Tomato", "amount": "500 g", "expirationDate": "2025-03-01"}]
+    assert len(stub.calls) == 1
+    features = {feature.type_ for feature in stub.calls[0][0].features}
+    assert features == {vision.Feature.Type.TEXT_DETECTION, vision.Feature.Type.LABEL_DETECTION}
+
+
+def test_cache_hit_makes_no_call(stub):
+    image = make_image()
+    first = stub.http.post("/identify_ingredient", files={"file": ("photo.png", image, "image/png")})
+    second = stub.http.post("/identify_ingredient", files={"file": ("again.png", image, "image/png")})
+
+    assert first.json() == second.json()
+    assert len(stub.calls) == 1
+
+
+def test_only_misses_are_sent(stub):
+    cached, new = make_image((10, 200, 10)), make_image((10, 10, 200))
+    upload(stub.http, [cached])
+    response = upload(stub.http, [cached, new, cached])
+
+    assert response.status_code == 200
+    assert len(response.json()["results"]) == 3
+    # The second request only sends the image it hasn't seen
+    assert [len(requests) for requests in stub.calls] == [1, 1]
+
+
+def test_large_uploads_are_split_into_concurrent_requests(stub, monkeypatch):
+    monkeypatch.setattr(settings, "VISION_MAX_IMAGES_PER_REQUEST", 4)
+    stub.latency_s = 0.3
+    images = [make_image((i * 20, 0, 0)) for i in range(10)]
+
+    started = time.perf_counter()
+    response = upload(stub.http, images)
+    elapsed = time.perf_counter() - started
+
+    assert response.status_code == 200
+    assert sorted(len(requests) for requests in stub.calls) == [2, 4, 4]
+    # Three requests of 0.3 s each, in flight together
+    assert elapsed < 0.75
+
+
+def test_deadline_returns_504(stub, monkeypatch):
+    monkeypatch.setattr(settings, "VISION_DEADLINE_S", 0.05)
+    stub.latency_s = 0.3
+
+    response = stub.http.post("/identify_ingredient", files={"file": ("photo.png", make_image(), "image/png")})
+
+    assert response.status_code == 504
+    assert len(stub.calls) == 1
+
+
+def test_errors_are_not_cached(stub):
+    stub.error = "quota exceeded"
+    image = make_image()
+    for _ in range(2):
+        response = stub.http.post("/identify_ingredient", files={"file": ("photo.png", image, "image/png")})
+        assert response.status_code == 502
+
+    assert len(stub.calls) == 2